@@ -0,0 +1,407 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Backtest price alerts over the candle store.
+
+Vectorized port of `technicals-wasm/src/alert_engine.rs`. The engine compares
+every tick against the previous one, so an alert with target `t` fires on a
+step `prev -> cur` when
+
+    price_cross_up     prev < t <= cur
+    price_cross_down   cur <= t < prev
+    price_reached      either of the two, or cur == t on the very first tick
+
+Seen from the step instead of the alert, an up step fires exactly the targets
+in `(prev, cur]`, a contiguous slice of the sorted targets. Two
+`searchsorted` calls per step therefore find every firing alert, and the cost
+is O((bars + fires) log rules) instead of bars × rules.
+
+The engine disarms an alert after it fired. That is the default here too
+(`rearm=False`, what the app would have shown); `--rearm` counts every
+crossing instead, as if the alert had been recreated right away.
+
+    python alert_backtest.py --rules alerts.json --tf 1h
+    python alert_backtest.py --grid BTCUSDT --grid-levels 2000 --tf 15m --rearm --horizons 4,16,96
+
+`--rules` takes the `AlertDefinition` array the app hands to `set_alerts`.
+Prices are compared as float64; two decimal targets closer than float
+resolution would collapse, which no real alert level comes near.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from candle_store import DEFAULT_EXCHANGE, CandleStore
+
+CONDITIONS = ("price_cross_up", "price_cross_down", "price_reached")
+CROSS_UP, CROSS_DOWN, REACHED = range(3)
+
+DEFAULT_HORIZONS = (1, 4, 24)
+STEP_CHUNK = 1 << 16
+
+
+def parse_rules(definitions):
+    """
+    Column view of a list of `AlertDefinition` dicts:
+    {"id": list, "symbol": list, "kind": int8[], "target": float64[], "active": bool[]}.
+    """
+    ids, symbols, kinds, targets, active = [], [], [], [], []
+    for d in definitions:
+        (condition, target), = d["condition"].items()
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown alert condition '{condition}' in alert {d['id']}")
+        ids.append(d["id"])
+        symbols.append(d["symbol"])
+        kinds.append(CONDITIONS.index(condition))
+        targets.append(float(target))
+        active.append(bool(d.get("active", True)))
+    return {
+        "id": ids,
+        "symbol": symbols,
+        "kind": np.array(kinds, dtype=np.int8),
+        "target": np.array(targets, dtype=np.float64),
+        "active": np.array(active, dtype=bool),
+    }
+
+
+def grid_rules(symbol, low, high, levels, conditions=CONDITIONS):
+    """`levels` evenly spaced targets per condition between `low` and `high`."""
+    definitions = []
+    for condition in conditions:
+        for i, target in enumerate(np.linspace(low, high, levels)):
+            definitions.append({
+                "id": f"{symbol}:{condition}:{i}",
+                "symbol": symbol,
+                "condition": {condition: repr(float(target))},
+                "active": True,
+            })
+    return definitions
+
+
+def price_path(klines, path="close"):
+    """
+    Ticks to feed the engine: (prices, bar index of each tick).
+
+    `close` feeds one tick per bar. `ohlc` feeds open, the nearer extreme,
+    the farther extreme and close — the usual intrabar path assumption (a red
+    bar visits its high first, a green bar its low), which catches alerts
+    that the wicks crossed.
+    """
+    if path == "close":
+        prices = np.asarray(klines["close"], dtype=np.float64)
+        bars = np.arange(len(prices))
+    elif path == "ohlc":
+        o, h, l, c = (np.asarray(klines[f], dtype=np.float64) for f in ("open", "high", "low", "close"))
+        green = c >= o
+        prices = np.stack([o, np.where(green, l, h), np.where(green, h, l), c], axis=1).ravel()
+        bars = np.repeat(np.arange(len(c)), 4)
+    else:
+        raise ValueError(f"Unknown price path '{path}'")
+    keep = ~np.isnan(prices)
+    return prices[keep], bars[keep]
+
+
+def _expand(step, lo, hi):
+    """(step, sorted position) pairs for every position in [lo, hi) of every step."""
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    starts = np.cumsum(counts) - counts
+    steps = np.repeat(step, counts)
+    positions = np.arange(total) - np.repeat(starts, counts) + np.repeat(lo, counts)
+    return steps, positions
+
+
+def crossing_events(prices, kind, target, live=None):
+    """
+    Every (step, rule) at which a rule's condition holds, ordered by step and
+    then by rule — the order `evaluate` returns events in. `live` restricts
+    the rules considered. Steps index `prices`.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    live = np.ones(len(kind), dtype=bool) if live is None else live
+    prev, cur = prices[:-1], prices[1:]
+    step = np.arange(1, len(prices))
+
+    out_steps, out_rules = [], []
+    up_rules = np.flatnonzero(live & (kind != CROSS_DOWN))
+    if len(up_rules):
+        order = up_rules[np.argsort(target[up_rules], kind="stable")]
+        sorted_t = target[order]
+        lo = np.searchsorted(sorted_t, prev, side="right")
+        hi = np.searchsorted(sorted_t, cur, side="right")
+        s, pos = _expand(step, lo, hi)
+        out_steps.append(s)
+        out_rules.append(order[pos])
+
+    down_rules = np.flatnonzero(live & (kind != CROSS_UP))
+    if len(down_rules):
+        order = down_rules[np.argsort(target[down_rules], kind="stable")]
+        sorted_t = target[order]
+        lo = np.searchsorted(sorted_t, cur, side="left")
+        hi = np.searchsorted(sorted_t, prev, side="left")
+        s, pos = _expand(step, lo, hi)
+        out_steps.append(s)
+        out_rules.append(order[pos])
+
+    if len(prices):
+        # No previous price yet: only an exact hit of price_reached fires.
+        first = np.flatnonzero(live & (kind == REACHED) & (target == prices[0]))
+        out_steps.append(np.zeros(len(first), dtype=np.int64))
+        out_rules.append(first)
+
+    if not out_steps:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    steps = np.concatenate(out_steps)
+    rules = np.concatenate(out_rules)
+    order = np.lexsort((rules, steps))
+    return steps[order], rules[order]
+
+
+def evaluate(prices, kind, target, active=None, rearm=False, chunk=STEP_CHUNK):
+    """
+    (step, rule) of every fire for one symbol's tick series.
+
+    Without `rearm` each rule fires at most once, like `AlertEngine`. The
+    series is processed in chunks of `chunk` steps and fired rules drop out
+    between chunks, so memory stays bounded by chunk size plus fires.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    live = np.ones(len(kind), dtype=bool) if active is None else np.array(active, dtype=bool)
+    all_steps, all_rules = [], []
+    for start in range(0, max(len(prices) - 1, 1), chunk):
+        # Overlap by one tick so the step into this chunk is evaluated once.
+        window = prices[start:start + chunk + 1]
+        steps, rules = crossing_events(window, kind, target, live)
+        if start > 0:
+            # Step 0 of a later chunk is not the first tick of the series.
+            keep = steps > 0
+            steps, rules = steps[keep], rules[keep]
+        if not rearm and len(rules):
+            _, first = np.unique(rules, return_index=True)
+            first.sort()
+            steps, rules = steps[first], rules[first]
+            live[rules] = False
+        all_steps.append(steps + start)
+        all_rules.append(rules)
+        if not live.any():
+            break
+    if not all_steps:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(all_steps), np.concatenate(all_rules)
+
+
+def event_outcomes(klines, bars, fire_prices, direction, horizons=DEFAULT_HORIZONS):
+    """
+    What happened after each fire, fired at `fire_prices` on bar `bars`.
+
+    * `ret_{h}`: close `h` bars later relative to the fire price (NaN past the end).
+    * `excursion`: best move in `direction` within the longest horizon.
+    * `lead_bars`: bars from the fire to that best move — how much warning
+      the alert gave before the move peaked.
+    """
+    close = np.asarray(klines["close"], dtype=np.float64)
+    high = np.asarray(klines["high"], dtype=np.float64)
+    low = np.asarray(klines["low"], dtype=np.float64)
+    n = len(close)
+    out = {}
+    for h in horizons:
+        idx = bars + h
+        ret = np.full(len(bars), np.nan)
+        ok = idx < n
+        ret[ok] = close[idx[ok]] / fire_prices[ok] - 1.0
+        out[f"ret_{h}"] = ret
+
+    horizon = max(horizons)
+    excursion = np.full(len(bars), np.nan)
+    lead = np.full(len(bars), np.nan)
+    if n > horizon:
+        up_windows = sliding_window_view(high[1:], horizon)
+        down_windows = sliding_window_view(low[1:], horizon)
+        ok = bars < len(up_windows)
+        for sign, windows, pick in ((1, up_windows, np.argmax), (-1, down_windows, np.argmin)):
+            sel = np.flatnonzero(ok & (direction == sign))
+            if not len(sel):
+                continue
+            rows = windows[bars[sel]]
+            at = pick(rows, axis=1)
+            extreme = rows[np.arange(len(sel)), at]
+            excursion[sel] = sign * (extreme / fire_prices[sel] - 1.0)
+            lead[sel] = at + 1
+    out["excursion"] = excursion
+    out["lead_bars"] = lead
+    return out
+
+
+def backtest_symbol(klines, rules, rule_idx, path="close", rearm=False, horizons=DEFAULT_HORIZONS):
+    """Fire table (dict of equal-length arrays) for the rules `rule_idx` of one symbol."""
+    prices, tick_bar = price_path(klines, path)
+    kind = rules["kind"][rule_idx]
+    target = rules["target"][rule_idx]
+    steps, local = evaluate(prices, kind, target, rules["active"][rule_idx], rearm=rearm)
+
+    fire_prices = prices[steps]
+    bars = tick_bar[steps]
+    prev = prices[np.maximum(steps - 1, 0)]
+    direction = np.sign(fire_prices - prev).astype(np.int8)
+    direction[kind[local] == CROSS_UP] = 1
+    direction[kind[local] == CROSS_DOWN] = -1
+
+    events = {
+        "rule": rule_idx[local],
+        "bar": bars,
+        "time": np.asarray(klines["time"])[bars],
+        "price": fire_prices,
+        "direction": direction,
+    }
+    events.update(event_outcomes(klines, bars, fire_prices, direction, horizons))
+    return events
+
+
+def summarize_rules(events, n_rules, horizons=DEFAULT_HORIZONS):
+    """Per-rule fire count, first fire time, mean directional return and hit rate per horizon, mean lead."""
+    rule = events["rule"]
+    fires = np.bincount(rule, minlength=n_rules)
+    summary = {"fires": fires}
+
+    first_time = np.full(n_rules, -1, dtype=np.int64)
+    if len(rule):
+        order = np.argsort(events["time"], kind="stable")
+        uniq, first = np.unique(rule[order], return_index=True)
+        first_time[uniq] = events["time"][order][first]
+    summary["first_fire"] = first_time
+
+    def mean_by_rule(values):
+        ok = ~np.isnan(values)
+        total = np.bincount(rule[ok], weights=values[ok], minlength=n_rules)
+        count = np.bincount(rule[ok], minlength=n_rules)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total / count
+
+    signed = events["direction"].astype(np.float64)
+    for h in horizons:
+        ret = events[f"ret_{h}"] * signed
+        summary[f"ret_{h}"] = mean_by_rule(ret)
+        hit = np.where(np.isnan(ret), np.nan, (ret > 0).astype(np.float64))
+        summary[f"hit_{h}"] = mean_by_rule(hit)
+    summary["lead_bars"] = mean_by_rule(events["lead_bars"])
+    return summary
+
+
+def format_table(rules, summary, horizons, top):
+    order = np.argsort(-summary["fires"], kind="stable")[:top]
+    header = f"{'alert':<34} {'fires':>6} " + " ".join(f"{'ret' + str(h):>8} {'hit' + str(h):>6}" for h in horizons)
+    header += f" {'lead':>6}"
+    lines = [header, "-" * len(header)]
+    for i in order:
+        if summary["fires"][i] == 0:
+            break
+        cols = " ".join(
+            f"{summary[f'ret_{h}'][i] * 100:>7.2f}% {summary[f'hit_{h}'][i] * 100:>5.0f}%" for h in horizons
+        )
+        lines.append(f"{rules['id'][i][:34]:<34} {summary['fires'][i]:>6} {cols} {summary['lead_bars'][i]:>6.1f}")
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Backtest price alerts over the local candle store.")
+    p.add_argument("--rules", help="JSON file with an AlertDefinition array.")
+    p.add_argument("--grid", help="Comma-separated symbols to generate a level grid for.")
+    p.add_argument("--grid-levels", type=int, default=1000, help="Levels per condition and grid symbol.")
+    p.add_argument("--store", default=None)
+    p.add_argument("--exchange", default=DEFAULT_EXCHANGE)
+    p.add_argument("--tf", default="1h")
+    p.add_argument("--bars", type=int, default=0, help="Only the last N bars (0 = all).")
+    p.add_argument("--path", choices=("close", "ohlc"), default="ohlc")
+    p.add_argument("--rearm", action="store_true", help="Count every crossing instead of the first.")
+    p.add_argument("--horizons", default=",".join(str(h) for h in DEFAULT_HORIZONS))
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--json", dest="json_out", help="Write the per-rule summary to this JSON file.")
+    return p
+
+
+def _load(store, exchange, symbol, tf, bars):
+    stored = store.load(exchange, symbol, tf)
+    return {f: np.asarray(v[-bars:] if bars else v) for f, v in stored.items()}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.rules and not args.grid:
+        print("❌ Pass --rules and/or --grid")
+        return 1
+    store = CandleStore(args.store)
+    horizons = tuple(int(h) for h in args.horizons.split(","))
+
+    definitions = []
+    if args.rules:
+        with open(args.rules, encoding="utf-8") as f:
+            definitions += json.load(f)
+    for symbol in (args.grid.split(",") if args.grid else []):
+        symbol = symbol.strip().upper()
+        k = _load(store, args.exchange, symbol, args.tf, args.bars)
+        definitions += grid_rules(symbol, float(np.nanmin(k["low"])), float(np.nanmax(k["high"])), args.grid_levels)
+    rules = parse_rules(definitions)
+    n_rules = len(rules["id"])
+
+    symbols = np.array(rules["symbol"])
+    parts = []
+    t0 = time.perf_counter()
+    total_bars = 0
+    for symbol in sorted(set(rules["symbol"])):
+        if not store.exists(args.exchange, symbol, args.tf):
+            print(f"⚠️ No {args.tf} candles for {symbol}, skipping its alerts")
+            continue
+        klines = _load(store, args.exchange, symbol, args.tf, args.bars)
+        total_bars += len(klines["close"])
+        parts.append(backtest_symbol(klines, rules, np.flatnonzero(symbols == symbol), args.path, args.rearm, horizons))
+    elapsed = time.perf_counter() - t0
+    if not parts:
+        print("❌ No candles for any alert symbol")
+        return 1
+
+    events = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    summary = summarize_rules(events, n_rules, horizons)
+    print(format_table(rules, summary, horizons, args.top))
+    fired = int((summary["fires"] > 0).sum())
+    print(f"\n✅ {n_rules} alerts over {total_bars} bars in {elapsed:.2f}s: "
+          f"{len(events['rule'])} fires, {fired} alerts fired at least once")
+
+    if args.json_out:
+        rows = []
+        for i in range(n_rules):
+            row = {"id": rules["id"][i], "symbol": rules["symbol"][i]}
+            for key, values in summary.items():
+                v = values[i].item()
+                row[key] = None if isinstance(v, float) and np.isnan(v) else v
+            rows.append(row)
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"💾 Summary written to {args.json_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+CPU throughput autotuner for PPO training.
+
+    python autotune.py --dataset datasets/bitunix_1h                 # search, print, write brain.yaml
+    python autotune.py --budget 50000 --threads 1,2,4,8 --no-write
+    ./cachy-brain --config brain.yaml train --data-source STORE      # trains with the tuned profile
+
+A profile is env count, rollout length (`n_steps`), minibatch size,
+epochs, torch intra-op threads and torch.compile. Each candidate trains a
+fresh agent on the dataset for a fixed budget of env steps (after one
+warm-up rollout, which also absorbs compilation) and reports env steps/s
+while collecting rollouts, gradient updates/s while training, and overall
+env steps/s of wall time — the number profiles are ranked by.
+
+The search is coordinate-wise: starting from SB3's defaults, one dimension
+at a time is swept with the others fixed at the best values so far, which
+costs the sum of the dimension sizes in trials instead of their product
+(`--exhaustive` runs the full grid). The fastest stable profile goes into
+the `train:` section of the config file, as the flags `train.py` takes.
+
+"Stable" means only that a profile's repeats agree within MAX_SPREAD on
+throughput and that training left all weights finite. It says nothing about
+how well the profile learns: the trials are too short to compare returns.
+
+Fewer epochs or larger minibatches are faster per env step but learn less
+per sample, which throughput cannot see. So minibatch size and epochs stay
+at `train.py`'s defaults (BATCH_SIZE 64, N_EPOCHS 10) unless `--batch-sizes`
+or `--epochs` lists several values; check the learning curves of a profile
+picked that way before relying on it.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+
+from indicator_bench import machine_fingerprint
+
+CONFIG = "brain.yaml"
+BUDGET = 20_000
+REPEATS = 2
+# Largest relative spread (max − min) / median of a profile's repeats that still counts as stable.
+MAX_SPREAD = 0.15
+DIMENSIONS = ("torch_threads", "n_envs", "n_steps", "batch_size", "n_epochs", "compile")
+N_ENVS = (1, 2, 4, 8, 16)
+N_STEPS = (128, 256, 512, 1024, 2048)
+# train.py's BATCH_SIZE and N_EPOCHS: searched only when the flags list several.
+BATCH_SIZES = (64,)
+N_EPOCHS = (10,)
+
+
+def thread_counts(cpus=None):
+    """1, 2, 4, ... up to the core count, plus the core count itself."""
+    cpus = cpus or os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    return tuple(sorted(set(counts + [cpus])))
+
+
+def valid(profile):
+    """SB3 wants the rollout (n_steps × n_envs) to split into whole minibatches."""
+    rollout = profile["n_steps"] * profile["n_envs"]
+    return profile["batch_size"] <= rollout and rollout % profile["batch_size"] == 0
+
+
+def profile_key(profile):
+    return tuple(profile[d] for d in DIMENSIONS)
+
+
+def score(result):
+    """Ranking value of a trial: overall env steps/s if it was stable, else None."""
+    return result["steps_per_s"] if result and result["stable"] else None
+
+
+def coordinate_search(space, base, measure, passes=1):
+    """
+    (best profile, trials): sweep each dimension of `space` in DIMENSIONS
+    order with the others at the best values so far. `measure(profile)`
+    returns a result dict with `steps_per_s` and `stable`; each profile is
+    measured once. Invalid combinations are skipped.
+    """
+    trials = {}
+
+    def run(profile):
+        key = profile_key(profile)
+        if key not in trials:
+            trials[key] = {"profile": dict(profile), **measure(profile)}
+        return trials[key]
+
+    best = dict(base)
+    best_score = score(run(best)) if valid(best) else None
+    for _ in range(passes):
+        for dim in DIMENSIONS:
+            for value in space[dim]:
+                candidate = {**best, dim: value}
+                if not valid(candidate):
+                    continue
+                s = score(run(candidate))
+                if s is not None and (best_score is None or s > best_score):
+                    best, best_score = candidate, s
+    return (best if best_score is not None else None), list(trials.values())
+
+
+def exhaustive_search(space, measure):
+    """(best profile, trials) over every valid combination of `space`."""
+    trials = []
+    for values in itertools.product(*(space[d] for d in DIMENSIONS)):
+        profile = dict(zip(DIMENSIONS, values))
+        if valid(profile):
+            trials.append({"profile": profile, **measure(profile)})
+    ranked = [t for t in trials if score(t) is not None]
+    best = max(ranked, key=score)["profile"] if ranked else None
+    return best, trials
+
+
+def summarize(runs):
+    """One trial result from its repeats: medians, spread and stability."""
+    ok = [r for r in runs if r.get("error") is None]
+    if not ok:
+        return {"steps_per_s": None, "env_steps_per_s": None, "grad_updates_per_s": None, "spread": None,
+                "stable": False, "error": runs[0].get("error") if runs else "no runs"}
+    rates = [r["steps_per_s"] for r in ok]
+    median = statistics.median(rates)
+    spread = (max(rates) - min(rates)) / median if median else float("inf")
+    return {
+        "steps_per_s": median,
+        "env_steps_per_s": statistics.median(r["env_steps_per_s"] or 0.0 for r in ok),
+        "grad_updates_per_s": statistics.median(r["grad_updates_per_s"] or 0.0 for r in ok),
+        "spread": spread,
+        "stable": len(ok) == len(runs) and all(r["finite"] for r in ok) and spread <= MAX_SPREAD,
+        "error": None,
+    }
+
+
+def train_args(profile):
+    """`train:` config keys for a profile; `cachy_brain.config_args` turns them into train.py flags."""
+    return {
+        "n_envs": profile["n_envs"],
+        "n_steps": profile["n_steps"],
+        "batch_size": profile["batch_size"],
+        "n_epochs": profile["n_epochs"],
+        "torch_threads": profile["torch_threads"],
+        "compile": bool(profile["compile"]),
+    }
+
+
+def write_profile(path, profile):
+    """Merge the profile into the `train:` section of a YAML config, keeping everything else."""
+    import yaml
+
+    config = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    config["train"] = {**(config.get("train") or {}), **train_args(profile)}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    os.replace(tmp, path)
+    return config
+
+
+def trial(data, profile, budget, seed=0):
+    """Train a fresh agent on `profile` for `budget` env steps; one measurement."""
+    import torch
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+    import train
+    from train_callbacks import ThroughputCallback
+
+    train.configure_torch(profile["torch_threads"])
+    venv = DummyVecEnv(train.env_fns_for(data, profile["n_envs"], episode_bars=train.EPISODE_BARS))
+    env = VecNormalize(venv, norm_obs=True, norm_reward=True, clip_obs=train.CLIP_OBS)
+    env.seed(seed)
+    try:
+        agent = PPO("MlpPolicy", env, verbose=0, ent_coef=train.ENT_COEF, seed=seed,
+                    n_steps=profile["n_steps"], batch_size=profile["batch_size"], n_epochs=profile["n_epochs"])
+        if profile["compile"]:
+            train.compile_policy(agent)
+        rollout = profile["n_steps"] * profile["n_envs"]
+        agent.learn(rollout)  # warm-up: first allocations, compilation
+        throughput = ThroughputCallback()
+        started = time.perf_counter()
+        agent.learn(max(budget, rollout), callback=throughput, reset_num_timesteps=False)
+        elapsed = time.perf_counter() - started
+        finite = all(bool(torch.isfinite(p).all()) for p in agent.policy.parameters())
+    except Exception as e:  # a profile that crashes (e.g. torch.compile without a compiler) is just unstable
+        return {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        env.close()
+    return {
+        "steps_per_s": throughput.result["env_steps"] / elapsed,
+        "env_steps_per_s": throughput.result["env_steps_per_s"],
+        "grad_updates_per_s": throughput.result["grad_updates_per_s"],
+        "finite": finite,
+        "error": None,
+    }
+
+
+def _ints(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+def format_trials(trials, best):
+    header = (f"{'threads':>7} {'envs':>5} {'n_steps':>7} {'batch':>6} {'epochs':>6} {'compile':>7} "
+              f"{'steps/s':>9} {'rollout/s':>9} {'updates/s':>9} {'spread':>7}  ")
+    lines = [header, "-" * len(header)]
+    best_key = profile_key(best) if best else None
+    for t in sorted(trials, key=lambda t: -(score(t) or 0)):
+        p = t["profile"]
+        if t.get("error"):
+            tail = f"❌ {t['error'][:60]}"
+            numbers = f"{'-':>9} {'-':>9} {'-':>9} {'-':>7}"
+        else:
+            tail = "⭐" if profile_key(p) == best_key else ("" if t["stable"] else "⚠️ unstable")
+            numbers = (f"{t['steps_per_s']:>9.0f} {t['env_steps_per_s']:>9.0f} {t['grad_updates_per_s']:>9.1f} "
+                       f"{t['spread'] * 100:>6.1f}%")
+        lines.append(f"{p['torch_threads']:>7} {p['n_envs']:>5} {p['n_steps']:>7} {p['batch_size']:>6} "
+                     f"{p['n_epochs']:>6} {'on' if p['compile'] else 'off':>7} {numbers}  {tail}")
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Find the fastest stable PPO training profile for this CPU.")
+    p.add_argument("--dataset", default=os.environ.get("CACHY_DATASET", "datasets/bitunix_1h"))
+    p.add_argument("--budget", type=int, default=BUDGET, help="Env steps measured per trial.")
+    p.add_argument("--repeats", type=int, default=REPEATS, help="Measurements per profile (for stability).")
+    p.add_argument("--envs", type=_ints, default=N_ENVS)
+    p.add_argument("--n-steps", type=_ints, default=N_STEPS)
+    p.add_argument("--batch-sizes", type=_ints, default=BATCH_SIZES,
+                   help="Minibatch sizes to search (default: train.py's only; larger ones learn less per sample).")
+    p.add_argument("--epochs", type=_ints, default=N_EPOCHS,
+                   help="Epoch counts to search (default: train.py's only; fewer learn less per sample).")
+    p.add_argument("--threads", type=_ints, default=None, help="torch thread counts (default: 1, 2, 4, … cores).")
+    p.add_argument("--no-compile", dest="compile", action="store_false", help="Do not try torch.compile.")
+    p.add_argument("--exhaustive", action="store_true", help="Measure the full grid instead of one dimension at a time.")
+    p.add_argument("--config", default=CONFIG, help="YAML config whose `train:` section receives the profile.")
+    p.add_argument("--no-write", dest="write", action="store_false")
+    p.add_argument("--json", help="Also write all trials to this file.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    import dataset
+    import torch
+
+    import train
+
+    if not os.path.exists(os.path.join(args.dataset, "manifest.json")):
+        print(f"❌ No dataset at {args.dataset}. Build one with dataset.py first.")
+        return 1
+    data = dataset.load(args.dataset)
+    n_symbols = len(data["manifest"]["symbols"])
+    space = {
+        "torch_threads": args.threads or thread_counts(),
+        "n_envs": args.envs,
+        "n_steps": args.n_steps,
+        "batch_size": args.batch_sizes,
+        "n_epochs": args.epochs,
+        "compile": (False, True) if args.compile and hasattr(torch, "compile") else (False,),
+    }
+    base = {"torch_threads": torch.get_num_threads(), "n_envs": n_symbols, "n_steps": train.N_STEPS,
+            "batch_size": train.BATCH_SIZE, "n_epochs": train.N_EPOCHS, "compile": False}
+    fingerprint, machine = machine_fingerprint()
+    print(f"🚀 Autotuning PPO on {machine['cpu'] or machine['machine']} ({machine['cpu_count']} cores), "
+          f"{args.budget} env steps × {args.repeats} per profile")
+
+    def measure(profile):
+        result = summarize([trial(data, profile, args.budget, seed=i) for i in range(args.repeats)])
+        rate = "-" if result["steps_per_s"] is None else f"{result['steps_per_s']:.0f} steps/s"
+        print(f"   {json.dumps(profile)}: {rate}{'' if result['stable'] else ' (unstable)'}")
+        return result
+
+    started = time.perf_counter()
+    if args.exhaustive:
+        best, trials = exhaustive_search(space, measure)
+    else:
+        best, trials = coordinate_search(space, base, measure)
+    print(f"\n⏱️ {len(trials)} profiles in {time.perf_counter() - started:.0f} s")
+    print(format_trials(trials, best))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"machine": fingerprint, "budget": args.budget, "best": best, "trials": trials}, f, indent=2)
+    if best is None:
+        print("❌ No stable profile; nothing written.")
+        return 1
+    base_rate = next((t["steps_per_s"] for t in trials if profile_key(t["profile"]) == profile_key(base)), None)
+    best_rate = next(t["steps_per_s"] for t in trials if profile_key(t["profile"]) == profile_key(best))
+    gain = f" ({best_rate / base_rate:.2f}× the defaults)" if base_rate else ""
+    print(f"🏆 {json.dumps(train_args(best))}: {best_rate:.0f} env steps/s{gain}")
+    if args.write:
+        write_profile(args.config, best)
+        print(f"💾 Written to the `train:` section of {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
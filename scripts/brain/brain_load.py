@@ -0,0 +1,237 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Load client for `brain_server.py`.
+
+Opens `--concurrency` connections (HTTP keep-alive or WebSocket), each
+sending requests back to back with random rows shaped after the model's
+inputs, then prints client-side throughput and latency next to the server's
+own batching metrics.
+
+    python brain_load.py --model cachy_brain --concurrency 64 --requests 20000
+    python brain_load.py --model cachy_brain --mode ws --rows 8
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from brain_server import (DEFAULT_HOST, DEFAULT_PORT, WS_TEXT, read_http_message, ws_accept_key, ws_frame,
+                          ws_read)
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host)
+
+    async def request(self, method, path, payload=None):
+        """(status, decoded JSON body)."""
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write((
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode() + body)
+        await self.writer.drain()
+        message = await read_http_message(self.reader)
+        if message is None:
+            raise ConnectionError("server closed the connection")
+        start, _, response = message
+        return int(start.split(" ")[1]), json.loads(response)
+
+    async def close(self):
+        self.writer.close()
+
+
+class WebSocketConnection:
+    """One WebSocket connection; `request` sends one message and waits for its reply."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            "GET /ws HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        status = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if b" 101 " not in status or headers.get("sec-websocket-accept") != ws_accept_key(key):
+            raise ConnectionError(f"WebSocket upgrade refused: {status.decode().strip()}")
+        return cls(reader, writer)
+
+    async def request(self, model, inputs):
+        self.next_id += 1
+        message = {"id": self.next_id, "model": model, "inputs": inputs}
+        self.writer.write(ws_frame(WS_TEXT, json.dumps(message).encode(), mask=True))
+        await self.writer.drain()
+        while True:
+            opcode, payload = await ws_read(self.reader)
+            if opcode == WS_TEXT:
+                response = json.loads(payload)
+                return response.get("status", 200), response
+
+    async def close(self):
+        self.writer.close()
+
+
+def random_inputs(inputs, rows, rng):
+    """Positive values for every input, so ratios and logs in the graph stay finite."""
+    return {i["name"]: (100.0 * (1.0 + 0.02 * rng.standard_normal((rows, i["width"])))).tolist() for i in inputs}
+
+
+async def _worker(connection, send, count, latencies, errors):
+    for _ in range(count):
+        started = time.perf_counter()
+        status, _ = await send(connection)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+
+
+async def run_load(host, port, model, mode="http", concurrency=16, requests=2000, rows=1, seed=0):
+    """Client-side results plus the server's metrics for `model` after the run."""
+    control = await HttpConnection.open(host, port)
+    _, listing = await control.request("GET", "/v1/models")
+    described = {m["name"]: m for m in listing["models"]}
+    if model not in described:
+        await control.close()
+        raise ValueError(f"server has no model '{model}' (loaded: {', '.join(sorted(described)) or 'none'})")
+    rng = np.random.default_rng(seed)
+    # A small pool of payloads, so the client spends its time sending, not generating.
+    payloads = [random_inputs(described[model]["inputs"], rows, rng) for _ in range(64)]
+
+    if mode == "ws":
+        opener = WebSocketConnection.open
+
+        async def send(connection):
+            return await connection.request(model, payloads[connection.next_id % len(payloads)])
+    else:
+        opener = HttpConnection.open
+        path = f"/v1/models/{model}/infer"
+        counter = itertools.count()
+
+        async def send(connection):
+            return await connection.request("POST", path, {"inputs": payloads[next(counter) % len(payloads)]})
+
+    connections = [await opener(host, port) for _ in range(concurrency)]
+    share = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(c, send, n, latencies, errors) for c, n in zip(connections, share)))
+    elapsed = time.perf_counter() - started
+    for connection in connections:
+        await connection.close()
+    _, metrics = await control.request("GET", "/metrics")
+    await control.close()
+
+    lat = np.asarray(latencies)
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rows_per_request": rows,
+        "errors": len(errors),
+        "seconds": elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "rows_per_s": len(latencies) * rows / elapsed,
+        "latency_ms": {f"p{q}": float(np.percentile(lat, q)) for q in (50, 95, 99)},
+        "server": metrics["models"].get(model),
+    }
+
+
+def format_result(r):
+    lat = r["latency_ms"]
+    lines = [
+        f"{r['mode']} × {r['concurrency']}: {r['requests']} requests ({r['rows_per_request']} rows each) "
+        f"in {r['seconds']:.2f}s, {r['errors']} errors",
+        f"   {r['requests_per_s']:,.0f} req/s, {r['rows_per_s']:,.0f} rows/s",
+        f"   client latency  p50 {lat['p50']:.2f} ms  p95 {lat['p95']:.2f} ms  p99 {lat['p99']:.2f} ms",
+    ]
+    server = r["server"]
+    if server:
+        inference = server["inference_ms"]
+        wait = server["queue_wait_ms"]
+        lines.append(f"   server batches {server['batches']}, mean {server['mean_batch_rows'] or 0:.1f} rows "
+                     f"(max {server['max_batch_rows']}), queue wait p50 {wait['p50'] or 0:.2f} ms, "
+                     f"inference p50 {inference['p50'] or 0:.2f} ms")
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Load-test a running brain_server.py.")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--model", default="cachy_brain")
+    p.add_argument("--mode", choices=("http", "ws"), default="http")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--rows", type=int, default=1, help="Rows per request (symbols screened at once).")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", dest="json_out", help="Also write the result to this JSON file.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        result = asyncio.run(run_load(args.host, args.port, args.model, args.mode, args.concurrency,
+                                      args.requests, args.rows, args.seed))
+    except (ConnectionError, OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(format_result(result))
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
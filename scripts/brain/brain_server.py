@@ -0,0 +1,659 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Local batching inference server for the exported brain models.
+
+Loads every `*.onnx` in a model directory once (the teacher from `export.py`,
+the students from `distill.py`) and serves them on localhost:
+
+    POST /v1/models/<name>/infer   {"inputs": {"close": [...], "rsi": [...], ...}}
+    GET  /v1/models                loaded models, their inputs and versions
+    GET  /metrics                  latency, queue depth and batch sizes per model
+    GET  /health
+    GET  /ws                       WebSocket, one JSON request per text message:
+                                   {"id": 1, "model": "cachy_brain", "inputs": {...}}
+
+Each input is one row (`[v, ...]`, input width values) or several rows
+(`[[...], [...]]`); the response holds one action row per input row.
+
+Requests for the same model are batched: rows are collected until
+`--max-batch` rows are queued or the oldest request has waited
+`--max-wait-ms`, then the session runs once. When a model file changes on
+disk (a new export lands) it is reloaded in the background; requests keep
+going to the old session until the new one is ready.
+
+    python brain_server.py --models trained_models --port 8765
+    python brain_load.py --model cachy_brain --concurrency 64 --requests 20000
+
+HTTP/1.1 keep-alive and WebSocket framing are implemented on asyncio
+streams, so the server needs nothing beyond onnxruntime and runs offline.
+"""
+
+import argparse
+import asyncio
+import base64
+import collections
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    HAS_ORT = True
+except ImportError:
+    HAS_ORT = False
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+RELOAD_INTERVAL_S = 1.0
+# A file modified less than this long ago may still be being written.
+RELOAD_SETTLE_S = 1.0
+METRIC_WINDOW = 10000
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT, WS_BINARY, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RequestError(ValueError):
+    """A malformed request; answered with `status` instead of tearing the connection down."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class OnnxModel:
+    """One onnxruntime session. `inputs` is [(name, width)], `run` maps a feed to (batch, action_dim)."""
+
+    def __init__(self, path, threads=1):
+        if not HAS_ORT:
+            raise RuntimeError("onnxruntime is not installed")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.inputs = [(i.name, int(i.shape[1])) for i in self.session.get_inputs()]
+        self.output = self.session.get_outputs()[0].name
+
+    def run(self, feed):
+        return self.session.run([self.output], feed)[0]
+
+
+def parse_feed(model, inputs):
+    """Request inputs -> ({name: float32 (rows, width)}, rows), checked against the model's inputs."""
+    if not isinstance(inputs, dict):
+        raise RequestError("'inputs' must be an object of input name -> values")
+    missing = [name for name, _ in model.inputs if name not in inputs]
+    if missing:
+        raise RequestError(f"missing inputs: {', '.join(missing)}")
+    feed, rows = {}, None
+    for name, width in model.inputs:
+        try:
+            values = np.asarray(inputs[name], dtype=np.float32)
+        except (TypeError, ValueError):
+            raise RequestError(f"input '{name}' is not numeric") from None
+        if values.size == 0 or values.size % width:
+            raise RequestError(f"input '{name}' needs a multiple of {width} values, got {values.size}")
+        values = values.reshape(-1, width)
+        if rows is not None and len(values) != rows:
+            raise RequestError(f"input '{name}' has {len(values)} rows, the others {rows}")
+        feed[name], rows = values, len(values)
+    return feed, rows
+
+
+def parse_json(body):
+    """A request object (HTTP body or WebSocket message)."""
+    try:
+        request = json.loads(body)
+    except ValueError:
+        raise RequestError("request is not valid JSON") from None
+    if not isinstance(request, dict):
+        raise RequestError("request must be a JSON object")
+    return request
+
+
+class LoadedModel:
+    def __init__(self, model, path, mtime, version):
+        self.model = model
+        self.path = path
+        self.mtime = mtime
+        self.version = version
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """`*.onnx` files of a directory by stem, reloaded when their mtime changes."""
+
+    def __init__(self, model_dir, loader=OnnxModel, settle_s=RELOAD_SETTLE_S):
+        self.model_dir = model_dir
+        self.loader = loader
+        self.settle_s = settle_s
+        self.models = {}
+        self._failed = {}
+
+    def scan(self):
+        """[(name, path, mtime)] of files that are new or changed and have settled."""
+        now = time.time()
+        changed = []
+        for path in sorted(glob.glob(os.path.join(self.model_dir, "*.onnx"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            current = self.models.get(name)
+            if current is not None and current.mtime == mtime:
+                continue
+            if self._failed.get(path) == mtime or now - mtime < self.settle_s:
+                continue
+            changed.append((name, path, mtime))
+        return changed
+
+    def load(self, name, path, mtime):
+        """Build the model, then swap it in; a failed load keeps the previous version serving."""
+        try:
+            model = self.loader(path)
+        except Exception:
+            self._failed[path] = mtime
+            raise
+        previous = self.models.get(name)
+        self.models[name] = LoadedModel(model, path, mtime, previous.version + 1 if previous else 1)
+        return self.models[name]
+
+    def load_all(self):
+        for name, path, mtime in self.scan():
+            self.load(name, path, mtime)
+        return self.models
+
+    def get(self, name):
+        loaded = self.models.get(name)
+        if loaded is None:
+            raise RequestError(f"unknown model '{name}'", status=404)
+        return loaded
+
+    def describe(self):
+        return [{
+            "name": name,
+            "version": m.version,
+            "path": m.path,
+            "loaded_at": m.loaded_at,
+            "inputs": [{"name": n, "width": w} for n, w in m.model.inputs],
+        } for name, m in sorted(self.models.items())]
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+class ModelStats:
+    def __init__(self, window):
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.latency_ms = collections.deque(maxlen=window)
+        self.queue_wait_ms = collections.deque(maxlen=window)
+        self.inference_ms = collections.deque(maxlen=window)
+        self.batch_rows = collections.deque(maxlen=window)
+
+
+class Metrics:
+    """Counters plus rolling windows of the last `window` samples per model."""
+
+    def __init__(self, window=METRIC_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self.connections = 0
+        self.models = collections.defaultdict(lambda: ModelStats(self.window))
+        self.queue_depth = {}
+
+    def snapshot(self):
+        out = {"uptime_s": time.time() - self.started, "connections": self.connections, "models": {}}
+        for name, s in sorted(self.models.items()):
+            depth = self.queue_depth.get(name)
+            out["models"][name] = {
+                "requests": s.requests,
+                "rows": s.rows,
+                "batches": s.batches,
+                "errors": s.errors,
+                "queue_depth": depth() if depth else 0,
+                "mean_batch_rows": float(np.mean(s.batch_rows)) if s.batch_rows else None,
+                "max_batch_rows": int(max(s.batch_rows)) if s.batch_rows else None,
+                "latency_ms": _percentiles(s.latency_ms),
+                "queue_wait_ms": _percentiles(s.queue_wait_ms),
+                "inference_ms": _percentiles(s.inference_ms),
+            }
+        return out
+
+
+class Batcher:
+    """
+    Dynamic batching for one model: rows are collected until `max_batch` rows
+    are queued or the oldest request has waited `max_wait_s`, then run in one
+    session call on a worker thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, name, registry, metrics, max_batch=DEFAULT_MAX_BATCH, max_wait_s=DEFAULT_MAX_WAIT_MS / 1000):
+        self.name = name
+        self.registry = registry
+        self.stats = metrics.models[name]
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self.queue = asyncio.Queue()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"brain-{name}")
+        self._carry = None
+        self._pending = None
+        self._task = None
+        metrics.queue_depth[name] = self.depth
+
+    def depth(self):
+        """Requests waiting, including the ones held back for the next batch."""
+        return self.queue.qsize() + (self._carry is not None) + (self._pending is not None and self._pending.done())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def close(self):
+        for task in (self._task, self._pending):
+            if task is not None:
+                task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, feed, rows):
+        """Queue one request; resolves to its (rows, action_dim) slice of the batch output."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((feed, rows, future, time.perf_counter()))
+        return await future
+
+    async def _next(self, timeout):
+        """The next queued request, or None once `timeout` (None: wait forever) ran out."""
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        if self._pending is None:
+            if not self.queue.empty():
+                return self.queue.get_nowait()
+            if timeout is not None and timeout <= 0:
+                return None
+            # Kept across calls rather than cancelled, so a timeout never drops an item.
+            self._pending = asyncio.ensure_future(self.queue.get())
+        done, _ = await asyncio.wait({self._pending}, timeout=timeout)
+        if not done:
+            return None
+        item, self._pending = self._pending.result(), None
+        return item
+
+    async def _loop(self):
+        while True:
+            first = await self._next(None)
+            batch, rows = [first], first[1]
+            deadline = first[3] + self.max_wait_s
+            while rows < self.max_batch:
+                item = await self._next(deadline - time.perf_counter())
+                if item is None:
+                    break
+                if rows + item[1] > self.max_batch:
+                    self._carry = item
+                    break
+                batch.append(item)
+                rows += item[1]
+            await self._flush(batch, rows)
+
+    async def _flush(self, batch, rows):
+        started = time.perf_counter()
+        futures = [future for _, _, future, _ in batch]
+        try:
+            model = self.registry.get(self.name).model
+            feed = {name: np.concatenate([f[name] for f, _, _, _ in batch]) for name, _ in model.inputs}
+            out = await asyncio.get_running_loop().run_in_executor(self.executor, model.run, feed)
+        except Exception as e:
+            self.stats.errors += len(batch)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        self.stats.batches += 1
+        self.stats.batch_rows.append(rows)
+        self.stats.inference_ms.append((finished - started) * 1000)
+        offset = 0
+        for _, n, future, queued in batch:
+            self.stats.queue_wait_ms.append((started - queued) * 1000)
+            if not future.done():
+                future.set_result(out[offset:offset + n])
+            offset += n
+
+
+# --- WebSocket framing (RFC 6455), shared with brain_load.py ---------------
+
+def ws_accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def ws_frame(opcode, payload, mask=False):
+    """One final frame. Clients must mask (`mask=True`), servers must not."""
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        header += bytes([mask_bit | n])
+    elif n < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", n)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", n)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _unmask(payload, key)
+
+
+def _unmask(payload, key):
+    data = np.frombuffer(payload, dtype=np.uint8)
+    pad = np.resize(np.frombuffer(key, dtype=np.uint8), len(data))
+    return (data ^ pad).tobytes()
+
+
+async def ws_read(reader):
+    """(opcode, payload) of the next message, continuation frames joined."""
+    opcode, parts = None, []
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if n > MAX_BODY_BYTES:
+            raise RequestError("frame too large", status=413)
+        key = await reader.readexactly(4) if b1 & 0x80 else None
+        payload = await reader.readexactly(n)
+        if key:
+            payload = _unmask(payload, key)
+        frame_op = b0 & 0x0F
+        if frame_op >= 0x8:
+            # Control frames may arrive between the fragments of a message.
+            return frame_op, payload
+        if frame_op != 0:
+            opcode = frame_op
+        parts.append(payload)
+        if b0 & 0x80:
+            return opcode, b"".join(parts)
+
+
+# --- HTTP ------------------------------------------------------------------
+
+async def read_http_message(reader):
+    """(start line, headers with lower-case names, body) or None at EOF."""
+    try:
+        start = await reader.readline()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        return None
+    if not start:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise RequestError("request body too large", status=413)
+    body = await reader.readexactly(length) if length else b""
+    return start.decode("latin-1").strip(), headers, body
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+class BrainServer:
+    def __init__(self, registry, metrics=None, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 reload_interval=RELOAD_INTERVAL_S):
+        self.registry = registry
+        self.metrics = metrics or Metrics()
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self.reload_interval = reload_interval
+        self.batchers = {}
+        self.server = None
+        self._watcher = None
+
+    def batcher(self, name):
+        if name not in self.batchers:
+            self.batchers[name] = Batcher(name, self.registry, self.metrics, self.max_batch, self.max_wait_s)
+        return self.batchers[name]
+
+    async def infer(self, name, inputs):
+        """Action rows for one request, with latency and error accounting."""
+        started = time.perf_counter()
+        model = self.registry.get(name).model
+        stats = self.metrics.models[name]
+        try:
+            feed, rows = parse_feed(model, inputs)
+        except RequestError:
+            stats.errors += 1
+            raise
+        # Failures of the session call itself are counted by the batcher.
+        out = await self.batcher(name).submit(feed, rows)
+        stats.requests += 1
+        stats.rows += rows
+        stats.latency_ms.append((time.perf_counter() - started) * 1000)
+        return out
+
+    async def reload(self):
+        """Load new or changed model files; returns the names that were (re)loaded."""
+        loop = asyncio.get_running_loop()
+        reloaded = []
+        for name, path, mtime in self.registry.scan():
+            try:
+                loaded = await loop.run_in_executor(None, self.registry.load, name, path, mtime)
+            except Exception as e:
+                print(f"⚠️ Could not load {path}: {e}")
+                continue
+            print(f"🔄 Loaded {name} v{loaded.version} from {path}")
+            reloaded.append(name)
+        return reloaded
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        await self.reload()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        if self.reload_interval:
+            self._watcher = asyncio.ensure_future(self._watch())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+        for batcher in self.batchers.values():
+            await batcher.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.metrics.connections += 1
+        try:
+            while True:
+                try:
+                    message = await read_http_message(reader)
+                except RequestError as e:
+                    writer.write(http_response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if message is None:
+                    break
+                start, headers, body = message
+                method, path = (start.split(" ") + ["", ""])[:2]
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self._route(method, path, body)
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, RequestError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown with the connection still open; nothing to report.
+            pass
+        finally:
+            self.metrics.connections -= 1
+            writer.close()
+
+    async def _route(self, method, path, body):
+        try:
+            if path == "/health":
+                return 200, {"status": "ok", "models": sorted(self.registry.models)}
+            if path == "/metrics":
+                return 200, self.metrics.snapshot()
+            if path == "/v1/models":
+                return 200, {"models": self.registry.describe()}
+            parts = path.strip("/").split("/")
+            if len(parts) == 4 and parts[:2] == ["v1", "models"] and parts[3] == "infer":
+                if method != "POST":
+                    raise RequestError("use POST", status=405)
+                request = parse_json(body or b"{}")
+                out = await self.infer(parts[2], request.get("inputs"))
+                return 200, {"model": parts[2], "version": self.registry.get(parts[2]).version,
+                             "action": out.tolist()}
+            raise RequestError(f"no route for {path}", status=404)
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            writer.write(http_response(400, {"error": "missing Sec-WebSocket-Key"}, keep_alive=False))
+            return
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept_key(key)}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        # Each message gets its own task so one connection can fill a batch.
+        tasks = set()
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == WS_CLOSE:
+                    writer.write(ws_frame(WS_CLOSE, payload[:2]))
+                    break
+                if opcode == WS_PING:
+                    writer.write(ws_frame(WS_PONG, payload))
+                    continue
+                if opcode not in (WS_TEXT, WS_BINARY):
+                    continue
+                task = asyncio.ensure_future(self._ws_message(writer, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _ws_message(self, writer, payload):
+        request_id = None
+        try:
+            request = parse_json(payload)
+            request_id = request.get("id")
+            name = request.get("model")
+            out = await self.infer(name, request.get("inputs"))
+            response = {"id": request_id, "model": name, "version": self.registry.get(name).version,
+                        "action": out.tolist()}
+        except RequestError as e:
+            response = {"id": request_id, "error": str(e), "status": e.status}
+        except Exception as e:
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}", "status": 500}
+        writer.write(ws_frame(WS_TEXT, json.dumps(response).encode()))
+        await writer.drain()
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Serve the exported brain models over HTTP/WebSocket on localhost.")
+    p.add_argument("--models", default="trained_models", help="Directory with the .onnx exports.")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Rows per session call.")
+    p.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                   help="Longest a request waits for its batch to fill.")
+    p.add_argument("--threads", type=int, default=1, help="onnxruntime intra-op threads per model.")
+    p.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL_S,
+                   help="Seconds between checks for new exports (0 disables hot reload).")
+    return p
+
+
+async def serve(args):
+    registry = ModelRegistry(args.models, loader=lambda path: OnnxModel(path, args.threads))
+    server = BrainServer(registry, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                         reload_interval=args.reload_interval)
+    port = await server.start(args.host, args.port)
+    if not registry.models:
+        print(f"⚠️ No models in {args.models} yet; waiting for an export.")
+    print(f"🧠 Serving {', '.join(sorted(registry.models)) or 'nothing'} on http://{args.host}:{port} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not HAS_ORT:
+        print("❌ onnxruntime is not installed (pip install onnxruntime).")
+        return 1
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+One entry point for the brain scripts.
+
+    ./cachy-brain data                                  # what is cached locally
+    ./cachy-brain download --symbols BTCUSDT --timeframes 1h,15m
+    ./cachy-brain features --symbols BTCUSDT,ETHUSDT --tf 1h --out datasets/bitunix_1h
+    ./cachy-brain train --data-source STORE --dataset datasets/bitunix_1h
+    ./cachy-brain update --tf 1h
+    ./cachy-brain autotune --dataset datasets/bitunix_1h   # writes train: flags to brain.yaml
+    ./cachy-brain export --best sharpe --symbol BTCUSDT --tf 1h
+    ./cachy-brain bench --sizes 1k,100k
+    ./cachy-brain backtest --grid BTCUSDT --tf 1h
+    ./cachy-brain patterns label --symbols BTCUSDT --tf 1h
+    ./cachy-brain risk grid --entry 30000 --symbol BTCUSDT --tf 1h
+    ./cachy-brain --config brain.yaml train
+
+Each subcommand forwards its arguments to the script it wraps and imports
+that script only when it runs, so torch, stable-baselines3, FinRL and
+pandas are loaded by the commands that use them and nothing else. `data`
+reads the stores with the standard library alone.
+
+`--config` takes a YAML file with one section per subcommand; its keys
+become flags (`timesteps: 50000` → `--timesteps 50000`, `true` → a bare
+flag, lists → comma-separated) that flags on the command line override:
+
+    train:
+      data_source: STORE
+      dataset: datasets/bitunix_1h
+      timesteps: 1000000
+    features:
+      symbols: [BTCUSDT, ETHUSDT]
+      tf: 1h
+      out: datasets/bitunix_1h
+"""
+
+import argparse
+import ast
+import importlib
+import json
+import os
+import struct
+import sys
+import time
+
+BRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand -> (module, help). Modules are imported on use only.
+COMMANDS = {
+    "download": ("market_data", "Download perpetual klines and funding into the candle store."),
+    "repair": ("kline_repair", "Fill kline gaps and build synthetic timeframes in the candle store."),
+    "features": ("dataset", "Build a memory-mapped training dataset from the candle store."),
+    "train": ("train", "Train the PPO agent."),
+    "update": ("online_update", "Fine-tune the latest registered agent on newly arrived bars."),
+    "autotune": ("autotune", "Find the fastest stable PPO training profile for this CPU."),
+    "export": ("export", "Export the trained agent to ONNX (plus ORT bundle)."),
+    "bench": ("indicator_bench", "Cross-engine indicator benchmark."),
+    "backtest": ("alert_backtest", "Backtest alert rules over the candle store."),
+    "scan": ("scanner", "Rank symbols by indicator signals."),
+    "distill": ("distill", "Distill the agent into small student models."),
+    "serve": ("brain_server", "Serve the exported models over HTTP/WebSocket."),
+    "registry": ("model_registry", "Query the model/dataset registry."),
+    "book": ("order_book", "Rebuild L2 order books from recorded depth streams."),
+    "patterns": ("patterns", "Label candlestick patterns and divergences over stored history."),
+    "risk": ("risk_scenarios", "Position size, R/R and EV/drawdown surfaces like the trade calculator."),
+}
+
+
+def config_args(config, command):
+    """Flags for `command` from a parsed YAML config (its section, if any)."""
+    section = (config or {}).get(command) or {}
+    if not isinstance(section, dict):
+        raise ValueError(f"Config section '{command}' must be a mapping")
+    argv = []
+    for key, value in section.items():
+        flag = "--" + str(key).replace("_", "-")
+        if value is None or value is False:
+            continue
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, (list, tuple)):
+            argv += [flag, ",".join(str(v) for v in value)]
+        else:
+            argv += [flag, str(value)]
+    return argv
+
+
+def load_config(path):
+    import yaml
+
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _npy_time_range(path):
+    """(rows, first, last) of a 1-d int64 .npy column, read from its header without NumPy."""
+    with open(path, "rb") as f:
+        if f.read(6) != b"\x93NUMPY":
+            raise ValueError(f"{path} is not a .npy file")
+        major = f.read(2)[0]
+        header_len = struct.unpack("<H" if major == 1 else "<I", f.read(2 if major == 1 else 4))[0]
+        header = ast.literal_eval(f.read(header_len).decode("latin-1"))
+        rows = header["shape"][0] if header["shape"] else 0
+        if rows == 0 or header["descr"] != "<i8":
+            return rows, None, None
+        data_start = f.tell()
+        first = struct.unpack("<q", f.read(8))[0]
+        f.seek(data_start + 8 * (rows - 1))
+        last = struct.unpack("<q", f.read(8))[0]
+    return rows, first, last
+
+
+def _fmt_ms(ms):
+    return "-" if ms is None else time.strftime("%Y-%m-%d %H:%M", time.gmtime(ms / 1000))
+
+
+def cached_series(store_root):
+    """[(exchange, symbol, tf, rows, first_ms, last_ms)] in the candle store (`tf` "funding" for funding)."""
+    found = []
+    if not os.path.isdir(store_root):
+        return found
+    for exchange in sorted(os.listdir(store_root)):
+        ex_dir = os.path.join(store_root, exchange)
+        if not os.path.isdir(ex_dir):
+            continue
+        for symbol in sorted(os.listdir(ex_dir)):
+            sym_dir = os.path.join(ex_dir, symbol)
+            if not os.path.isdir(sym_dir):
+                continue
+            for tf in sorted(os.listdir(sym_dir)):
+                column = os.path.join(sym_dir, tf, "time.npy")
+                if os.path.exists(column):
+                    found.append((exchange, symbol, tf, *_npy_time_range(column)))
+    return found
+
+
+def cached_datasets(datasets_root):
+    """Manifests of the datasets under `datasets_root`, with their directory as `path`."""
+    found = []
+    if not os.path.isdir(datasets_root):
+        return found
+    for name in sorted(os.listdir(datasets_root)):
+        manifest = os.path.join(datasets_root, name, "manifest.json")
+        if os.path.exists(manifest):
+            with open(manifest, encoding="utf-8") as f:
+                found.append({**json.load(f), "path": os.path.join(datasets_root, name)})
+    return found
+
+
+def list_data(argv):
+    p = argparse.ArgumentParser(prog="cachy-brain data", description="List cached klines, funding and datasets.")
+    p.add_argument("--store", default=os.environ.get("CACHY_CANDLE_STORE", os.path.join(BRAIN_DIR, "candle_store")))
+    p.add_argument("--datasets", default=os.path.join(BRAIN_DIR, "datasets"))
+    args = p.parse_args(argv)
+
+    series = cached_series(args.store)
+    print(f"🗄️ Candle store {args.store}: {len(series)} series")
+    for exchange, symbol, tf, rows, first, last in series:
+        print(f"   {exchange:<8} {symbol:<14} {tf:<8} {rows:>9} rows  {_fmt_ms(first)} → {_fmt_ms(last)}")
+    datasets = cached_datasets(args.datasets)
+    print(f"📦 Datasets {args.datasets}: {len(datasets)}")
+    for d in datasets:
+        print(f"   {os.path.basename(d['path']):<20} {d.get('exchange', '-')} {d.get('tf', '-'):<4} "
+              f"{d.get('bars', 0):>8} bars × {len(d.get('symbols', []))} symbols  "
+              f"{_fmt_ms(d.get('start'))} → {_fmt_ms(d.get('end'))}")
+    return 0
+
+
+def build_parser():
+    p = argparse.ArgumentParser(
+        prog="cachy-brain",
+        description="Cachy Brain: data, features, training, export and benchmarks.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(
+            [f"  {'data':<10} List cached klines, funding and datasets."]
+            + [f"  {name:<10} {help_text}" for name, (_, help_text) in COMMANDS.items()]
+        ) + "\n\n`cachy-brain <command> --help` shows the flags of a command.",
+    )
+    p.add_argument("--config", help="YAML file with one section of flags per command.")
+    p.add_argument("command", choices=["data", *COMMANDS], metavar="command")
+    p.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    forwarded = list(args.args)
+    if args.config:
+        # Config flags go first so the command line wins (argparse keeps the last value).
+        forwarded = config_args(load_config(args.config), args.command) + forwarded
+    if args.command == "data":
+        return list_data(forwarded)
+
+    module_name, _ = COMMANDS[args.command]
+    if BRAIN_DIR not in sys.path:
+        sys.path.insert(0, BRAIN_DIR)
+    module = importlib.import_module(module_name)
+    # The scripts' argparse should show the subcommand, not `cachy_brain.py`.
+    sys.argv[0] = f"cachy-brain {args.command}"
+    return module.main(forwarded)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Local candle store for the offline tools.
+
+The app keeps klines in IndexedDB (`klines_chunks`, see
+`src/services/storageService.ts`), which Python cannot open. This store is the
+on-disk counterpart: one directory per exchange/symbol/timeframe holding one
+`.npy` column per kline field, so a series loads as memory-mapped arrays
+without parsing anything.
+
+    <root>/<exchange>/<SYMBOL>/<tf>/time.npy      int64, ms, bar open, ascending
+                                   /open.npy      float64
+                                   /high.npy ...
+
+Series get in by `import_indexeddb_export` (records shaped like the app's
+`StoredKlines`) or by `write` from a downloader (`market_data.py`). Writes
+merge by timestamp, so re-importing an overlapping export is harmless.
+
+Funding settlements live next to the timeframes of a symbol:
+
+    <root>/<exchange>/<SYMBOL>/funding/time.npy   int64, ms, settlement time
+                                      /rate.npy   float64, fraction (0.0001 = 0.01%)
+
+Pattern labels of a series (`patterns.py`) are a sparse event table inside
+its timeframe directory, one row per detected pattern:
+
+    <root>/<exchange>/<SYMBOL>/<tf>/patterns/time.npy      int64, bar on whose close the pattern is known
+                                            /start.npy     int64, first bar of the pattern
+                                            /pattern.npy   int16, index into names.json
+                                            /names.json    [{"id", "source", "direction", ...}, ...]
+"""
+
+import json
+import os
+
+import numpy as np
+
+from synthetic import KLINE_FIELDS
+
+BRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.environ.get("CACHY_CANDLE_STORE", os.path.join(BRAIN_DIR, "candle_store"))
+DEFAULT_EXCHANGE = "bitunix"
+
+_DTYPES = {field: (np.int64 if field == "time" else np.float64) for field in KLINE_FIELDS}
+FUNDING_FIELDS = ("time", "rate")
+_FUNDING_DTYPES = {"time": np.int64, "rate": np.float64}
+FUNDING_DIR = "funding"
+EVENT_FIELDS = ("time", "start", "pattern")
+_EVENT_DTYPES = {"time": np.int64, "start": np.int64, "pattern": np.int16}
+EVENTS_DIR = "patterns"
+EVENT_NAMES = "names.json"
+
+
+_UNIT_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000,
+    "M": 2_592_000_000,  # 30 days, as the app approximates it
+}
+
+
+def timeframe_ms(tf):
+    """Bar length of a timeframe string, same table as `getIntervalMs` in storageService.ts."""
+    try:
+        value = int(tf[:-1])
+    except ValueError:
+        return 60_000
+    if tf[-1] not in _UNIT_MS:
+        return 60_000
+    return value * _UNIT_MS[tf[-1]]
+
+
+def merge_klines(old, new, fields=KLINE_FIELDS, dtypes=_DTYPES):
+    """Union of two kline dicts by `time`; on a collision the newer write wins."""
+    if old is None or len(old["time"]) == 0:
+        merged = {f: np.asarray(new[f], dtype=dtypes[f]) for f in fields}
+    else:
+        merged = {f: np.concatenate([np.asarray(old[f], dtype=dtypes[f]),
+                                     np.asarray(new[f], dtype=dtypes[f])]) for f in fields}
+    # Reverse so np.unique's first occurrence is the most recent write.
+    times = merged["time"][::-1]
+    _, first = np.unique(times, return_index=True)
+    keep = len(times) - 1 - first
+    return {f: merged[f][keep] for f in fields}
+
+
+def _load_columns(directory, fields, mmap):
+    mode = "r" if mmap else None
+    return {f: np.load(os.path.join(directory, f"{f}.npy"), mmap_mode=mode) for f in fields}
+
+
+def _write_columns(directory, columns):
+    os.makedirs(directory, exist_ok=True)
+    # Write every column to a temp name first so a crash cannot leave a
+    # series whose columns disagree on length.
+    for f, values in columns.items():
+        np.save(os.path.join(directory, f".{f}.tmp.npy"), values)
+    for f in columns:
+        os.replace(os.path.join(directory, f".{f}.tmp.npy"), os.path.join(directory, f"{f}.npy"))
+
+
+class CandleStore:
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_ROOT
+
+    def path(self, exchange, symbol, tf):
+        return os.path.join(self.root, exchange.lower(), symbol.upper(), tf)
+
+    def series(self, exchange=None):
+        """All (exchange, symbol, tf) triples in the store, sorted."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for ex in sorted(os.listdir(self.root)):
+            if exchange and ex != exchange.lower():
+                continue
+            ex_dir = os.path.join(self.root, ex)
+            if not os.path.isdir(ex_dir):
+                continue
+            for symbol in sorted(os.listdir(ex_dir)):
+                sym_dir = os.path.join(ex_dir, symbol)
+                if not os.path.isdir(sym_dir):
+                    continue
+                for tf in sorted(os.listdir(sym_dir)):
+                    if tf == FUNDING_DIR:
+                        continue
+                    if os.path.exists(os.path.join(sym_dir, tf, "time.npy")):
+                        found.append((ex, symbol, tf))
+        return found
+
+    def exists(self, exchange, symbol, tf):
+        return os.path.exists(os.path.join(self.path(exchange, symbol, tf), "time.npy"))
+
+    def load(self, exchange, symbol, tf, mmap=True):
+        """Kline dict of one series. Memory-mapped read-only unless `mmap=False`."""
+        directory = self.path(exchange, symbol, tf)
+        if not os.path.exists(os.path.join(directory, "time.npy")):
+            raise FileNotFoundError(f"No candles for {exchange}/{symbol}/{tf} in {self.root}")
+        return _load_columns(directory, KLINE_FIELDS, mmap)
+
+    def write(self, exchange, symbol, tf, klines):
+        """Merge `klines` into the stored series and return the stored bar count."""
+        old = self.load(exchange, symbol, tf, mmap=False) if self.exists(exchange, symbol, tf) else None
+        merged = merge_klines(old, klines)
+        _write_columns(self.path(exchange, symbol, tf), merged)
+        return len(merged["time"])
+
+    def has_funding(self, exchange, symbol):
+        return os.path.exists(os.path.join(self.path(exchange, symbol, FUNDING_DIR), "time.npy"))
+
+    def load_funding(self, exchange, symbol, mmap=True):
+        """Funding settlements {time, rate} of one symbol; empty arrays if none are stored."""
+        if not self.has_funding(exchange, symbol):
+            return {f: np.empty(0, dtype=_FUNDING_DTYPES[f]) for f in FUNDING_FIELDS}
+        return _load_columns(self.path(exchange, symbol, FUNDING_DIR), FUNDING_FIELDS, mmap)
+
+    def write_funding(self, exchange, symbol, funding):
+        """Merge funding settlements {time, rate} into the store; returns the stored count."""
+        old = self.load_funding(exchange, symbol, mmap=False) if self.has_funding(exchange, symbol) else None
+        merged = merge_klines(old, funding, FUNDING_FIELDS, _FUNDING_DTYPES)
+        _write_columns(self.path(exchange, symbol, FUNDING_DIR), merged)
+        return len(merged["time"])
+
+    def has_events(self, exchange, symbol, tf):
+        return os.path.exists(os.path.join(self.path(exchange, symbol, tf), EVENTS_DIR, EVENT_NAMES))
+
+    def load_events(self, exchange, symbol, tf, mmap=True):
+        """(events {time, start, pattern}, names) of one series; empty arrays and [] if none are stored."""
+        if not self.has_events(exchange, symbol, tf):
+            return {f: np.empty(0, dtype=_EVENT_DTYPES[f]) for f in EVENT_FIELDS}, []
+        directory = os.path.join(self.path(exchange, symbol, tf), EVENTS_DIR)
+        with open(os.path.join(directory, EVENT_NAMES), encoding="utf-8") as f:
+            names = json.load(f)
+        return _load_columns(directory, EVENT_FIELDS, mmap), names
+
+    def write_events(self, exchange, symbol, tf, events, names):
+        """
+        Replace the pattern events of a series. Labels are recomputed from the
+        whole series, so unlike klines they are not merged. Returns the event count.
+        """
+        directory = os.path.join(self.path(exchange, symbol, tf), EVENTS_DIR)
+        _write_columns(directory, {f: np.asarray(events[f], dtype=_EVENT_DTYPES[f]) for f in EVENT_FIELDS})
+        tmp = os.path.join(directory, f".{EVENT_NAMES}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(names, f, indent=1)
+        os.replace(tmp, os.path.join(directory, EVENT_NAMES))
+        return len(events["time"])
+
+    def import_indexeddb_export(self, path, exchange=DEFAULT_EXCHANGE):
+        """
+        Import a JSON array of `StoredKlines` records (`{symbol, tf, data: [{time,
+        open, high, low, close, volume}, ...]}`), the shape of the app's
+        `klines_chunks` object store. Returns {(symbol, tf): bars written}.
+        """
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            records = records.get("klines_chunks", [records])
+
+        grouped = {}
+        for record in records:
+            key = (record["symbol"], record["tf"])
+            grouped.setdefault(key, []).extend(record.get("data", []))
+
+        written = {}
+        for (symbol, tf), rows in grouped.items():
+            if not rows:
+                continue
+            klines = {
+                "time": np.array([int(r["time"]) for r in rows], dtype=np.int64),
+                **{f: np.array([float(r[f]) for r in rows]) for f in KLINE_FIELDS if f != "time"},
+            }
+            written[(symbol, tf)] = self.write(exchange, symbol, tf, klines)
+        return written
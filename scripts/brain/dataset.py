@@ -0,0 +1,368 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Training datasets built from the candle store.
+
+A dataset is a directory of `.npy` arrays on one shared time grid (one
+timeframe, several symbols) plus `manifest.json`:
+
+    time.npy       (T,)        int64, bar open in ms
+    close.npy      (T, S)      float, forward-filled over missing bars
+    features.npy   (T, S, F)   float, names in manifest["features"]
+    funding.npy    (T, S)      float, funding rate settled during the bar
+    valid.npy      (T, S)      bool, False where the exchange had no bar
+
+Symbols and bars are plain integer indices into these arrays (names in
+manifest["symbols"], times in time.npy); there is no per-row date string or
+ticker object as in the FinRL frame. The float arrays are float64, or
+float32 with `--dtype float32`, which halves the size for large universes
+(1-minute bars of 100 symbols). The training environment (`market_env.py`)
+copies one window of its symbol at a time out of the memory maps, so RAM use
+is bounded by the window, not the universe; `footprint` reports both sides.
+
+    python dataset.py --symbols BTCUSDT,ETHUSDT --tf 15m --out datasets/bitunix_15m
+    python dataset.py --symbols $(cat universe.txt) --tf 1m --dtype float32 --out datasets/bitunix_1m
+    python dataset.py --append --out datasets/bitunix_15m    # only the bars added to the store since
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import observation
+import reference_indicators as ri
+from candle_store import DEFAULT_EXCHANGE, CandleStore, timeframe_ms
+from market_data import NATIVE_TIMEFRAMES
+
+FUNDING_EXCHANGE = "bitunix"
+VOLUME_EMA = 50
+DTYPES = ("float64", "float32")
+ARRAYS = ("time", "close", "features", "funding", "valid")
+# History before the first appended bar that `append` feeds the indicators:
+# the slowest recursive one (EMA 50 of the volume) forgets its seed to ~1e-17.
+APPEND_WARMUP_BARS = 1000
+APPEND_COPY_ROWS = 1 << 16
+# What the FinRL frame stores per row besides the numbers: a `date` string and a `tic` object pointer.
+_FRAME_ROW_OVERHEAD = 8 + sys.getsizeof("2024-01-01 00:00:00") + 8
+
+
+def raw_inputs(k):
+    """
+    The `perp` layout's raw inputs (observation.PERP_INPUTS) for every bar of
+    a kline dict, except the ones that depend on the grid (`prev_close`,
+    `funding_rate`) or the agent (`position`).
+    """
+    close = np.asarray(k["close"], dtype=np.float64)
+    macd, macd_signal = ri.macd(close, 12, 26, 9)
+    _, bb_upper, bb_lower = ri.bb(close, 20, 2.0)
+    volume = np.asarray(k["volume"], dtype=np.float64)
+    return {
+        "close": close,
+        "rsi": ri.rsi(close, 14),
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+        "atr": ri.atr(k["high"], k["low"], close, 14),
+        "volume": volume,
+        "log_volume_ema": ri.ema(np.log1p(volume), VOLUME_EMA),
+    }
+
+
+def feature_names():
+    """Feature axis of features.npy: the `perp` observation without the position."""
+    return list(observation.PERP_FEATURES[:-1])
+
+
+def align(times, grid):
+    """(index into `times` of the last bar at or before each grid point, exact match mask)."""
+    idx = np.searchsorted(times, grid, side="right") - 1
+    exact = (idx >= 0) & (times[np.maximum(idx, 0)] == grid)
+    return idx, exact
+
+
+def funding_per_bar(funding, grid, bar_ms):
+    """
+    (settled, last): the rate settled within each bar (open, open + bar_ms],
+    summed if several fall into one bar, and the last settled rate as of the
+    bar close (forward-filled, 0 before the first known settlement).
+    """
+    times = np.asarray(funding["time"], dtype=np.int64)
+    rates = np.asarray(funding["rate"], dtype=np.float64)
+    if len(times) == 0:
+        zeros = np.zeros(len(grid))
+        return zeros, zeros.copy()
+    csum = np.concatenate([[0.0], np.cumsum(rates)])
+    lo = np.searchsorted(times, grid, side="right")
+    hi = np.searchsorted(times, grid + bar_ms, side="right")
+    settled = csum[hi] - csum[lo]
+    last = np.where(hi > 0, rates[np.maximum(hi - 1, 0)], 0.0)
+    return settled, last
+
+
+def _open_arrays(out_dir, dtype, n_t, n_s, n_f):
+    """Writable memory maps for a dataset of `n_t` bars, as hidden temp files in `out_dir`."""
+    def tmp(name, dt, shape):
+        return np.lib.format.open_memmap(os.path.join(out_dir, f".{name}.tmp.npy"), "w+", dt, shape)
+    return {
+        "close": tmp("close", dtype, (n_t, n_s)),
+        "features": tmp("features", dtype, (n_t, n_s, n_f)),
+        "funding": tmp("funding", dtype, (n_t, n_s)),
+        "valid": tmp("valid", bool, (n_t, n_s)),
+    }
+
+
+def _fill_symbol(arrays, rows, s, store, symbol, times, raw, grid, bar_ms):
+    """Write symbol `s` on `grid` into `arrays[...][rows, s]` from its bar times and `raw_inputs`."""
+    idx, exact = align(times, grid)
+    # Missing bars repeat the last bar, so their return comes out as 0.
+    on_grid = {name: values[idx] for name, values in raw.items()}
+    on_grid["prev_close"] = np.concatenate([[raw["close"][max(idx[0] - 1, 0)]], on_grid["close"][:-1]])
+    settled, last = funding_per_bar(store.load_funding(FUNDING_EXCHANGE, symbol), grid, bar_ms)
+    on_grid["funding_rate"] = last
+    on_grid["position"] = np.zeros(len(grid))
+
+    columns = observation.perp_columns(on_grid, np)[:-1]
+    for f, column in enumerate(columns):
+        arrays["features"][rows, s, f] = column
+    arrays["close"][rows, s] = on_grid["close"]
+    arrays["valid"][rows, s] = exact
+    arrays["funding"][rows, s] = settled
+
+
+def _commit(arrays, grid, out_dir):
+    """Flush the temp arrays and move them (with `time`) over the dataset's files."""
+    np.save(os.path.join(out_dir, ".time.tmp.npy"), grid)
+    for arr in arrays.values():
+        arr.flush()
+    arrays.clear()
+    for name in ARRAYS:
+        os.replace(os.path.join(out_dir, f".{name}.tmp.npy"), os.path.join(out_dir, f"{name}.npy"))
+
+
+def build(store, exchange, symbols, tf, out_dir, start_ms=None, end_ms=None, dtype="float64"):
+    """Write a dataset for `symbols` at `tf` to `out_dir`; returns its manifest."""
+    if tf not in NATIVE_TIMEFRAMES.get(exchange, (tf,)):
+        raise ValueError(f"{exchange} does not serve {tf} natively")
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}' (choose from {', '.join(DTYPES)})")
+    bar_ms = timeframe_ms(tf)
+
+    per_symbol = []
+    for symbol in symbols:
+        k = {f: np.asarray(v) for f, v in store.load(exchange, symbol, tf).items()}
+        raw = raw_inputs(k)
+        # Trim the indicator warmup: from the first bar where every input is
+        # defined, one more so that bar has a previous close.
+        finite = np.logical_and.reduce([np.isfinite(v) for v in raw.values()])
+        if not finite.any():
+            raise ValueError(f"{symbol} {tf}: not enough bars for the feature warmup")
+        first = min(int(np.argmax(finite)) + 1, len(finite) - 1)
+        per_symbol.append((symbol, k["time"].astype(np.int64), raw, first))
+
+    start = max(int(times[first]) for _, times, _, first in per_symbol)
+    end = min(int(times[-1]) for _, times, _, _ in per_symbol)
+    if start_ms is not None:
+        start = max(start, start_ms)
+    if end_ms is not None:
+        end = min(end, end_ms)
+    if end <= start:
+        raise ValueError("The symbols' histories do not overlap after warmup")
+    # Snap to the exchange's bar grid (bars open on multiples of the bar length).
+    start = -(-start // bar_ms) * bar_ms
+    grid = np.arange(start, end + 1, bar_ms, dtype=np.int64)
+
+    n_t, n_s, names = len(grid), len(per_symbol), feature_names()
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = _open_arrays(out_dir, dtype, n_t, n_s, len(names))
+
+    for s, (symbol, times, raw, _) in enumerate(per_symbol):
+        _fill_symbol(arrays, slice(None), s, store, symbol, times, raw, grid, bar_ms)
+    _commit(arrays, grid, out_dir)
+
+    manifest = {
+        "exchange": exchange,
+        "tf": tf,
+        "bar_ms": bar_ms,
+        "symbols": [symbol for symbol, *_ in per_symbol],
+        "layout": "perp",
+        "features": names,
+        "dtype": dtype,
+        "bars": n_t,
+        "start": int(grid[0]),
+        "end": int(grid[-1]),
+        "funding_exchange": FUNDING_EXCHANGE,
+        "store": os.path.abspath(store.root),
+        "created": int(time.time()),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def append(store, out_dir, end_ms=None, warmup_bars=APPEND_WARMUP_BARS):
+    """
+    Extend the dataset in `out_dir` with the store's bars after its last one
+    (up to `end_ms`). Features are computed for the new bars only, from
+    `warmup_bars` bars of history before them, which makes the recursive
+    indicators (EMA, Wilder smoothing) agree with a full rebuild to float
+    precision. Old rows are copied as they are. Returns (manifest, new bars).
+    """
+    with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    bar_ms, symbols = manifest["bar_ms"], manifest["symbols"]
+    old_end = manifest["end"]
+    first_new = old_end + bar_ms
+
+    per_symbol = []
+    for symbol in symbols:
+        k = store.load(manifest["exchange"], symbol, manifest["tf"])
+        times = np.asarray(k["time"], dtype=np.int64)
+        lo = max(int(np.searchsorted(times, first_new)) - warmup_bars, 0)
+        tail = {f: np.asarray(v[lo:]) for f, v in k.items()}
+        per_symbol.append((symbol, tail["time"], raw_inputs(tail)))
+
+    end = min(int(times[-1]) for _, times, _ in per_symbol)
+    if end_ms is not None:
+        end = min(end, end_ms)
+    if end < first_new:
+        return manifest, 0
+    new_grid = np.arange(first_new, end + 1, bar_ms, dtype=np.int64)
+
+    old = load(out_dir)
+    n_old, n_s, n_f = old["features"].shape
+    n_t = n_old + len(new_grid)
+    arrays = _open_arrays(out_dir, manifest["dtype"], n_t, n_s, n_f)
+    for name in ("close", "features", "funding", "valid"):
+        for lo in range(0, n_old, APPEND_COPY_ROWS):
+            hi = min(lo + APPEND_COPY_ROWS, n_old)
+            arrays[name][lo:hi] = old[name][lo:hi]
+    grid = np.concatenate([old["time"], new_grid])
+    del old
+    for s, (symbol, times, raw) in enumerate(per_symbol):
+        _fill_symbol(arrays, slice(n_old, None), s, store, symbol, times, raw, new_grid, bar_ms)
+    _commit(arrays, grid, out_dir)
+
+    manifest.update({"bars": n_t, "end": int(grid[-1]), "created": int(time.time())})
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest, len(new_grid)
+
+
+def load(path, mmap=True, budget_bytes=None):
+    """
+    Dataset dict: the arrays (memory-mapped read-only by default) plus
+    `manifest`. With `budget_bytes` the arrays are read into RAM if they fit
+    the budget together and memory-mapped otherwise.
+    """
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if budget_bytes is not None:
+        size = sum(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r").nbytes for name in ARRAYS)
+        mmap = size > budget_bytes
+    mode = "r" if mmap else None
+    data = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+    data["manifest"] = manifest
+    return data
+
+
+def footprint(data, window_bars=None, n_envs=None):
+    """
+    Memory use of a loaded dataset in bytes: `arrays` (per array), `mapped`
+    (left on disk behind memory maps), `resident` (read into RAM), and the
+    size of the same data as a FinRL-style long frame (`frame`: float64
+    columns plus a date string and a ticker object per row). With
+    `window_bars`, `windows` is what `n_envs` environments (default: one per
+    symbol) hold in RAM for their current window.
+    """
+    arrays = {name: int(data[name].nbytes) for name in ARRAYS}
+    mapped = sum(n for name, n in arrays.items() if isinstance(data[name], np.memmap))
+    n_t, n_s, n_f = data["features"].shape
+    out = {
+        "rows": n_t * n_s,
+        "dtype": str(data["features"].dtype),
+        "arrays": arrays,
+        "mapped": mapped,
+        "resident": sum(arrays.values()) - mapped,
+        "frame": n_t * n_s * (8 * (n_f + 2) + 1 + _FRAME_ROW_OVERHEAD),
+    }
+    if window_bars is not None:
+        envs = n_s if n_envs is None else n_envs
+        # Each env keeps its symbol's features (as float32 observations) and close/funding (float64).
+        out["windows"] = envs * min(window_bars, n_t) * (4 * n_f + 16)
+    return out
+
+
+def _mb(n):
+    return f"{n / 2**20:,.1f} MB"
+
+
+def format_footprint(fp):
+    lines = [
+        f"💾 {fp['rows']:,} rows ({fp['dtype']}): as a FinRL frame ≈ {_mb(fp['frame'])} in RAM; "
+        f"as this dataset {_mb(sum(fp['arrays'].values()))} "
+        f"({_mb(fp['resident'])} in RAM, {_mb(fp['mapped'])} memory-mapped on disk)",
+    ]
+    if "windows" in fp:
+        lines.append(f"   env windows: {_mb(fp['windows'])} in RAM")
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Build a memory-mapped training dataset from the candle store.")
+    p.add_argument("--store", default=None)
+    p.add_argument("--exchange", choices=tuple(NATIVE_TIMEFRAMES), default=DEFAULT_EXCHANGE)
+    p.add_argument("--symbols", help="Comma-separated; required unless --append.")
+    p.add_argument("--tf", default="1h")
+    p.add_argument("--out", required=True)
+    p.add_argument("--dtype", choices=DTYPES, default="float64",
+                   help="Float type of close/features/funding; float32 halves the dataset size.")
+    p.add_argument("--append", action="store_true",
+                   help="Extend the dataset in --out with the store's newer bars instead of rebuilding it.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.append:
+        try:
+            manifest, added = append(CandleStore(args.store), args.out)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {added} new bars appended to {args.out} ({manifest['bars']} bars)")
+        return 0
+    if not args.symbols:
+        print("❌ --symbols is required (or --append).")
+        return 1
+    symbols = [s.strip().upper() for s in args.symbols.split(",")]
+    try:
+        manifest = build(CandleStore(args.store), args.exchange, symbols, args.tf, args.out, dtype=args.dtype)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ {manifest['bars']} bars × {len(manifest['symbols'])} symbols × {len(manifest['features'])} features "
+          f"written to {args.out}")
+    print(format_footprint(footprint(load(args.out))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Distill the trained PPO policy into small student models.
+
+The teacher labels bars of its training dataset, up to --max-samples drawn
+across it (with positions drawn uniformly from [-1, 1], since the position
+is part of the observation); the students learn those deterministic actions
+by regression. Each student is
+exported through the same fused graph as the teacher (`export.FusedPolicy`:
+raw inputs, assembly, normalization baked in), so the browser can swap one
+for the other without touching its inputs.
+
+    python distill.py
+    python distill.py --students mlp16,mlp32x2,gbt --epochs 40
+
+The table compares every student with the teacher on the held-out tail of
+the dataset: direction agreement (long/flat/short with a 0.1 dead zone), mean
+absolute action error, parameter count, ONNX size and single-sample latency.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+
+import dataset
+import export
+import observation
+
+# Optional: gradient-boosted tree student, needs scikit-learn and skl2onnx
+try:
+    import onnx
+    from onnx import compose, helper
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    from sklearn.ensemble import GradientBoostingRegressor
+    HAS_GBT = True
+except ImportError:
+    HAS_GBT = False
+
+STUDENT_DIR = os.path.join(export.TRAINED_MODEL_DIR, "students")
+DEFAULT_STUDENTS = "mlp16,mlp32x2,mlp64x2,gbt"
+DEAD_ZONE = 0.1
+VALIDATION_SHARE = 0.2
+# Teacher-labelled samples (bars × symbols) across training and validation.
+MAX_SAMPLES = 500_000
+LATENCY_RUNS = 2000
+
+
+def hidden_sizes(name):
+    """'mlp32x2' -> (32, 32), 'mlp16' -> (16,)."""
+    spec = name[len("mlp"):]
+    width, _, depth = spec.partition("x")
+    return (int(width),) * int(depth or 1)
+
+
+class StudentMLP(torch.nn.Sequential):
+    def __init__(self, obs_dim, action_dim, hidden):
+        layers = []
+        last = obs_dim
+        for width in hidden:
+            layers += [torch.nn.Linear(last, width), torch.nn.Tanh()]
+            last = width
+        layers.append(torch.nn.Linear(last, action_dim))
+        super().__init__(*layers)
+
+
+def teacher_observations(data, rng, max_samples=MAX_SAMPLES):
+    """
+    (train, validation) raw observations, split by time: dataset features plus
+    a random position, in the dataset's dtype.
+
+    At most about `max_samples` rows: bars are drawn without replacement from
+    each side of the split and read in order, so a memory-mapped dataset only
+    pages in the drawn bars.
+    """
+    features = data["features"]
+    n_t, n_s, n_f = features.shape
+    split = int(n_t * (1.0 - VALIDATION_SHARE))
+    bars = max(max_samples // n_s, 2)
+    parts = []
+    for start, stop, share in ((0, split, 1.0 - VALIDATION_SHARE), (split, n_t, VALIDATION_SHARE)):
+        count = min(stop - start, max(int(bars * share), 1))
+        idx = np.sort(rng.choice(stop - start, count, replace=False)) + start
+        obs = np.empty((count, n_s, n_f + 1), dtype=features.dtype)
+        obs[..., :n_f] = features[idx]
+        obs[..., n_f] = rng.uniform(-1.0, 1.0, (count, n_s))
+        parts.append(obs.reshape(-1, n_f + 1))
+    return parts[0], parts[1]
+
+
+def direction(actions):
+    return np.where(actions > DEAD_ZONE, 1, np.where(actions < -DEAD_ZONE, -1, 0))
+
+
+def agreement(student, teacher):
+    """(direction agreement, mean absolute error) over all samples and action dims."""
+    return float(np.mean(direction(student) == direction(teacher))), float(np.mean(np.abs(student - teacher)))
+
+
+def train_mlp(obs, actions, hidden, epochs, seed=0, batch_size=1024, lr=3e-3):
+    torch.manual_seed(seed)
+    student = StudentMLP(obs.shape[1], actions.shape[1], hidden)
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    x = torch.as_tensor(obs, dtype=torch.float32)
+    y = torch.as_tensor(actions, dtype=torch.float32)
+    for _ in range(epochs):
+        order = torch.randperm(len(x))
+        for i in range(0, len(x), batch_size):
+            idx = order[i:i + batch_size]
+            loss = torch.nn.functional.mse_loss(student(x[idx]), y[idx])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+    student.eval()
+    return student
+
+
+def predict_mlp(student, obs):
+    with torch.no_grad():
+        return student(torch.as_tensor(obs, dtype=torch.float32)).numpy()
+
+
+def export_gbt(model, layout, norm, action_space, path):
+    """
+    Preprocessing graph (assembly + normalization, traced from torch) merged
+    with the skl2onnx tree graph and a final Clip to the action range.
+    """
+    obs_dim = len(observation.feature_names(layout))
+    pre_path = path + ".pre.onnx"
+    identity = export.FusedPolicy(torch.nn.Identity(), layout, norm, [-3.0e38], [3.0e38])
+    export.export_fused(identity, layout, export.sample_inputs(layout, 2, np.random.default_rng(0)), pre_path)
+    pre = onnx.load(pre_path)
+    os.remove(pre_path)
+
+    tree = convert_sklearn(
+        model, initial_types=[("obs", FloatTensorType([None, obs_dim]))],
+        target_opset={"": export.OPSET_VERSION, "ai.onnx.ml": 1},
+    )
+    tree = compose.add_prefix(tree, "student_")
+    merged = compose.merge_models(pre, tree, io_map=[("action", "student_obs")])
+    low = helper.make_tensor("action_low", onnx.TensorProto.FLOAT, [], [float(np.min(action_space.low))])
+    high = helper.make_tensor("action_high", onnx.TensorProto.FLOAT, [], [float(np.max(action_space.high))])
+    merged.graph.initializer.extend([low, high])
+    tree_out = merged.graph.output[0].name
+    merged.graph.node.append(helper.make_node("Clip", [tree_out, "action_low", "action_high"], ["action"]))
+    out_info = helper.make_tensor_value_info("action", onnx.TensorProto.FLOAT, ["batch_size", 1])
+    del merged.graph.output[:]
+    merged.graph.output.append(out_info)
+    onnx.checker.check_model(merged)
+    onnx.save(merged, path)
+
+
+def latency_us(path, layout, runs=LATENCY_RUNS):
+    """p50/p99 of single-sample inference in microseconds (onnxruntime, else None)."""
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return None, None
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    feed = export.sample_inputs(layout, 1, np.random.default_rng(1))
+    for _ in range(50):
+        session.run(None, feed)
+    samples = np.empty(runs)
+    for i in range(runs):
+        t0 = time.perf_counter_ns()
+        session.run(None, feed)
+        samples[i] = (time.perf_counter_ns() - t0) / 1000.0
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def count_parameters(module):
+    return int(sum(p.numel() for p in module.parameters()))
+
+
+def format_table(rows):
+    header = f"{'model':<12} {'params':>9} {'onnx KB':>8} {'agree':>7} {'MAE':>7} {'p50 µs':>8} {'p99 µs':>8}"
+    lines = [header, "-" * len(header)]
+    for r in rows:
+        p50 = "-" if r["p50_us"] is None else f"{r['p50_us']:.1f}"
+        p99 = "-" if r["p99_us"] is None else f"{r['p99_us']:.1f}"
+        lines.append(
+            f"{r['model']:<12} {r['params']:>9} {r['onnx_bytes'] / 1024:>8.1f} {r['agreement'] * 100:>6.1f}% "
+            f"{r['mae']:>7.4f} {p50:>8} {p99:>8}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Distill the PPO policy into small student models.")
+    p.add_argument("--students", default=DEFAULT_STUDENTS, help="Comma-separated: mlp<width>[x<depth>] and/or gbt.")
+    p.add_argument("--dataset", help="Dataset directory (default: the one the teacher was trained on).")
+    p.add_argument("--epochs", type=int, default=30)
+    p.add_argument("--max-samples", type=int, default=MAX_SAMPLES,
+                   help="Bars × symbols the teacher labels, drawn across the dataset.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", dest="json_out", help="Also write the table rows to this JSON file.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    print("🚀 Starting Policy Distillation...")
+    base = os.path.join(export.TRAINED_MODEL_DIR, export.MODEL_NAME)
+    if not os.path.exists(base + ".zip"):
+        print(f"❌ Model not found at {base}.zip. Please run train.py first.")
+        return 1
+    teacher = PPO.load(base + ".zip")
+    policy = teacher.policy
+    policy.eval()
+    obs_dim = int(np.prod(policy.observation_space.shape))
+    layout = export.load_layout(base + export.LAYOUT_SUFFIX, obs_dim)
+    if layout["kind"] != "perp":
+        print("❌ Distillation needs a model trained on a candle-store dataset (DATA_SOURCE = \"STORE\").")
+        return 1
+    norm = export.load_normalization(base + export.VECNORMALIZE_SUFFIX, obs_dim)
+    data = dataset.load(args.dataset or layout["dataset"])
+
+    # 1. Teacher labels on normalized observations
+    rng = np.random.default_rng(args.seed)
+    train_raw, val_raw = teacher_observations(data, rng, args.max_samples)
+    train_obs = observation.normalize(train_raw, norm["mean"], norm["var"], norm["epsilon"], norm["clip"], np)
+    val_obs = observation.normalize(val_raw, norm["mean"], norm["var"], norm["epsilon"], norm["clip"], np)
+    head = export.PolicyHead(policy)
+    low, high = policy.action_space.low, policy.action_space.high
+    with torch.no_grad():
+        def label(obs):
+            actions = head(torch.as_tensor(obs, dtype=torch.float32)).numpy()
+            return np.clip(actions, low, high)
+        train_y, val_y = label(train_obs), label(val_obs)
+    print(f"📚 {len(train_obs)} training / {len(val_obs)} validation samples labelled by the teacher")
+
+    os.makedirs(STUDENT_DIR, exist_ok=True)
+    rows = []
+    teacher_path = os.path.join(STUDENT_DIR, "teacher.onnx")
+    export.export_fused(export.FusedPolicy(head, layout, norm, low, high), layout,
+                        export.sample_inputs(layout, 2, rng), teacher_path)
+    p50, p99 = latency_us(teacher_path, layout)
+    rows.append({"model": "teacher", "params": count_parameters(policy), "onnx_bytes": os.path.getsize(teacher_path),
+                 "agreement": 1.0, "mae": 0.0, "p50_us": p50, "p99_us": p99, "path": teacher_path})
+
+    # 2. Students
+    for name in (s.strip() for s in args.students.split(",")):
+        path = os.path.join(STUDENT_DIR, f"cachy_brain_{name}.onnx")
+        if name == "gbt":
+            if not HAS_GBT:
+                print("⚠️ gbt needs scikit-learn and skl2onnx; skipping.")
+                continue
+            if train_y.shape[1] != 1:
+                # One regressor and one graph output; a multi-dimensional action space would need one per dim.
+                print(f"⚠️ gbt distils a single action dimension, the policy has {train_y.shape[1]}; skipping.")
+                continue
+            print("🌲 Training gradient-boosted trees...")
+            model = GradientBoostingRegressor(n_estimators=100, max_depth=3, random_state=args.seed)
+            model.fit(train_obs, train_y[:, 0])
+            pred = np.clip(model.predict(val_obs)[:, None], low, high)
+            export_gbt(model, layout, norm, policy.action_space, path)
+            params = int(sum(est.tree_.node_count for est in model.estimators_.ravel()))
+        elif name.startswith("mlp"):
+            hidden = hidden_sizes(name)
+            print(f"🧠 Training student {name} {hidden}...")
+            student = train_mlp(train_obs, train_y, hidden, args.epochs, seed=args.seed)
+            pred = np.clip(predict_mlp(student, val_obs), low, high)
+            export.export_fused(export.FusedPolicy(student, layout, norm, low, high), layout,
+                                export.sample_inputs(layout, 2, rng), path)
+            params = count_parameters(student)
+        else:
+            print(f"⚠️ Unknown student '{name}', skipping.")
+            continue
+        agree, mae = agreement(pred, val_y)
+        p50, p99 = latency_us(path, layout)
+        rows.append({"model": name, "params": params, "onnx_bytes": os.path.getsize(path),
+                     "agreement": agree, "mae": mae, "p50_us": p50, "p99_us": p99, "path": path})
+        export.write_manifest(path.replace(".onnx", ".manifest.json"), layout, norm, policy.action_space,
+                              export.graph_inputs(layout), {"teacher": os.path.abspath(base + ".zip"), "student": name},
+                              model_name=os.path.basename(path))
+
+    print()
+    print(format_table(rows))
+    if rows[0]["p50_us"] is None:
+        print("   (latency needs onnxruntime)")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    print(f"\n🎉 Students written to {STUDENT_DIR}/ (each with its manifest).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Port of `DivergenceScanner` (`src/utils/divergenceScanner.ts`).
+
+Pivot detection is vectorized; the pairing of pivots keeps the TS loop
+structure, because which pair wins ("keep the widest") depends on iteration
+order. Constants and result fields match the TS version one to one.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+PIVOT_RANGE = 2
+MAX_LOOKBACK = 60
+MIN_LOOKBACK = 5
+PRICE_SEARCH_WINDOW = 2
+RECENT_BARS = 15
+
+
+def find_pivots(values, pivot_range=PIVOT_RANGE):
+    """
+    (high_idx, low_idx): indices where no neighbour within `pivot_range` is
+    strictly higher (resp. lower). Plateaus yield several pivots, as in TS.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < pivot_range * 2 + 1:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    windows = sliding_window_view(values, 2 * pivot_range + 1)
+    center = windows[:, pivot_range]
+    # NaN comparisons are false in TS, so a NaN neighbour never disqualifies.
+    with np.errstate(invalid="ignore"):
+        is_high = ~(windows > center[:, None]).any(axis=1)
+        is_low = ~(windows < center[:, None]).any(axis=1)
+    offset = pivot_range
+    return np.flatnonzero(is_high) + offset, np.flatnonzero(is_low) + offset
+
+
+def _window_extreme(data, center, radius, fn):
+    start = max(0, center - radius)
+    end = min(len(data) - 1, center + radius)
+    return float(fn(data[start:end + 1]))
+
+
+def _pair_pivots(pivots, values, price, price_fn, side, better_regular, better_hidden, name):
+    results = []
+    for i in range(len(pivots) - 1, 0, -1):
+        p2 = int(pivots[i])
+        best_regular = best_hidden = None
+        for j in range(i - 1, -1, -1):
+            p1 = int(pivots[j])
+            if p2 - p1 > MAX_LOOKBACK:
+                break
+            if p2 - p1 < MIN_LOOKBACK:
+                continue
+            ind1, ind2 = float(values[p1]), float(values[p2])
+            price1 = _window_extreme(price, p1, PRICE_SEARCH_WINDOW, price_fn)
+            price2 = _window_extreme(price, p2, PRICE_SEARCH_WINDOW, price_fn)
+            base = {
+                "indicator": name, "side": side, "startIdx": p1, "endIdx": p2,
+                "priceStart": price1, "priceEnd": price2, "indStart": ind1, "indEnd": ind2,
+            }
+            if better_regular(price1, price2, ind1, ind2):
+                best_regular = dict(base, type="Regular")
+            if better_hidden(price1, price2, ind1, ind2):
+                best_hidden = dict(base, type="Hidden")
+        if best_regular:
+            results.append(best_regular)
+        if best_hidden:
+            results.append(best_hidden)
+    return results
+
+
+def scan(highs, lows, indicator, name):
+    """Divergences ending in the last `RECENT_BARS` bars, deduplicated."""
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    indicator = np.asarray(indicator, dtype=np.float64)
+    high_idx, low_idx = find_pivots(indicator)
+
+    results = _pair_pivots(
+        low_idx, indicator, lows, np.min, "Bullish",
+        lambda p1, p2, i1, i2: p2 < p1 and i2 > i1,
+        lambda p1, p2, i1, i2: p2 > p1 and i2 < i1,
+        name,
+    )
+    results += _pair_pivots(
+        high_idx, indicator, highs, np.max, "Bearish",
+        lambda p1, p2, i1, i2: p2 > p1 and i2 < i1,
+        lambda p1, p2, i1, i2: p2 < p1 and i2 > i1,
+        name,
+    )
+
+    recent_from = len(indicator) - RECENT_BARS
+    seen = set()
+    out = []
+    for r in results:
+        if r["endIdx"] < recent_from:
+            continue
+        key = (r["startIdx"], r["endIdx"], r["type"], r["side"])
+        if key not in seen:
+            seen.add(key)
+            out.append(r)
+    return out
@@ -14,92 +14,323 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+import argparse
+import json
+import pickle
+import sys
 import torch
 import onnx
 from stable_baselines3 import PPO
 import numpy as np
 
+import observation
+import ort_bundle
+from profiling import MODES as PROFILE_MODES, Profiler
+
 # --- Configuration ---
 TRAINED_MODEL_DIR = "trained_models"
 MODEL_NAME = "ppo_cachy_agent"
 ONNX_MODEL_NAME = "cachy_brain.onnx"
+MANIFEST_NAME = "cachy_brain.manifest.json"
+OPSET_VERSION = 11
+
+# Must match train.py
+VECNORMALIZE_SUFFIX = "_vecnormalize.pkl"
+LAYOUT_SUFFIX = ".layout.json"
+
+
+def load_normalization(path, obs_dim):
+    """
+    Observation statistics saved by train.py's VecNormalize. Without them the
+    graph still gets a (no-op) normalization stage, so its inputs and outputs
+    look the same either way.
+    """
+    if not os.path.exists(path):
+        print(f"⚠️ No normalization stats at {path}; exporting without observation scaling.")
+        return {"mean": np.zeros(obs_dim), "var": np.ones(obs_dim), "epsilon": 0.0, "clip": np.inf, "enabled": False}
+    with open(path, "rb") as f:
+        vec_normalize = pickle.load(f)
+    if not vec_normalize.norm_obs:
+        return {"mean": np.zeros(obs_dim), "var": np.ones(obs_dim), "epsilon": 0.0, "clip": np.inf, "enabled": False}
+    return {
+        "mean": np.asarray(vec_normalize.obs_rms.mean, dtype=np.float64),
+        "var": np.asarray(vec_normalize.obs_rms.var, dtype=np.float64),
+        "epsilon": float(vec_normalize.epsilon),
+        "clip": float(vec_normalize.clip_obs),
+        "enabled": True,
+    }
+
+
+def load_layout(path, obs_dim):
+    """Input layout saved by train.py; models from before it existed get one flat input."""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    print(f"⚠️ No input layout at {path}; the graph takes the assembled observation as one input.")
+    return {"kind": "flat", "obs_dim": obs_dim}
+
+
+class PolicyHead(torch.nn.Module):
+    """Normalized observation -> mode of the SB3 policy's action distribution."""
+
+    def __init__(self, policy):
+        super().__init__()
+        self.policy = policy
+
+    def forward(self, obs):
+        return self.policy.get_distribution(obs).mode()
+
+
+class FusedPolicy(torch.nn.Module):
+    """
+    Raw indicator inputs -> observation assembly -> normalization -> `head`
+    -> action clipped to the action space. `head` is the SB3 policy
+    (`PolicyHead`) or a distilled student (`distill.py`).
+    """
+
+    def __init__(self, head, layout, norm, action_low, action_high):
+        super().__init__()
+        self.head = head
+        self.layout = layout
+        self.input_names = [name for name, _, _ in graph_inputs(layout)]
+        self.register_buffer("mean", torch.tensor(norm["mean"], dtype=torch.float32))
+        self.register_buffer("std", torch.tensor(np.sqrt(norm["var"] + norm["epsilon"]), dtype=torch.float32))
+        self.clip = float(min(norm["clip"], 3.0e38))
+        self.register_buffer("low", torch.tensor(action_low, dtype=torch.float32))
+        self.register_buffer("high", torch.tensor(action_high, dtype=torch.float32))
+
+    def forward(self, *inputs):
+        named = dict(zip(self.input_names, inputs))
+        if self.layout["kind"] == "flat":
+            obs = named["observation"]
+        else:
+            obs = observation.assemble(self.layout, named, torch)
+        obs = torch.clip((obs - self.mean) / self.std, -self.clip, self.clip)
+        action = self.head(obs)
+        # Clipped like SB3's predict().
+        return torch.max(torch.min(action, self.high), self.low)
+
+
+def graph_inputs(layout):
+    if layout["kind"] == "flat":
+        return [("observation", layout["obs_dim"], "assembled observation vector")]
+    return observation.graph_inputs(layout)
+
+
+def sample_inputs(layout, batch, rng):
+    """Plausible raw inputs for verification (prices positive, RSI in range, ...)."""
+    inputs = {}
+    for name, width, _ in graph_inputs(layout):
+        if name in ("close", "prev_close", "bb_upper", "bb_lower"):
+            values = 100.0 * (1.0 + 0.02 * rng.standard_normal((batch, width)))
+        elif name == "rsi":
+            values = rng.uniform(0, 100, (batch, width))
+        elif name == "position":
+            values = rng.uniform(-1, 1, (batch, width))
+        elif name in ("volume", "atr", "balance", "shares"):
+            values = rng.uniform(0, 1000, (batch, width))
+        else:
+            values = rng.standard_normal((batch, width))
+        inputs[name] = values.astype(np.float32)
+    if layout["kind"] == "perp":
+        inputs["bb_upper"] = inputs["close"] * 1.03
+        inputs["bb_lower"] = inputs["close"] * 0.97
+        inputs["funding_rate"] *= 1e-4
+    return inputs
 
-def main():
+
+def export_fused(fused, layout, sample, output_path):
+    """Trace `fused` into an ONNX file with one named input per raw input."""
+    inputs = graph_inputs(layout)
+    input_names = [name for name, _, _ in inputs]
+    example = tuple(torch.from_numpy(sample[name]) for name in input_names)
+    dynamic_axes = {name: {0: "batch_size"} for name in input_names}
+    dynamic_axes["action"] = {0: "batch_size"}
+    with torch.no_grad():
+        torch.onnx.export(
+            fused,
+            example,
+            output_path,
+            opset_version=OPSET_VERSION,
+            input_names=input_names,
+            output_names=["action"],
+            dynamic_axes=dynamic_axes,
+        )
+
+
+def write_manifest(path, layout, norm, action_space, inputs, source, model_name=ONNX_MODEL_NAME):
+    manifest = {
+        "model": model_name,
+        "opset": OPSET_VERSION,
+        "layout": layout["kind"],
+        "inputs": [
+            {"name": name, "shape": ["batch", width], "dtype": "float32", "description": description}
+            for name, width, description in inputs
+        ],
+        "observation": observation.feature_names(layout) if layout["kind"] != "flat" else None,
+        "normalization": {
+            "baked_in": True,
+            "enabled": norm["enabled"],
+            "epsilon": norm["epsilon"],
+            "clip": None if np.isinf(norm["clip"]) else norm["clip"],
+        },
+        "outputs": [{
+            "name": "action",
+            "shape": ["batch", int(np.prod(action_space.shape))],
+            "dtype": "float32",
+            "range": [float(np.min(action_space.low)), float(np.max(action_space.high))],
+        }],
+        "source": source,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Export the trained PPO agent to ONNX.")
+    source = p.add_mutually_exclusive_group()
+    source.add_argument("--run", type=int, help="Export this registry run (model_registry.py) instead of "
+                                                 f"whatever is in {TRAINED_MODEL_DIR}/.")
+    source.add_argument("--best", metavar="METRIC", help="Export the registry run with the highest METRIC.")
+    p.add_argument("--symbol", default="", help="With --best: rank by this symbol's metric.")
+    p.add_argument("--tf", help="With --best: only runs on this timeframe.")
+    p.add_argument("--profile", choices=PROFILE_MODES, default="basic",
+                   help="Per-stage profiling: timings only, or with cProfile / py-spy output (see profiling.py).")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profiler = Profiler("export", args.profile)
+    try:
+        return run_export(args, profiler)
+    finally:
+        if profiler.stages:
+            profiler.finish()
+
+
+def run_export(args, profiler):
+    """0 on success, 1 on a failure; a graph that fails the parity check is not left in the output dir."""
     print("🚀 Starting ONNX Export...")
 
+    registry, run_id = None, None
+    if args.run is not None or args.best:
+        from model_registry import ModelRegistry
+        registry = ModelRegistry()
+        run = registry.run(args.run) if args.run is not None else registry.best(args.best, args.symbol.upper(), args.tf)
+        if run is None:
+            print("❌ No matching run in the registry.")
+            registry.close()
+            return 1
+        run_id = run["id"]
+        with profiler.stage("restore_run"):
+            registry.restore(run_id, TRAINED_MODEL_DIR)
+        print(f"🗂️ Restored registry run #{run_id} to {TRAINED_MODEL_DIR}/")
+
     model_path = os.path.join(TRAINED_MODEL_DIR, MODEL_NAME + ".zip")
     if not os.path.exists(model_path):
         print(f"❌ Model not found at {model_path}. Please run train.py first.")
-        return
+        if registry is not None:
+            registry.close()
+        return 1
 
-    # 1. Load PyTorch Model
+    # 1. Load PyTorch Model, normalization stats and input layout
     print("📥 Loading SB3 Model...")
-    model = PPO.load(model_path)
-
-    # Extract the Policy Network (the decision maker)
-    # We only need the 'actor' part for inference usually, but SB3 makes it easy to export the whole policy forward pass
-    policy = model.policy
-
-    # 2. Define Dummy Input
-    # We need to know the observation space shape from training.
-    # Based on train.py: 1 + 2*stock_dim + len(INDICATORS)*stock_dim
-    # For 1 stock (BTC) and standard indicators (8 usually in FinRL default):
-    # 1 (balance) + 2 (prices) + 8 (indicators) = 11 features approx.
-    # IMPORTANT: You must match the shape exactly.
-    # For now, we assume a shape based on standard FinRL config or we'd load the env to check.
-    # Let's try to infer from the policy object if possible, otherwise hardcode for demo.
+    with profiler.stage("load_model"):
+        model = PPO.load(model_path)
+        policy = model.policy
+        policy.eval()
+        obs_dim = int(np.prod(policy.observation_space.shape))
+        base = os.path.join(TRAINED_MODEL_DIR, MODEL_NAME)
+        norm = load_normalization(base + VECNORMALIZE_SUFFIX, obs_dim)
+        layout = load_layout(base + LAYOUT_SUFFIX, obs_dim)
+        inputs = graph_inputs(layout)
+    print(f"   Observation: {obs_dim} values, layout '{layout['kind']}', {len(inputs)} graph inputs")
 
-    try:
-        obs_shape = policy.observation_space.shape
-        print(f"   Inferred observation shape: {obs_shape}")
-    except:
-        print("   Could not infer shape, defaulting to (1, 19) (FinRL default for 1 ticker)")
-        obs_shape = (19,)
+    if layout["kind"] != "flat" and len(observation.feature_names(layout)) != obs_dim:
+        print(f"❌ Layout describes {len(observation.feature_names(layout))} values, the policy expects {obs_dim}.")
+        if registry is not None:
+            registry.close()
+        return 1
 
-    # Create dummy input tensor
-    dummy_input = torch.randn(1, *obs_shape)
+    # 2. Build the fused module
+    fused = FusedPolicy(PolicyHead(policy), layout, norm, policy.action_space.low, policy.action_space.high)
+    fused.eval()
+    rng = np.random.default_rng(0)
+    sample = sample_inputs(layout, 4, rng)
 
-    # 3. Export to ONNX
+    # 3. Export to ONNX, under a temporary name until the graph is verified
     print("📤 Exporting to ONNX...")
-    output_path = os.path.join(TRAINED_MODEL_DIR, ONNX_MODEL_NAME)
-
-    # SB3 policies have a 'predict' method, but for ONNX we often trace the 'forward' or internal net.
-    # SB3 provides a helper `predict` which returns (action, state).
-    # However, 'forward' returns actions, values, log_probs.
-    # For pure inference action, we often just want the deterministic action distribution or mean.
-
-    # Simplified export of the policy network
-    class OnnxablePolicy(torch.nn.Module):
-        def __init__(self, policy):
-            super().__init__()
-            self.policy = policy
-
-        def forward(self, observation):
-            # Returns the action directly
-            # Note: deterministc=True usually means taking the mode of the distribution
-            return self.policy.get_distribution(observation).mode()
-
-    onnx_policy = OnnxablePolicy(policy)
-
-    torch.onnx.export(
-        onnx_policy,
-        dummy_input,
-        output_path,
-        opset_version=11,
-        input_names=["input"],
-        output_names=["output"],
-        dynamic_axes={"input": {0: "batch_size"}, "output": {0: "batch_size"}}
-    )
-
-    print(f"✅ Export complete: {output_path}")
+    onnx_path = os.path.join(TRAINED_MODEL_DIR, ONNX_MODEL_NAME)
+    manifest_path = os.path.join(TRAINED_MODEL_DIR, MANIFEST_NAME)
+    pending_path = onnx_path + ".pending"
+    with profiler.stage("export_onnx") as stage:
+        export_fused(fused, layout, sample, pending_path)
+        stage.extra["onnx_bytes"] = os.path.getsize(pending_path)
 
     # 4. Verify ONNX Model
     print("🔍 Verifying ONNX Model...")
-    onnx_model = onnx.load(output_path)
-    onnx.checker.check_model(onnx_model)
-    print("   Model structure checked.")
+    with profiler.stage("verify", rows=len(next(iter(sample.values())))):
+        onnx_model = onnx.load(pending_path)
+        onnx.checker.check_model(onnx_model)
+        print("   Model structure checked.")
+
+        # The fused graph must agree with the unfused path: assemble in NumPy,
+        # normalize like VecNormalize, then SB3's own predict().
+        if layout["kind"] == "flat":
+            obs = sample["observation"].astype(np.float64)
+        else:
+            obs = observation.assemble(layout, {k: v.astype(np.float64) for k, v in sample.items()}, np)
+        obs = observation.normalize(obs, norm["mean"], norm["var"], norm["epsilon"], norm["clip"], np)
+        expected, _ = model.predict(obs.astype(np.float32), deterministic=True)
+        try:
+            import onnxruntime as ort
+            session = ort.InferenceSession(pending_path, providers=["CPUExecutionProvider"])
+            got = session.run(["action"], sample)[0]
+            source = "onnxruntime"
+        except ImportError:
+            with torch.no_grad():
+                got = fused(*(torch.from_numpy(sample[name]) for name, _, _ in inputs)).numpy()
+            source = "torch (onnxruntime not installed)"
+        diff = float(np.max(np.abs(got.reshape(expected.shape) - expected)))
+    print(f"   Max |fused - SB3 predict| = {diff:.2e} via {source}")
+    if diff > 1e-4:
+        print(f"❌ Fused graph disagrees with the unfused policy; {onnx_path} and the ORT bundle are unchanged.")
+        os.remove(pending_path)
+        if registry is not None:
+            registry.close()
+        return 1
+    os.replace(pending_path, onnx_path)
+    write_manifest(manifest_path, layout, norm, policy.action_space, inputs, {
+        "model": os.path.abspath(model_path),
+        "layout": layout,
+    })
+    print(f"✅ Export complete: {onnx_path} (+ {MANIFEST_NAME})")
+
+    # 5. ORT flatbuffer, operator list and reduced runtime build config
+    print("📦 Building ORT bundle...")
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    with profiler.stage("ort_bundle"):
+        report = ort_bundle.bundle(onnx_path, runtime_full=ort_bundle.find_runtime(repo_root))
+    print(ort_bundle.format_report(report))
+    output_path = onnx_path
+    if report["ort_available"]:
+        output_path = report["paths"]["ort"]
+    else:
+        print("⚠️ onnxruntime not installed: no .ort written, operator list taken from the ONNX graph.")
+    print("   Build the reduced runtime with trained_models/build_ort_web.sh, then rerun ort_bundle.py "
+          "with --runtime-reduced for the after-size.")
+
+    if registry is not None:
+        with profiler.stage("register_export"):
+            exported = {onnx_path, output_path, manifest_path}
+            registry.add_artifacts(run_id, {os.path.basename(p): p for p in exported})
+            registry.close()
+        print(f"🗂️ Export attached to registry run #{run_id}")
 
-    print(f"\n🎉 DONE! You can now move '{output_path}' to your Cachy app's static/models/ folder.")
+    print(f"\n🎉 DONE! You can now move '{output_path}' and '{manifest_path}' to your Cachy app's static/models/ folder.")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
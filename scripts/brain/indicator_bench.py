@@ -0,0 +1,317 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Cross-engine indicator throughput benchmark.
+
+Runs one indicator set (see `reference_indicators.DEFAULT_INDICATOR_SET`)
+through three engines on the same synthetic klines:
+
+* `numpy` — the vectorized references in this folder, in-process.
+* `wasm`  — `static/wasm/technicals_wasm.js`, the build the browser loads.
+* `js`    — `JSIndicators` / `StatefulTechnicalsCalculator` from `src/utils`.
+
+The two node engines run through `tests/benchmarks/cross_engine_driver.test.ts`
+under vitest, one process per engine and size. Each run reports bars/s for a
+full-series pass, latency per incremental update and peak memory, and is
+appended to a JSON-lines history. `--gate` compares against that history and
+exits non-zero when any engine got slower on the same machine.
+
+    python indicator_bench.py --sizes 1k,100k,1m --engines numpy,wasm,js --gate
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+import reference_indicators
+from model_registry import git_sha
+from synthetic import KLINE_FIELDS, parse_size, random_walk_klines
+
+BRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BRAIN_DIR, "..", ".."))
+DRIVER = "tests/benchmarks/cross_engine_driver.test.ts"
+
+DEFAULT_HISTORY = os.path.join(BRAIN_DIR, "benchmarks", "indicator_history.jsonl")
+DEFAULT_SIZES = "1k,10k,100k,1m"
+ENGINES = ("numpy", "wasm", "js")
+
+# A stateless engine has to recompute over a trailing window on every tick.
+# 200 bars is the history both the WASM and the stateful JS calculator keep.
+NUMPY_UPDATE_WINDOW = 200
+
+# Decimal arithmetic plus one string per value: past this the WASM engine is
+# measuring the allocator, and a 10M run takes the better part of an hour.
+DEFAULT_ENGINE_CAPS = {"wasm": 1_000_000}
+
+
+def machine_fingerprint():
+    """Stable identity of the box a result was measured on."""
+    cpu = platform.processor() or ""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    parts = {
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpu": cpu,
+        "cpu_count": os.cpu_count(),
+    }
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:12]
+    return digest, parts
+
+
+def write_dataset(klines, directory):
+    """Raw float64 columns plus a meta file — the driver's input format."""
+    os.makedirs(directory, exist_ok=True)
+    for field in KLINE_FIELDS:
+        np.ascontiguousarray(klines[field], dtype="<f8").tofile(os.path.join(directory, f"{field}.f64"))
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"n": int(len(klines["close"]))}, f)
+
+
+def latency_summary(samples_s):
+    samples = np.sort(np.asarray(samples_s)) * 1e6
+    if len(samples) == 0:
+        return {"count": 0, "mean_us": 0.0, "p50_us": 0.0, "p95_us": 0.0, "p99_us": 0.0}
+    return {
+        "count": int(len(samples)),
+        "mean_us": float(samples.mean()),
+        "p50_us": float(np.percentile(samples, 50)),
+        "p95_us": float(np.percentile(samples, 95)),
+        "p99_us": float(np.percentile(samples, 99)),
+    }
+
+
+def bench_numpy(klines, updates):
+    n = len(klines["close"])
+    t0 = time.perf_counter()
+    reference_indicators.compute_set(klines)
+    batch = time.perf_counter() - t0
+
+    # tracemalloc hooks every allocation and would slow the timed pass down
+    # several-fold, so memory gets its own, untimed pass.
+    tracemalloc.start()
+    reference_indicators.compute_set(klines)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    window = min(NUMPY_UPDATE_WINDOW, n)
+    samples = []
+    for u in range(updates):
+        end = n - (u % max(1, n - window + 1))
+        tail = {k: v[end - window:end] for k, v in klines.items()}
+        s = time.perf_counter()
+        reference_indicators.compute_set(tail)
+        samples.append(time.perf_counter() - s)
+
+    return {
+        "engine": "numpy",
+        "bars": n,
+        "batch_seconds": batch,
+        "bars_per_sec": n / max(batch, 1e-9),
+        "update": latency_summary(samples),
+        "memory": {"peak_bytes": int(peak)},
+        "runtime": f"numpy {np.__version__}",
+    }
+
+
+def bench_node(engine, dataset_dir, updates, node_cmd):
+    out_file = os.path.join(dataset_dir, f"result-{engine}.json")
+    env = dict(os.environ)
+    env.update({
+        "CACHY_BENCH_DATASET": dataset_dir,
+        "CACHY_BENCH_OUT": out_file,
+        "CACHY_BENCH_ENGINE": engine,
+        "CACHY_BENCH_UPDATES": str(updates),
+    })
+    cmd = node_cmd + ["vitest", "run", "--project", "unit", DRIVER]
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0 or not os.path.exists(out_file):
+        tail = (proc.stdout + proc.stderr).strip().splitlines()[-15:]
+        raise RuntimeError(f"{engine} driver failed:\n" + "\n".join(tail))
+    with open(out_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, record):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def find_regressions(history, run, threshold, window=5):
+    """
+    Compare each result of `run` with the median of the last `window` results
+    for the same engine, size and machine. Returns one message per result that
+    lost more than `threshold` of its bars/s or update latency.
+    """
+    regressions = []
+    for result in run["results"]:
+        key = (result["engine"], result["bars"])
+        past = [
+            r for rec in history if rec["machine"] == run["machine"]
+            for r in rec["results"] if (r["engine"], r["bars"]) == key
+        ][-window:]
+        if not past:
+            continue
+        base_tput = float(np.median([r["bars_per_sec"] for r in past]))
+        base_p50 = float(np.median([r["update"]["p50_us"] for r in past]))
+        if result["bars_per_sec"] < base_tput * (1.0 - threshold):
+            regressions.append(
+                f"{result['engine']} @ {result['bars']:,} bars: throughput "
+                f"{result['bars_per_sec']:,.0f} bars/s vs median {base_tput:,.0f}"
+            )
+        if base_p50 > 0 and result["update"]["p50_us"] > base_p50 * (1.0 + threshold):
+            regressions.append(
+                f"{result['engine']} @ {result['bars']:,} bars: update p50 "
+                f"{result['update']['p50_us']:.1f} us vs median {base_p50:.1f} us"
+            )
+    return regressions
+
+
+def format_table(results):
+    header = f"{'engine':<7} {'bars':>12} {'bars/s':>14} {'upd p50 us':>11} {'upd p95 us':>11} {'peak MB':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['engine']:<7} {r['bars']:>12,} {r['bars_per_sec']:>14,.0f} "
+            f"{r['update']['p50_us']:>11.1f} {r['update']['p95_us']:>11.1f} "
+            f"{r['memory']['peak_bytes'] / 1e6:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_caps(values):
+    caps = dict(DEFAULT_ENGINE_CAPS)
+    for item in values or []:
+        engine, _, size = item.partition("=")
+        caps[engine] = parse_size(size) if size else None
+    return caps
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Cross-engine indicator throughput benchmark.")
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated bar counts, e.g. 1k,100k,10m.")
+    p.add_argument("--engines", default=",".join(ENGINES), help="Subset of numpy,wasm,js.")
+    p.add_argument("--updates", type=int, default=1000, help="Incremental updates timed per run.")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--cap", action="append", metavar="ENGINE=SIZE",
+                   help="Largest size to run an engine at (default wasm=1m). 'wasm=' removes the cap.")
+    p.add_argument("--history", default=DEFAULT_HISTORY, help="JSON-lines history file.")
+    p.add_argument("--no-record", action="store_true", help="Do not append this run to the history.")
+    p.add_argument("--gate", action="store_true", help="Exit 1 if any engine regressed against the history.")
+    p.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before --gate fails.")
+    p.add_argument("--node-cmd", default="npx", help="Command that runs vitest (default: npx).")
+    return p
+
+
+def run(args):
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        raise SystemExit(f"Unknown engine(s): {', '.join(sorted(unknown))}")
+    caps = parse_caps(args.cap)
+    node_cmd = args.node_cmd.split()
+    if any(e != "numpy" for e in engines) and shutil.which(node_cmd[0]) is None:
+        print(f"⚠️ '{node_cmd[0]}' not found — skipping the wasm and js engines.")
+        engines = [e for e in engines if e == "numpy"]
+
+    fingerprint, machine = machine_fingerprint()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="cachy-bench-") as tmp:
+        for n in sizes:
+            print(f"📊 {n:,} bars")
+            klines = random_walk_klines(n, seed=args.seed)
+            dataset_dir = os.path.join(tmp, str(n))
+            if any(e != "numpy" for e in engines):
+                write_dataset(klines, dataset_dir)
+            for engine in engines:
+                cap = caps.get(engine)
+                if cap is not None and n > cap:
+                    print(f"   ⏭️ {engine}: above cap of {cap:,} bars")
+                    continue
+                try:
+                    if engine == "numpy":
+                        result = bench_numpy(klines, args.updates)
+                    else:
+                        result = bench_node(engine, dataset_dir, args.updates, node_cmd)
+                except RuntimeError as e:
+                    print(f"   ❌ {e}")
+                    continue
+                print(f"   ✅ {engine}: {result['bars_per_sec']:,.0f} bars/s")
+                results.append(result)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_sha": git_sha(),
+        "machine": fingerprint,
+        "machine_info": machine,
+        "python": sys.version.split()[0],
+        "seed": args.seed,
+        "indicators": sorted(reference_indicators.DEFAULT_INDICATOR_SET),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    print("🚀 Starting cross-engine indicator benchmark...")
+    record = run(args)
+
+    print()
+    print(format_table(record["results"]))
+
+    history = load_history(args.history)
+    regressions = find_regressions(history, record, args.threshold)
+    if not args.no_record and record["results"]:
+        append_history(args.history, record)
+        print(f"\n💾 Appended to {args.history}")
+
+    if regressions:
+        print("\n⚠️ Slower than history:")
+        for line in regressions:
+            print(f"   {line}")
+        if args.gate:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Kline repair and synthetic timeframes, vectorized.
+
+The same rules the app applies at runtime, over whole arrays:
+
+* `dedup_pages` — concatenate downloaded pages, sort by time and keep one
+  bar per timestamp (the later page wins, like `candle_store.merge_klines`).
+* `fill_gaps` — `historyFetcher.fillGaps`: a step of more than 1.1 bar
+  lengths gets floor(step / bar) − 1 flat bars at the previous close with
+  zero volume, at most MAX_GAP_FILL per gap.
+* `resample` — `syntheticKlines.aggregateIntoSyntheticBucket` replayed over
+  a series: bars go into the bucket floor(time / bucket) × bucket; each run
+  of consecutive bars in one bucket is one candle (open of the first, max
+  high, min low, close of the last, summed volume).
+
+    python kline_repair.py --symbols BTCUSDT --tf 1m --resample 3m,9m   # store → store
+    python kline_repair.py --bench 10m
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from candle_store import DEFAULT_EXCHANGE, CandleStore, timeframe_ms
+from synthetic import KLINE_FIELDS, parse_size, random_walk_klines
+
+GAP_THRESHOLD = 1.1
+MAX_GAP_FILL = 5000
+
+
+def from_rows(rows):
+    """Kline dict from exchange rows [time, open, high, low, close, volume] (ccxt's fetch_ohlcv)."""
+    arr = np.asarray(rows, dtype=np.float64).reshape(-1, len(KLINE_FIELDS))
+    k = {f: arr[:, i] for i, f in enumerate(KLINE_FIELDS)}
+    k["time"] = k["time"].astype(np.int64)
+    return k
+
+
+def dedup_pages(pages):
+    """One sorted kline dict from overlapping pages; on a repeated timestamp the later page wins."""
+    pages = [p for p in pages if len(p["time"])]
+    if not pages:
+        return {f: np.empty(0, dtype=np.int64 if f == "time" else np.float64) for f in KLINE_FIELDS}
+    merged = {f: np.concatenate([np.asarray(p[f], dtype=np.int64 if f == "time" else np.float64) for p in pages])
+              for f in KLINE_FIELDS}
+    # Reverse so np.unique's first occurrence is the latest page's bar.
+    times = merged["time"][::-1]
+    _, first = np.unique(times, return_index=True)
+    keep = len(times) - 1 - first
+    return {f: v[keep] for f, v in merged.items()}
+
+
+def find_gaps(times, interval_ms, max_fill=MAX_GAP_FILL):
+    """(index of the bar before each gap, bars `fill_gaps` inserts there)."""
+    times = np.asarray(times, dtype=np.int64)
+    diff = np.diff(times)
+    gap = np.flatnonzero(diff > interval_ms * GAP_THRESHOLD)
+    counts = np.minimum(diff[gap] // interval_ms - 1, max_fill)
+    keep = counts > 0
+    return gap[keep], counts[keep]
+
+
+def fill_gaps(k, interval_ms, max_fill=MAX_GAP_FILL):
+    """Kline dict with flat zero-volume bars inserted into gaps (unchanged if there are none)."""
+    times = np.asarray(k["time"], dtype=np.int64)
+    before, counts = find_gaps(times, interval_ms, max_fill)
+    if len(before) == 0:
+        return k
+    if (counts >= max_fill).any():
+        print(f"⚠️ Gap of more than {max_fill} bars: filled {max_fill}, the series stays discontinuous there.")
+    n, n_fill = len(times), int(counts.sum())
+    # Original bar i moves down by the number of bars filled before it.
+    shift = np.zeros(n, dtype=np.int64)
+    np.add.at(shift, before + 1, counts)
+    original = np.arange(n) + np.cumsum(shift)
+    is_fill = np.ones(n + n_fill, dtype=bool)
+    is_fill[original] = False
+
+    owner = np.repeat(before, counts)
+    step = np.arange(n_fill) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    close = np.asarray(k["close"], dtype=np.float64)
+    out = {}
+    for f in KLINE_FIELDS:
+        values = np.asarray(k[f])
+        column = np.empty(n + n_fill, dtype=values.dtype)
+        column[original] = values
+        if f == "time":
+            column[is_fill] = times[owner] + step * interval_ms
+        elif f == "volume":
+            column[is_fill] = 0
+        else:
+            column[is_fill] = close[owner]
+        out[f] = column
+    return out
+
+
+def resample(k, tf):
+    """Candles of timeframe `tf` (string like "3m" or bucket length in ms) from a base series."""
+    bucket_ms = timeframe_ms(tf) if isinstance(tf, str) else int(tf)
+    times = np.asarray(k["time"], dtype=np.int64)
+    if len(times) == 0:
+        return {f: np.asarray(k[f])[:0] for f in KLINE_FIELDS}
+    bucket = times // bucket_ms * bucket_ms
+    starts = np.concatenate([[0], np.flatnonzero(bucket[1:] != bucket[:-1]) + 1])
+    ends = np.concatenate([starts[1:], [len(times)]]) - 1
+    return {
+        "time": bucket[starts],
+        "open": np.asarray(k["open"], dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(np.asarray(k["high"], dtype=np.float64), starts),
+        "low": np.minimum.reduceat(np.asarray(k["low"], dtype=np.float64), starts),
+        "close": np.asarray(k["close"], dtype=np.float64)[ends],
+        "volume": np.add.reduceat(np.asarray(k["volume"], dtype=np.float64), starts),
+    }
+
+
+def repair(pages, interval_ms, max_fill=MAX_GAP_FILL):
+    """`dedup_pages` then `fill_gaps`: a continuous series from paginated downloads."""
+    return fill_gaps(dedup_pages(pages), interval_ms, max_fill)
+
+
+def bench(n_bars, seed=0):
+    """Bars per second of each step over a 1m series with a few gaps and overlapping pages."""
+    k = random_walk_klines(n_bars, seed=seed)
+    rng = np.random.default_rng(seed)
+    holes = rng.choice(n_bars, size=max(n_bars // 1000, 1), replace=False)
+    k = {f: np.delete(v, holes) for f, v in k.items()}
+    page = 1000
+    pages = [{f: v[i:i + page + 50] for f, v in k.items()} for i in range(0, len(k["time"]), page)]
+
+    results = {}
+    for name, fn in (("dedup_pages", lambda: dedup_pages(pages)),
+                     ("fill_gaps", lambda: fill_gaps(k, 60_000)),
+                     ("resample_15m", lambda: resample(k, "15m"))):
+        started = time.perf_counter()
+        fn()
+        results[name] = len(k["time"]) / (time.perf_counter() - started)
+    return results
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Repair gaps and build synthetic timeframes from stored klines.")
+    p.add_argument("--store", default=None)
+    p.add_argument("--exchange", default=DEFAULT_EXCHANGE)
+    p.add_argument("--symbols", help="Comma-separated, e.g. BTCUSDT,ETHUSDT")
+    p.add_argument("--tf", default="1m", help="Base timeframe in the store.")
+    p.add_argument("--resample", help="Target timeframes written to the store, e.g. 3m,9m,2h")
+    p.add_argument("--no-fill", dest="fill", action="store_false", help="Resample without filling gaps first.")
+    p.add_argument("--bench", help="Only time the steps on a synthetic series of this size (e.g. 10m).")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.bench:
+        for name, rate in bench(parse_size(args.bench)).items():
+            print(f"⚡ {name:<14} {rate / 1e6:8.1f}M bars/s")
+        return 0
+    if not args.symbols or not args.resample:
+        print("❌ --symbols and --resample are required (or --bench).")
+        return 1
+
+    store = CandleStore(args.store)
+    base_ms = timeframe_ms(args.tf)
+    for symbol in (s.strip().upper() for s in args.symbols.split(",")):
+        try:
+            k = {f: np.asarray(v) for f, v in store.load(args.exchange, symbol, args.tf).items()}
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        if args.fill:
+            before, counts = find_gaps(k["time"], base_ms)
+            k = fill_gaps(k, base_ms)
+            print(f"🩹 {symbol} {args.tf}: {len(before)} gaps, {int(counts.sum())} bars filled")
+        for tf in (t.strip() for t in args.resample.split(",")):
+            if timeframe_ms(tf) % base_ms:
+                print(f"⚠️ {tf} is not a multiple of {args.tf}; skipped.")
+                continue
+            stored = store.write(args.exchange, symbol, tf, resample(k, tf))
+            print(f"✅ {symbol} {tf}: {stored} bars")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Download Bitunix/Bitget perpetual klines and Bitunix funding history into the
+candle store.
+
+Requests and response parsing follow the app's server routes
+(`src/routes/api/klines/+server.ts`, `src/routes/api/funding-rate/+server.ts`)
+and `apiService.ts`, so the store holds the same bars the app charts: same
+volume field (quote volume first), same timestamp fallbacks, same dropped rows.
+
+    python market_data.py --symbols BTCUSDT,ETHUSDT --timeframes 15m,1h,4h --days 365
+
+Funding history always comes from Bitunix, whichever exchange the klines come
+from — the app does the same (`fundingRateService.historyKey`). The history
+endpoint only serves the latest 200 settlements; the store merges by
+timestamp, so running this regularly accumulates a longer history.
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+from candle_store import DEFAULT_EXCHANGE, CandleStore, timeframe_ms
+
+BITUNIX_BASE = "https://fapi.bitunix.com"
+BITGET_BASE = "https://api.bitget.com"
+
+# Same lists as BROKER_CAPABILITIES in src/config/brokerCapabilities.ts.
+NATIVE_TIMEFRAMES = {
+    "bitunix": ("1m", "5m", "15m", "30m", "1h", "4h", "1d", "1w", "1M"),
+    "bitget": ("1m", "5m", "15m", "30m", "1h", "4h", "1d", "1w"),
+}
+BITGET_GRANULARITY = {"1h": "1H", "4h": "4H", "1d": "1D", "1w": "1W"}
+
+# BITUNIX_MAX_ROWS_PER_REQUEST in apiService.ts; Bitget pages are sized alike.
+PAGE_ROWS = 200
+FUNDING_HISTORY_LIMIT = 200
+REQUEST_PAUSE_S = 0.15  # stays well under Bitunix's 10 req/s
+USER_AGENT = "Mozilla/5.0 (cachy-brain market_data)"
+
+
+def _first(row, *keys):
+    for k in keys:
+        v = row.get(k)
+        if v not in (None, "", 0, "0"):
+            return v
+    return 0
+
+
+def _columns(rows):
+    if not rows:
+        return {
+            "time": np.empty(0, dtype=np.int64),
+            **{f: np.empty(0) for f in ("open", "high", "low", "close", "volume")},
+        }
+    arr = np.array(rows, dtype=np.float64)
+    order = np.argsort(arr[:, 0], kind="stable")
+    arr = arr[order]
+    return {
+        "time": arr[:, 0].astype(np.int64),
+        "open": arr[:, 1], "high": arr[:, 2], "low": arr[:, 3], "close": arr[:, 4], "volume": arr[:, 5],
+    }
+
+
+def parse_bitunix_klines(rows):
+    """Kline dict from the `data` array of Bitunix' /futures/market/kline."""
+    out = []
+    for k in rows:
+        try:
+            t = int(float(_first(k, "id", "time", "ts", "timestamp")))
+            o = float(_first(k, "open", "o"))
+            c = float(_first(k, "close", "c"))
+            if t == 0 or o == 0 or c == 0:
+                continue
+            out.append((
+                t, o, float(_first(k, "high", "h")), float(_first(k, "low", "l")), c,
+                float(_first(k, "quoteVol", "q", "volume", "vol", "v", "amount")),
+            ))
+        except (TypeError, ValueError):
+            continue
+    return _columns(out)
+
+
+def parse_bitget_klines(rows):
+    """Kline dict from Bitget's /mix/v1/market/candles (tuple rows, or objects on some versions)."""
+    out = []
+    for k in rows:
+        try:
+            if isinstance(k, dict):
+                row = (
+                    _first(k, "timestamp", "time", "t", "ts"), _first(k, "open", "o"), _first(k, "high", "h"),
+                    _first(k, "low", "l"), _first(k, "close", "c"), _first(k, "volume", "vol", "v"),
+                )
+            else:
+                row = k[:6]
+            values = tuple(float(v) for v in row)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if all(np.isfinite(values[1:5])) and values[0] > 0:
+            out.append((int(values[0]),) + values[1:])
+    return _columns(out)
+
+
+def parse_bitunix_funding(rows):
+    """
+    {time, rate} from get_funding_rate_history. Unlike funding_rate/batch,
+    this endpoint already returns fractions (see fetchBitunixFundingRateHistory).
+    """
+    times, rates = [], []
+    for r in rows:
+        try:
+            t = int(float(r["fundingTime"]))
+            rate = float(r["fundingRate"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if t > 0 and np.isfinite(rate):
+            times.append(t)
+            rates.append(rate)
+    order = np.argsort(times, kind="stable")
+    return {"time": np.array(times, dtype=np.int64)[order], "rate": np.array(rates)[order]}
+
+
+def fetch_json(url, params):
+    query = urllib.parse.urlencode(params)
+    request = urllib.request.Request(f"{url}?{query}", headers={"User-Agent": USER_AGENT, "Accept": "application/json"})
+    with urllib.request.urlopen(request, timeout=15) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _bitunix_page(symbol, tf, end_ms):
+    data = fetch_json(f"{BITUNIX_BASE}/api/v1/futures/market/kline", {
+        "symbol": symbol, "interval": tf, "limit": PAGE_ROWS, "endTime": end_ms,
+    })
+    if str(data.get("code")) != "0":
+        raise RuntimeError(f"Bitunix kline error for {symbol} {tf}: {data.get('msg')}")
+    return parse_bitunix_klines(data.get("data") or [])
+
+
+def _bitget_page(symbol, tf, end_ms):
+    bitget_symbol = symbol if "_" in symbol else f"{symbol}_UMCBL"
+    data = fetch_json(f"{BITGET_BASE}/api/mix/v1/market/candles", {
+        "symbol": bitget_symbol,
+        "granularity": BITGET_GRANULARITY.get(tf, tf),
+        "startTime": end_ms - PAGE_ROWS * timeframe_ms(tf),
+        "endTime": end_ms,
+    })
+    if isinstance(data, dict):
+        raise RuntimeError(f"Bitget kline error for {symbol} {tf}: {data.get('msg') or data.get('code')}")
+    return parse_bitget_klines(data)
+
+
+def download_klines(exchange, symbol, tf, start_ms, end_ms):
+    """All bars of [start_ms, end_ms], paged backwards from `end_ms`."""
+    if tf not in NATIVE_TIMEFRAMES[exchange]:
+        raise ValueError(f"{exchange} has no native {tf} klines (native: {', '.join(NATIVE_TIMEFRAMES[exchange])})")
+    fetch_page = _bitunix_page if exchange == "bitunix" else _bitget_page
+    pages = []
+    cursor = end_ms
+    while cursor > start_ms:
+        page = fetch_page(symbol, tf, cursor)
+        if len(page["time"]) == 0:
+            break
+        pages.append(page)
+        first = int(page["time"][0])
+        if first >= cursor:
+            break
+        cursor = first - 1
+        time.sleep(REQUEST_PAUSE_S)
+    if not pages:
+        return _columns([])
+    merged = {f: np.concatenate([p[f] for p in reversed(pages)]) for f in pages[0]}
+    keep = (merged["time"] >= start_ms) & (merged["time"] <= end_ms)
+    return {f: v[keep] for f, v in merged.items()}
+
+
+def download_funding(symbol, limit=FUNDING_HISTORY_LIMIT):
+    data = fetch_json(f"{BITUNIX_BASE}/api/v1/futures/market/get_funding_rate_history", {
+        "symbol": symbol, "limit": limit,
+    })
+    if str(data.get("code")) != "0":
+        raise RuntimeError(f"Bitunix funding history error for {symbol}: {data.get('msg')}")
+    return parse_bitunix_funding(data.get("data") or [])
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Download perpetual klines and funding history into the candle store.")
+    p.add_argument("--store", default=None)
+    p.add_argument("--exchange", choices=tuple(NATIVE_TIMEFRAMES), default=DEFAULT_EXCHANGE)
+    p.add_argument("--symbols", required=True, help="Comma-separated, e.g. BTCUSDT,ETHUSDT")
+    p.add_argument("--timeframes", default="1h")
+    p.add_argument("--days", type=float, default=365)
+    p.add_argument("--no-funding", dest="funding", action="store_false")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = CandleStore(args.store)
+    end_ms = int(time.time() * 1000)
+    start_ms = end_ms - int(args.days * 86_400_000)
+
+    failures = 0
+    for symbol in (s.strip().upper() for s in args.symbols.split(",")):
+        for tf in (t.strip() for t in args.timeframes.split(",")):
+            try:
+                klines = download_klines(args.exchange, symbol, tf, start_ms, end_ms)
+                stored = store.write(args.exchange, symbol, tf, klines)
+                print(f"✅ {args.exchange} {symbol} {tf}: {len(klines['time'])} bars fetched, {stored} stored")
+            except Exception as e:
+                failures += 1
+                print(f"❌ {symbol} {tf}: {e}")
+        if args.funding:
+            try:
+                funding = download_funding(symbol)
+                stored = store.write_funding("bitunix", symbol, funding)
+                print(f"✅ bitunix {symbol} funding: {len(funding['time'])} settlements fetched, {stored} stored")
+            except Exception as e:
+                failures += 1
+                print(f"❌ {symbol} funding: {e}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
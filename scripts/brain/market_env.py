@@ -0,0 +1,160 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Perpetual-futures trading environment over a `dataset.py` dataset.
+
+One environment trades one symbol of the dataset. The action is the target
+position as a fraction of equity in [-1, 1] (short to long); each step holds
+it over the next bar and earns
+
+    position × bar return − fee × |position change| − position × funding
+
+where funding is the rate settled during that bar (longs pay a positive
+rate, shorts receive it). Observations are the dataset features of the
+current bar plus the current position.
+
+The env never holds more of the dataset than one window of its symbol:
+`reset` (and `step`, once the window is used up) copies up to `window_bars`
+bars of features, close and funding out of the memory-mapped arrays into
+small contiguous arrays, so stepping does not touch the memory maps and a
+universe larger than RAM trains from disk.
+"""
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+# Bitunix taker fee for perpetuals, as a fraction.
+DEFAULT_FEE = 0.0006
+YEAR_MS = 365 * 24 * 3_600_000
+# Bars per window copied out of the dataset (covers an EPISODE_BARS episode in one read).
+WINDOW_BARS = 4096
+
+
+class PerpetualTradingEnv(gym.Env):
+    metadata = {"render_modes": []}
+
+    def __init__(self, data, symbol, episode_bars=None, fee=DEFAULT_FEE, start=0, end=None,
+                 window_bars=WINDOW_BARS, recency_half_life=None):
+        """
+        `data` is the dict from `dataset.load`. `episode_bars` limits episode
+        length and randomizes the start within [start, end); None plays the
+        whole range once, a window at a time. With `recency_half_life` (bars)
+        episode starts are drawn with weights halving every that many bars
+        back from the latest possible start, so recent bars are replayed most.
+        """
+        super().__init__()
+        symbols = data["manifest"]["symbols"]
+        self.s = symbols.index(symbol) if isinstance(symbol, str) else int(symbol)
+        self.symbol = symbols[self.s]
+        self.features = data["features"]
+        self.close = data["close"]
+        self.funding = data["funding"]
+        self.fee = fee
+        self.start = start
+        self.end = len(data["time"]) if end is None else end
+        self.episode_bars = episode_bars
+        self.window_bars = max(int(window_bars), 2)
+        self.recency_half_life = recency_half_life
+        n_features = self.features.shape[2]
+
+        self.observation_space = spaces.Box(-np.inf, np.inf, shape=(n_features + 1,), dtype=np.float32)
+        self.action_space = spaces.Box(-1.0, 1.0, shape=(1,), dtype=np.float32)
+        self.t = self.start
+        self.stop = self.end - 1
+        self.position = 0.0
+        self._w0 = self._w1 = 0
+        self._features = self._close = self._funding = None
+
+    def _load_window(self, t):
+        """Copy bars [t - 1, t - 1 + window_bars) (clipped to the episode) of this symbol into RAM."""
+        lo = max(t - 1, 0)
+        hi = min(lo + self.window_bars, self.stop + 1)
+        self._features = np.array(self.features[lo:hi, self.s], dtype=np.float32)
+        self._close = np.array(self.close[lo:hi, self.s], dtype=np.float64)
+        self._funding = np.array(self.funding[lo:hi, self.s], dtype=np.float64)
+        self._w0, self._w1 = lo, hi
+
+    def _obs(self):
+        obs = np.empty(self.observation_space.shape, dtype=np.float32)
+        obs[:-1] = self._features[self.t - self._w0]
+        obs[-1] = self.position
+        return obs
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if self.episode_bars and self.end - self.start > self.episode_bars + 1:
+            last_start = self.end - self.episode_bars - 1
+            if self.recency_half_life:
+                self.t = last_start - self._recent_offset(last_start - self.start + 1)
+            else:
+                self.t = int(self.np_random.integers(self.start, last_start + 1))
+            self.stop = self.t + self.episode_bars
+        else:
+            self.t = self.start
+            self.stop = self.end - 1
+        self.position = 0.0
+        self._load_window(self.t)
+        return self._obs(), {}
+
+    def _recent_offset(self, n):
+        """Bars back from the latest start, from a truncated exponential over [0, n) (inverse CDF)."""
+        h = self.recency_half_life
+        u = self.np_random.random()
+        back = -h * np.log2(1.0 - u * (1.0 - 2.0 ** (-n / h)))
+        return min(int(back), n - 1)
+
+    def step(self, action):
+        target = float(np.clip(np.asarray(action, dtype=np.float64).reshape(-1)[0], -1.0, 1.0))
+        cost = self.fee * abs(target - self.position)
+        self.position = target
+        self.t += 1
+        if self.t >= self._w1:
+            self._load_window(self.t)
+        i = self.t - self._w0
+        bar_return = self._close[i] / self._close[i - 1] - 1.0
+        funding = self._funding[i]
+        reward = float(target * bar_return - cost - target * funding)
+        terminated = self.t >= self.stop
+        info = {"bar_return": float(bar_return), "funding": float(funding), "cost": cost}
+        return self._obs(), reward, terminated, False, info
+
+
+def make_env_fns(data, episode_bars=None, fee=DEFAULT_FEE, start=0, end=None, window_bars=WINDOW_BARS,
+                 recency_half_life=None):
+    """One env factory per dataset symbol, for SB3's DummyVecEnv/SubprocVecEnv."""
+    def factory(s):
+        return lambda: PerpetualTradingEnv(data, s, episode_bars, fee, start, end, window_bars, recency_half_life)
+    return [factory(s) for s in range(len(data["manifest"]["symbols"]))]
+
+
+def performance(rewards, bar_ms):
+    """
+    Backtest metrics of a sequence of per-bar rewards (fractional returns on
+    equity, as `step` pays them): total return, annualized Sharpe ratio and
+    maximum drawdown of the compounded equity curve.
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    if len(rewards) == 0:
+        return {"total_return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0}
+    equity = np.cumprod(1.0 + rewards)
+    peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+    std = rewards.std()
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "sharpe": float(rewards.mean() / std * np.sqrt(YEAR_MS / bar_ms)) if std > 0 else 0.0,
+        "max_drawdown": float(np.max(1.0 - equity / peak)),
+    }
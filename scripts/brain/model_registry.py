@@ -0,0 +1,385 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Local registry of datasets, training runs and their artifacts.
+
+`registry/index.sqlite` indexes everything; file contents live once in
+`registry/blobs/<sha256[:2]>/<sha256>`, so identical datasets and identical
+artifacts are stored a single time.
+
+* A dataset is identified by the hash of its arrays and manifest (minus the
+  build time and store path), so rebuilding the same data gives the same id.
+* A run is identified by a key over dataset hash, training config and the
+  training code. `train.py` looks the key up first and restores the stored
+  artifacts instead of retraining when nothing changed.
+* Runs carry metrics per symbol (e.g. `sharpe` for BTCUSDT) and aggregated
+  (symbol ""), indexed for queries like
+
+    python model_registry.py best --metric sharpe --symbol BTCUSDT --tf 1h
+    python model_registry.py runs --tf 1h
+    python model_registry.py restore 12 --out trained_models
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+BRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BRAIN_DIR, "..", ".."))
+DEFAULT_ROOT = os.environ.get("CACHY_REGISTRY", os.path.join(BRAIN_DIR, "registry"))
+DATASET_FILES = ("time", "close", "features", "funding", "valid")
+# Manifest fields that describe how/when a dataset was built, not what it holds.
+VOLATILE_MANIFEST_FIELDS = ("created", "store")
+HASH_CHUNK = 1 << 22
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY, size INTEGER, created REAL
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    hash TEXT PRIMARY KEY, exchange TEXT, tf TEXT, symbols TEXT, features TEXT,
+    bars INTEGER, start INTEGER, "end" INTEGER, manifest TEXT, path TEXT, created REAL
+);
+CREATE TABLE IF NOT EXISTS dataset_files (
+    dataset_hash TEXT, name TEXT, sha256 TEXT, PRIMARY KEY (dataset_hash, name)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE, dataset_hash TEXT, tf TEXT,
+    config TEXT, git_sha TEXT, created REAL
+);
+CREATE TABLE IF NOT EXISTS run_symbols (
+    run_id INTEGER, symbol TEXT, PRIMARY KEY (run_id, symbol)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id INTEGER, name TEXT, sha256 TEXT, PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER, symbol TEXT, name TEXT, value REAL, PRIMARY KEY (run_id, symbol, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_by_value ON metrics (name, symbol, value);
+CREATE INDEX IF NOT EXISTS runs_by_tf ON runs (tf);
+CREATE INDEX IF NOT EXISTS runs_by_dataset ON runs (dataset_hash);
+"""
+
+
+def _canonical(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def code_hash(paths):
+    """Hash of source files, so a changed environment or reward invalidates old runs."""
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        h.update(os.path.basename(path).encode())
+        h.update(b"\0")
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def git_sha():
+    """Short commit of the checkout, recorded with each run; None outside git."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_key(dataset_hash, config, code):
+    """Identity of a training run: same data, same config, same code → same key."""
+    return hashlib.sha256(_canonical({"dataset": dataset_hash, "config": config, "code": code}).encode()).hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # --- blobs ---------------------------------------------------------------
+
+    def file_hash(self, path):
+        """sha256 of a file, cached by (path, size, mtime) so unchanged multi-GB datasets are not re-read."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.db.execute("SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row is not None and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+            return row["sha256"]
+        digest = sha256_file(path)
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                            (path, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def put_file(self, path):
+        """Store a file's content (once) and return its sha256."""
+        digest = self.file_hash(path)
+        target = self.blob_path(digest)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # A copy, not a hard link: train.py overwrites its outputs in place.
+            tmp = target + ".tmp"
+            shutil.copyfile(path, tmp)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, target)
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)",
+                            (digest, os.path.getsize(target), time.time()))
+        return digest
+
+    # --- datasets ------------------------------------------------------------
+
+    def dataset_hash(self, path):
+        """(hash, manifest, file hashes) of a dataset directory; the hash ignores when and from which store it was built."""
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        content = {k: v for k, v in manifest.items() if k not in VOLATILE_MANIFEST_FIELDS}
+        files = {name: self.file_hash(os.path.join(path, f"{name}.npy")) for name in DATASET_FILES}
+        digest = hashlib.sha256(_canonical({"manifest": content, "files": files}).encode()).hexdigest()
+        return digest, manifest, files
+
+    def register_dataset(self, path):
+        """Hash of the dataset at `path`; its files go into the blob store the first time that hash is seen."""
+        digest, manifest, files = self.dataset_hash(path)
+        if self.db.execute("SELECT 1 FROM datasets WHERE hash = ?", (digest,)).fetchone():
+            return digest
+        for name in DATASET_FILES:
+            self.put_file(os.path.join(path, f"{name}.npy"))
+        with self.db:
+            self.db.execute(
+                "INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, manifest.get("exchange"), manifest.get("tf"), _canonical(manifest.get("symbols", [])),
+                 _canonical(manifest.get("features", [])), manifest.get("bars"), manifest.get("start"),
+                 manifest.get("end"), _canonical(manifest), os.path.abspath(path), time.time()))
+            self.db.executemany("INSERT INTO dataset_files VALUES (?, ?, ?)",
+                                [(digest, name, sha) for name, sha in files.items()])
+        return digest
+
+    def restore_dataset(self, digest, out_dir):
+        """Write a registered dataset back out as a `dataset.load`-able directory."""
+        row = self.db.execute("SELECT manifest FROM datasets WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"unknown dataset {digest}")
+        os.makedirs(out_dir, exist_ok=True)
+        for f in self.db.execute("SELECT name, sha256 FROM dataset_files WHERE dataset_hash = ?", (digest,)):
+            shutil.copyfile(self.blob_path(f["sha256"]), os.path.join(out_dir, f"{f['name']}.npy"))
+            os.chmod(os.path.join(out_dir, f"{f['name']}.npy"), 0o644)
+        with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(json.loads(row["manifest"]), f, indent=2)
+        return out_dir
+
+    def datasets(self):
+        return [dict(r) for r in self.db.execute(
+            "SELECT hash, exchange, tf, symbols, bars, start, \"end\", path FROM datasets ORDER BY created")]
+
+    # --- runs ----------------------------------------------------------------
+
+    def find_run(self, key):
+        row = self.db.execute("SELECT id FROM runs WHERE key = ?", (key,)).fetchone()
+        return self.run(row["id"]) if row else None
+
+    def record_run(self, key, dataset_hash, config, artifacts, metrics, tf=None, symbols=(), git_sha=None):
+        """
+        Store a finished run. `artifacts` maps names (file names on restore)
+        to paths; `metrics` maps symbol ("" for aggregates) to {name: value}.
+        Returns the run id.
+        """
+        digests = {name: self.put_file(path) for name, path in artifacts.items()}
+        previous = self.db.execute("SELECT id FROM runs WHERE key = ?", (key,)).fetchone()
+        with self.db:
+            if previous is not None:
+                # A forced rerun of the same inputs replaces the earlier record.
+                for table, column in (("runs", "id"), ("run_symbols", "run_id"), ("artifacts", "run_id"),
+                                      ("metrics", "run_id")):
+                    self.db.execute(f"DELETE FROM {table} WHERE {column} = ?", (previous["id"],))
+            cur = self.db.execute(
+                "INSERT INTO runs (key, dataset_hash, tf, config, git_sha, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, dataset_hash, tf, _canonical(config), git_sha, time.time()))
+            run_id = cur.lastrowid
+            self.db.executemany("INSERT INTO run_symbols VALUES (?, ?)", [(run_id, s) for s in symbols])
+            self.db.executemany("INSERT INTO artifacts VALUES (?, ?, ?)",
+                                [(run_id, name, digest) for name, digest in digests.items()])
+            self.db.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?)", [
+                (run_id, symbol, name, float(value))
+                for symbol, values in metrics.items() for name, value in values.items()])
+        return run_id
+
+    def add_artifacts(self, run_id, artifacts):
+        """Attach more files to an existing run (e.g. the ONNX export of its model)."""
+        digests = {name: self.put_file(path) for name, path in artifacts.items()}
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)",
+                                [(run_id, name, digest) for name, digest in digests.items()])
+
+    def run(self, run_id):
+        row = self.db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        out = dict(row)
+        out["config"] = json.loads(out["config"])
+        out["symbols"] = [r["symbol"] for r in self.db.execute(
+            "SELECT symbol FROM run_symbols WHERE run_id = ? ORDER BY symbol", (run_id,))]
+        out["artifacts"] = {r["name"]: r["sha256"] for r in self.db.execute(
+            "SELECT name, sha256 FROM artifacts WHERE run_id = ?", (run_id,))}
+        metrics = {}
+        for r in self.db.execute("SELECT symbol, name, value FROM metrics WHERE run_id = ?", (run_id,)):
+            metrics.setdefault(r["symbol"], {})[r["name"]] = r["value"]
+        out["metrics"] = metrics
+        return out
+
+    def runs(self, tf=None, symbol=None, dataset_hash=None):
+        query = "SELECT DISTINCT runs.id FROM runs LEFT JOIN run_symbols ON run_symbols.run_id = runs.id WHERE 1"
+        params = []
+        for column, value in (("runs.tf", tf), ("run_symbols.symbol", symbol), ("runs.dataset_hash", dataset_hash)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        return [self.run(r["id"]) for r in self.db.execute(query + " ORDER BY runs.id", params)]
+
+    def latest(self, tf=None, symbol=None):
+        """The most recently recorded run, optionally on `tf` and trading `symbol`."""
+        runs = self.runs(tf=tf, symbol=symbol)
+        return runs[-1] if runs else None
+
+    def best(self, metric, symbol="", tf=None, lowest=False):
+        """The run with the highest (or lowest) `metric` for `symbol` ("" = aggregate), optionally per timeframe."""
+        query = ("SELECT metrics.run_id FROM metrics JOIN runs ON runs.id = metrics.run_id "
+                 "WHERE metrics.name = ? AND metrics.symbol = ?")
+        params = [metric, symbol]
+        if tf is not None:
+            query += " AND runs.tf = ?"
+            params.append(tf)
+        query += f" ORDER BY metrics.value {'ASC' if lowest else 'DESC'}, metrics.run_id DESC LIMIT 1"
+        row = self.db.execute(query, params).fetchone()
+        return self.run(row["run_id"]) if row else None
+
+    def restore(self, run_id, out_dir):
+        """Copy a run's artifacts into `out_dir` under their names; returns {name: path}."""
+        run = self.run(run_id)
+        if run is None:
+            raise KeyError(f"unknown run {run_id}")
+        os.makedirs(out_dir, exist_ok=True)
+        paths = {}
+        for name, digest in run["artifacts"].items():
+            paths[name] = os.path.join(out_dir, name)
+            tmp = paths[name] + ".tmp"
+            shutil.copyfile(self.blob_path(digest), tmp)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, paths[name])
+        return paths
+
+
+def format_runs(runs, metric="sharpe"):
+    header = f"{'run':>5} {'tf':<5} {'symbols':<28} {metric:>9} {'dataset':<12} {'created':<16}"
+    lines = [header, "-" * len(header)]
+    for r in runs:
+        value = r["metrics"].get("", {}).get(metric)
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["created"]))
+        lines.append(f"{r['id']:>5} {r['tf'] or '-':<5} {','.join(r['symbols'])[:28]:<28} "
+                     f"{'-' if value is None else f'{value:.3f}':>9} {(r['dataset_hash'] or '-')[:12]:<12} {created:<16}")
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Query the local model/dataset registry.")
+    p.add_argument("--root", default=DEFAULT_ROOT)
+    sub = p.add_subparsers(dest="command", required=True)
+    runs = sub.add_parser("runs", help="List runs.")
+    runs.add_argument("--tf")
+    runs.add_argument("--symbol")
+    runs.add_argument("--metric", default="sharpe", help="Aggregate metric shown in the table.")
+    best = sub.add_parser("best", help="Best run by a metric.")
+    best.add_argument("--metric", default="sharpe")
+    best.add_argument("--symbol", default="", help="Per-symbol metric (default: the aggregate).")
+    best.add_argument("--tf")
+    best.add_argument("--lowest", action="store_true", help="For metrics where lower is better (max_drawdown).")
+    show = sub.add_parser("show", help="One run as JSON.")
+    show.add_argument("run", type=int)
+    restore = sub.add_parser("restore", help="Copy a run's artifacts into a directory.")
+    restore.add_argument("run", type=int)
+    restore.add_argument("--out", default="trained_models")
+    sub.add_parser("datasets", help="List registered datasets.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == "runs":
+            print(format_runs(registry.runs(tf=args.tf, symbol=args.symbol), args.metric))
+        elif args.command == "best":
+            started = time.perf_counter()
+            run = registry.best(args.metric, args.symbol.upper(), args.tf, args.lowest)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if run is None:
+                print(f"❌ No run has '{args.metric}'{' for ' + args.symbol if args.symbol else ''}.")
+                return 1
+            value = run["metrics"][args.symbol.upper()][args.metric]
+            print(f"🏆 Run #{run['id']}: {args.metric} = {value:.4f} ({elapsed_ms:.1f} ms)")
+            print(json.dumps(run, indent=2))
+        elif args.command == "show":
+            run = registry.run(args.run)
+            if run is None:
+                print(f"❌ Unknown run {args.run}")
+                return 1
+            print(json.dumps(run, indent=2))
+        elif args.command == "restore":
+            for name, path in registry.restore(args.run, args.out).items():
+                print(f"📥 {name} -> {path}")
+        elif args.command == "datasets":
+            for d in registry.datasets():
+                print(f"{d['hash'][:12]}  {d['exchange']} {d['tf']}  {d['bars']} bars  "
+                      f"{', '.join(json.loads(d['symbols']))}  ({d['path']})")
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    finally:
+        registry.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
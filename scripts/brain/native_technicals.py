@@ -0,0 +1,158 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+ctypes binding to the native build of `technicals-wasm`.
+
+The crate already builds as a `cdylib`; on a non-wasm target it also exports
+the C functions in `technicals-wasm/src/native_exports.rs`. Build it with
+
+    cargo build --release --manifest-path technicals-wasm/Cargo.toml
+
+and this module finds `technicals-wasm/target/release/libtechnicals_wasm.*`,
+or the path in `CACHY_TECHNICALS_LIB`.
+"""
+
+import ctypes
+import json
+import os
+import sys
+
+import numpy as np
+
+BRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+CRATE_DIR = os.path.abspath(os.path.join(BRAIN_DIR, "..", "..", "technicals-wasm"))
+
+# Same defaults the Technicals panel starts with (see wasmCalculator.ts for
+# the settings → Rust mapping this mirrors).
+DEFAULT_SETTINGS = {
+    "ema": [{"length": 20}, {"length": 50}, {"length": 200}],
+    "sma": [{"length": 20}],
+    "rsi": [{"length": 14}],
+    "macd": [{"fast": 12, "slow": 26, "signal": 9}],
+    "stoch": [{"k": 14, "d": 3, "smooth": 3}],
+    "cci": [{"length": 20}],
+    "adx": [{"length": 14}],
+    "mfi": [{"length": 14}],
+    "bb": [{"length": 20, "std_dev": "2"}],
+    "atr": [{"length": 14}],
+    "supertrend": [{"length": 10, "multiplier": "3"}],
+}
+
+
+class NativeLibraryMissing(RuntimeError):
+    pass
+
+
+def _library_name():
+    if sys.platform == "darwin":
+        return "libtechnicals_wasm.dylib"
+    if sys.platform == "win32":
+        return "technicals_wasm.dll"
+    return "libtechnicals_wasm.so"
+
+
+def find_library():
+    candidates = [os.environ.get("CACHY_TECHNICALS_LIB")]
+    for profile in ("release", "debug"):
+        candidates.append(os.path.join(CRATE_DIR, "target", profile, _library_name()))
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    raise NativeLibraryMissing(
+        "Native technicals library not found. Build it with:\n"
+        "    cargo build --release --manifest-path technicals-wasm/Cargo.toml\n"
+        "or point CACHY_TECHNICALS_LIB at the built library."
+    )
+
+
+_lib = None
+
+
+def load_library():
+    """Load (once per process) and declare the C signatures."""
+    global _lib
+    if _lib is not None:
+        return _lib
+    lib = ctypes.CDLL(find_library())
+    f64p = ctypes.POINTER(ctypes.c_double)
+    lib.technicals_replay.argtypes = [f64p] * 6 + [ctypes.c_size_t, ctypes.c_size_t, ctypes.c_char_p]
+    lib.technicals_replay.restype = ctypes.c_void_p
+    lib.alerts_replay.argtypes = [
+        ctypes.c_char_p, ctypes.c_char_p, f64p, ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t,
+    ]
+    lib.alerts_replay.restype = ctypes.c_void_p
+    lib.technicals_free_string.argtypes = [ctypes.c_void_p]
+    lib.technicals_free_string.restype = None
+    _lib = lib
+    return lib
+
+
+def _f64_pointer(values):
+    arr = np.ascontiguousarray(values, dtype=np.float64)
+    return arr, arr.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+
+
+def replay(klines, lookback, settings=None):
+    """
+    Readings of the last `lookback` bars, computed bar by bar the way a live
+    chart sees them (`update` on the forming bar, then `shift`).
+
+    Returns a list of `update` outputs — dicts with `movingAverages`,
+    `oscillators`, `volatility` and `pivots`, values as decimal strings.
+    """
+    lib = load_library()
+    n = len(klines["close"])
+    lookback = min(lookback, n - 1)
+    if lookback < 1:
+        return []
+    keep = []
+    pointers = []
+    for field in ("open", "high", "low", "close", "volume", "time"):
+        arr, ptr = _f64_pointer(klines[field])
+        keep.append(arr)
+        pointers.append(ptr)
+    settings_json = json.dumps(settings or DEFAULT_SETTINGS).encode("utf-8")
+
+    raw = lib.technicals_replay(*pointers, n, n - lookback, settings_json)
+    if not raw:
+        raise RuntimeError("technicals_replay failed (invalid input or calculator panic)")
+    try:
+        return json.loads(ctypes.string_at(raw).decode("utf-8"))
+    finally:
+        lib.technicals_free_string(raw)
+
+
+def alerts_replay(definitions, symbol, prices, timestamps):
+    """
+    Every `AlertEvent` `AlertEngine` emits when fed `prices` of `symbol` tick
+    by tick, in firing order. `definitions` is an `AlertDefinition` list.
+    """
+    lib = load_library()
+    prices, price_ptr = _f64_pointer(prices)
+    timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+    raw = lib.alerts_replay(
+        json.dumps(definitions).encode("utf-8"),
+        symbol.encode("utf-8"),
+        price_ptr,
+        timestamps.ctypes.data_as(ctypes.POINTER(ctypes.c_int64)),
+        len(prices),
+    )
+    if not raw:
+        raise RuntimeError("alerts_replay failed (invalid alert definitions?)")
+    try:
+        return json.loads(ctypes.string_at(raw).decode("utf-8"))
+    finally:
+        lib.technicals_free_string(raw)
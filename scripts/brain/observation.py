@@ -0,0 +1,127 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Observation layouts: how raw indicator values become the policy's input.
+
+Everything here is written once against an array namespace `xp` that is
+either `numpy` (dataset building, tests) or `torch` (export.py traces it into
+the ONNX graph). The browser therefore feeds plain indicator readings and
+never rebuilds or rescales a state vector itself.
+
+Two layouts exist, matching the two environments `train.py` can train on:
+
+* `perp` — `market_env.PerpetualTradingEnv`: per-bar features from one
+  symbol's indicators plus the current position.
+* `finrl` — FinRL's `StockTradingEnv`: `[balance, close × n, shares × n,
+  indicator_1 × n, ...]`, copied through unchanged.
+"""
+
+# Raw inputs of the `perp` layout, in graph input order: (name, description).
+PERP_INPUTS = (
+    ("close", "close of the current bar"),
+    ("prev_close", "close of the previous bar"),
+    ("rsi", "RSI 14, 0..100"),
+    ("macd", "MACD line 12/26"),
+    ("macd_signal", "MACD signal 9"),
+    ("bb_upper", "Bollinger upper band 20/2"),
+    ("bb_lower", "Bollinger lower band 20/2"),
+    ("atr", "ATR 14"),
+    ("volume", "bar volume"),
+    ("log_volume_ema", "EMA 50 of log1p(volume)"),
+    ("funding_rate", "last settled funding rate, fraction"),
+    ("position", "current position, -1..1"),
+)
+
+# Feature names of the `perp` observation, in order. dataset.py stores all
+# but `position`; the environment appends the position itself.
+PERP_FEATURES = (
+    "log_return", "rsi14", "macd_hist", "bb_pct_b", "atr_pct", "volume_z", "funding_bps", "position",
+)
+
+
+def perp_columns(raw, xp):
+    """The `perp` observation as a list of columns (one per PERP_FEATURES entry)."""
+    close = raw["close"]
+    lower = raw["bb_lower"]
+    width = raw["bb_upper"] - lower
+    flat = width <= 0
+    # Zero-width bands (a perfectly flat window) put the close in the middle.
+    pct_b = xp.where(flat, close * 0 + 0.5, (close - lower) / xp.where(flat, close * 0 + 1, width))
+    return [
+        xp.log(close / raw["prev_close"]),
+        raw["rsi"] / 100.0 - 0.5,
+        (raw["macd"] - raw["macd_signal"]) / close,
+        pct_b - 0.5,
+        raw["atr"] / close,
+        xp.log1p(raw["volume"]) - raw["log_volume_ema"],
+        raw["funding_rate"] * 1e4,
+        raw["position"],
+    ]
+
+
+def finrl_inputs(stock_dim, indicators):
+    """Raw inputs of the `finrl` layout: (name, width, description)."""
+    inputs = [
+        ("balance", 1, "cash balance"),
+        ("close", stock_dim, "close per stock"),
+        ("shares", stock_dim, "shares held per stock"),
+    ]
+    inputs += [(name, stock_dim, f"{name} per stock") for name in indicators]
+    return inputs
+
+
+def finrl_features(stock_dim, indicators):
+    names = ["balance"]
+    names += [f"close_{i}" for i in range(stock_dim)]
+    names += [f"shares_{i}" for i in range(stock_dim)]
+    names += [f"{name}_{i}" for name in indicators for i in range(stock_dim)]
+    return names
+
+
+def normalize(obs, mean, var, epsilon, clip, xp):
+    """VecNormalize's observation transform: clip((obs - mean) / sqrt(var + eps), ±clip)."""
+    return xp.clip((obs - mean) / xp.sqrt(var + epsilon), -clip, clip)
+
+
+def _concat(columns, xp):
+    if xp.__name__ == "numpy":
+        return xp.concatenate(columns, axis=1)
+    return xp.cat(columns, dim=1)
+
+
+def graph_inputs(layout):
+    """(name, width, description) of every raw input of a layout, in order."""
+    if layout["kind"] == "perp":
+        return [(name, 1, description) for name, description in PERP_INPUTS]
+    if layout["kind"] == "finrl":
+        return finrl_inputs(layout["stock_dim"], layout["indicators"])
+    raise ValueError(f"Unknown observation layout '{layout['kind']}'")
+
+
+def assemble(layout, inputs, xp):
+    """
+    Observation matrix (batch, obs_dim) from a dict of raw inputs, each of
+    shape (batch, width) as listed by `graph_inputs`.
+    """
+    if layout["kind"] == "perp":
+        return _concat(perp_columns(inputs, xp), xp)
+    return _concat([inputs[name] for name, _, _ in graph_inputs(layout)], xp)
+
+
+def feature_names(layout):
+    if layout["kind"] == "perp":
+        return list(PERP_FEATURES)
+    return finrl_features(layout["stock_dim"], layout["indicators"])
@@ -0,0 +1,244 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Incremental fine-tuning of the latest registered agent on newly arrived bars.
+
+A daily refresh instead of a full `train.py` run:
+
+1. Restore the latest registry run on `--tf` (or `--run`) into `--work-dir`.
+2. Download the bars and funding since the end of its dataset into the
+   candle store and `dataset.append` them: features for the new bars only.
+3. Backtest the restored agent on the newest `--validation-bars` bars. That
+   score is the baseline.
+4. Fine-tune for at most `--timesteps` steps, at a lower learning rate, on
+   the `--window-bars` bars before the validation bars, with episode starts
+   weighted toward recent bars (half-life `--half-life` bars). The
+   normalization statistics keep adapting. Every `--eval-freq` steps the
+   validation backtest runs; only snapshots that beat the baseline are kept.
+5. If one did, it replaces the model in trained_models/, is registered as a
+   child run of the parent and exported with export.py. Otherwise nothing
+   changes and the deployed model stays.
+
+    python online_update.py --tf 1h
+    python online_update.py --run 12 --no-download --timesteps 20000 --half-life 500
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+import dataset
+import train
+from candle_store import CandleStore
+from market_env import make_env_fns
+from model_registry import ModelRegistry, code_hash, git_sha, run_key
+from profiling import MODES as PROFILE_MODES, Profiler
+from train_callbacks import ThroughputCallback, ValidationCallback, restore_best
+
+WORK_DIR = os.path.join(train.TRAINED_MODEL_DIR, "update")
+TIMESTEPS = 20_000
+WINDOW_BARS = 5000
+HALF_LIFE = 1000
+VALIDATION_BARS = 500
+LEARNING_RATE = 1e-4
+EVALUATIONS = 5
+UPDATE_SOURCES = train.TRAINING_SOURCES + ("online_update.py",)
+
+
+def download_new(store, manifest, now_ms):
+    """Bars after the dataset's last one and the latest funding into the store; returns the failure count."""
+    from market_data import download_funding, download_klines
+
+    failures = 0
+    for symbol in manifest["symbols"]:
+        try:
+            klines = download_klines(manifest["exchange"], symbol, manifest["tf"], manifest["end"], now_ms)
+            store.write(manifest["exchange"], symbol, manifest["tf"], klines)
+            store.write_funding("bitunix", symbol, download_funding(symbol))
+            since = time.strftime("%Y-%m-%d %H:%M", time.gmtime(manifest["end"] / 1000))
+            print(f"📥 {symbol}: {len(klines['time'])} bars since {since}")
+        except Exception as e:
+            failures += 1
+            print(f"⚠️ {symbol}: download failed ({e}); updating with the stored bars.")
+    return failures
+
+
+def update_config(parent, args, manifest):
+    """The parent's training config plus what this update did."""
+    return {
+        **parent["config"],
+        "mode": "update",
+        "parent_run": parent["id"],
+        "update_timesteps": args.timesteps,
+        "window_bars": args.window_bars,
+        "half_life": args.half_life,
+        "learning_rate": args.learning_rate,
+        "validation_bars": args.validation_bars,
+        "data_end": manifest["end"],
+    }
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Fine-tune the latest registered agent on newly arrived bars.")
+    p.add_argument("--run", type=int, help="Registry run to start from (default: the latest on --tf).")
+    p.add_argument("--tf", help="Timeframe of the run to update.")
+    p.add_argument("--dataset", help="Dataset to extend (default: the one the run was trained on).")
+    p.add_argument("--store", default=None)
+    p.add_argument("--work-dir", default=WORK_DIR)
+    p.add_argument("--no-download", dest="download", action="store_false",
+                   help="Append only what is already in the candle store.")
+    p.add_argument("--timesteps", type=int, default=TIMESTEPS, help="Fine-tuning steps (upper bound).")
+    p.add_argument("--window-bars", type=int, default=WINDOW_BARS, help="Replay window before the validation bars.")
+    p.add_argument("--half-life", type=float, default=HALF_LIFE,
+                   help="Recency weighting of episode starts in bars (0: uniform).")
+    p.add_argument("--validation-bars", type=int, default=VALIDATION_BARS)
+    p.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    p.add_argument("--eval-freq", type=int, help=f"Steps between validations (default: --timesteps / {EVALUATIONS}).")
+    p.add_argument("--patience", type=int, default=0, help="Validations without improvement before stopping.")
+    p.add_argument("--metric", default="sharpe", help="Validation metric that must not get worse.")
+    p.add_argument("--no-export", dest="export", action="store_false")
+    p.add_argument("--profile", choices=PROFILE_MODES, default="basic")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profiler = Profiler("update", args.profile)
+    try:
+        return run_update(args, profiler)
+    finally:
+        if profiler.stages:
+            profiler.finish()
+
+
+def run_update(args, profiler):
+    registry = ModelRegistry()
+    try:
+        parent = registry.run(args.run) if args.run is not None else registry.latest(tf=args.tf)
+        if parent is None:
+            print("❌ No matching run in the registry; train one with train.py --data-source STORE first.")
+            return 1
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+        with profiler.stage("restore_run"):
+            paths = registry.restore(parent["id"], args.work_dir)
+        base = os.path.join(args.work_dir, train.MODEL_NAME)
+        with open(base + train.LAYOUT_SUFFIX, encoding="utf-8") as f:
+            layout = json.load(f)
+        if layout.get("kind") != "perp":
+            print(f"❌ Run #{parent['id']} is a '{layout.get('kind')}' model; only STORE runs can be updated.")
+            return 1
+        dataset_dir = args.dataset or layout["dataset"]
+        print(f"🗂️ Updating run #{parent['id']} ({layout['exchange']} {layout['tf']}, "
+              f"{', '.join(layout['symbols'])}) from {dataset_dir}")
+
+        # 1. New bars: download, then features for them only.
+        store = CandleStore(args.store)
+        with open(os.path.join(dataset_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        now_ms = int(time.time() * 1000)
+        if args.download:
+            with profiler.stage("download"):
+                download_new(store, manifest, now_ms)
+        with profiler.stage("append") as stage:
+            # The newest bar is still forming; it waits for the next update.
+            last_closed = now_ms // manifest["bar_ms"] * manifest["bar_ms"] - manifest["bar_ms"]
+            manifest, added = dataset.append(store, dataset_dir, end_ms=last_closed)
+            stage.rows = added
+        print(f"➕ {added} new bars, dataset now {manifest['bars']} bars up to "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(manifest['end'] / 1000))}")
+        if manifest["symbols"] != layout["symbols"]:
+            print(f"❌ The dataset's symbols {manifest['symbols']} differ from the model's {layout['symbols']}.")
+            return 1
+
+        # 2. Recency-weighted replay window before the newest (validation) bars.
+        data = dataset.load(dataset_dir)
+        split = manifest["bars"] - args.validation_bars
+        lo = max(split - args.window_bars, 0)
+        episode_bars = min(train.EPISODE_BARS, (split - lo) // 2)
+        if episode_bars < 2:
+            print(f"❌ {manifest['bars']} bars leave no training window before {args.validation_bars} validation bars.")
+            return 1
+        print(f"✂️ Fine-tuning on bars [{lo}, {split}), validating on [{split}, {manifest['bars']})")
+        with profiler.stage("env_setup"):
+            venv = DummyVecEnv(make_env_fns(data, episode_bars=episode_bars, start=lo, end=split,
+                                            recency_half_life=args.half_life or None))
+            env = VecNormalize.load(paths[train.MODEL_NAME + train.VECNORMALIZE_SUFFIX], venv)
+            env.training = True
+            agent = PPO.load(paths[train.MODEL_NAME + ".zip"], env=env, learning_rate=args.learning_rate,
+                             seed=train.SEED)
+
+        with profiler.stage("baseline") as stage:
+            baseline = train.evaluate_agent(agent, env, data, start=split)[""][args.metric]
+            stage.rows = args.validation_bars * len(manifest["symbols"])
+        print(f"📏 Baseline validation {args.metric}: {baseline:.3f}")
+
+        # 3. Bounded fine-tuning; the validation callback keeps only snapshots that beat the baseline.
+        checkpoint_dir = os.path.join(args.work_dir, "checkpoints")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        validation = ValidationCallback(
+            lambda model: train.evaluate_agent(model, model.get_vec_normalize_env(), data, start=split),
+            checkpoint_dir, args.eval_freq or max(args.timesteps // EVALUATIONS, 1), args.patience,
+            metric=args.metric)
+        validation.load_state({"best": baseline, "best_step": agent.num_timesteps,
+                               "last_eval": agent.num_timesteps})
+        print(f"🧠 Fine-tuning for up to {args.timesteps} steps...")
+        with profiler.stage("learn") as stage:
+            try:
+                agent.learn(total_timesteps=args.timesteps, callback=[validation, ThroughputCallback(stage)],
+                            reset_num_timesteps=False)
+            except KeyboardInterrupt:
+                print("⏸️ Interrupted: keeping what the validations found so far.")
+            stage.extra["validations"] = len(validation.history)
+        if not restore_best(agent, checkpoint_dir):
+            print(f"🛑 No fine-tuned snapshot beat the baseline {args.metric} {baseline:.3f}; "
+                  f"the deployed model stays run #{parent['id']}.")
+            return 0
+        print(f"⭐ Fine-tuned {args.metric} {validation.best:.3f} (baseline {baseline:.3f}) at step {validation.best_step}")
+
+        # 4. Save, register as a child run and export.
+        with profiler.stage("register_run"):
+            dataset_hash = registry.register_dataset(dataset_dir)
+            artifacts = train.save_agent(agent, env, {**layout, "dataset": os.path.abspath(dataset_dir),
+                                                      "dataset_hash": dataset_hash})
+            metrics = train.evaluate_agent(agent, env, data, start=split)
+            metrics[""]["timesteps"] = agent.num_timesteps
+            config = update_config(parent, args, manifest)
+            here = os.path.dirname(os.path.abspath(__file__))
+            key = run_key(dataset_hash, config, code_hash([os.path.join(here, name) for name in UPDATE_SOURCES]))
+            run_id = registry.record_run(key, dataset_hash, config, artifacts, metrics, tf=manifest["tf"],
+                                         symbols=manifest["symbols"], git_sha=git_sha())
+        print(f"🗂️ Registered as run #{run_id} (parent #{parent['id']}): {args.metric} {metrics[''][args.metric]:.3f}")
+    finally:
+        registry.close()
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+
+    if args.export:
+        import export
+
+        if export.main(["--run", str(run_id)]) != 0:
+            print(f"❌ Run #{run_id} is registered, but exporting it failed (see above).")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,520 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+L2 order book reconstruction and liquidity analytics over recorded depth streams.
+
+Two steps, so the slow one runs once:
+
+* `ingest` parses depth messages (JSONL) into a *tape*: flat NumPy columns of
+  messages (time, snapshot/delta, sequence ids) and of their price levels
+  (side, integer tick, quantity), saved as .npz.
+* `analyze` replays a tape into time buckets. Each side of the book is a pair
+  of sorted arrays (ticks, quantities); all deltas of a bucket are merged into
+  it at once (the last update of a level wins, quantity 0 deletes it), so the
+  replay runs at millions of level updates per second on one core. Per
+  bucket it records best bid/ask, spread, microprice, top-N imbalance,
+  notional depth within distances of the mid and a liquidity heatmap
+  (quantity per absolute price bin).
+
+Accepted input, one JSON object per line:
+
+* Frames recorded by `scripts/perf/scenario.py` (`{"t", "url", "data"}`),
+  e.g. `cpu_profiles.py capture --record`.
+* Bitunix depth pushes `{"ch": "depth_book5", "symbol", "ts", "data":
+  {"b": [[price, qty], ...], "a": [...]}}`. These are top-of-book snapshots;
+  every message replaces the book.
+* Incremental feeds: `"type"`/`"action"` "snapshot" or "update"/"delta" and
+  sequence ids (`seq`/`u`, optionally `prevSeq`/`pu`) on the message or in
+  `data`. Sequence continuity is checked; after a gap the book is flagged
+  invalid until the next snapshot.
+
+    python order_book.py ingest frames.jsonl --symbol BTCUSDT --out books/BTCUSDT.npz
+    python order_book.py analyze books/BTCUSDT.npz --bucket 1s --out books/BTCUSDT_1s.npz
+    python order_book.py bench 10m
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from synthetic import parse_size
+
+SNAPSHOT, DELTA = 0, 1
+BID, ASK = 0, 1
+NO_SEQ = -1
+DISTANCES_BPS = (10, 25, 50, 100)
+IMBALANCE_LEVELS = 5
+HEATMAP_BINS = 100
+# Inferred ticks stop here: float noise ("100.00999999999999") must not become a 1e-14 tick.
+MAX_DECIMALS = 8
+TAPE_FIELDS = ("ts", "kind", "seq", "prev", "offsets", "side", "tick", "qty")
+
+_KINDS = {"snapshot": SNAPSHOT, "partial": SNAPSHOT, "full": SNAPSHOT,
+          "update": DELTA, "delta": DELTA, "incremental": DELTA}
+_SEQ_KEYS = ("seq", "u", "updateId", "lastUpdateId")
+_PREV_KEYS = ("prevSeq", "pu", "prev_seq")
+_DURATION_MS = {"ms": 1, "s": 1000, "m": 60_000, "h": 3_600_000}
+
+
+def parse_duration(text):
+    """Milliseconds from "250ms", "1s", "5m", "1h" or a plain number of ms."""
+    text = str(text).strip()
+    for unit in ("ms", "s", "m", "h"):
+        if text.endswith(unit) and text[:-len(unit)].replace(".", "", 1).isdigit():
+            return int(float(text[:-len(unit)]) * _DURATION_MS[unit])
+    return int(text)
+
+
+def _first(obj, keys):
+    for key in keys:
+        if obj.get(key) is not None:
+            return obj[key]
+    return None
+
+
+def parse_message(obj, symbol=None):
+    """
+    (ts, kind, seq, prev, bids, asks) of one depth message, or None if it is
+    not one, not for `symbol` or has no timestamp (it cannot be placed on the
+    tape). Recorded frames are unwrapped; levels stay as the exchange sent
+    them ([price, qty] strings or numbers).
+    """
+    frame_t = None
+    if isinstance(obj.get("data"), str) and "url" in obj:
+        frame_t = obj.get("t")
+        try:
+            obj = json.loads(obj["data"])
+        except ValueError:
+            return None
+        if not isinstance(obj, dict):
+            return None
+    channel = str(obj.get("ch") or obj.get("channel") or obj.get("topic") or "")
+    data = obj.get("data")
+    if "depth" not in channel or not isinstance(data, dict):
+        return None
+    if symbol and str(obj.get("symbol") or data.get("symbol") or data.get("s") or "").upper() != symbol:
+        return None
+    bids = data.get("b", data.get("bids")) or []
+    asks = data.get("a", data.get("asks")) or []
+    kind = _first(obj, ("type", "action")) or _first(data, ("type", "action"))
+    kind = _KINDS.get(str(kind).lower(), SNAPSHOT) if kind is not None else SNAPSHOT
+    seq = _first(obj, _SEQ_KEYS)
+    seq = _first(data, _SEQ_KEYS) if seq is None else seq
+    prev = _first(obj, _PREV_KEYS)
+    prev = _first(data, _PREV_KEYS) if prev is None else prev
+    ts = _first(obj, ("ts", "T", "E"))
+    ts = _first(data, ("ts", "T", "E")) if ts is None else ts
+    ts = frame_t if ts is None else ts
+    if ts is None:
+        return None
+    return (int(float(ts)), kind, NO_SEQ if seq is None else int(seq),
+            NO_SEQ if prev is None else int(prev), bids, asks)
+
+
+def _decimals(text):
+    text = text if isinstance(text, str) else repr(float(text))
+    if "e" in text or "E" in text:
+        return len(f"{float(text):.12f}".rstrip("0").partition(".")[2])
+    return len(text.partition(".")[2].rstrip("0"))
+
+
+def build_tape(messages, tick_size=None):
+    """
+    Tape from parsed messages (`parse_message` tuples, in arrival order).
+    Messages are put in timestamp order, arrival order among equal stamps;
+    `check_sequence` then flags any that the reordering put out of sequence.
+    Prices become integer ticks of `tick_size`; by default the tick is
+    10^-d for the most decimals d seen in any price (at most MAX_DECIMALS).
+    """
+    ts, kind, seq, prev, offsets = [], [], [], [], [0]
+    side, price, qty = [], [], []
+    decimals = 0
+    for m_ts, m_kind, m_seq, m_prev, bids, asks in messages:
+        ts.append(m_ts)
+        kind.append(m_kind)
+        seq.append(m_seq)
+        prev.append(m_prev)
+        for s, levels in ((BID, bids), (ASK, asks)):
+            for level in levels:
+                p = level[0]
+                if tick_size is None:
+                    decimals = max(decimals, _decimals(p))
+                side.append(s)
+                price.append(float(p))
+                qty.append(float(level[1]))
+        offsets.append(len(side))
+    tick_size = float(tick_size) if tick_size is not None else 10.0 ** -min(decimals, MAX_DECIMALS)
+    tape = {
+        "ts": np.asarray(ts, dtype=np.int64),
+        "kind": np.asarray(kind, dtype=np.int8),
+        "seq": np.asarray(seq, dtype=np.int64),
+        "prev": np.asarray(prev, dtype=np.int64),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+        "side": np.asarray(side, dtype=np.int8),
+        "tick": np.rint(np.asarray(price, dtype=np.float64) / tick_size).astype(np.int64),
+        "qty": np.asarray(qty, dtype=np.float64),
+        "tick_size": tick_size,
+    }
+    return sort_tape(tape)
+
+
+def sort_tape(tape):
+    """The tape with its messages (and their levels) stably sorted by timestamp; unchanged if already sorted."""
+    ts, offsets = tape["ts"], tape["offsets"]
+    if len(ts) < 2 or np.all(ts[1:] >= ts[:-1]):
+        return tape
+    order = np.argsort(ts, kind="stable")
+    counts = np.diff(offsets)[order]
+    new_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    levels = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1] - offsets[:-1][order], counts)
+    out = {key: tape[key][order] for key in ("ts", "kind", "seq", "prev")}
+    out.update({key: tape[key][levels] for key in ("side", "tick", "qty")})
+    out["offsets"] = new_offsets
+    out["tick_size"] = tape["tick_size"]
+    return out
+
+
+def read_messages(path, symbol=None):
+    """Parsed depth messages of a JSONL file; other lines are skipped."""
+    symbol = symbol.upper() if symbol else None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(obj, dict):
+                parsed = parse_message(obj, symbol)
+                if parsed is not None:
+                    yield parsed
+
+
+def save_tape(tape, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, **tape)
+
+
+def load_tape(path):
+    with np.load(path) as z:
+        tape = {f: z[f] for f in TAPE_FIELDS}
+        tape["tick_size"] = float(z["tick_size"])
+    return tape
+
+
+def check_sequence(tape, gap_ms=None):
+    """
+    Sequence continuity of a tape. A delta continues the chain if its `prev`
+    equals the previous sequence id (or, without `prev`, its own id is one
+    higher); a snapshot starts a new chain. Returns a report dict with
+    `gaps` (index, ts, expected, got, and "gap" or "out_of_order"),
+    `silences` (index, ts, ms without messages above `gap_ms`) and `valid`:
+    per message, whether the book is trustworthy after it — from a snapshot
+    until the next break.
+    """
+    kind, seq, prev, ts = tape["kind"], tape["seq"], tape["prev"], tape["ts"]
+    n = len(kind)
+    gaps = []
+    has = np.flatnonzero(seq != NO_SEQ)
+    if len(has) > 1:
+        cur, last = has[1:], seq[has[:-1]]
+        is_delta = kind[cur] == DELTA
+        with_prev = prev[cur] != NO_SEQ
+        expected = np.where(with_prev, last, last + 1)
+        got = np.where(with_prev, prev[cur], seq[cur])
+        broken = is_delta & (got != expected)
+        for i, e, g in zip(cur[broken], expected[broken], got[broken]):
+            gaps.append({"index": int(i), "ts": int(ts[i]), "expected": int(e), "got": int(g),
+                         "kind": "gap" if g > e else "out_of_order"})
+
+    # Book state after each message: the latest event (snapshot → valid, break → invalid) wins.
+    event = np.full(n, -1, dtype=np.int8)
+    event[kind == SNAPSHOT] = 1
+    event[[g["index"] for g in gaps]] = 0
+    marked = np.where(event >= 0, np.arange(n), -1)
+    latest = np.maximum.accumulate(marked) if n else marked
+    valid = np.where(latest >= 0, event[np.maximum(latest, 0)] == 1, False)
+
+    silences = []
+    if gap_ms and n > 1:
+        step = np.diff(ts)
+        for i in np.flatnonzero(step > gap_ms):
+            silences.append({"index": int(i + 1), "ts": int(ts[i + 1]), "ms": int(step[i])})
+    return {"messages": n, "sequenced": int(len(has)), "snapshots": int((kind == SNAPSHOT).sum()),
+            "gaps": gaps, "silences": silences, "valid": valid}
+
+
+def _side_levels(tape, lo, hi, side):
+    """(ticks, qty) of one side's levels in tape rows [lo, hi), in arrival order."""
+    mask = tape["side"][lo:hi] == side
+    return tape["tick"][lo:hi][mask], tape["qty"][lo:hi][mask]
+
+
+def merge_levels(ticks, qty, upd_ticks, upd_qty):
+    """Sorted side after applying updates in order: the last update of a tick wins, quantity 0 removes it."""
+    if len(upd_ticks) == 0:
+        return ticks, qty
+    t = np.concatenate([ticks, upd_ticks])
+    q = np.concatenate([qty, upd_qty])
+    order = np.argsort(t, kind="stable")
+    t, q = t[order], q[order]
+    last = np.empty(len(t), dtype=bool)
+    last[:-1] = t[1:] != t[:-1]
+    last[-1] = True
+    keep = last & (q > 0)
+    return t[keep], q[keep]
+
+
+def heatmap_range(tape, bins=HEATMAP_BINS):
+    """(first tick, ticks per bin) covering the 1st–99th percentile of level prices in `bins` bins."""
+    live = tape["tick"][tape["qty"] > 0]
+    if len(live) == 0:
+        return 0, 1
+    lo, hi = np.percentile(live, [1, 99])
+    width = max(int(np.ceil((hi - lo + 1) / bins)), 1)
+    return int(lo), width
+
+
+def replay(tape, bucket_ms, distances_bps=DISTANCES_BPS, levels=IMBALANCE_LEVELS,
+           heatmap_bins=HEATMAP_BINS, heatmap=None, valid=None):
+    """
+    Book metrics at the end of each `bucket_ms` bucket from the first to the
+    last message. `heatmap` is (first tick, ticks per bin), by default
+    `heatmap_range`; `valid` is `check_sequence(...)["valid"]`. Returns a
+    dict of arrays; prices are in quote units, depth is notional (price × qty)
+    within each distance of the mid, and the heatmap holds quantity per bin.
+    """
+    ts, kind, offsets = tape["ts"], tape["kind"], tape["offsets"]
+    tick_size = tape["tick_size"]
+    n_msgs = len(ts)
+    if n_msgs == 0:
+        raise ValueError("The tape has no messages")
+    if np.any(ts[1:] < ts[:-1]):
+        # Buckets are found by binary search over the timestamps.
+        raise ValueError("The tape's timestamps are not in order; build it with build_tape or sort_tape")
+    valid = check_sequence(tape)["valid"] if valid is None else valid
+    t0 = ts[0] // bucket_ms * bucket_ms
+    n = int((ts[-1] - t0) // bucket_ms) + 1
+    bucket_end = np.searchsorted(ts, t0 + (np.arange(n) + 1) * bucket_ms, side="left")
+    first_tick, bin_ticks = heatmap if heatmap is not None else heatmap_range(tape, heatmap_bins)
+    distances = np.asarray(distances_bps, dtype=np.float64) / 1e4
+
+    out = {
+        "time": t0 + np.arange(n, dtype=np.int64) * bucket_ms,
+        "messages": np.diff(np.concatenate([[0], bucket_end])),
+        "valid": np.zeros(n, dtype=bool),
+        "best_bid": np.full(n, np.nan), "best_ask": np.full(n, np.nan),
+        "mid": np.full(n, np.nan), "spread": np.full(n, np.nan), "spread_bps": np.full(n, np.nan),
+        "microprice": np.full(n, np.nan), "imbalance": np.full(n, np.nan),
+        "bid_depth": np.zeros((n, len(distances))), "ask_depth": np.zeros((n, len(distances))),
+        "heat_bid": np.zeros((n, heatmap_bins)), "heat_ask": np.zeros((n, heatmap_bins)),
+        "bid_levels": np.zeros(n, dtype=np.int64), "ask_levels": np.zeros(n, dtype=np.int64),
+    }
+    out["heatmap_price"] = (first_tick + np.arange(heatmap_bins) * bin_ticks) * tick_size
+    out["distances_bps"] = np.asarray(distances_bps, dtype=np.float64)
+
+    empty_t, empty_q = np.empty(0, dtype=np.int64), np.empty(0)
+    bid_t, bid_q, ask_t, ask_q = empty_t, empty_q, empty_t, empty_q
+    done = 0
+    for k in range(n):
+        end = int(bucket_end[k])
+        if end == done and k:
+            for key in ("valid", "best_bid", "best_ask", "mid", "spread", "spread_bps", "microprice",
+                        "imbalance", "bid_depth", "ask_depth", "heat_bid", "heat_ask",
+                        "bid_levels", "ask_levels"):
+                out[key][k] = out[key][k - 1]
+            continue
+        if end > done:
+            snaps = np.flatnonzero(kind[done:end] == SNAPSHOT)
+            if len(snaps):
+                s = done + int(snaps[-1])
+                bid_t, bid_q = merge_levels(empty_t, empty_q, *_side_levels(tape, offsets[s], offsets[s + 1], BID))
+                ask_t, ask_q = merge_levels(empty_t, empty_q, *_side_levels(tape, offsets[s], offsets[s + 1], ASK))
+                done = s + 1
+            lo, hi = offsets[done], offsets[end]
+            if hi > lo:
+                bid_t, bid_q = merge_levels(bid_t, bid_q, *_side_levels(tape, lo, hi, BID))
+                ask_t, ask_q = merge_levels(ask_t, ask_q, *_side_levels(tape, lo, hi, ASK))
+            done = end
+        out["valid"][k] = end > 0 and bool(valid[end - 1])
+        out["bid_levels"][k], out["ask_levels"][k] = len(bid_t), len(ask_t)
+        _bucket_metrics(out, k, bid_t, bid_q, ask_t, ask_q, tick_size, distances, levels,
+                        first_tick, bin_ticks, heatmap_bins)
+    return out
+
+
+def _bucket_metrics(out, k, bid_t, bid_q, ask_t, ask_q, tick_size, distances, levels,
+                    first_tick, bin_ticks, bins):
+    for t, q, key in ((bid_t, bid_q, "heat_bid"), (ask_t, ask_q, "heat_ask")):
+        b = (t - first_tick) // bin_ticks
+        inside = (b >= 0) & (b < bins)
+        out[key][k] = np.bincount(b[inside], weights=q[inside], minlength=bins)
+    if len(bid_t) == 0 or len(ask_t) == 0:
+        return
+    bid, ask = bid_t[-1] * tick_size, ask_t[0] * tick_size
+    bid_size, ask_size = bid_q[-1], ask_q[0]
+    mid = (bid + ask) / 2
+    out["best_bid"][k], out["best_ask"][k], out["mid"][k] = bid, ask, mid
+    out["spread"][k] = ask - bid
+    out["spread_bps"][k] = (ask - bid) / mid * 1e4
+    out["microprice"][k] = (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+    top_bid, top_ask = bid_q[-levels:].sum(), ask_q[:levels].sum()
+    out["imbalance"][k] = (top_bid - top_ask) / (top_bid + top_ask)
+
+    bid_notional = np.concatenate([[0.0], np.cumsum(bid_t * tick_size * bid_q)])
+    ask_notional = np.concatenate([[0.0], np.cumsum(ask_t * tick_size * ask_q)])
+    bid_from = np.searchsorted(bid_t, mid * (1 - distances) / tick_size, side="left")
+    ask_to = np.searchsorted(ask_t, mid * (1 + distances) / tick_size, side="right")
+    out["bid_depth"][k] = bid_notional[-1] - bid_notional[bid_from]
+    out["ask_depth"][k] = ask_notional[ask_to]
+
+
+def synthetic_tape(n_updates, seed=0, snapshot_every=1000, snapshot_levels=200, levels_per_delta=10,
+                   start_price=30000.0, tick_size=0.1, interval_ms=10):
+    """
+    Deterministic snapshot-plus-delta tape with about `n_updates` level
+    updates: a random-walk mid, a full snapshot every `snapshot_every`
+    messages and deltas that set or delete levels near the mid.
+    """
+    rng = np.random.default_rng(seed)
+    n_msgs = max(n_updates // levels_per_delta, 1)
+    kind = np.full(n_msgs, DELTA, dtype=np.int8)
+    kind[::snapshot_every] = SNAPSHOT
+    counts = np.where(kind == SNAPSHOT, 2 * snapshot_levels, levels_per_delta)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    mid = np.rint(start_price / tick_size + np.cumsum(rng.normal(0, 2.0, n_msgs))).astype(np.int64)
+
+    owner = np.repeat(np.arange(n_msgs), counts)
+    pos = np.arange(offsets[-1]) - offsets[owner]
+    snap = kind[owner] == SNAPSHOT
+    side = np.where(snap, pos >= snapshot_levels, rng.random(len(owner)) < 0.5).astype(np.int8)
+    depth = np.where(snap, pos % snapshot_levels, rng.integers(0, snapshot_levels, len(owner)))
+    tick = np.where(side == BID, mid[owner] - 1 - depth, mid[owner] + 1 + depth)
+    qty = np.round(rng.gamma(2.0, 0.5, len(owner)), 3)
+    qty[~snap & (rng.random(len(owner)) < 0.2)] = 0.0
+    seq = np.arange(1, n_msgs + 1, dtype=np.int64)
+    return {
+        "ts": 1_700_000_000_000 + np.arange(n_msgs, dtype=np.int64) * interval_ms,
+        "kind": kind, "seq": seq, "prev": seq - 1, "offsets": offsets,
+        "side": side, "tick": tick.astype(np.int64), "qty": qty, "tick_size": tick_size,
+    }
+
+
+def bench(n_updates, bucket_ms=1000, seed=0):
+    """Level updates per second of `replay` and of `check_sequence` over a synthetic tape."""
+    tape = synthetic_tape(n_updates, seed=seed)
+    updates = len(tape["tick"])
+    results = {}
+    started = time.perf_counter()
+    report = check_sequence(tape)
+    results["check_sequence"] = updates / (time.perf_counter() - started)
+    for ms in (bucket_ms, bucket_ms * 60):
+        started = time.perf_counter()
+        replay(tape, ms, valid=report["valid"])
+        results[f"replay_{ms}ms"] = updates / (time.perf_counter() - started)
+    return results
+
+
+def summary(tape, report, book):
+    ok = book["valid"] & ~np.isnan(book["spread_bps"])
+    crossed = int((book["spread"][ok] <= 0).sum())
+    lines = [
+        f"📚 {report['messages']} messages ({report['snapshots']} snapshots), {len(tape['tick'])} level updates, "
+        f"tick {tape['tick_size']:g}",
+        f"🔗 Sequence: {report['sequenced']} with ids, {len(report['gaps'])} breaks, "
+        f"{len(report['silences'])} silences",
+    ]
+    for g in report["gaps"][:10]:
+        lines.append(f"   ⚠️ {g['kind']} at message {g['index']} ({g['ts']}): expected {g['expected']}, got {g['got']}")
+    for s in report["silences"][:10]:
+        lines.append(f"   ⏸️ {s['ms']} ms without messages before message {s['index']} ({s['ts']})")
+    lines.append(f"🪣 {len(book['time'])} buckets, {int(ok.sum())} valid, {crossed} crossed")
+    if ok.any():
+        lines.append(f"   spread {np.median(book['spread_bps'][ok]):.2f} bps median, "
+                     f"imbalance {np.mean(book['imbalance'][ok]):+.3f} mean")
+        for i, d in enumerate(book["distances_bps"]):
+            lines.append(f"   depth ±{d:g} bps: bid {np.median(book['bid_depth'][ok, i]):,.0f} / "
+                         f"ask {np.median(book['ask_depth'][ok, i]):,.0f} median notional")
+    return "\n".join(lines)
+
+
+def _tape_from(path, symbol, tick):
+    if path.endswith(".npz"):
+        return sort_tape(load_tape(path))
+    return build_tape(read_messages(path, symbol), tick)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Rebuild L2 order books from recorded depth streams and measure liquidity.")
+    sub = p.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Parse depth messages (JSONL) into a tape (.npz).")
+    ingest.add_argument("input")
+    ingest.add_argument("--symbol", help="Only messages of this symbol.")
+    ingest.add_argument("--tick", type=float, help="Tick size (default: from the price decimals).")
+    ingest.add_argument("--out", required=True)
+    analyze = sub.add_parser("analyze", help="Replay a tape (or JSONL) into time-bucketed book metrics.")
+    analyze.add_argument("input")
+    analyze.add_argument("--symbol")
+    analyze.add_argument("--tick", type=float)
+    analyze.add_argument("--bucket", default="1s", help="Bucket length, e.g. 250ms, 1s, 1m.")
+    analyze.add_argument("--distances", default=",".join(str(d) for d in DISTANCES_BPS),
+                         help="Depth distances from the mid in bps.")
+    analyze.add_argument("--levels", type=int, default=IMBALANCE_LEVELS, help="Levels per side for the imbalance.")
+    analyze.add_argument("--heatmap-bins", type=int, default=HEATMAP_BINS)
+    analyze.add_argument("--gap-ms", type=int, default=5000, help="Report pauses between messages above this.")
+    analyze.add_argument("--out", help="Write the metrics and heatmap matrices (.npz).")
+    bench_p = sub.add_parser("bench", help="Replay throughput on a synthetic tape.")
+    bench_p.add_argument("size", nargs="?", default="10m", help="Level updates, e.g. 1m, 10m.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "bench":
+        for name, rate in bench(parse_size(args.size)).items():
+            print(f"⚡ {name:<16} {rate / 1e6:8.1f}M updates/s")
+        return 0
+    try:
+        tape = _tape_from(args.input, args.symbol, args.tick)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    if len(tape["ts"]) == 0:
+        print(f"❌ No depth messages in {args.input}")
+        return 1
+    if args.command == "ingest":
+        save_tape(tape, args.out)
+        print(f"✅ {len(tape['ts'])} messages, {len(tape['tick'])} levels → {args.out}")
+        return 0
+
+    report = check_sequence(tape, args.gap_ms)
+    book = replay(tape, parse_duration(args.bucket), [float(d) for d in args.distances.split(",")],
+                  args.levels, args.heatmap_bins, valid=report["valid"])
+    print(summary(tape, report, book))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        np.savez_compressed(args.out, **book)
+        print(f"💾 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+ORT-format bundle for onnxruntime-web.
+
+The full onnxruntime-web WASM runtime ships every operator kernel. A model
+that uses a dozen operators only needs those, so this step writes
+
+* `<model>.ort`                      the model as ORT flatbuffer (no protobuf
+                                     parser needed at load time),
+* `<model>.required_operators.config` the operators it uses, in the format
+                                     onnxruntime's `--include_ops_by_config`
+                                     reads,
+* `build_ort_web.sh`                 the minimal WASM build of onnxruntime
+                                     restricted to those operators,
+* `<model>.size_report.json`         model + runtime bytes (raw/gzip/brotli)
+                                     before and after.
+
+`export.py` runs it after every export. Standalone:
+
+    python ort_bundle.py trained_models/cachy_brain.onnx \\
+        --runtime-full node_modules/onnxruntime-web/dist/ort-wasm-simd.wasm \\
+        --runtime-reduced ~/onnxruntime/build/MinSizeRel/ort-wasm-simd.wasm
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import onnx
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+DEFAULT_DOMAIN = "ai.onnx"
+RUNTIME_GLOB = os.path.join("node_modules", "onnxruntime-web", "dist", "ort-wasm-simd*.wasm")
+
+BUILD_SCRIPT = """#!/usr/bin/env bash
+# Minimal onnxruntime-web build that only contains the operators of
+# {models}. Generated by scripts/brain/ort_bundle.py; run it from an
+# onnxruntime checkout (https://github.com/microsoft/onnxruntime).
+set -euo pipefail
+
+CONFIG="$(cd "$(dirname "${{BASH_SOURCE[0]}}")" && pwd)/{config}"
+
+./build.sh \\
+  --config MinSizeRel \\
+  --build_wasm \\
+  --enable_wasm_simd \\
+  --skip_tests \\
+  --disable_wasm_exception_catching \\
+  --disable_rtti \\
+  --minimal_build \\
+  --include_ops_by_config "$CONFIG" \\
+  --parallel
+
+# The runtime lands in build/Linux/MinSizeRel/ort-wasm-simd.wasm; pass it to
+# ort_bundle.py --runtime-reduced for the size report.
+"""
+
+
+def used_operators(model):
+    """{(domain, opset): sorted op types} of a model, subgraphs (If/Loop/Scan) included."""
+    opsets = {(imp.domain or DEFAULT_DOMAIN): imp.version for imp in model.opset_import}
+    found = {}
+
+    def visit(graph):
+        for node in graph.node:
+            domain = node.domain or DEFAULT_DOMAIN
+            found.setdefault(domain, set()).add(node.op_type)
+            for attr in node.attribute:
+                if attr.type == onnx.AttributeProto.GRAPH:
+                    visit(attr.g)
+                elif attr.type == onnx.AttributeProto.GRAPHS:
+                    for g in attr.graphs:
+                        visit(g)
+
+    visit(model.graph)
+    return {(domain, opsets.get(domain, 1)): sorted(ops) for domain, ops in sorted(found.items())}
+
+
+def format_operator_config(operators, model_names):
+    """The `required_operators.config` format: `domain;opset;op1,op2,...` per line."""
+    lines = ["# Generated from model/s:"] + [f"# - {name}" for name in model_names]
+    for (domain, opset), ops in sorted(operators.items()):
+        lines.append(f"{domain};{opset};{','.join(ops)}")
+    return "\n".join(lines) + "\n"
+
+
+def convert_to_ort(onnx_path, out_dir):
+    """
+    Convert with onnxruntime's own tool (fixed optimizations, so the operator
+    list matches what the runtime will actually execute). Returns the `.ort`
+    path and the tool's operator config, or (None, None) without onnxruntime.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        staged = os.path.join(tmp, os.path.basename(onnx_path))
+        shutil.copy(onnx_path, staged)
+        result = subprocess.run(
+            [sys.executable, "-m", "onnxruntime.tools.convert_onnx_models_to_ort", staged,
+             "--output_dir", tmp, "--optimization_style", "Fixed"],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return None, None
+        ort_files = glob.glob(os.path.join(tmp, "*.ort"))
+        configs = glob.glob(os.path.join(tmp, "*.config"))
+        if not ort_files:
+            return None, None
+        stem = os.path.splitext(os.path.basename(onnx_path))[0]
+        ort_path = os.path.join(out_dir, stem + ".ort")
+        shutil.copy(ort_files[0], ort_path)
+        config = None
+        if configs:
+            with open(configs[0], encoding="utf-8") as f:
+                config = f.read()
+        return ort_path, config
+
+
+def sizes(path):
+    """{raw, gzip, brotli} bytes of a file; None for a missing path."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    out = {"raw": len(data), "gzip": len(gzip.compress(data, compresslevel=9))}
+    out["brotli"] = len(brotli.compress(data, quality=11)) if HAS_BROTLI else None
+    return out
+
+
+def _add(a, b):
+    if a is None or b is None:
+        return None
+    return {k: (None if a[k] is None or b[k] is None else a[k] + b[k]) for k in a}
+
+
+def size_report(onnx_path, ort_path, runtime_full, runtime_reduced):
+    before = {"model": sizes(onnx_path), "runtime": sizes(runtime_full)}
+    after = {"model": sizes(ort_path), "runtime": sizes(runtime_reduced)}
+    before["total"] = _add(before["model"], before["runtime"])
+    after["total"] = _add(after["model"], after["runtime"])
+    return {
+        "before": before,
+        "after": after,
+        "paths": {"onnx": onnx_path, "ort": ort_path, "runtime_full": runtime_full, "runtime_reduced": runtime_reduced},
+    }
+
+
+def format_report(report):
+    def cell(entry, key):
+        if entry is None or entry.get(key) is None:
+            return f"{'-':>10}"
+        return f"{entry[key] / 1024:>9.1f}K"
+
+    header = f"{'':<16} {'raw':>10} {'gzip':>10} {'brotli':>10}"
+    lines = [header, "-" * len(header)]
+    for stage in ("before", "after"):
+        for part in ("model", "runtime", "total"):
+            entry = report[stage][part]
+            lines.append(f"{stage + ' ' + part:<16} {cell(entry, 'raw')} {cell(entry, 'gzip')} {cell(entry, 'brotli')}")
+    return "\n".join(lines)
+
+
+def find_runtime(repo_root):
+    matches = sorted(glob.glob(os.path.join(repo_root, RUNTIME_GLOB)))
+    return matches[0] if matches else None
+
+
+def bundle(onnx_path, out_dir=None, runtime_full=None, runtime_reduced=None):
+    """Write the ORT bundle for `onnx_path`; returns the size report (with `ort_available`)."""
+    out_dir = out_dir or os.path.dirname(os.path.abspath(onnx_path))
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(onnx_path))[0]
+
+    ort_path, tool_config = convert_to_ort(onnx_path, out_dir)
+    # Without onnxruntime's tool the config comes from the graph itself; the
+    # runtime may then keep a few operators that optimizations would fuse away.
+    config = tool_config or format_operator_config(
+        used_operators(onnx.load(onnx_path)), [os.path.basename(onnx_path)])
+    config_name = f"{stem}.required_operators.config"
+    with open(os.path.join(out_dir, config_name), "w", encoding="utf-8") as f:
+        f.write(config)
+    script_path = os.path.join(out_dir, "build_ort_web.sh")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(BUILD_SCRIPT.format(models=os.path.basename(onnx_path), config=config_name))
+    os.chmod(script_path, 0o755)
+
+    report = size_report(onnx_path, ort_path, runtime_full, runtime_reduced)
+    report["operators"] = [line for line in config.splitlines() if line and not line.startswith("#")]
+    report["ort_available"] = ort_path is not None
+    with open(os.path.join(out_dir, f"{stem}.size_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Build the ORT-format, operator-reduced bundle of an ONNX model.")
+    p.add_argument("model", help="Path to the exported .onnx model.")
+    p.add_argument("--out", help="Output directory (default: next to the model).")
+    p.add_argument("--runtime-full", help="Stock onnxruntime-web .wasm (default: from node_modules if installed).")
+    p.add_argument("--runtime-reduced", help="The .wasm produced by build_ort_web.sh.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    runtime_full = args.runtime_full or find_runtime(repo_root)
+    report = bundle(args.model, args.out, runtime_full, args.runtime_reduced)
+    print(format_report(report))
+    if not report["ort_available"]:
+        print("⚠️ onnxruntime not installed: no .ort written, operator list taken from the ONNX graph.")
+    print(f"   Operators: {'; '.join(report['operators'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
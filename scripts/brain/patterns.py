@@ -0,0 +1,480 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Pattern labels over whole histories, vectorized.
+
+The app detects patterns for the visible chart only, one bar at a time. This
+labels every bar of a stored series at once with the same rules and writes the
+hits as a sparse event table into the candle store (see `candle_store.py`),
+for training features and hit-rate statistics.
+
+* Candlestick patterns — `PatternDetector.detect` (`src/services/patternDetection.ts`)
+  with the templates of `src/services/candlestickPatterns.ts`, read from that
+  file. Per pattern length the windows of all bars are normalized together;
+  the trend gate, the formula patterns (hammer, engulfing, stars, ...) and the
+  template distance are boolean arrays over all bars. The template distance
+  is summed in the TS order, so matches are bit-identical.
+* Divergences — `DivergenceScanner` (`divergence.py`) on RSI 14, Stoch 14/3
+  and the MACD 12/26/9 line, the app's defaults. The app only reports the
+  last 15 bars; here every pivot pair of the history is kept. StochRSI, CCI
+  and AO have no reference implementation in `reference_indicators.py` yet
+  and are not labeled.
+
+`chartPatterns.ts` only draws the educational chart-pattern figures; the app
+has no detector for them, so there is nothing to label.
+
+An event's `time` is the bar on whose close the app would first show it:
+the last candle of a candlestick pattern, the second bar after the later
+pivot of a divergence (pivots need `PIVOT_RANGE` bars on either side).
+
+    python patterns.py label --symbols BTCUSDT,ETHUSDT --tf 1h
+    python patterns.py stats --symbols BTCUSDT,ETHUSDT --tf 1h --horizons 1,5,20
+    python patterns.py bench 1m
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import divergence
+import reference_indicators as ri
+from candle_store import DEFAULT_EXCHANGE, CandleStore
+from synthetic import parse_size, random_walk_klines
+
+BRAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_TS = os.path.join(BRAIN_DIR, "..", "..", "src", "services", "candlestickPatterns.ts")
+
+TREND_LOOKBACK = 5
+TOLERANCE_PER_CANDLE = 0.05
+# End bars per block of candlestick labeling; bounds the normalized window columns in memory.
+CHUNK_BARS = 1 << 18
+HORIZONS = (1, 5, 20)
+MIN_EVENTS = 20
+
+# name -> indicator over a kline dict, with the app's default settings (technicalsCalculator.ts).
+DIVERGENCE_INDICATORS = {
+    "RSI": lambda k: ri.rsi(k["close"], 14),
+    "Stoch": lambda k: ri.sma(ri.stoch(k["high"], k["low"], k["close"], 14), 3),
+    "MACD": lambda k: ri.macd(k["close"], 12, 26, 9)[0],
+}
+DIVERGENCE_KINDS = (("Regular", "Bullish"), ("Hidden", "Bullish"), ("Regular", "Bearish"), ("Hidden", "Bearish"))
+
+_FORMULAS = {"hammer", "inverted_hammer", "hanging_man", "shooting_star", "bullish_engulfing",
+             "bearish_engulfing", "morning_star", "evening_star"}
+
+
+def load_templates(path=TEMPLATES_TS):
+    """`CANDLESTICK_PATTERNS` of the app (the array literal is plain JSON)."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    start = source.index("= [", source.index("CANDLESTICK_PATTERNS")) + 2
+    end = source.index("\n];", start) + 2
+    return json.loads(source[start:end])
+
+
+def _direction(text):
+    return 1 if "Bullish" in text else -1 if "Bearish" in text else 0
+
+
+def pattern_names(templates):
+    """Event codes: index i of the list is code i in the `pattern` column."""
+    names = [{"id": t["id"], "name": t["name"], "source": "candlestick", "type": t["type"],
+              "direction": _direction(t["type"]), "bars": len(t["candles"])} for t in templates]
+    for indicator in DIVERGENCE_INDICATORS:
+        for kind, side in DIVERGENCE_KINDS:
+            names.append({"id": f"{indicator.lower()}_{kind.lower()}_{side.lower()}",
+                          "name": f"{indicator} {kind} {side} divergence", "source": "divergence",
+                          "type": f"{side} {kind} Divergence", "direction": _direction(side)})
+    return names
+
+
+def _normalized_template(candles):
+    """`normalizeSequenceToBuffer`: [o, h, l, c] per candle scaled by the pattern's low/high."""
+    low = min(c["low"] for c in candles)
+    high = max(c["high"] for c in candles)
+    span = high - low
+    inv = 0.0 if span == 0 else 1.0 / span
+    out = []
+    for c in candles:
+        out += [0.5] * 4 if inv == 0 else [(c[f] - low) * inv for f in ("open", "high", "low", "close")]
+    return np.array(out)
+
+
+def _hammer(o, h, l, c):
+    body = np.abs(o - c)
+    upper = h - np.maximum(o, c)
+    lower = np.minimum(o, c) - l
+    span = h - l
+    return (span != 0) & (lower >= body * 2) & (upper <= span * 0.1)
+
+
+def _inverted_hammer(o, h, l, c):
+    body = np.abs(o - c)
+    upper = h - np.maximum(o, c)
+    lower = np.minimum(o, c) - l
+    span = h - l
+    return (span != 0) & (upper >= body * 2) & (lower <= span * 0.1)
+
+
+def _engulfing(o, c, bullish):
+    po, pc, co, cc = o[0], c[0], o[1], c[1]
+    if bullish:
+        return (pc < po) & (cc > co) & (co <= pc) & (cc >= po)
+    return (pc > po) & (cc < co) & (co >= pc) & (cc <= po)
+
+
+def _star(o, h, l, c, morning):
+    body1 = np.abs(o[0] - c[0])
+    body2 = np.abs(o[1] - c[1])
+    mid1 = (o[0] + c[0]) / 2
+    shape = (body1 >= (h[0] - l[0]) * 0.5) & (body2 < body1 * 0.5)
+    if morning:
+        return shape & (c[0] < o[0]) & (c[2] > o[2]) & (c[2] > mid1)
+    return shape & (c[0] > o[0]) & (c[2] < o[2]) & (c[2] < mid1)
+
+
+def _formula(pattern_id, o, h, l, c):
+    """The `checkSpecificLogic` cases; o/h/l/c are lists of per-candle columns."""
+    if pattern_id in ("hammer", "hanging_man"):
+        return _hammer(o[0], h[0], l[0], c[0])
+    if pattern_id in ("inverted_hammer", "shooting_star"):
+        return _inverted_hammer(o[0], h[0], l[0], c[0])
+    if pattern_id in ("bullish_engulfing", "bearish_engulfing"):
+        return _engulfing(o, c, pattern_id == "bullish_engulfing")
+    return _star(o, h, l, c, pattern_id == "morning_star")
+
+
+def _detect_block(o, h, l, c, templates, codes):
+    """(end index, start index, code) of every candlestick pattern in one block of bars."""
+    n = len(c)
+    by_length = {}
+    for template, code in zip(templates, codes):
+        by_length.setdefault(len(template["candles"]), []).append((template, code))
+    ends, starts, found = [], [], []
+    for length, group in by_length.items():
+        m = n - length + 1
+        if m <= 0:
+            continue
+        low, high = l[:m].copy(), h[:m].copy()
+        for i in range(1, length):
+            np.minimum(low, l[i:i + m], out=low)
+            np.maximum(high, h[i:i + m], out=high)
+        span = high - low
+        flat = span == 0
+        inv = np.divide(1.0, span, out=np.zeros(m), where=~flat)
+        cols = {f: [x[i:i + m] for i in range(length)] for f, x in (("o", o), ("h", h), ("l", l), ("c", c))}
+        norm = []
+        for i in range(length):
+            for f in ("o", "h", "l", "c"):
+                v = (cols[f][i] - low) * inv
+                v[flat] = 0.5
+                norm.append(v)
+
+        # Window w covers bars w .. w+length-1; its trend compares the closes 1 and 5 bars before it.
+        w = np.arange(m)
+        has_trend = w >= TREND_LOOKBACK
+        before = np.where(has_trend, w - 1, 0)
+        trend_start = np.where(has_trend, w - TREND_LOOKBACK, 0)
+        up = has_trend & (c[before] > c[trend_start])
+        down = has_trend & (c[before] < c[trend_start])
+
+        tolerance = TOLERANCE_PER_CANDLE * length
+        for template, code in group:
+            trend = template["candles"][0].get("trend")
+            if trend == "downtrend":
+                match = ~has_trend | down
+            elif trend in ("uptrend", "uptrend_peak"):
+                match = ~has_trend | up
+            else:
+                match = np.ones(m, dtype=bool)
+            if template["id"] in _FORMULAS:
+                hit = np.flatnonzero(match & _formula(template["id"], cols["o"], cols["h"], cols["l"], cols["c"]))
+            else:
+                # Same summation order as geometricMatchFast. Its early exit becomes dropping
+                # the windows that are out of tolerance after each candle, so most of them
+                # are only summed over the first one or two.
+                template_values = _normalized_template(template["candles"])
+                total = np.zeros(m)
+                for t, v in zip(template_values[:4], norm[:4]):
+                    diff = t - v
+                    total += diff * diff
+                hit = np.flatnonzero(match & (total < tolerance))
+                total = total[hit]
+                for j in range(4, len(template_values)):
+                    diff = template_values[j] - norm[j][hit]
+                    total += diff * diff
+                    if j % 4 == 3:
+                        keep = total < tolerance
+                        hit, total = hit[keep], total[keep]
+            ends.append(hit + length - 1)
+            starts.append(hit)
+            found.append(np.full(len(hit), code, dtype=np.int16))
+    if not ends:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.int16)
+    return np.concatenate(ends), np.concatenate(starts), np.concatenate(found)
+
+
+def candlestick_events(k, templates, codes=None, chunk=CHUNK_BARS):
+    """(end index, start index, code) of every candlestick pattern in a kline dict."""
+    codes = list(range(len(templates))) if codes is None else codes
+    o, h, l, c = (np.asarray(k[f], dtype=np.float64) for f in ("open", "high", "low", "close"))
+    n = len(c)
+    # Enough earlier bars that windows ending in a block see the same trend bars as over the full series.
+    warmup = max((len(t["candles"]) for t in templates), default=1) + TREND_LOOKBACK - 1
+    ends, starts, found = [], [], []
+    for block in range(0, n, chunk):
+        base = max(0, block - warmup)
+        e, s, p = _detect_block(o[base:block + chunk], h[base:block + chunk], l[base:block + chunk],
+                                c[base:block + chunk], templates, codes)
+        keep = e + base >= block
+        ends.append(e[keep] + base)
+        starts.append(s[keep] + base)
+        found.append(p[keep])
+    if not ends:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.int16)
+    return np.concatenate(ends), np.concatenate(starts), np.concatenate(found)
+
+
+def _window_extremes(price, fn):
+    """`_window_extreme` around every bar: min/max over ±PRICE_SEARCH_WINDOW, clipped to the series."""
+    r = divergence.PRICE_SEARCH_WINDOW
+    fill = np.inf if fn is np.min else -np.inf
+    padded = np.concatenate([np.full(r, fill), price, np.full(r, fill)])
+    return fn(sliding_window_view(padded, 2 * r + 1), axis=1)
+
+
+def _pair_all(pivots, values, extremes, regular, hidden):
+    """
+    `divergence._pair_pivots` for every later pivot at once. The TS loop walks
+    back from each pivot and overwrites its best match, so the widest earlier
+    pivot within [MIN_LOOKBACK, MAX_LOOKBACK] that satisfies the rule wins.
+    Returns {"Regular": (p1, p2), "Hidden": (p1, p2)}.
+    """
+    count = len(pivots)
+    best = {"Regular": np.full(count, -1), "Hidden": np.full(count, -1)}
+    ind = values[pivots]
+    price = extremes[pivots]
+    for offset in range(1, min(count, divergence.MAX_LOOKBACK + 1)):
+        i = np.arange(offset, count)
+        gap = pivots[i] - pivots[i - offset]
+        near = (gap >= divergence.MIN_LOOKBACK) & (gap <= divergence.MAX_LOOKBACK)
+        if not (gap <= divergence.MAX_LOOKBACK).any():
+            break
+        p1, p2, i1, i2 = price[i - offset], price[i], ind[i - offset], ind[i]
+        for kind, rule in (("Regular", regular), ("Hidden", hidden)):
+            ok = near & rule(p1, p2, i1, i2)
+            best[kind][i[ok]] = pivots[i[ok] - offset]
+    out = {}
+    for kind, start in best.items():
+        found = start >= 0
+        out[kind] = (start[found], pivots[found])
+    return out
+
+
+def divergence_events(highs, lows, indicator):
+    """{(kind, side): (start index, end index)} of every divergence `divergence.scan` can report."""
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    indicator = np.asarray(indicator, dtype=np.float64)
+    high_idx, low_idx = divergence.find_pivots(indicator)
+    with np.errstate(invalid="ignore"):
+        bullish = _pair_all(low_idx, indicator, _window_extremes(lows, np.min),
+                            lambda p1, p2, i1, i2: (p2 < p1) & (i2 > i1),
+                            lambda p1, p2, i1, i2: (p2 > p1) & (i2 < i1))
+        bearish = _pair_all(high_idx, indicator, _window_extremes(highs, np.max),
+                            lambda p1, p2, i1, i2: (p2 > p1) & (i2 < i1),
+                            lambda p1, p2, i1, i2: (p2 < p1) & (i2 > i1))
+    return {**{(kind, "Bullish"): v for kind, v in bullish.items()},
+            **{(kind, "Bearish"): v for kind, v in bearish.items()}}
+
+
+def label(k, templates=None):
+    """
+    (events, names) for a kline dict: events {time, start, pattern} sorted by
+    time then code, names as `pattern_names`.
+    """
+    templates = load_templates() if templates is None else templates
+    names = pattern_names(templates)
+    code = {n["id"]: i for i, n in enumerate(names)}
+    times = np.asarray(k["time"], dtype=np.int64)
+
+    ends, starts, found = candlestick_events(k, templates)
+    ends, starts, found = [ends], [starts], [found]
+    for indicator, fn in DIVERGENCE_INDICATORS.items():
+        values = fn(k)
+        for (kind, side), (p1, p2) in divergence_events(k["high"], k["low"], values).items():
+            ends.append(p2 + divergence.PIVOT_RANGE)
+            starts.append(p1)
+            found.append(np.full(len(p1), code[f"{indicator.lower()}_{kind.lower()}_{side.lower()}"], dtype=np.int16))
+    ends, starts, found = np.concatenate(ends), np.concatenate(starts), np.concatenate(found)
+    order = np.lexsort((found, ends))
+    events = {"time": times[ends[order]], "start": times[starts[order]], "pattern": found[order]}
+    return events, names
+
+
+def to_dense(times, events, n_codes):
+    """(bars × n_codes) int8 matrix on a kline time axis: 1 where the pattern is known at that bar's close."""
+    times = np.asarray(times, dtype=np.int64)
+    out = np.zeros((len(times), n_codes), dtype=np.int8)
+    rows = np.searchsorted(times, events["time"])
+    inside = rows < len(times)
+    inside[inside] = times[rows[inside]] == np.asarray(events["time"])[inside]
+    out[rows[inside], np.asarray(events["pattern"])[inside]] = 1
+    return out
+
+
+def forward_returns(k, events, horizons=HORIZONS):
+    """(events × horizons) close-to-close returns after each event's bar; NaN past the end of the series."""
+    times = np.asarray(k["time"], dtype=np.int64)
+    close = np.asarray(k["close"], dtype=np.float64)
+    rows = np.searchsorted(times, events["time"])
+    out = np.full((len(rows), len(horizons)), np.nan)
+    for j, h in enumerate(horizons):
+        ok = rows + h < len(times)
+        out[ok, j] = close[rows[ok] + h] / close[rows[ok]] - 1.0
+    return out
+
+
+def hit_rates(codes, returns, names, horizons=HORIZONS, min_events=1):
+    """
+    Per pattern with at least `min_events` events: count, mean forward return
+    and hit rate (share of returns in the pattern's direction; None for
+    neutral patterns) per horizon.
+    """
+    codes = np.asarray(codes)
+    rows = []
+    for code, meta in enumerate(names):
+        r = returns[codes == code]
+        if len(r) < max(min_events, 1):
+            continue
+        row = {"pattern": meta["id"], "direction": meta["direction"], "events": len(r)}
+        for j, h in enumerate(horizons):
+            valid = r[:, j][~np.isnan(r[:, j])]
+            row[f"ret_{h}"] = float(valid.mean()) if len(valid) else None
+            row[f"hit_{h}"] = (float((np.sign(valid) == meta["direction"]).mean())
+                               if len(valid) and meta["direction"] else None)
+        rows.append(row)
+    return rows
+
+
+def format_hit_rates(rows, horizons, baseline):
+    header = f"{'pattern':<34} {'dir':>3} {'events':>7}" + "".join(f" {'hit' + str(h):>7} {'ret' + str(h):>8}"
+                                                                 for h in horizons)
+    lines = [header, f"{'(all bars: share up)':<34} {'':>3} {'':>7}"
+             + "".join(f" {baseline[h]:7.1%} {'':>8}" for h in horizons)]
+    for row in sorted(rows, key=lambda r: -r["events"]):
+        cells = ""
+        for h in horizons:
+            hit, ret = row[f"hit_{h}"], row[f"ret_{h}"]
+            cells += f" {'-' if hit is None else f'{hit:.1%}':>7} {'-' if ret is None else f'{ret:+.3%}':>8}"
+        lines.append(f"{row['pattern']:<34} {row['direction']:>+3d} {row['events']:>7}{cells}")
+    return "\n".join(lines)
+
+
+def bench(n_bars, seed=0):
+    """Bars per second of candlestick and divergence labeling over a synthetic series."""
+    k = random_walk_klines(n_bars, seed=seed)
+    templates = load_templates()
+    started = time.perf_counter()
+    candlestick_events(k, templates)
+    candles_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for fn in DIVERGENCE_INDICATORS.values():
+        divergence_events(k["high"], k["low"], fn(k))
+    divergence_s = time.perf_counter() - started
+    return {"candlesticks": n_bars / candles_s, "divergences": n_bars / divergence_s}
+
+
+def _symbols(args, store):
+    if args.symbols:
+        return [s.strip().upper() for s in args.symbols.split(",")]
+    return [symbol for _, symbol, tf in store.series(args.exchange) if tf == args.tf]
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Label candlestick patterns and divergences over stored klines.")
+    sub = p.add_subparsers(dest="command", required=True)
+    for name, text in (("label", "Detect patterns and write event tables into the candle store."),
+                       ("stats", "Hit rates of the stored (or freshly detected) pattern events.")):
+        s = sub.add_parser(name, help=text)
+        s.add_argument("--store", default=None)
+        s.add_argument("--exchange", default=DEFAULT_EXCHANGE)
+        s.add_argument("--symbols", help="Comma-separated (default: every stored symbol with --tf).")
+        s.add_argument("--tf", default="1h")
+    stats = sub.choices["stats"]
+    stats.add_argument("--horizons", default=",".join(str(h) for h in HORIZONS), help="Bars after the event.")
+    stats.add_argument("--min-events", type=int, default=MIN_EVENTS)
+    bench_p = sub.add_parser("bench", help="Labeling throughput on a synthetic series.")
+    bench_p.add_argument("size", nargs="?", default="1m", help="Bars, e.g. 100k, 1m.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "bench":
+        for name, rate in bench(parse_size(args.size)).items():
+            print(f"⚡ {name:<13} {rate / 1e6:8.2f}M bars/s")
+        return 0
+
+    store = CandleStore(args.store)
+    symbols = _symbols(args, store)
+    if not symbols:
+        print(f"❌ No {args.tf} series in {store.root}")
+        return 1
+    templates = load_templates()
+    horizons = [int(h) for h in args.horizons.split(",")] if args.command == "stats" else []
+    all_codes, all_returns, ups, names = [], [], {h: [] for h in horizons}, pattern_names(templates)
+    for symbol in symbols:
+        try:
+            k = store.load(args.exchange, symbol, args.tf)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        if args.command == "label":
+            started = time.perf_counter()
+            events, names = label(k, templates)
+            stored = store.write_events(args.exchange, symbol, args.tf, events, names)
+            print(f"✅ {symbol} {args.tf}: {stored} events over {len(k['time'])} bars "
+                  f"({time.perf_counter() - started:.1f}s)")
+            continue
+        events, stored_names = store.load_events(args.exchange, symbol, args.tf)
+        if stored_names != names:
+            # Not labeled yet, or labeled with an older template set: detect in memory.
+            events, _ = label(k, templates)
+        all_codes.append(np.asarray(events["pattern"]))
+        all_returns.append(forward_returns(k, events, horizons))
+        close = np.asarray(k["close"])
+        for h in horizons:
+            ups[h].append(close[h:] > close[:-h])
+    if args.command == "label":
+        return 0
+
+    baseline = {h: float(np.concatenate(ups[h]).mean()) if ups[h] else 0.0 for h in horizons}
+    rows = hit_rates(np.concatenate(all_codes), np.concatenate(all_returns), names, horizons, args.min_events)
+    print(f"📊 {len(symbols)} symbols, {args.tf}, patterns with at least {args.min_events} events")
+    print(format_hit_rates(rows, horizons, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Stage-level profiling for the brain pipeline.
+
+    profiler = Profiler("train", mode="basic")
+    with profiler.stage("download") as stage:
+        df = download(...)
+        stage.rows = len(df)
+    profiler.finish()   # summary table + benchmarks/profiles/train_<time>.json
+
+Every stage records wall and CPU time, resident memory at its start and
+its peak (sampled from /proc every few milliseconds), a row count and free
+form `extra` values (e.g. env steps/s from `train_callbacks.ThroughputCallback`).
+
+`mode` adds a profiler per stage:
+
+* `cprofile` — `<stage>.prof` (open with snakeviz or pstats) plus the top
+  functions by cumulative time in the JSON.
+* `sampling` — a py-spy flamegraph `<stage>.svg` of the running process,
+  if `py-spy` is on the PATH (it samples from outside, so even C extensions
+  like torch show up).
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from indicator_bench import BRAIN_DIR, machine_fingerprint
+from model_registry import git_sha
+
+DEFAULT_DIR = os.path.join(BRAIN_DIR, "benchmarks", "profiles")
+MODES = ("basic", "cprofile", "sampling")
+RSS_INTERVAL_S = 0.005
+TOP_FUNCTIONS = 15
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def current_rss():
+    """Resident set size in bytes (Linux), else the process peak from getrusage."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _PeakRss(threading.Thread):
+    """Polls the RSS in the background; `peak` is the largest value seen."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_INTERVAL_S):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+class Stage:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.extra = {}
+        self.wall_s = None
+        self.cpu_s = None
+        self.rss_start = None
+        self.rss_peak = None
+        self.error = None
+        self.artifacts = {}
+
+    def to_dict(self):
+        out = {
+            "name": self.name,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "rss_start_mb": self.rss_start / 2**20,
+            "rss_peak_mb": self.rss_peak / 2**20,
+            "rows": self.rows,
+            "rows_per_s": self.rows / self.wall_s if self.rows and self.wall_s else None,
+            "extra": self.extra,
+        }
+        if self.error:
+            out["error"] = self.error
+        if self.artifacts:
+            out["artifacts"] = self.artifacts
+        return out
+
+
+def _top_functions(profile, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({func})", "calls": calls,
+                     "tottime_s": tottime, "cumtime_s": cumtime})
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:limit]
+
+
+class Profiler:
+    def __init__(self, script, mode="basic", out_dir=DEFAULT_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}' (choose from {', '.join(MODES)})")
+        if mode == "sampling" and shutil.which("py-spy") is None:
+            print("⚠️ py-spy not found on PATH; profiling stages without the sampling profiler.")
+            mode = "basic"
+        self.script = script
+        self.mode = mode
+        self.started = time.time()
+        self.run_dir = os.path.join(out_dir, f"{script}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started))}")
+        self.out_dir = out_dir
+        self.stages = []
+
+    def _artifact(self, name):
+        os.makedirs(self.run_dir, exist_ok=True)
+        return os.path.join(self.run_dir, name)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Measure the enclosed block; set `.rows` / `.extra` on the yielded stage as results come in."""
+        stage = Stage(name, rows)
+        sampler = _PeakRss()
+        stage.rss_start = sampler.peak
+        sampler.start()
+        profile = cProfile.Profile() if self.mode == "cprofile" else None
+        spy = None
+        if self.mode == "sampling":
+            stage.artifacts["flamegraph"] = self._artifact(f"{name}.svg")
+            spy = subprocess.Popen(
+                ["py-spy", "record", "--pid", str(os.getpid()), "--rate", "200", "--nonblocking",
+                 "--output", stage.artifacts["flamegraph"]],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield stage
+        except BaseException as e:
+            stage.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            stage.wall_s = time.perf_counter() - wall
+            stage.cpu_s = time.process_time() - cpu
+            stage.rss_peak = sampler.stop()
+            if profile is not None:
+                stage.artifacts["cprofile"] = self._artifact(f"{name}.prof")
+                profile.dump_stats(stage.artifacts["cprofile"])
+                stage.extra["top_functions"] = _top_functions(profile)
+            if spy is not None:
+                spy.send_signal(signal.SIGINT)
+                try:
+                    spy.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    spy.kill()
+            self.stages.append(stage)
+
+    def report(self):
+        fingerprint, machine = machine_fingerprint()
+        return {
+            "script": self.script,
+            "mode": self.mode,
+            "started": self.started,
+            "wall_s": time.time() - self.started,
+            "git_sha": git_sha(),
+            "machine_fingerprint": fingerprint,
+            "machine": machine,
+            "stages": [stage.to_dict() for stage in self.stages],
+        }
+
+    def write(self, report=None):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = self.run_dir + ".json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report or self.report(), f, indent=2)
+        return path
+
+    def finish(self):
+        """Print the summary table and write the JSON report; returns its path."""
+        report = self.report()
+        print(format_table(report))
+        path = self.write(report)
+        print(f"⏱️ Profile written to {path}")
+        return path
+
+
+def _fmt_rate(value):
+    if value is None:
+        return "-"
+    return f"{value / 1e6:.2f}M" if value >= 1e6 else f"{value / 1e3:.1f}k" if value >= 1e3 else f"{value:.0f}"
+
+
+def format_table(report):
+    header = f"{'stage':<18} {'wall s':>9} {'cpu s':>9} {'cpu %':>6} {'rss MB':>8} {'peak MB':>8} {'rows':>10} {'rows/s':>9}"
+    lines = [header, "-" * len(header)]
+    for s in report["stages"]:
+        cpu_pct = f"{100 * s['cpu_s'] / s['wall_s']:.0f}" if s["wall_s"] else "-"
+        rows = "-" if s["rows"] is None else str(s["rows"])
+        name = s["name"] + (" ❌" if "error" in s else "")
+        lines.append(f"{name:<18} {s['wall_s']:>9.3f} {s['cpu_s']:>9.3f} {cpu_pct:>6} {s['rss_start_mb']:>8.0f} "
+                     f"{s['rss_peak_mb']:>8.0f} {rows:>10} {_fmt_rate(s['rows_per_s']):>9}")
+        rates = {k: v for k, v in s["extra"].items() if isinstance(v, (int, float))}
+        if rates:
+            lines.append("    " + ", ".join(f"{k} {_fmt_rate(v) if k.endswith('_per_s') else v}" for k, v in rates.items()))
+    total_wall = sum(s["wall_s"] for s in report["stages"])
+    lines.append(f"{'total':<18} {total_wall:>9.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,321 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+NumPy reference implementations of the app's core indicators.
+
+Every function follows the conventions of `JSIndicators` in
+`src/utils/indicators.ts`: float64 in, float64 out, same length as the input,
+NaN where the indicator is not yet defined, and the same seeding (an EMA starts
+from the SMA of its first `period` values, RSI and ATR use Wilder smoothing).
+
+The recursive smoothers (EMA, RMA) are computed with a blocked linear scan
+instead of a Python loop, so a 10M-bar series stays in the sub-second range.
+SuperTrend is path dependent and is the one indicator that still loops.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Largest growth factor allowed inside one scan block. The block length is
+# chosen so decay**-block stays below this; beyond ~1e12 the rescaled prefix
+# sums start to lose the low-order digits of the older terms.
+_MAX_BLOCK_GROWTH = 1e12
+
+
+def decay_scan(x, decay, init=0.0):
+    """
+    Solve y[i] = decay * y[i-1] + x[i] with y[-1] = init.
+
+    Within a block the recurrence is a rescaled prefix sum; the carry from one
+    block to the next is the same recurrence over the block ends, solved
+    recursively. `decay` must be in (0, 1].
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[0]
+    if n == 0:
+        return x.copy()
+    if decay == 1.0:
+        return np.cumsum(x) + init
+
+    block = int(np.log(_MAX_BLOCK_GROWTH) / -np.log(decay))
+    block = max(1, min(block, n))
+    if block == 1:
+        # Decay so strong that nothing survives a step within precision.
+        out = np.empty(n)
+        prev = init
+        for i in range(n):
+            prev = decay * prev + x[i]
+            out[i] = prev
+        return out
+
+    n_blocks = -(-n // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = x
+    tiles = padded.reshape(n_blocks, block)
+
+    powers = decay ** np.arange(block, dtype=np.float64)
+    # Within-block solution with a zero carry-in.
+    local = np.cumsum(tiles / powers, axis=1) * powers
+
+    # Carry into each block: y_end[k] = decay**block * y_end[k-1] + local_end[k]
+    block_decay = decay ** block
+    ends = decay_scan(local[:, -1], block_decay, init)
+    carry_in = np.empty(n_blocks)
+    carry_in[0] = init
+    carry_in[1:] = ends[:-1]
+
+    out = local + carry_in[:, None] * (powers * decay)
+    return out.reshape(-1)[:n]
+
+
+def _first_valid(data):
+    valid = ~np.isnan(data)
+    if not valid.any():
+        return len(data)
+    return int(np.argmax(valid))
+
+
+def sma(data, period):
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    start = _first_valid(data)
+    if len(data) - start < period:
+        return out
+    csum = np.cumsum(data[start:])
+    window = csum[period - 1:].copy()
+    window[1:] -= csum[:-period]
+    out[start + period - 1:] = window / period
+    return out
+
+
+def _smoothed(data, period, alpha):
+    """SMA-seeded exponential smoother, shared by EMA (alpha=2/(p+1)) and RMA (1/p)."""
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    start = _first_valid(data)
+    if len(data) - start < period:
+        return out
+    seed = data[start:start + period].mean()
+    seed_idx = start + period - 1
+    out[seed_idx] = seed
+    tail = data[seed_idx + 1:]
+    if len(tail):
+        out[seed_idx + 1:] = decay_scan(alpha * tail, 1.0 - alpha, seed)
+    return out
+
+
+def ema(data, period):
+    return _smoothed(data, period, 2.0 / (period + 1))
+
+
+def smma(data, period):
+    """Wilder's smoothing (RMA), as `JSIndicators.smma`."""
+    return _smoothed(data, period, 1.0 / period)
+
+
+def wma(data, period):
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    start = _first_valid(data)
+    if len(data) - start < period:
+        return out
+    weights = np.arange(period, 0, -1, dtype=np.float64)
+    denominator = period * (period + 1) / 2
+    out[start + period - 1:] = np.convolve(data[start:], weights, mode="valid") / denominator
+    return out
+
+
+def rsi(data, period):
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    start = _first_valid(data)
+    if len(data) - start <= period:
+        return out
+    diff = np.diff(data[start:])
+    gains = np.where(diff >= 0, diff, 0.0)
+    losses = np.where(diff < 0, -diff, 0.0)
+    alpha = 1.0 / period
+    avg_gain = np.empty(len(diff) - period + 1)
+    avg_loss = np.empty_like(avg_gain)
+    avg_gain[0] = gains[:period].mean()
+    avg_loss[0] = losses[:period].mean()
+    avg_gain[1:] = decay_scan(alpha * gains[period:], 1.0 - alpha, avg_gain[0])
+    avg_loss[1:] = decay_scan(alpha * losses[period:], 1.0 - alpha, avg_loss[0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    value[avg_loss == 0] = 100.0
+    out[start + period:] = value
+    return out
+
+
+def macd(data, fast, slow, signal):
+    line = ema(data, fast) - ema(data, slow)
+    return line, ema(line, signal)
+
+
+def rolling_max(data, period):
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    if len(data) >= period:
+        out[period - 1:] = sliding_window_view(data, period).max(axis=1)
+    return out
+
+
+def rolling_min(data, period):
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    if len(data) >= period:
+        out[period - 1:] = sliding_window_view(data, period).min(axis=1)
+    return out
+
+
+def bb(data, period, std_dev=2.0):
+    """Bollinger Bands with the two-pass (population) deviation the JS path uses."""
+    data = np.asarray(data, dtype=np.float64)
+    middle = sma(data, period)
+    upper = np.full(len(data), np.nan)
+    lower = np.full(len(data), np.nan)
+    if len(data) < period:
+        return middle, upper, lower
+    windows = sliding_window_view(data, period)
+    sd = windows.std(axis=1)
+    upper[period - 1:] = middle[period - 1:] + sd * std_dev
+    lower[period - 1:] = middle[period - 1:] - sd * std_dev
+    return middle, upper, lower
+
+
+def true_range(high, low, close):
+    """True range with tr[0] = 0, matching the JS ATR buffer."""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = np.zeros(len(close))
+    if len(close) > 1:
+        prev = close[:-1]
+        tr[1:] = np.maximum.reduce([
+            high[1:] - low[1:],
+            np.abs(high[1:] - prev),
+            np.abs(low[1:] - prev),
+        ])
+    return tr
+
+
+def atr(high, low, close, period):
+    if len(close) < period:
+        return np.full(len(close), np.nan)
+    return smma(true_range(high, low, close), period)
+
+
+def stoch(high, low, close, period):
+    """Stochastic %K, as `JSIndicators.stoch`."""
+    close = np.asarray(close, dtype=np.float64)
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    span = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = (close - lowest) / span * 100.0
+    k[span == 0] = 50.0
+    return k
+
+
+def williams_r(high, low, close, period):
+    close = np.asarray(close, dtype=np.float64)
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    span = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wr = (highest - close) / span * -100.0
+    wr[span == 0] = 0.0
+    return wr
+
+
+def mom(data, period):
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(len(data), np.nan)
+    out[period:] = data[period:] - data[:-period]
+    return out
+
+
+def supertrend(high, low, close, period=10, multiplier=3.0):
+    """
+    SuperTrend line and trend direction (1 bull, -1 bear).
+
+    The final bands are seeded from the basic bands on the first bar where ATR
+    exists; after that the usual ratchet rules apply.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    trend = np.ones(n, dtype=np.int8)
+    value = np.full(n, np.nan)
+    if n == 0:
+        return value, trend
+
+    a = atr(high, low, close, period)
+    hl2 = (high + low) / 2.0
+    basic_upper = (hl2 + multiplier * a).tolist()
+    basic_lower = (hl2 - multiplier * a).tolist()
+    closes = close.tolist()
+
+    final_upper = [float("nan")] * n
+    final_lower = [float("nan")] * n
+    trends = [1] * n
+    fu = fl = float("nan")
+    current = 1
+    for i in range(1, n):
+        bu = basic_upper[i]
+        bl = basic_lower[i]
+        prev_close = closes[i - 1]
+        if fu != fu:  # NaN: first bar with an ATR reading
+            new_fu, new_fl = bu, bl
+        else:
+            new_fu = bu if (bu < fu or prev_close > fu) else fu
+            new_fl = bl if (bl > fl or prev_close < fl) else fl
+        if fu == fu:
+            if current == 1 and closes[i] < fl:
+                current = -1
+            elif current == -1 and closes[i] > fu:
+                current = 1
+        fu, fl = new_fu, new_fl
+        final_upper[i] = fu
+        final_lower[i] = fl
+        trends[i] = current
+
+    trend = np.asarray(trends, dtype=np.int8)
+    value = np.where(trend == 1, np.asarray(final_lower), np.asarray(final_upper))
+    return value, trend
+
+
+# The indicator set the engine benchmark and the scanner compare across
+# engines. Keys are stable names; the values compute one indicator over a full
+# OHLCV dict and return one array (or a tuple of arrays).
+DEFAULT_INDICATOR_SET = {
+    "ema20": lambda k: ema(k["close"], 20),
+    "sma20": lambda k: sma(k["close"], 20),
+    "rsi14": lambda k: rsi(k["close"], 14),
+    "macd12_26_9": lambda k: macd(k["close"], 12, 26, 9),
+    "bb20_2": lambda k: bb(k["close"], 20, 2.0),
+    "atr14": lambda k: atr(k["high"], k["low"], k["close"], 14),
+    "stoch14": lambda k: stoch(k["high"], k["low"], k["close"], 14),
+    "supertrend10_3": lambda k: supertrend(k["high"], k["low"], k["close"], 10, 3.0),
+}
+
+
+def compute_set(klines, indicator_set=None):
+    """Run every indicator of `indicator_set` over one OHLCV dict."""
+    indicator_set = indicator_set or DEFAULT_INDICATOR_SET
+    return {name: fn(klines) for name, fn in indicator_set.items()}
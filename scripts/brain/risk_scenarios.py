@@ -0,0 +1,637 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Position size and risk scenarios, exact and over whole grids.
+
+Two paths over the same formulas as the app's trade calculator
+(`src/lib/calculators/core.ts`, driven by `calculatorService.ts` whenever
+`tradeCalculator.svelte.ts` sees an input change):
+
+* Exact — `base_metrics`, `individual_tp`, `total_metrics` and `calculate`
+  are line-by-line ports on `decimal.Decimal` with decimal.js' defaults (20
+  significant digits, half-up), so one trade gives the app's numbers digit
+  for digit: position size, margin, fees, break-even and liquidation price,
+  per-target and total R/R.
+* Float — `scenario_grid` evaluates every combination of risk %, leverage,
+  ATR-multiple stop and TP split (up to MAX_TARGETS targets at fixed R
+  multiples) as NumPy arrays, millions of scenarios per second, and adds what
+  planning needs on top of the calculator: expected value, log growth and a
+  drawdown estimate per scenario.
+
+Outcomes of a trade: it reaches targets 1..j and the rest of the position is
+stopped out, or it reaches every target and the unsold rest closes at the
+last one. `q[m, k]`, the chance to reach target k before the stop of ATR
+multiple m, comes from a driftless random walk (distance to the stop over
+the sum of both distances) or from first passages over stored klines
+(`history_hit_rates`). The drawdown is that of the expected longest run of
+stop-outs in `--trades` trades. Scenarios whose margin exceeds the account
+or whose liquidation price comes before the stop are marked invalid.
+
+    python risk_scenarios.py calc --entry 100 --stop 90 --account 1000 --risk 1 --tp 110:50,120:50
+    python risk_scenarios.py grid --entry 30000 --atr 150 --risk 0.25:2:0.25 --leverage 1,5,10,25,50 \\
+        --atr-mult 0.5:4:0.5 --targets 1,2,3 --split-step 10 --symbol BTCUSDT --tf 1h --out surface.npz
+    python risk_scenarios.py bench 10m
+"""
+
+import argparse
+import decimal
+import functools
+import itertools
+import os
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+import reference_indicators as ri
+from candle_store import DEFAULT_EXCHANGE, CandleStore
+from synthetic import parse_size, random_walk_klines
+
+# decimal.js defaults: precision 20, ROUND_HALF_UP.
+JS_DECIMAL = decimal.Context(prec=20, rounding=decimal.ROUND_HALF_UP)
+LONG, SHORT = "long", "short"
+VALID, INVALID, INCOMPLETE = "VALID", "INVALID", "INCOMPLETE"
+DEFAULT_FEES = "0.0140"
+DEFAULT_LEVERAGE = "10"
+DEFAULT_ATR_MULTIPLIER = "1.2"
+MAX_TARGETS = 5
+ATR_PERIOD = 14
+HORIZON_BARS = 100
+TRADES = 100
+
+
+def to_decimal(value):
+    """`parseDecimal` for the inputs Python passes around: None/"" → 0, numbers via their shortest repr."""
+    if isinstance(value, Decimal):
+        return value
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return Decimal(0)
+    return Decimal(str(value).strip())
+
+
+def _js_decimal(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with decimal.localcontext(JS_DECIMAL):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@_js_decimal
+def break_even_price(entry, fee_percent, trade_type):
+    fee = fee_percent / 100
+    if trade_type == LONG:
+        return entry * (fee + 1) / (Decimal(1) - fee)
+    return entry * (Decimal(1) - fee) / (fee + 1)
+
+
+@_js_decimal
+def derive_money_metrics(position_size, values, risk_amount):
+    volume = position_size * values["entryPrice"]
+    required_margin = volume / values["leverage"] if values["leverage"] > 0 else volume
+    fee = values["fees"] / 100
+    entry_fee = volume * fee
+    sl_exit_fee = position_size * values["stopLossPrice"] * fee
+    return {"requiredMargin": required_margin, "netLoss": risk_amount + entry_fee + sl_exit_fee,
+            "entryFee": entry_fee}
+
+
+@_js_decimal
+def base_metrics(values, trade_type):
+    """`calculateBaseMetrics`; None when entry and stop coincide."""
+    risk_amount = values["accountSize"] * (values["riskPercentage"] / 100)
+    risk_per_unit = abs(values["entryPrice"] - values["stopLossPrice"])
+    if risk_per_unit == 0:
+        return None
+    position_size = risk_amount / risk_per_unit
+    money = derive_money_metrics(position_size, values, risk_amount)
+    mmr = values.get("maintenanceMarginRate") or Decimal(0)
+    leverage, entry = values["leverage"], values["entryPrice"]
+    if leverage > 0:
+        if trade_type == LONG:
+            liquidation = entry * (Decimal(1) - Decimal(1) / leverage + mmr)
+        else:
+            liquidation = entry * (Decimal(1) + Decimal(1) / leverage - mmr)
+    else:
+        liquidation = Decimal(0)
+    return {
+        "positionSize": position_size,
+        "requiredMargin": money["requiredMargin"],
+        "netLoss": money["netLoss"],
+        "breakEvenPrice": break_even_price(entry, values["fees"], trade_type),
+        "liquidationPrice": liquidation,
+        "entryFee": money["entryFee"],
+        "riskAmount": risk_amount,
+    }
+
+
+@_js_decimal
+def individual_tp(tp_price, tp_percent, base, values, index):
+    """`calculateIndividualTp`."""
+    entry, fee = values["entryPrice"], values["fees"] / 100
+    share = tp_percent / 100
+    position_part = base["positionSize"] * share
+    gross = abs(tp_price - entry) * position_part
+    exit_fee = position_part * tp_price * fee
+    entry_fee_part = position_part * entry * fee
+    net_profit = gross - entry_fee_part - exit_fee
+    risk_for_part = base["riskAmount"] * share
+    return {
+        "netProfit": net_profit,
+        "riskRewardRatio": net_profit / risk_for_part if risk_for_part > 0 else Decimal(0),
+        "priceChangePercent": (tp_price - entry) / entry * 100 if entry > 0 else Decimal(0),
+        "returnOnCapital": (net_profit / (base["requiredMargin"] * share) * 100
+                            if base["requiredMargin"] > 0 and tp_percent > 0 else Decimal(0)),
+        "partialVolume": position_part,
+        "exitFee": exit_fee,
+        "index": index,
+        "percentSold": tp_percent,
+    }
+
+
+@_js_decimal
+def total_metrics(targets, base, values, trade_type):
+    """`calculateTotalMetrics`; `targets` are {price, percent} dicts of Decimals."""
+    size, fee = base["positionSize"], values["fees"] / 100
+    total_net_profit = weighted_rr = total_fees = Decimal(0)
+    for index, tp in enumerate(targets):
+        if tp["price"] > 0 and tp["percent"] > 0:
+            part = individual_tp(tp["price"], tp["percent"], base, values, index)
+            total_net_profit += part["netProfit"]
+            share = tp["percent"] / 100
+            total_fees = total_fees + size * share * values["entryPrice"] * fee + size * share * tp["price"] * fee
+            weighted_rr += part["riskRewardRatio"] * share
+
+    prices = [tp["price"] for tp in targets if tp["price"] > 0]
+    max_potential = Decimal(0)
+    if prices:
+        best = max(prices) if trade_type == LONG else min(prices)
+        max_potential = abs(best - values["entryPrice"]) * size - base["entryFee"] - size * best * fee
+    sold = values["totalPercentSold"]
+    return {
+        "totalNetProfit": total_net_profit,
+        "totalRR": weighted_rr / (sold / 100) if sold > 0 else Decimal(0),
+        "totalFees": total_fees,
+        "maxPotentialProfit": max_potential,
+        "riskAmount": base["riskAmount"],
+    }
+
+
+def _validate(state):
+    """`getAndValidateInputs`: (status, message, values)."""
+    trade_type = state.get("tradeType", LONG)
+    values = {
+        "accountSize": to_decimal(state.get("accountSize")),
+        "riskPercentage": to_decimal(state.get("riskPercentage")),
+        "entryPrice": to_decimal(state.get("entryPrice")),
+        "leverage": to_decimal(state.get("leverage") or DEFAULT_LEVERAGE),
+        "fees": to_decimal(state.get("fees") or DEFAULT_FEES),
+        "atrValue": to_decimal(state.get("atrValue")),
+        "atrMultiplier": to_decimal(state.get("atrMultiplier") or DEFAULT_ATR_MULTIPLIER),
+        "stopLossPrice": to_decimal(state.get("stopLossPrice")),
+        "targets": [{"price": to_decimal(t.get("price")), "percent": to_decimal(t.get("percent"))}
+                    for t in state.get("targets", [])],
+        "totalPercentSold": Decimal(0),
+    }
+    if state.get("maintenanceMarginRate") is not None:
+        values["maintenanceMarginRate"] = to_decimal(state["maintenanceMarginRate"])
+    required = ["accountSize", "riskPercentage", "entryPrice"]
+    required += ["atrValue", "atrMultiplier"] if state.get("useAtrSl") else ["stopLossPrice"]
+    if any(values[f] == 0 for f in required):
+        return INCOMPLETE, None, values
+
+    if state.get("useAtrSl"):
+        if values["entryPrice"] > 0 and values["atrValue"] > 0 and values["atrMultiplier"] > 0:
+            with decimal.localcontext(JS_DECIMAL):
+                offset = values["atrValue"] * values["atrMultiplier"]
+                values["stopLossPrice"] = (values["entryPrice"] - offset if trade_type == LONG
+                                           else values["entryPrice"] + offset)
+        elif values["atrValue"] > 0 and values["atrMultiplier"] > 0:
+            return INCOMPLETE, None, values
+    atr_sl_invalid = bool(state.get("useAtrSl")) and values["stopLossPrice"] <= 0
+    if values["stopLossPrice"] <= 0 and not atr_sl_invalid:
+        return INCOMPLETE, None, values
+    if atr_sl_invalid:
+        return INVALID, "atrSlInvalid", values
+
+    entry, stop = values["entryPrice"], values["stopLossPrice"]
+    if trade_type == LONG and entry <= stop:
+        return INVALID, "slBelowEntry", values
+    if trade_type == SHORT and entry >= stop:
+        return INVALID, "slAboveEntry", values
+    for tp in values["targets"]:
+        if tp["price"] > 0:
+            if trade_type == LONG and tp["price"] <= stop:
+                return INVALID, "tpBelowSl", values
+            if trade_type == LONG and tp["price"] <= entry:
+                return INVALID, "tpAboveEntry", values
+            if trade_type == SHORT and tp["price"] >= stop:
+                return INVALID, "tpAboveSl", values
+            if trade_type == SHORT and tp["price"] >= entry:
+                return INVALID, "tpBelowEntry", values
+    with decimal.localcontext(JS_DECIMAL):
+        values["totalPercentSold"] = sum((t["percent"] for t in values["targets"]), Decimal(0))
+    if values["totalPercentSold"] > 100:
+        return INVALID, "totalPercentExceeded", values
+    return VALID, None, values
+
+
+@_js_decimal
+def calculate(state):
+    """
+    One pass of `calculatorService.calculateAndDisplay` over a trade state
+    (the `tradeState` fields: accountSize, riskPercentage, entryPrice,
+    stopLossPrice, leverage, fees, tradeType, targets, useAtrSl, atrValue,
+    atrMultiplier, isRiskAmountLocked, riskAmount, isPositionSizeLocked,
+    lockedPositionSize, plus the symbol's basePrecision).
+
+    Returns {"status", "message"} for incomplete or invalid input, else also
+    "values" (after ATR stop and lock adjustments), "base", "tps" and "totals".
+    """
+    status, message, values = _validate(state)
+    if status != VALID:
+        return {"status": status, "message": message}
+    trade_type = state.get("tradeType", LONG)
+    locked_size = to_decimal(state.get("lockedPositionSize"))
+
+    if state.get("isRiskAmountLocked"):
+        risk_amount = to_decimal(state.get("riskAmount"))
+        if risk_amount > 0 and values["accountSize"] > 0:
+            values["riskPercentage"] = risk_amount / values["accountSize"] * 100
+        base = base_metrics(values, trade_type)
+    elif state.get("isPositionSizeLocked") and locked_size > 0:
+        risk_per_unit = abs(values["entryPrice"] - values["stopLossPrice"])
+        if risk_per_unit <= 0:
+            return {"status": INVALID, "message": "slDistance"}
+        risk_amount = risk_per_unit * locked_size
+        values["riskPercentage"] = (Decimal(0) if values["accountSize"] == 0
+                                    else risk_amount / values["accountSize"] * 100)
+        base = base_metrics(values, trade_type)
+        if base:
+            base["positionSize"] = locked_size
+    else:
+        base = base_metrics(values, trade_type)
+
+    if not base or base["positionSize"] <= 0:
+        return {"status": INVALID, "message": "noPosition"}
+
+    precision = state.get("basePrecision")
+    if precision is not None:
+        # toDecimalPlaces does not round to the context precision.
+        rounded = base["positionSize"].quantize(Decimal(1).scaleb(-int(precision)), rounding=decimal.ROUND_DOWN,
+                                                context=decimal.Context(prec=1000))
+        if rounded != base["positionSize"]:
+            base.update(derive_money_metrics(rounded, values, base["riskAmount"]))
+        base["positionSize"] = rounded
+
+    tps = []
+    for index, tp in enumerate(values["targets"]):
+        if tp["price"] > 0 and tp["percent"] > 0:
+            details = individual_tp(tp["price"], tp["percent"], base, values, index)
+            if (trade_type == LONG and tp["price"] > values["entryPrice"]) or \
+                    (trade_type == SHORT and tp["price"] < values["entryPrice"]):
+                tps.append(details)
+    return {"status": VALID, "message": None, "values": values, "base": base, "tps": tps,
+            "totals": total_metrics(values["targets"], base, values, trade_type),
+            "isMarginExceeded": values["accountSize"] > 0 and base["requiredMargin"] > values["accountSize"]}
+
+
+# --- Float grids ---
+
+def parse_values(text):
+    """"1,2,5" or an inclusive range "start:stop:step" → float array."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return start + step * np.arange(count)
+    return np.array([float(x) for x in text.split(",")])
+
+
+def splits(n_targets, step=10):
+    """(S, n_targets) percentages: every split of 100% into positive multiples of `step`."""
+    units = int(round(100 / step))
+    if n_targets < 1 or n_targets > units:
+        return np.empty((0, n_targets))
+    rows = []
+    # Stars and bars: n_targets - 1 cut points between units.
+    for cuts in itertools.combinations(range(1, units), n_targets - 1):
+        edges = (0, *cuts, units)
+        rows.append([(b - a) * step for a, b in zip(edges, edges[1:])])
+    return np.array(rows, dtype=np.float64)
+
+
+def walk_hit_rates(atr_mults, targets_r):
+    """(M, K) chance to reach each target before the stop under a driftless walk: 1 / (1 + R)."""
+    return np.broadcast_to(1.0 / (1.0 + np.asarray(targets_r, dtype=np.float64)),
+                           (len(atr_mults), len(targets_r))).copy()
+
+
+def history_hit_rates(k, atr_mults, targets_r, trade_type=LONG, atr_period=ATR_PERIOD,
+                      horizon=HORIZON_BARS, stride=1):
+    """
+    (M, K) share of entries at a bar's close whose target k is reached before
+    the stop at `atr_mults[m]` × ATR within `horizon` bars. A bar touching both
+    counts as a stop, and a target not reached within the horizon as missed.
+    """
+    high, low, close = (np.asarray(k[f], dtype=np.float64) for f in ("high", "low", "close"))
+    atr = ri.atr(high, low, close, atr_period)
+    entries = np.arange(0, len(close) - horizon, stride)
+    entries = entries[np.isfinite(atr[entries]) & (atr[entries] > 0)]
+    mults = np.asarray(atr_mults, dtype=np.float64)
+    targets = np.asarray(targets_r, dtype=np.float64)
+    if len(entries) == 0:
+        return np.full((len(mults), len(targets)), np.nan)
+    sign = 1.0 if trade_type == LONG else -1.0
+    entry = close[entries]
+    stop_dist = mults[:, None] * atr[entries][None, :]                   # (M, E)
+    # Favourable and adverse excursion so far, as positive distances from the entry.
+    best = np.zeros(len(entries))
+    worst = np.zeros(len(entries))
+    stop_at = np.full(stop_dist.shape, horizon + 1, dtype=np.int32)
+    target_at = np.full((len(mults), len(targets), len(entries)), horizon + 1, dtype=np.int32)
+    for h in range(1, horizon + 1):
+        bar_high, bar_low = high[entries + h], low[entries + h]
+        favourable = (bar_high - entry) if sign > 0 else (entry - bar_low)
+        adverse = (entry - bar_low) if sign > 0 else (bar_high - entry)
+        np.maximum(best, favourable, out=best)
+        np.maximum(worst, adverse, out=worst)
+        stop_at[(stop_at > horizon) & (worst >= stop_dist)] = h
+        reached = best[None, None, :] >= targets[None, :, None] * stop_dist[:, None, :]
+        target_at[(target_at > horizon) & reached] = h
+    return (target_at < stop_at[:, None, :]).mean(axis=2)
+
+
+def _losing_streak(p_loss, trades):
+    """Expected longest run of losses in `trades` trades, log(n (1 - p)) / log(1 / p)."""
+    p = np.clip(p_loss, 0.0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        run = np.log(trades * (1.0 - p)) / np.log(1.0 / p)
+    run = np.where(p <= 0, 0.0, np.where(p >= 1, trades, run))
+    return np.clip(run, 0.0, trades)
+
+
+def scenario_grid(entry, atr, risk_pcts, leverages, atr_mults, split_rows, targets_r, hit=None,
+                  trade_type=LONG, account=1000.0, fees=float(DEFAULT_FEES), mmr=0.0, trades=TRADES):
+    """
+    Surfaces over (risk %, leverage, ATR multiple, split), the calculator's
+    formulas in float64. `split_rows` is (S, K) percentages per target,
+    `targets_r` the K targets as multiples of the stop distance, `hit` the
+    (M, K) target hit rates (default `walk_hit_rates`).
+
+    Money is in account currency and per trade: `ev`, the expected profit;
+    `ev_pct`, that in % of the account; `growth`, the expected log return;
+    `drawdown`, the loss of the expected longest stop-out streak in `trades`
+    trades; `ev_roc`, `ev` in % of the required margin. Invalid scenarios
+    (margin above the account, liquidation before the stop) are NaN there.
+    """
+    f = fees / 100.0
+    risk = np.asarray(risk_pcts, dtype=np.float64)[:, None, None, None]
+    lev = np.asarray(leverages, dtype=np.float64)[None, :, None, None]
+    mult = np.asarray(atr_mults, dtype=np.float64)
+    split_rows = np.asarray(split_rows, dtype=np.float64)
+    targets = np.asarray(targets_r, dtype=np.float64)
+    if len(targets) > MAX_TARGETS or split_rows.shape[1] != len(targets):
+        raise ValueError(f"Need 1..{MAX_TARGETS} targets and one split column per target")
+    q = walk_hit_rates(mult, targets) if hit is None else np.asarray(hit, dtype=np.float64)
+    sign = 1.0 if trade_type == LONG else -1.0
+
+    stop_dist = (atr * mult)[None, None, :, None]
+    stop = entry - sign * stop_dist
+    risk_amount = account * (risk / 100.0)
+    size = risk_amount / stop_dist                                        # (R, 1, M, 1)
+    volume = size * entry
+    margin = np.where(lev > 0, volume / np.where(lev > 0, lev, 1.0), volume)
+    entry_fee = volume * f
+    net_loss = risk_amount + entry_fee + size * stop * f
+    with np.errstate(divide="ignore"):
+        inv_lev = np.where(lev > 0, 1.0 / lev, 0.0)
+    liquidation = np.where(lev > 0, entry * (1.0 - sign * inv_lev + sign * mmr), 0.0)
+    liquidated = (lev > 0) & ((stop <= liquidation) if sign > 0 else (stop >= liquidation))
+    valid = (margin <= account) & ~liquidated & (stop > 0)
+
+    # Targets and their net profit per 1% of the position (calculateIndividualTp without the split).
+    tp_price = entry + sign * targets[None, None, None, None, :] * stop_dist[..., None]    # (1, 1, M, 1, K)
+    per_pct = (size[..., None] / 100.0) * (np.abs(tp_price - entry) - entry * f - tp_price * f)
+    share = split_rows[None, None, None, :, :]                            # (1, 1, 1, S, K)
+    tp_net = per_pct * share                                              # (R, 1, M, S, K)
+    total_net_profit = tp_net.sum(axis=-1)
+    # Weighted R/R of the calculator: Σ (net_k / (risk · p_k)) · p_k over Σ p_k.
+    sold = split_rows.sum(axis=1)[None, None, None, :]
+    total_rr = np.where(sold > 0, total_net_profit / risk_amount / np.where(sold > 0, sold / 100.0, 1.0), 0.0)
+
+    # Outcome j: targets 1..j filled, the rest stopped; j = K: all filled, the rest closes at the last target.
+    reach = np.concatenate([np.ones((len(mult), 1)), q, np.zeros((len(mult), 1))], axis=1)
+    prob = (reach[:, :-1] - reach[:, 1:])[None, None, :, None, :]         # (1, 1, M, 1, K+1)
+    filled = np.concatenate([np.zeros_like(tp_net[..., :1]), np.cumsum(tp_net, axis=-1)], axis=-1)
+    rest = 1.0 - np.concatenate([np.zeros((len(split_rows), 1)), np.cumsum(split_rows, axis=1)], axis=1) / 100.0
+    rest = rest[None, None, None, :, :]                                   # (1, 1, 1, S, K+1)
+    rest_pnl = np.concatenate([np.repeat(-net_loss[..., None], len(targets), axis=-1), per_pct[..., -1:] * 100.0],
+                              axis=-1)                                    # (R, 1, M, 1, K+1)
+    pnl = filled + rest * rest_pnl                                        # (R, 1, M, S, K+1)
+    ev = (prob * pnl).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth = np.where((pnl > -account).all(axis=-1),
+                          (prob * np.log1p(np.maximum(pnl / account, -1 + 1e-12))).sum(axis=-1), -np.inf)
+    streak = _losing_streak(prob[..., 0], trades)
+    drawdown = 1.0 - np.maximum(1.0 - net_loss / account, 0.0) ** streak
+
+    shape = (len(risk), len(lev.ravel()), len(mult), len(split_rows))
+    valid = np.broadcast_to(valid, shape)
+
+    def surface(x):
+        return np.where(valid, np.broadcast_to(x, shape), np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ev_roc = ev / margin * 100.0
+    return {
+        "risk": np.asarray(risk_pcts, dtype=np.float64), "leverage": np.asarray(leverages, dtype=np.float64),
+        "atr_mult": mult, "splits": split_rows, "targets_r": targets, "hit": q,
+        "valid": valid.copy(),
+        "position_size": np.broadcast_to(size, shape).copy(), "required_margin": np.broadcast_to(margin, shape).copy(),
+        "net_loss": np.broadcast_to(net_loss, shape).copy(),
+        "liquidation_price": np.broadcast_to(liquidation, shape).copy(),
+        "total_net_profit": np.broadcast_to(total_net_profit, shape).copy(),
+        "total_rr": np.broadcast_to(total_rr, shape).copy(),
+        "ev": surface(ev), "ev_pct": surface(ev / account * 100.0), "growth": surface(growth),
+        "drawdown": surface(drawdown), "ev_roc": surface(ev_roc),
+    }
+
+
+def best_scenarios(grid, metric="growth", top=10, max_drawdown=None):
+    """Flat indices and rows of the `top` valid scenarios by `metric`."""
+    score = grid[metric].ravel().copy()
+    if max_drawdown is not None:
+        score[~(grid["drawdown"].ravel() <= max_drawdown)] = np.nan
+    order = np.argsort(np.where(np.isnan(score), np.inf, -score), kind="stable")[:top]
+    rows = []
+    for flat in order:
+        if np.isnan(score[flat]):
+            break
+        r, lv, m, s = np.unravel_index(flat, grid["valid"].shape)
+        rows.append({"risk": float(grid["risk"][r]), "leverage": float(grid["leverage"][lv]),
+                     "atr_mult": float(grid["atr_mult"][m]), "split": grid["splits"][s].tolist(),
+                     **{name: float(grid[name].ravel()[flat])
+                        for name in ("ev", "ev_pct", "growth", "drawdown", "ev_roc", "total_rr")}})
+    return rows
+
+
+def bench(n_scenarios, seed=0):
+    """Scenarios per second of `scenario_grid` on a grid of about `n_scenarios` cells."""
+    split_rows = splits(3, 5)                                             # 171 splits
+    per_axis = max(int(round((n_scenarios / len(split_rows)) ** (1 / 3))), 1)
+    risk = np.linspace(0.25, 3.0, per_axis)
+    leverage = np.linspace(1, 50, per_axis)
+    mult = np.linspace(0.5, 4.0, per_axis)
+    k = random_walk_klines(20_000, seed=seed, volatility=0.004)
+    started = time.perf_counter()
+    hit = history_hit_rates(k, mult, [1, 2, 3], horizon=50)
+    hit_s = time.perf_counter() - started
+    started = time.perf_counter()
+    grid = scenario_grid(30_000.0, 150.0, risk, leverage, mult, split_rows, [1, 2, 3], hit)
+    size = grid["valid"].size
+    return {"grid": size / (time.perf_counter() - started), "history_hits": len(k["time"]) / hit_s}, size
+
+
+def _parse_targets(text):
+    targets = []
+    for item in (text or "").split(","):
+        if item.strip():
+            price, _, percent = item.partition(":")
+            targets.append({"price": price.strip(), "percent": percent.strip() or "0"})
+    return targets
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Position size, R/R and risk scenarios like the app's trade calculator.")
+    sub = p.add_subparsers(dest="command", required=True)
+    calc = sub.add_parser("calc", help="One trade, exactly as the calculator shows it.")
+    calc.add_argument("--account", required=True)
+    calc.add_argument("--risk", required=True, help="Risk per trade in % of the account.")
+    calc.add_argument("--entry", required=True)
+    calc.add_argument("--stop", help="Stop price (or --atr and --atr-mult).")
+    calc.add_argument("--atr")
+    calc.add_argument("--atr-mult", default=DEFAULT_ATR_MULTIPLIER)
+    calc.add_argument("--leverage", default=DEFAULT_LEVERAGE)
+    calc.add_argument("--fees", default=DEFAULT_FEES, help="Fee per side in %.")
+    calc.add_argument("--tp", help="Targets price:percent, e.g. 110:50,120:50")
+    calc.add_argument("--short", action="store_true")
+    calc.add_argument("--precision", type=int, help="Base precision of the symbol (position size rounded down).")
+
+    grid = sub.add_parser("grid", help="EV, growth and drawdown surfaces over a scenario grid.")
+    grid.add_argument("--entry", type=float, required=True)
+    grid.add_argument("--atr", type=float, help="ATR in price units (default: last ATR of --symbol).")
+    grid.add_argument("--account", type=float, default=1000.0)
+    grid.add_argument("--risk", default="0.25:2:0.25", help="Risk % values, list or start:stop:step.")
+    grid.add_argument("--leverage", default="1,2,5,10,20,50")
+    grid.add_argument("--atr-mult", default="0.5:4:0.5")
+    grid.add_argument("--targets", default="1,2,3", help=f"Up to {MAX_TARGETS} targets in R (multiples of the stop).")
+    grid.add_argument("--split-step", type=float, default=10.0, help="Granularity of the TP split in %.")
+    grid.add_argument("--fees", type=float, default=float(DEFAULT_FEES))
+    grid.add_argument("--mmr", type=float, default=0.0, help="Maintenance margin rate (fraction).")
+    grid.add_argument("--short", action="store_true")
+    grid.add_argument("--trades", type=int, default=TRADES, help="Trades per drawdown estimate.")
+    grid.add_argument("--store", default=None)
+    grid.add_argument("--exchange", default=DEFAULT_EXCHANGE)
+    grid.add_argument("--symbol", help="Hit rates from this symbol's stored klines instead of a random walk.")
+    grid.add_argument("--tf", default="1h")
+    grid.add_argument("--horizon", type=int, default=HORIZON_BARS, help="Bars a historical trade may run.")
+    grid.add_argument("--max-drawdown", type=float, help="Only rank scenarios with at most this drawdown (0.2 = 20%%).")
+    grid.add_argument("--top", type=int, default=10)
+    grid.add_argument("--out", help="Write every surface (.npz).")
+
+    bench_p = sub.add_parser("bench", help="Grid throughput.")
+    bench_p.add_argument("size", nargs="?", default="10m", help="Scenarios, e.g. 1m, 10m.")
+    return p
+
+
+def _run_calc(args):
+    state = {"accountSize": args.account, "riskPercentage": args.risk, "entryPrice": args.entry,
+             "stopLossPrice": args.stop, "leverage": args.leverage, "fees": args.fees,
+             "tradeType": SHORT if args.short else LONG, "targets": _parse_targets(args.tp),
+             "useAtrSl": bool(args.atr), "atrValue": args.atr, "atrMultiplier": args.atr_mult,
+             "basePrecision": args.precision}
+    result = calculate(state)
+    if result["status"] != VALID:
+        print(f"❌ {result['status']}: {result['message'] or 'missing input'}")
+        return 1
+    base, totals = result["base"], result["totals"]
+    print(f"🧮 Stop {result['values']['stopLossPrice']}  size {base['positionSize']}  "
+          f"margin {base['requiredMargin']}{'  ⚠️ above account' if result['isMarginExceeded'] else ''}")
+    print(f"   risk {base['riskAmount']}  net loss {base['netLoss']}  entry fee {base['entryFee']}")
+    print(f"   break-even {base['breakEvenPrice']}  liquidation {base['liquidationPrice']}")
+    for tp in result["tps"]:
+        print(f"🎯 TP{tp['index'] + 1} {tp['percentSold']}%: net {tp['netProfit']}  R/R {tp['riskRewardRatio']}  "
+              f"RoC {tp['returnOnCapital']}%")
+    if result["values"]["totalPercentSold"] > 0:
+        print(f"   total net {totals['totalNetProfit']}  R/R {totals['totalRR']}  fees {totals['totalFees']}  "
+              f"max {totals['maxPotentialProfit']}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "bench":
+        rates, size = bench(parse_size(args.size))
+        print(f"⚡ grid          {rates['grid'] / 1e6:8.1f}M scenarios/s ({size} scenarios)")
+        print(f"⚡ history_hits  {rates['history_hits'] / 1e3:8.1f}k bars/s")
+        return 0
+    if args.command == "calc":
+        return _run_calc(args)
+
+    targets = parse_values(args.targets)
+    mults = parse_values(args.atr_mult)
+    trade_type = SHORT if args.short else LONG
+    atr, hit = args.atr, None
+    if args.symbol:
+        try:
+            k = CandleStore(args.store).load(args.exchange, args.symbol.upper(), args.tf)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        hit = history_hit_rates(k, mults, targets, trade_type, horizon=args.horizon)
+        if atr is None:
+            atr = float(ri.atr(k["high"], k["low"], k["close"], ATR_PERIOD)[-1])
+        print(f"📈 Hit rates from {args.symbol.upper()} {args.tf} ({len(k['time'])} bars, {args.horizon}-bar horizon)")
+    if atr is None:
+        print("❌ --atr is required without --symbol.")
+        return 1
+    split_rows = splits(len(targets), args.split_step)
+    if len(split_rows) == 0:
+        print(f"❌ {len(targets)} targets do not fit into 100% in steps of {args.split_step}%.")
+        return 1
+    try:
+        grid = scenario_grid(args.entry, atr, parse_values(args.risk), parse_values(args.leverage), mults,
+                             split_rows, targets, hit, trade_type, args.account, args.fees, args.mmr, args.trades)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"🧮 {grid['valid'].size} scenarios, {int(grid['valid'].sum())} valid (ATR {atr:g})")
+    for m, row in zip(mults, grid["hit"]):
+        print(f"   {m:4g}×ATR  " + "  ".join(f"{r:g}R {p:5.1%}" for r, p in zip(targets, row)))
+    for row in best_scenarios(grid, "growth", args.top, args.max_drawdown):
+        print(f"🏆 risk {row['risk']:5.2f}%  lev {row['leverage']:4g}×  stop {row['atr_mult']:4g}×ATR  "
+              f"split {'/'.join(f'{s:g}' for s in row['split'])}  EV {row['ev_pct']:+.3f}%  "
+              f"growth {row['growth']:+.5f}  DD {row['drawdown']:.1%}  RoC {row['ev_roc']:+.2f}%")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        np.savez_compressed(args.out, **grid)
+        print(f"💾 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
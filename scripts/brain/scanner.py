@@ -0,0 +1,219 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Multi-symbol indicator scanner over the local candle store.
+
+Every symbol × timeframe is one task in a process pool. A task replays the
+last `--lookback` bars through the native build of `technicals-wasm` (the same
+`TechnicalsCalculator` the Technicals panel runs), then derives the signals a
+screen cares about: RSI extremes, SuperTrend flips and RSI divergences
+(`divergence.py`, a port of `divergenceScanner.ts`). The result is one ranked
+table.
+
+    python scanner.py --timeframes 15m,1h,4h --top 30
+    python scanner.py --symbols BTCUSDT,ETHUSDT --rank divergence --json scan.json
+
+`--engine numpy` computes the same readings with `reference_indicators.py`
+for machines without a Rust toolchain.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import divergence
+import reference_indicators
+from candle_store import DEFAULT_EXCHANGE, CandleStore
+
+# 3x the EMA 200 period: the depth at which the seed stops dominating an
+# EMA. Same constant and reasoning as ANALYST_HISTORY_TARGET in the app
+# (ADR-0009).
+HISTORY_BARS = 600
+LOOKBACK_BARS = 120
+
+RSI_LENGTH = 14
+RSI_OVERBOUGHT = 70.0
+RSI_OVERSOLD = 30.0
+SUPERTREND_KEY = "SuperTrend_10-3"
+
+RANK_KEYS = ("score", "rsi", "flip", "divergence")
+
+
+def _readings_native(klines, lookback):
+    import native_technicals
+
+    readings = native_technicals.replay(klines, lookback)
+    rsi = np.array([float(r["oscillators"].get(f"RSI{RSI_LENGTH}", "nan")) for r in readings])
+    trend = np.array([float(r["volatility"].get(SUPERTREND_KEY, "nan")) for r in readings])
+    return rsi, trend
+
+
+def _readings_numpy(klines, lookback):
+    rsi = reference_indicators.rsi(klines["close"], RSI_LENGTH)
+    _, trend = reference_indicators.supertrend(klines["high"], klines["low"], klines["close"], 10, 3.0)
+    return rsi[-lookback:], trend[-lookback:].astype(np.float64)
+
+
+def scan_series(task):
+    """
+    Worker entry point. `task` is (store_root, exchange, symbol, tf, history,
+    lookback, engine); returns one result row, or a row with `error` set.
+    """
+    root, exchange, symbol, tf, history, lookback, engine = task
+    row = {"exchange": exchange, "symbol": symbol, "tf": tf}
+    try:
+        stored = CandleStore(root).load(exchange, symbol, tf)
+        klines = {f: np.asarray(v[-history:], dtype=np.float64) for f, v in stored.items()}
+        n = len(klines["close"])
+        lookback = min(lookback, n - 1)
+        if lookback < 2 * divergence.PIVOT_RANGE + 1:
+            row["error"] = f"only {n} bars"
+            return row
+
+        if engine == "native":
+            rsi, trend = _readings_native(klines, lookback)
+        else:
+            rsi, trend = _readings_numpy(klines, lookback)
+
+        highs = klines["high"][-lookback:]
+        lows = klines["low"][-lookback:]
+        row.update(summarize(rsi, trend, highs, lows))
+        row["close"] = float(klines["close"][-1])
+        row["bars"] = n
+    except Exception as e:  # one bad series must not sink the whole scan
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def summarize(rsi, trend, highs, lows):
+    """Signals and score of one series from its per-bar RSI and SuperTrend readings."""
+    last_rsi = float(rsi[-1])
+    out = {"rsi": last_rsi, "rsi_state": "neutral"}
+    if last_rsi >= RSI_OVERBOUGHT:
+        out["rsi_state"] = "overbought"
+    elif last_rsi <= RSI_OVERSOLD:
+        out["rsi_state"] = "oversold"
+
+    valid = ~np.isnan(trend)
+    flips = np.flatnonzero(valid[1:] & valid[:-1] & (trend[1:] != trend[:-1])) + 1
+    out["trend"] = "bull" if trend[-1] == 1 else "bear" if trend[-1] == -1 else "n/a"
+    if len(flips):
+        out["bars_since_flip"] = int(len(trend) - 1 - flips[-1])
+    else:
+        out["bars_since_flip"] = None
+
+    divs = divergence.scan(highs, lows, rsi, "RSI")
+    out["divergences"] = sorted({f"{d['type']} {d['side']}" for d in divs})
+
+    # Each component lands in [0, 1]; the score is their sum, so a symbol
+    # showing all three signals at full strength scores 3.
+    rsi_strength = 0.0 if np.isnan(last_rsi) else abs(last_rsi - 50.0) / 50.0
+    flip_strength = 0.0
+    if out["bars_since_flip"] is not None:
+        flip_strength = max(0.0, 1.0 - out["bars_since_flip"] / 10.0)
+    div_strength = min(1.0, sum(1.0 if d.startswith("Regular") else 0.5 for d in out["divergences"]))
+    out["score"] = round(rsi_strength + flip_strength + div_strength, 4)
+    out["_rank"] = {"rsi": rsi_strength, "flip": flip_strength, "divergence": div_strength}
+    return out
+
+
+def rank(rows, key="score"):
+    ok = [r for r in rows if "error" not in r]
+    if key == "score":
+        return sorted(ok, key=lambda r: r["score"], reverse=True)
+    return sorted(ok, key=lambda r: (r["_rank"][key], r["score"]), reverse=True)
+
+
+def format_table(rows):
+    header = f"{'#':>3} {'symbol':<14} {'tf':<4} {'close':>14} {'rsi':>6} {'trend':<5} {'flip':>5} {'score':>6}  divergences"
+    lines = [header, "-" * len(header)]
+    for i, r in enumerate(rows, 1):
+        flip = "-" if r["bars_since_flip"] is None else str(r["bars_since_flip"])
+        lines.append(
+            f"{i:>3} {r['symbol']:<14} {r['tf']:<4} {r['close']:>14.6g} {r['rsi']:>6.1f} "
+            f"{r['trend']:<5} {flip:>5} {r['score']:>6.2f}  {', '.join(r['divergences']) or '-'}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Scan the local candle store for indicator signals.")
+    p.add_argument("--store", default=None, help="Candle store root (default: CACHY_CANDLE_STORE or ./candle_store).")
+    p.add_argument("--exchange", default=DEFAULT_EXCHANGE)
+    p.add_argument("--symbols", default="all", help="Comma-separated symbols, or 'all'.")
+    p.add_argument("--timeframes", default="all", help="Comma-separated timeframes, or 'all'.")
+    p.add_argument("--history", type=int, default=HISTORY_BARS, help="Bars loaded per series.")
+    p.add_argument("--lookback", type=int, default=LOOKBACK_BARS, help="Bars replayed bar by bar.")
+    p.add_argument("--engine", choices=("native", "numpy"), default="native")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size.")
+    p.add_argument("--rank", choices=RANK_KEYS, default="score")
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--json", dest="json_out", help="Also write all rows to this JSON file.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = CandleStore(args.store)
+
+    if args.engine == "native":
+        import native_technicals
+        try:
+            native_technicals.find_library()
+        except native_technicals.NativeLibraryMissing as e:
+            print(f"❌ {e}")
+            return 1
+
+    symbols = None if args.symbols == "all" else {s.strip().upper() for s in args.symbols.split(",")}
+    tfs = None if args.timeframes == "all" else {t.strip() for t in args.timeframes.split(",")}
+    series = [
+        (ex, sym, tf) for ex, sym, tf in store.series(args.exchange)
+        if (symbols is None or sym in symbols) and (tfs is None or tf in tfs)
+    ]
+    if not series:
+        print(f"❌ No matching series in {store.root}")
+        return 1
+
+    print(f"🔎 Scanning {len(series)} series with {args.workers} workers ({args.engine})...")
+    tasks = [(store.root, ex, sym, tf, args.history, args.lookback, args.engine) for ex, sym, tf in series]
+    t0 = time.perf_counter()
+    chunksize = max(1, len(tasks) // (4 * max(1, args.workers)))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(scan_series, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - t0
+
+    failed = [r for r in rows if "error" in r]
+    ranked = rank(rows, args.rank)
+    print(format_table(ranked[:args.top]))
+    print(f"\n✅ {len(rows) - len(failed)} series in {elapsed:.2f}s", end="")
+    print(f", {len(failed)} skipped" if failed else "")
+    for r in failed[:10]:
+        print(f"   ⚠️ {r['symbol']} {r['tf']}: {r['error']}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump([{k: v for k, v in r.items() if k != "_rank"} for r in ranked + failed], f, indent=2)
+        print(f"💾 Rows written to {args.json_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Deterministic synthetic kline series for benchmarks and offline checks.
+
+The generator is seeded, so the same (n_bars, seed) pair always produces the
+same series — results from two runs are comparable without shipping data.
+"""
+
+import numpy as np
+
+KLINE_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+
+def random_walk_klines(n_bars, seed=42, start_price=30000.0, interval_ms=60_000,
+                       start_ms=1_700_000_000_000, volatility=0.002):
+    """
+    Geometric random walk shaped like the app's klines.
+
+    Returns a dict of equally long arrays: `time` (int64 ms, bar open) and
+    float64 `open`, `high`, `low`, `close`, `volume`. Every bar opens at the
+    previous close and its high/low enclose both open and close.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, volatility, n_bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+
+    wick = np.abs(rng.normal(0.0, volatility / 2, (2, n_bars)))
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high * (1.0 + wick[0])
+    low = body_low * (1.0 - wick[1])
+    volume = rng.gamma(2.0, 50.0, n_bars)
+    time = start_ms + np.arange(n_bars, dtype=np.int64) * interval_ms
+
+    return {
+        "time": time,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    }
+
+
+def parse_size(text):
+    """'1k' -> 1000, '10m' -> 10_000_000, '2500' -> 2500."""
+    text = text.strip().lower()
+    factor = 1
+    if text.endswith("k"):
+        factor, text = 1_000, text[:-1]
+    elif text.endswith("m"):
+        factor, text = 1_000_000, text[:-1]
+    return int(float(text) * factor)
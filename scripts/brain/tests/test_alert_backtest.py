@@ -0,0 +1,123 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+import alert_backtest as ab
+from synthetic import random_walk_klines
+
+
+def engine_events(definitions, symbol, prices):
+    """Line-by-line transcription of AlertEngine::evaluate in alert_engine.rs."""
+    alerts = [dict(d) for d in definitions]
+    last = None
+    events = []
+    for step, price in enumerate(prices):
+        for i, a in enumerate(alerts):
+            if not a["active"] or a["symbol"] != symbol:
+                continue
+            (cond, target), = a["condition"].items()
+            target = float(target)
+            if cond == "price_reached":
+                if last is not None:
+                    hit = (last < target <= price) or (last > target >= price)
+                else:
+                    hit = price == target
+            elif cond == "price_cross_up":
+                hit = last is not None and last < target <= price
+            else:
+                hit = last is not None and last > target >= price
+            if hit:
+                events.append((step, i))
+                a["active"] = False
+        last = price
+    return events
+
+
+def _definitions(prices, n, seed):
+    rng = np.random.default_rng(seed)
+    targets = rng.uniform(prices.min(), prices.max(), n)
+    # A few exact hits so the equality edges are exercised too.
+    targets[:5] = rng.choice(prices, 5)
+    return [
+        {"id": str(i), "symbol": "BTCUSDT", "condition": {ab.CONDITIONS[i % 3]: repr(float(t))}, "active": i % 17 != 0}
+        for i, t in enumerate(targets)
+    ]
+
+
+@pytest.mark.parametrize("chunk", [ab.STEP_CHUNK, 7])
+def test_vectorized_port_matches_the_sequential_engine(chunk):
+    prices = np.round(random_walk_klines(400, seed=5)["close"], 0)
+    definitions = _definitions(prices, 300, seed=6)
+    rules = ab.parse_rules(definitions)
+    steps, fired = ab.evaluate(prices, rules["kind"], rules["target"], rules["active"], chunk=chunk)
+    assert list(zip(steps.tolist(), fired.tolist())) == engine_events(definitions, "BTCUSDT", prices)
+
+
+def test_first_tick_only_fires_an_exact_price_reached():
+    rules = ab.parse_rules([
+        {"id": "a", "symbol": "X", "condition": {"price_reached": "100"}, "active": True},
+        {"id": "b", "symbol": "X", "condition": {"price_cross_up": "100"}, "active": True},
+    ])
+    steps, fired = ab.evaluate(np.array([100.0, 100.0]), rules["kind"], rules["target"])
+    assert steps.tolist() == [0]
+    assert fired.tolist() == [0]
+
+
+def test_rearm_counts_every_crossing():
+    prices = np.array([9.0, 11.0, 9.0, 11.0, 9.0, 11.0])
+    rules = ab.parse_rules([{"id": "up", "symbol": "X", "condition": {"price_cross_up": "10"}, "active": True}])
+    once, _ = ab.evaluate(prices, rules["kind"], rules["target"])
+    every, _ = ab.evaluate(prices, rules["kind"], rules["target"], rearm=True)
+    assert once.tolist() == [1]
+    assert every.tolist() == [1, 3, 5]
+
+
+def test_ohlc_path_visits_wicks_in_bar_order():
+    klines = {"open": [10.0, 10.0], "high": [12.0, 11.0], "low": [9.0, 8.0], "close": [11.0, 9.0]}
+    prices, bars = ab.price_path(klines, "ohlc")
+    assert prices.tolist() == [10, 9, 12, 11, 10, 11, 8, 9]
+    assert bars.tolist() == [0, 0, 0, 0, 1, 1, 1, 1]
+
+
+def test_outcomes_and_summary():
+    klines = random_walk_klines(300, seed=8)
+    definitions = ab.grid_rules("BTCUSDT", klines["low"].min(), klines["high"].max(), 50)
+    rules = ab.parse_rules(definitions)
+    events = ab.backtest_symbol(klines, rules, np.arange(len(definitions)), rearm=True, horizons=(1, 10))
+    assert np.all(events["direction"][rules["kind"][events["rule"]] == ab.CROSS_UP] == 1)
+    lead = events["lead_bars"][~np.isnan(events["lead_bars"])]
+    assert lead.min() >= 1 and lead.max() <= 10
+
+    summary = ab.summarize_rules(events, len(definitions), horizons=(1, 10))
+    assert summary["fires"].sum() == len(events["rule"])
+    never = summary["fires"] == 0
+    assert np.all(summary["first_fire"][never] == -1)
+
+
+def test_native_engine_parity():
+    native = pytest.importorskip("native_technicals")
+    try:
+        native.find_library()
+    except native.NativeLibraryMissing:
+        pytest.skip("native technicals library not built")
+    prices = np.round(random_walk_klines(400, seed=5)["close"], 0)
+    definitions = _definitions(prices, 300, seed=6)
+    events = native.alerts_replay(definitions, "BTCUSDT", prices, np.arange(len(prices)))
+    rules = ab.parse_rules(definitions)
+    steps, fired = ab.evaluate(prices, rules["kind"], rules["target"], rules["active"])
+    assert [(e["timestamp"], e["alert_id"]) for e in events] == [(s, rules["id"][r]) for s, r in zip(steps, fired)]
@@ -0,0 +1,115 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import pytest
+import yaml
+
+import autotune
+from cachy_brain import config_args
+
+SPACE = {
+    "torch_threads": (1, 2, 4),
+    "n_envs": (1, 2, 4),
+    "n_steps": (256, 1024),
+    "batch_size": (64, 512),
+    "n_epochs": (10,),
+    "compile": (False, True),
+}
+BASE = {"torch_threads": 4, "n_envs": 2, "n_steps": 1024, "batch_size": 64, "n_epochs": 10, "compile": False}
+
+
+def _fake_measure(calls):
+    """Throughput that grows with envs, rollout and batch size, peaks at 2 threads; compiling is unstable."""
+    def measure(profile):
+        calls.append(profile)
+        rate = 1000 * profile["n_envs"] * (1.5 if profile["batch_size"] == 512 else 1.0)
+        rate *= 1.1 if profile["n_steps"] == 1024 else 1.0
+        rate /= 1 + abs(profile["torch_threads"] - 2)
+        return {"steps_per_s": rate, "env_steps_per_s": rate, "grad_updates_per_s": 1.0, "spread": 0.0,
+                "stable": not profile["compile"], "error": None}
+    return measure
+
+
+def test_coordinate_search_finds_the_best_stable_profile_with_few_trials():
+    calls = []
+    best, trials = autotune.coordinate_search(SPACE, BASE, _fake_measure(calls))
+    assert best == {"torch_threads": 2, "n_envs": 4, "n_steps": 1024, "batch_size": 512, "n_epochs": 10,
+                    "compile": False}
+    # Each profile is measured once, far fewer than the 72-profile grid.
+    assert len(calls) == len(trials) == len({autotune.profile_key(p) for p in calls})
+    assert len(calls) <= sum(len(v) for v in SPACE.values())
+
+    grid_best, grid = autotune.exhaustive_search(SPACE, _fake_measure([]))
+    assert grid_best == best
+    assert all(autotune.valid(t["profile"]) for t in grid)
+
+
+def test_invalid_minibatch_splits_are_skipped():
+    assert autotune.valid({"n_steps": 256, "n_envs": 1, "batch_size": 64})
+    assert not autotune.valid({"n_steps": 256, "n_envs": 1, "batch_size": 512})
+    assert not autotune.valid({"n_steps": 100, "n_envs": 3, "batch_size": 64})
+
+
+def test_stability_needs_agreeing_finite_repeats():
+    def run(rate, finite=True, error=None):
+        return {"steps_per_s": rate, "env_steps_per_s": rate, "grad_updates_per_s": 2.0, "finite": finite,
+                "error": error}
+
+    assert autotune.summarize([run(1000), run(1050)])["stable"]
+    assert not autotune.summarize([run(1000), run(1500)])["stable"]
+    assert not autotune.summarize([run(1000), run(1000, finite=False)])["stable"]
+    failed = autotune.summarize([run(None, error="RuntimeError: no compiler")])
+    assert not failed["stable"] and failed["steps_per_s"] is None
+    assert autotune.score(failed) is None
+
+
+def test_profile_lands_in_the_train_section_as_train_flags(tmp_path):
+    path = tmp_path / "brain.yaml"
+    path.write_text(yaml.safe_dump({"train": {"data_source": "STORE", "n_envs": 1}, "features": {"tf": "1h"}}))
+    profile = {**BASE, "compile": True}
+    autotune.write_profile(str(path), profile)
+    config = yaml.safe_load(path.read_text())
+    assert config["features"] == {"tf": "1h"}
+    assert config["train"]["data_source"] == "STORE"
+    argv = config_args(config, "train")
+    assert argv[argv.index("--n-envs") + 1] == "2"
+    assert argv[argv.index("--torch-threads") + 1] == "4"
+    assert "--compile" in argv
+
+
+def test_minibatch_size_and_epochs_are_held_unless_listed():
+    args = autotune.build_parser().parse_args([])
+    assert args.batch_sizes == (64,) and args.epochs == (10,)
+    args = autotune.build_parser().parse_args(["--batch-sizes", "64,256"])
+    assert args.batch_sizes == (64, 256)
+
+
+def test_thread_counts():
+    assert autotune.thread_counts(1) == (1,)
+    assert autotune.thread_counts(6) == (1, 2, 4, 6)
+    assert autotune.thread_counts(8) == (1, 2, 4, 8)
+
+
+def test_trial_measures_a_short_run(tmp_path):
+    pytest.importorskip("stable_baselines3")
+    import dataset
+    from test_dataset import _store
+
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "ds"))
+    profile = {"torch_threads": 1, "n_envs": 2, "n_steps": 32, "batch_size": 32, "n_epochs": 1, "compile": False}
+    result = autotune.trial(dataset.load(str(tmp_path / "ds")), profile, budget=128)
+    assert result["error"] is None and result["finite"]
+    assert result["steps_per_s"] > 0 and result["grad_updates_per_s"] > 0
@@ -0,0 +1,138 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import os
+import time
+
+import brain_load
+import brain_server as bs
+
+
+class SumModel:
+    """Stands in for an onnxruntime session: action = scale * sum of the row."""
+
+    def __init__(self, scale=1.0):
+        self.inputs = [("x", 2), ("y", 1)]
+        self.scale = scale
+        self.batches = []
+
+    def run(self, feed):
+        self.batches.append(len(feed["x"]))
+        return self.scale * (feed["x"].sum(axis=1, keepdims=True) + feed["y"])
+
+
+def _registry(tmp_path, scales):
+    models = {}
+
+    def loader(path):
+        models[path] = SumModel(scales.pop(0))
+        return models[path]
+
+    (tmp_path / "sum.onnx").write_bytes(b"")
+    registry = bs.ModelRegistry(str(tmp_path), loader=loader, settle_s=0)
+    registry.load_all()
+    return registry, models
+
+
+def test_parse_feed_accepts_one_or_several_rows():
+    model = SumModel()
+    feed, rows = bs.parse_feed(model, {"x": [1, 2], "y": [3]})
+    assert rows == 1 and feed["x"].shape == (1, 2)
+    feed, rows = bs.parse_feed(model, {"x": [[1, 2], [3, 4]], "y": [5, 6]})
+    assert rows == 2 and feed["y"].shape == (2, 1)
+    for bad in ({"x": [1, 2]}, {"x": [1, 2, 3], "y": [1]}, {"x": [1, 2], "y": [1, 2]}, {"x": "a", "y": [1]}):
+        try:
+            bs.parse_feed(model, bad)
+        except bs.RequestError as e:
+            assert e.status == 400
+        else:
+            raise AssertionError(f"accepted {bad}")
+
+
+def test_batcher_fills_batches_and_routes_results(tmp_path):
+    registry, models = _registry(tmp_path, [1.0])
+    model = next(iter(models.values()))
+
+    async def scenario():
+        metrics = bs.Metrics()
+        batcher = bs.Batcher("sum", registry, metrics, max_batch=4, max_wait_s=0.05)
+        feeds = [bs.parse_feed(model, {"x": [i, i], "y": [0.5]}) for i in range(10)]
+        outs = await asyncio.gather(*(batcher.submit(f, n) for f, n in feeds))
+        await batcher.close()
+        return outs, metrics.snapshot()
+
+    outs, snapshot = asyncio.run(scenario())
+    assert [float(o[0, 0]) for o in outs] == [2 * i + 0.5 for i in range(10)]
+    assert model.batches == [4, 4, 2]
+    stats = snapshot["models"]["sum"]
+    assert stats["batches"] == 3 and stats["max_batch_rows"] == 4 and stats["queue_depth"] == 0
+
+
+def test_batcher_flushes_a_lone_request_after_max_wait(tmp_path):
+    registry, models = _registry(tmp_path, [1.0])
+
+    async def scenario():
+        batcher = bs.Batcher("sum", registry, bs.Metrics(), max_batch=64, max_wait_s=0.01)
+        t0 = time.perf_counter()
+        out = await batcher.submit(*bs.parse_feed(models[str(tmp_path / "sum.onnx")], {"x": [1, 1], "y": [1]}))
+        await batcher.close()
+        return out, time.perf_counter() - t0
+
+    out, elapsed = asyncio.run(scenario())
+    assert float(out[0, 0]) == 3.0
+    assert elapsed < 1.0
+
+
+def test_registry_reloads_changed_files_only(tmp_path):
+    registry, _ = _registry(tmp_path, [1.0, 2.0])
+    assert registry.scan() == []
+    path = tmp_path / "sum.onnx"
+    mtime = os.stat(path).st_mtime - 5
+    os.utime(path, (mtime, mtime))
+    assert [name for name, _, _ in registry.scan()] == ["sum"]
+    registry.load_all()
+    assert registry.get("sum").version == 2 and registry.get("sum").model.scale == 2.0
+
+
+def test_http_and_websocket_round_trip(tmp_path):
+    registry, _ = _registry(tmp_path, [10.0])
+
+    async def scenario():
+        server = bs.BrainServer(registry, max_batch=8, max_wait_ms=1, reload_interval=0)
+        port = await server.start(port=0)
+        try:
+            http = await brain_load.HttpConnection.open("127.0.0.1", port)
+            ok = await http.request("POST", "/v1/models/sum/infer", {"inputs": {"x": [[1, 2], [3, 4]], "y": [1, 1]}})
+            bad = await http.request("POST", "/v1/models/sum/infer", {"inputs": {"x": [1]}})
+            missing = await http.request("POST", "/v1/models/nope/infer", {"inputs": {}})
+            ws = await brain_load.WebSocketConnection.open("127.0.0.1", port)
+            ws_ok = await ws.request("sum", {"x": [1, 1], "y": [0]})
+            load = await brain_load.run_load("127.0.0.1", port, "sum", mode="ws", concurrency=4, requests=40)
+            metrics = await http.request("GET", "/metrics")
+            await ws.close()
+            await http.close()
+        finally:
+            await server.close()
+        return ok, bad, missing, ws_ok, load, metrics
+
+    ok, bad, missing, ws_ok, load, metrics = asyncio.run(scenario())
+    assert ok[0] == 200 and ok[1]["action"] == [[40.0], [80.0]] and ok[1]["version"] == 1
+    assert bad[0] == 400 and missing[0] == 404
+    assert ws_ok[0] == 200 and ws_ok[1]["action"] == [[20.0]]
+    assert load["requests"] == 40 and load["errors"] == 0
+    stats = metrics[1]["models"]["sum"]
+    assert stats["requests"] == 42 and stats["errors"] == 1 and stats["latency_ms"]["p50"] is not None
@@ -0,0 +1,76 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import cachy_brain
+from candle_store import CandleStore
+from synthetic import random_walk_klines
+
+
+def test_config_section_becomes_flags():
+    config = {"train": {"data_source": "STORE", "timesteps": 5000, "resume": True, "patience": None,
+                        "symbols": ["BTCUSDT", "ETHUSDT"]},
+              "export": {"best": "sharpe"}}
+    assert cachy_brain.config_args(config, "train") == [
+        "--data-source", "STORE", "--timesteps", "5000", "--resume", "--symbols", "BTCUSDT,ETHUSDT"]
+    assert cachy_brain.config_args(config, "bench") == []
+
+
+def test_data_lists_store_without_numpy(tmp_path):
+    store = CandleStore(str(tmp_path))
+    klines = random_walk_klines(50)
+    store.write("bitunix", "BTCUSDT", "1h", klines)
+    store.write_funding("bitunix", "BTCUSDT", {"time": np.array([0, 28_800_000], dtype=np.int64),
+                                               "rate": np.array([1e-4, -2e-4])})
+    assert cachy_brain.cached_series(str(tmp_path)) == [
+        ("bitunix", "BTCUSDT", "1h", 50, int(klines["time"][0]), int(klines["time"][-1])),
+        ("bitunix", "BTCUSDT", "funding", 2, 0, 28_800_000),
+    ]
+
+    # The listing path must not pull in numpy (or anything heavier).
+    code = ("import sys, cachy_brain; cachy_brain.main(['data', '--store', sys.argv[1], '--datasets', sys.argv[1]]);"
+            " assert 'numpy' not in sys.modules, 'numpy imported'")
+    out = subprocess.run([sys.executable, "-c", code, str(tmp_path)], cwd=os.path.dirname(cachy_brain.__file__),
+                         capture_output=True, text=True, check=True).stdout
+    assert "BTCUSDT" in out and "1 series" not in out and "2 series" in out
+
+
+def test_command_line_overrides_config(tmp_path, monkeypatch):
+    config = tmp_path / "brain.yaml"
+    config.write_text("data:\n  store: /nonexistent\n  datasets: /nonexistent\n")
+    seen = []
+    monkeypatch.setattr(cachy_brain, "list_data", lambda argv: seen.append(argv) or 0)
+    assert cachy_brain.main(["--config", str(config), "data", "--store", str(tmp_path)]) == 0
+    assert seen == [["--store", "/nonexistent", "--datasets", "/nonexistent", "--store", str(tmp_path)]]
+
+
+def test_command_exit_code_is_passed_through(monkeypatch):
+    fake = types.SimpleNamespace(main=lambda argv: 1)
+    monkeypatch.setattr(cachy_brain.importlib, "import_module", lambda name: fake)
+    assert cachy_brain.main(["train", "--data-source", "STORE"]) == 1
+
+
+def test_train_without_a_dataset_fails(tmp_path):
+    pytest.importorskip("stable_baselines3")
+    import train
+
+    assert train.main(["--data-source", "STORE", "--dataset", str(tmp_path / "missing")]) == 1
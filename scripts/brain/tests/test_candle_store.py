@@ -0,0 +1,65 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+
+import numpy as np
+
+from candle_store import CandleStore, merge_klines, timeframe_ms
+from synthetic import random_walk_klines
+
+
+def test_timeframe_table_matches_storage_service():
+    assert timeframe_ms("1m") == 60_000
+    assert timeframe_ms("4h") == 4 * 3_600_000
+    assert timeframe_ms("1w") == 604_800_000
+    assert timeframe_ms("1M") == 30 * 86_400_000
+    assert timeframe_ms("bogus") == 60_000
+
+
+def test_merge_dedups_by_time_and_prefers_the_newer_write():
+    old = random_walk_klines(10, seed=1)
+    new = {k: v[5:].copy() for k, v in random_walk_klines(15, seed=2).items()}
+    merged = merge_klines(old, new)
+    assert np.all(np.diff(merged["time"]) > 0)
+    assert len(merged["time"]) == 15
+    np.testing.assert_array_equal(merged["close"][5:], new["close"])
+    np.testing.assert_array_equal(merged["close"][:5], old["close"][:5])
+
+
+def test_write_then_load_memory_maps_the_columns(tmp_path):
+    store = CandleStore(str(tmp_path))
+    klines = random_walk_klines(100)
+    assert store.write("bitunix", "btcusdt", "1h", klines) == 100
+    assert store.series() == [("bitunix", "BTCUSDT", "1h")]
+    loaded = store.load("bitunix", "BTCUSDT", "1h")
+    assert isinstance(loaded["close"], np.memmap)
+    np.testing.assert_array_equal(loaded["time"], klines["time"])
+
+
+def test_import_of_indexeddb_chunks(tmp_path):
+    rows = [{"time": 60_000 * i, "open": "1.5", "high": "2", "low": "1", "close": str(1 + i), "volume": "10"}
+            for i in range(4)]
+    records = [
+        {"id": "ETHUSDT:1m:0", "symbol": "ETHUSDT", "tf": "1m", "data": rows[:3], "lastUpdated": 0},
+        {"id": "ETHUSDT:1m:1", "symbol": "ETHUSDT", "tf": "1m", "data": rows[2:], "lastUpdated": 0},
+    ]
+    export = tmp_path / "export.json"
+    export.write_text(json.dumps(records))
+
+    store = CandleStore(str(tmp_path / "store"))
+    assert store.import_indexeddb_export(str(export)) == {("ETHUSDT", "1m"): 4}
+    np.testing.assert_array_equal(store.load("bitunix", "ETHUSDT", "1m")["close"], [1, 2, 3, 4])
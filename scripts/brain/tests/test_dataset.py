@@ -0,0 +1,125 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+import dataset
+from candle_store import CandleStore
+from synthetic import random_walk_klines
+
+HOUR = 3_600_000
+
+
+def _store(tmp_path, drop_bar=None):
+    store = CandleStore(str(tmp_path / "store"))
+    for seed, symbol in enumerate(("BTCUSDT", "ETHUSDT")):
+        k = random_walk_klines(300, seed=seed, interval_ms=HOUR, start_ms=1_700_006_400_000)
+        if drop_bar is not None and symbol == "ETHUSDT":
+            k = {f: np.delete(v, drop_bar) for f, v in k.items()}
+        store.write("bitunix", symbol, "1h", k)
+    store.write_funding("bitunix", "BTCUSDT", {
+        "time": np.array([1_700_006_400_000 + 100 * HOUR, 1_700_006_400_000 + 108 * HOUR]),
+        "rate": np.array([0.0001, -0.0002]),
+    })
+    return store
+
+
+def test_funding_lands_in_the_bar_it_settles_in():
+    grid = np.arange(0, 10 * HOUR, HOUR)
+    funding = {"time": np.array([2 * HOUR, 8 * HOUR]), "rate": np.array([0.001, 0.002])}
+    settled, last = dataset.funding_per_bar(funding, grid, HOUR)
+    assert np.flatnonzero(settled).tolist() == [1, 7]
+    assert last.tolist() == [0, 0.001, 0.001, 0.001, 0.001, 0.001, 0.001, 0.002, 0.002, 0.002]
+
+
+def test_build_aligns_symbols_and_marks_missing_bars(tmp_path):
+    store = _store(tmp_path, drop_bar=200)
+    manifest = dataset.build(store, "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "ds"))
+    data = dataset.load(str(tmp_path / "ds"))
+
+    assert isinstance(data["features"], np.memmap)
+    n = manifest["bars"]
+    assert data["features"].shape == (n, 2, len(dataset.feature_names()))
+    assert np.all(np.diff(data["time"]) == HOUR)
+    assert np.isfinite(data["features"]).all()
+
+    missing = np.flatnonzero(~data["valid"][:, 1])
+    assert len(missing) == 1 and data["valid"][:, 0].all()
+    m = missing[0]
+    assert data["close"][m, 1] == data["close"][m - 1, 1]
+    assert data["features"][m, 1, 0] == 0.0
+
+    assert data["funding"][:, 0].sum() == pytest.approx(-0.0001)
+    assert data["funding"][:, 1].sum() == 0.0
+    assert data["features"][-1, 0, -1] == pytest.approx(-2.0)
+
+
+def test_build_rejects_a_timeframe_the_exchange_does_not_serve(tmp_path):
+    with pytest.raises(ValueError):
+        dataset.build(_store(tmp_path), "bitget", ["BTCUSDT"], "1M", str(tmp_path / "ds"))
+
+
+def test_float32_dataset_halves_the_footprint(tmp_path):
+    store = _store(tmp_path)
+    dataset.build(store, "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "f64"))
+    manifest = dataset.build(store, "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "f32"), dtype="float32")
+    wide, compact = dataset.load(str(tmp_path / "f64")), dataset.load(str(tmp_path / "f32"))
+
+    assert manifest["dtype"] == "float32" and compact["features"].dtype == np.float32
+    assert compact["time"].dtype == np.int64
+    np.testing.assert_allclose(compact["features"], wide["features"], rtol=1e-6, atol=1e-6)
+
+    fp64, fp32 = dataset.footprint(wide), dataset.footprint(compact, window_bars=100)
+    assert fp32["arrays"]["features"] * 2 == fp64["arrays"]["features"]
+    assert fp32["resident"] == 0 and fp32["mapped"] == sum(fp32["arrays"].values())
+    assert fp32["frame"] > 2 * fp32["mapped"]
+    assert fp32["windows"] == 2 * 100 * (4 * len(manifest["features"]) + 16)
+
+
+def test_load_reads_into_ram_only_within_the_budget(tmp_path):
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT"], "1h", str(tmp_path / "ds"))
+    size = sum(dataset.footprint(dataset.load(str(tmp_path / "ds")))["arrays"].values())
+    assert not isinstance(dataset.load(str(tmp_path / "ds"), budget_bytes=size)["features"], np.memmap)
+    assert isinstance(dataset.load(str(tmp_path / "ds"), budget_bytes=size - 1)["features"], np.memmap)
+
+
+def test_append_matches_a_full_rebuild(tmp_path):
+    full = CandleStore(str(tmp_path / "full"))
+    head = CandleStore(str(tmp_path / "head"))
+    for seed, symbol in enumerate(("BTCUSDT", "ETHUSDT")):
+        k = random_walk_klines(1600, seed=seed, interval_ms=HOUR, start_ms=1_700_006_400_000)
+        if symbol == "ETHUSDT":
+            k = {f: np.delete(v, 1450) for f, v in k.items()}
+        full.write("bitunix", symbol, "1h", k)
+        head.write("bitunix", symbol, "1h", {f: v[:1400] for f, v in k.items()})
+    for store in (full, head):
+        store.write_funding("bitunix", "BTCUSDT", {
+            "time": np.array([1_700_006_400_000 + 1420 * HOUR]), "rate": np.array([0.0003])})
+
+    dataset.build(full, "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "rebuilt"))
+    dataset.build(head, "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "grown"))
+    manifest, added = dataset.append(full, str(tmp_path / "grown"))
+    assert added == 200
+    assert dataset.append(full, str(tmp_path / "grown"))[1] == 0
+
+    rebuilt, grown = dataset.load(str(tmp_path / "rebuilt")), dataset.load(str(tmp_path / "grown"))
+    assert manifest["bars"] == rebuilt["manifest"]["bars"]
+    np.testing.assert_array_equal(grown["time"], rebuilt["time"])
+    np.testing.assert_array_equal(grown["valid"], rebuilt["valid"])
+    np.testing.assert_array_equal(grown["funding"], rebuilt["funding"])
+    np.testing.assert_allclose(grown["close"], rebuilt["close"])
+    np.testing.assert_allclose(grown["features"], rebuilt["features"], rtol=1e-9, atol=1e-12)
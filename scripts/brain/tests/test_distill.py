@@ -0,0 +1,64 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("stable_baselines3")
+pytest.importorskip("onnx")
+
+import distill  # noqa: E402
+
+
+def test_student_names():
+    assert distill.hidden_sizes("mlp16") == (16,)
+    assert distill.hidden_sizes("mlp32x2") == (32, 32)
+
+
+def test_agreement_uses_a_dead_zone():
+    teacher = np.array([[0.5], [0.05], [-0.5], [0.2]])
+    student = np.array([[0.4], [-0.05], [0.3], [0.2]])
+    agree, mae = distill.agreement(student, teacher)
+    assert agree == 0.75
+    assert mae == pytest.approx((0.1 + 0.1 + 0.8 + 0.0) / 4)
+
+
+def test_small_mlp_learns_a_smooth_teacher():
+    rng = np.random.default_rng(0)
+    obs = rng.standard_normal((4000, 8))
+    actions = np.tanh(obs @ rng.standard_normal((8, 1)) * 0.5)
+    student = distill.train_mlp(obs[:3000], actions[:3000], (32, 32), epochs=40)
+    agree, mae = distill.agreement(distill.predict_mlp(student, obs[3000:]), actions[3000:])
+    assert agree > 0.9
+    assert mae < 0.1
+
+
+def test_teacher_observations_sample_the_mapped_dataset(tmp_path):
+    features = np.lib.format.open_memmap(str(tmp_path / "features.npy"), "w+", np.float32, (1000, 2, 3))
+    features[:] = np.arange(1000, dtype=np.float32)[:, None, None]
+    features.flush()
+    data = {"features": np.load(str(tmp_path / "features.npy"), mmap_mode="r")}
+    train, val = distill.teacher_observations(data, np.random.default_rng(0), max_samples=200)
+    assert train.dtype == val.dtype == np.float32
+    assert train.shape == (160, 4) and val.shape == (40, 4)
+    # Split by time, distinct bars, and the position column in [-1, 1].
+    assert train[:, 0].max() < 800 <= val[:, 0].min()
+    assert len(np.unique(train[:, 0])) == 80
+    assert np.all(np.abs(train[:, 3]) <= 1.0)
+
+    train, val = distill.teacher_observations(data, np.random.default_rng(0), max_samples=10_000)
+    assert len(train) + len(val) == 2000
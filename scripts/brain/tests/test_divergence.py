@@ -0,0 +1,49 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+import divergence
+
+
+def test_find_pivots_matches_the_ts_neighbourhood_rule():
+    values = np.array([1, 3, 2, 5, 4, 4, 6, 1, 0, 2, 3], dtype=float)
+    highs, lows = divergence.find_pivots(values, 2)
+    assert highs.tolist() == [3, 6]
+    assert lows.tolist() == [8]
+
+
+def _dip(n, center, depth):
+    x = np.arange(n)
+    return -depth * np.exp(-((x - center) ** 2) / 8.0)
+
+
+def test_regular_bullish_divergence_on_lower_price_low_and_higher_indicator_low():
+    n = 60
+    price = 100 + _dip(n, 20, 5) + _dip(n, 50, 8)
+    indicator = 50 + _dip(n, 20, 20) + _dip(n, 50, 10)
+    hits = divergence.scan(price + 0.5, price - 0.5, indicator, "RSI")
+    regular = [h for h in hits if h["type"] == "Regular" and h["side"] == "Bullish"]
+    assert len(regular) == 1
+    assert (regular[0]["startIdx"], regular[0]["endIdx"]) == (20, 50)
+    assert regular[0]["priceEnd"] < regular[0]["priceStart"]
+
+
+def test_old_divergences_are_not_reported():
+    n = 120
+    price = 100 + _dip(n, 20, 5) + _dip(n, 50, 8)
+    indicator = 50 + _dip(n, 20, 20) + _dip(n, 50, 10)
+    assert divergence.scan(price, price, indicator, "RSI") == []
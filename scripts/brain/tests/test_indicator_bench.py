@@ -0,0 +1,53 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+import indicator_bench
+from synthetic import random_walk_klines
+
+
+def _run(machine, engine, bars, tput, p50):
+    return {
+        "machine": machine,
+        "results": [{"engine": engine, "bars": bars, "bars_per_sec": tput, "update": {"p50_us": p50}}],
+    }
+
+
+def test_regression_gate_compares_same_machine_and_size_only():
+    history = [_run("a", "wasm", 1000, 100.0, 10.0) for _ in range(3)]
+    history.append(_run("b", "wasm", 1000, 1000.0, 1.0))
+    history.append(_run("a", "wasm", 5000, 1000.0, 1.0))
+
+    assert indicator_bench.find_regressions(history, _run("a", "wasm", 1000, 95.0, 10.5), 0.10) == []
+
+    slower = indicator_bench.find_regressions(history, _run("a", "wasm", 1000, 80.0, 10.0), 0.10)
+    assert len(slower) == 1 and "throughput" in slower[0]
+
+    laggier = indicator_bench.find_regressions(history, _run("a", "wasm", 1000, 100.0, 12.0), 0.10)
+    assert len(laggier) == 1 and "update p50" in laggier[0]
+
+
+def test_first_run_has_nothing_to_regress_against():
+    assert indicator_bench.find_regressions([], _run("a", "js", 1000, 1.0, 1.0), 0.10) == []
+
+
+def test_dataset_round_trips_as_float64_columns(tmp_path):
+    klines = random_walk_klines(64)
+    indicator_bench.write_dataset(klines, tmp_path)
+    close = np.fromfile(tmp_path / "close.f64", dtype="<f8")
+    np.testing.assert_array_equal(close, klines["close"])
+    assert (tmp_path / "meta.json").read_text() == '{"n": 64}'
@@ -0,0 +1,119 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+
+import kline_repair as kr
+from synthetic import KLINE_FIELDS, random_walk_klines
+
+MINUTE = 60_000
+
+
+def _loop_fill_gaps(k, interval_ms, max_fill=kr.MAX_GAP_FILL):
+    """Line-by-line transcription of historyFetcher.fillGaps."""
+    rows = [dict(zip(KLINE_FIELDS, values)) for values in zip(*(k[f] for f in KLINE_FIELDS))]
+    if len(rows) < 2:
+        return rows
+    threshold = interval_ms * 1.1
+    result = [rows[0]]
+    prev = rows[0]
+    for curr in rows[1:]:
+        diff = curr["time"] - prev["time"]
+        if diff > threshold:
+            gap_count = diff // interval_ms - 1
+            next_time = prev["time"] + interval_ms
+            for _ in range(min(gap_count, max_fill)):
+                c = prev["close"]
+                result.append({"time": next_time, "open": c, "high": c, "low": c, "close": c, "volume": 0.0})
+                next_time += interval_ms
+        result.append(curr)
+        prev = curr
+    return result
+
+
+def _loop_synthetic(k, bucket_ms):
+    """aggregateIntoSyntheticBucket fed bar by bar; the last push of each bucket is its candle."""
+    candles = []
+    prev = None
+    for bar in (dict(zip(KLINE_FIELDS, values)) for values in zip(*(k[f] for f in KLINE_FIELDS))):
+        bucket_time = bar["time"] // bucket_ms * bucket_ms
+        if prev is None or prev["time"] != bucket_time:
+            prev = {"time": bucket_time, "open": bar["open"], "high": bar["high"], "low": bar["low"],
+                    "close": bar["close"], "volume": bar["volume"]}
+            candles.append(prev)
+            continue
+        prev["high"] = max(prev["high"], bar["high"])
+        prev["low"] = min(prev["low"], bar["low"])
+        prev["close"] = bar["close"]
+        prev["volume"] += bar["volume"]
+    return candles
+
+
+def _as_rows(k):
+    return [dict(zip(KLINE_FIELDS, values)) for values in zip(*(k[f].tolist() for f in KLINE_FIELDS))]
+
+
+@pytest.fixture(scope="module")
+def gappy():
+    k = random_walk_klines(5000, seed=3)
+    holes = np.random.default_rng(3).choice(np.arange(1, 4999), size=300, replace=False)
+    k = {f: np.delete(v, holes) for f, v in k.items()}
+    # A bar 1.5 lengths late (no fill, as in the app) and a long outage.
+    k["time"][2000:] += MINUTE // 2
+    k["time"][3000:] += 40 * MINUTE
+    return k
+
+
+def test_fill_gaps_matches_app(gappy):
+    filled = kr.fill_gaps(gappy, MINUTE)
+    expected = _loop_fill_gaps({f: v.tolist() for f, v in gappy.items()}, MINUTE)
+    assert _as_rows(filled) == expected
+    before, counts = kr.find_gaps(gappy["time"], MINUTE)
+    assert len(filled["time"]) == len(gappy["time"]) + counts.sum()
+    assert filled["time"].dtype == np.int64
+
+
+def test_fill_gaps_caps_long_outages_and_leaves_clean_series_alone():
+    k = random_walk_klines(10)
+    k["time"][5:] += 100 * MINUTE
+    assert len(kr.fill_gaps(k, MINUTE, max_fill=20)["time"]) == 30
+    clean = random_walk_klines(10)
+    assert kr.fill_gaps(clean, MINUTE) is clean
+    unsorted = {f: v[::-1].copy() for f, v in clean.items()}
+    assert len(kr.fill_gaps(unsorted, MINUTE)["time"]) == 10
+
+
+@pytest.mark.parametrize("tf", ["3m", "9m", "15m", "2h"])
+def test_resample_matches_synthetic_klines(gappy, tf):
+    ours = kr.resample(gappy, tf)
+    expected = _loop_synthetic({f: v.tolist() for f, v in gappy.items()}, kr.timeframe_ms(tf))
+    assert len(ours["time"]) == len(expected)
+    for f in KLINE_FIELDS:
+        np.testing.assert_allclose(ours[f], [c[f] for c in expected], rtol=1e-12)
+
+
+def test_dedup_pages_prefers_later_pages():
+    k = random_walk_klines(30)
+    newer = {f: v[10:25].copy() for f, v in k.items()}
+    newer["close"] += 1.0
+    pages = [{f: v[20:] for f, v in k.items()}, {f: v[:20] for f, v in k.items()}, newer]
+    merged = kr.dedup_pages(pages)
+    np.testing.assert_array_equal(merged["time"], k["time"])
+    np.testing.assert_array_equal(merged["close"][10:25], newer["close"])
+    np.testing.assert_array_equal(merged["close"][25:], k["close"][25:])
+
+    rows = np.column_stack([k[f] for f in KLINE_FIELDS]).tolist()
+    assert kr.repair([kr.from_rows(rows[:18]), kr.from_rows(rows[15:])], MINUTE)["time"].tolist() == k["time"].tolist()
@@ -0,0 +1,44 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import market_data
+
+
+def test_bitunix_rows_follow_the_server_route_mapping():
+    rows = [
+        {"id": 2000, "open": "2", "high": "3", "low": "1", "close": "2.5", "quoteVol": "50", "vol": "20"},
+        {"time": 1000, "o": "1", "h": "2", "l": "0.5", "c": "1.5", "vol": "10"},
+        {"id": 3000, "open": "0", "high": "1", "low": "1", "close": "1"},
+    ]
+    k = market_data.parse_bitunix_klines(rows)
+    assert k["time"].tolist() == [1000, 2000]
+    assert k["volume"].tolist() == [10.0, 50.0]
+    assert k["close"].tolist() == [1.5, 2.5]
+
+
+def test_bitget_tuples_and_objects():
+    rows = [["2000", "2", "3", "1", "2.5", "7", "99"], {"ts": 1000, "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 3},
+            ["bad"]]
+    k = market_data.parse_bitget_klines(rows)
+    assert k["time"].tolist() == [1000, 2000]
+    assert k["volume"].tolist() == [3.0, 7.0]
+
+
+def test_funding_history_is_already_a_fraction():
+    rows = [{"fundingTime": "28800000", "fundingRate": "0.0001"}, {"fundingTime": 0, "fundingRate": "1"}]
+    f = market_data.parse_bitunix_funding(rows)
+    assert f["time"].tolist() == [28_800_000]
+    assert f["rate"].tolist() == [0.0001]
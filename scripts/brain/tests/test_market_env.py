@@ -0,0 +1,91 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+pytest.importorskip("gymnasium")
+
+import dataset  # noqa: E402
+from market_env import PerpetualTradingEnv  # noqa: E402
+from test_dataset import _store  # noqa: E402
+
+
+def test_reward_is_position_return_minus_fees_and_funding(tmp_path):
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "ds"))
+    data = dataset.load(str(tmp_path / "ds"))
+    env = PerpetualTradingEnv(data, "BTCUSDT", fee=0.001)
+    obs, _ = env.reset(seed=0)
+    assert obs.shape == env.observation_space.shape
+
+    total = 0.0
+    expected = 0.0
+    terminated = False
+    while not terminated:
+        t = env.t
+        obs, reward, terminated, _, _ = env.step(np.array([1.0]))
+        ret = data["close"][t + 1, 0] / data["close"][t, 0] - 1
+        expected += ret - data["funding"][t + 1, 0] - (0.001 if t == 0 else 0.0)
+        total += reward
+    assert total == pytest.approx(expected)
+    assert obs[-1] == 1.0
+
+
+def test_performance_metrics():
+    from market_env import performance
+
+    rewards = np.array([0.1, -0.5, 0.2])
+    m = performance(rewards, 24 * 3_600_000)
+    assert m["total_return"] == pytest.approx(1.1 * 0.5 * 1.2 - 1)
+    assert m["max_drawdown"] == pytest.approx(0.5)
+    assert m["sharpe"] == pytest.approx(rewards.mean() / rewards.std() * np.sqrt(365))
+    assert performance(np.zeros(5), 3_600_000)["sharpe"] == 0.0
+
+
+def test_small_windows_step_like_one_big_window(tmp_path):
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "ds"), dtype="float32")
+    data = dataset.load(str(tmp_path / "ds"))
+    runs = []
+    for window_bars in (7, 10_000):
+        env = PerpetualTradingEnv(data, "ETHUSDT", window_bars=window_bars)
+        obs, _ = env.reset(seed=0)
+        trace = [obs]
+        terminated = False
+        while not terminated:
+            obs, reward, terminated, _, _ = env.step(np.array([np.sin(env.t)]))
+            trace += [obs, reward]
+        runs.append(trace)
+    assert len(runs[0]) == len(runs[1]) == 1 + 2 * (data["manifest"]["bars"] - 1)
+    for a, b in zip(*runs):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_recency_weighted_starts_favour_recent_bars(tmp_path):
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "ds"))
+    data = dataset.load(str(tmp_path / "ds"))
+    env = PerpetualTradingEnv(data, "BTCUSDT", episode_bars=20, recency_half_life=30)
+    env.reset(seed=0)
+    last_start = env.end - 20 - 1
+    starts = []
+    for _ in range(4000):
+        env.reset()
+        starts.append(env.t)
+    starts = np.array(starts)
+    assert starts.min() >= env.start and starts.max() <= last_start
+    back = last_start - starts
+    # Half of the draws within one half-life of the latest start, three quarters within two.
+    assert np.mean(back < 30) == pytest.approx(0.5, abs=0.04)
+    assert np.mean(back < 60) == pytest.approx(0.75, abs=0.04)
@@ -0,0 +1,105 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+import dataset
+from model_registry import ModelRegistry, run_key
+from test_dataset import _store
+
+
+def _dataset(tmp_path, name="ds"):
+    path = str(tmp_path / name)
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", path)
+    return path
+
+
+def _blob_count(registry):
+    return sum(len(files) for _, _, files in os.walk(registry.blob_dir))
+
+
+def test_identical_datasets_share_one_hash_and_one_copy(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    first = _dataset(tmp_path)
+    digest = registry.register_dataset(first)
+    blobs = _blob_count(registry)
+
+    # Same data built again later: other directory, other build time.
+    copy = str(tmp_path / "copy")
+    shutil.copytree(first, copy)
+    with open(os.path.join(copy, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["created"] += 3600
+    with open(os.path.join(copy, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    assert registry.register_dataset(copy) == digest
+    assert _blob_count(registry) == blobs
+    assert len(registry.datasets()) == 1
+
+    restored = registry.restore_dataset(digest, str(tmp_path / "restored"))
+    assert registry.dataset_hash(restored)[0] == digest
+    assert dataset.load(restored)["manifest"]["symbols"] == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_run_key_changes_with_any_input():
+    base = run_key("d", {"timesteps": 10}, "c")
+    assert base == run_key("d", {"timesteps": 10}, "c")
+    assert len({base, run_key("e", {"timesteps": 10}, "c"), run_key("d", {"timesteps": 11}, "c"),
+                run_key("d", {"timesteps": 10}, "x")}) == 4
+
+
+def test_best_run_by_symbol_and_timeframe(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    model = tmp_path / "model.zip"
+    runs = {}
+    for i, (tf, btc, eth) in enumerate([("1h", 0.5, 2.0), ("1h", 1.5, 0.1), ("15m", 3.0, 3.0)]):
+        model.write_bytes(f"weights {i}".encode())
+        runs[i] = registry.record_run(
+            f"key{i}", "d", {"i": i}, {"ppo_cachy_agent.zip": str(model)},
+            {"BTCUSDT": {"sharpe": btc}, "ETHUSDT": {"sharpe": eth}, "": {"sharpe": (btc + eth) / 2}},
+            tf=tf, symbols=["BTCUSDT", "ETHUSDT"])
+
+    started = time.perf_counter()
+    best = registry.best("sharpe", "BTCUSDT", "1h")
+    assert time.perf_counter() - started < 0.05
+    assert best["id"] == runs[1] and best["metrics"]["BTCUSDT"]["sharpe"] == 1.5
+    assert registry.best("sharpe", "ETHUSDT", "1h")["id"] == runs[0]
+    assert registry.best("sharpe")["id"] == runs[2]
+    assert registry.best("sharpe", "SOLUSDT") is None
+    assert [r["id"] for r in registry.runs(tf="1h")] == [runs[0], runs[1]]
+
+    paths = registry.restore(runs[1], str(tmp_path / "out"))
+    with open(paths["ppo_cachy_agent.zip"], "rb") as f:
+        assert f.read() == b"weights 1"
+    assert registry.find_run("key1")["id"] == runs[1]
+
+
+def test_rerun_with_same_key_replaces_the_record(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    model = tmp_path / "model.zip"
+    model.write_bytes(b"a")
+    registry.record_run("k", "d", {}, {"m.zip": str(model)}, {"": {"sharpe": 1.0}}, tf="1h")
+    model.write_bytes(b"b")
+    second = registry.record_run("k", "d", {}, {"m.zip": str(model)}, {"": {"sharpe": 2.0}}, tf="1h")
+    assert [r["id"] for r in registry.runs()] == [second]
+    assert registry.best("sharpe")["metrics"][""]["sharpe"] == pytest.approx(2.0)
+    assert registry.latest(tf="1h")["id"] == second
+    assert registry.latest(tf="4h") is None
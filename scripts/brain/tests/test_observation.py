@@ -0,0 +1,80 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+import observation
+
+PERP = {"kind": "perp"}
+
+
+def _raw(batch=3):
+    rng = np.random.default_rng(1)
+    close = 100 + rng.standard_normal((batch, 1))
+    return {
+        "close": close,
+        "prev_close": close * 0.99,
+        "rsi": np.full((batch, 1), 75.0),
+        "macd": close * 0.002,
+        "macd_signal": close * 0.001,
+        "bb_upper": close + 1.0,
+        "bb_lower": close - 3.0,
+        "atr": close * 0.01,
+        "volume": np.full((batch, 1), np.e - 1),
+        "log_volume_ema": np.full((batch, 1), 0.25),
+        "funding_rate": np.full((batch, 1), 0.0001),
+        "position": np.full((batch, 1), -0.5),
+    }
+
+
+def test_perp_assembly_follows_the_feature_order():
+    obs = observation.assemble(PERP, _raw(), np)
+    assert obs.shape == (3, len(observation.PERP_FEATURES))
+    expected = [np.log(1 / 0.99), 0.25, 0.001, 0.25, 0.01, 0.75, 1.0, -0.5]
+    np.testing.assert_allclose(obs, np.tile(expected, (3, 1)))
+
+
+def test_flat_bollinger_band_puts_the_close_in_the_middle():
+    raw = _raw(1)
+    raw["bb_upper"] = raw["bb_lower"] = raw["close"]
+    obs = observation.assemble(PERP, raw, np)
+    assert obs[0, observation.PERP_FEATURES.index("bb_pct_b")] == 0.0
+
+
+def test_finrl_layout_is_indicator_major():
+    layout = {"kind": "finrl", "stock_dim": 2, "indicators": ["macd", "rsi_30"]}
+    names = [name for name, _, _ in observation.graph_inputs(layout)]
+    assert names == ["balance", "close", "shares", "macd", "rsi_30"]
+    inputs = {"balance": np.array([[1.0]]), "close": np.array([[2.0, 3.0]]), "shares": np.array([[4.0, 5.0]]),
+              "macd": np.array([[6.0, 7.0]]), "rsi_30": np.array([[8.0, 9.0]])}
+    obs = observation.assemble(layout, inputs, np)
+    assert obs.tolist() == [[1, 2, 3, 4, 5, 6, 7, 8, 9]]
+    assert observation.feature_names(layout)[5:7] == ["macd_0", "macd_1"]
+
+
+def test_normalize_matches_vecnormalize():
+    obs = np.array([[0.0, 100.0]])
+    out = observation.normalize(obs, np.array([1.0, 0.0]), np.array([4.0, 1.0]), 0.0, 10.0, np)
+    assert out.tolist() == [[-0.5, 10.0]]
+
+
+def test_torch_assembly_matches_numpy():
+    torch = pytest.importorskip("torch")
+    raw = _raw()
+    expected = observation.assemble(PERP, raw, np)
+    got = observation.assemble(PERP, {k: torch.from_numpy(v) for k, v in raw.items()}, torch)
+    np.testing.assert_allclose(got.numpy(), expected, rtol=1e-12)
@@ -0,0 +1,99 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import functools
+
+import numpy as np
+import pytest
+
+pytest.importorskip("gymnasium")
+pytest.importorskip("stable_baselines3")
+
+from stable_baselines3 import PPO  # noqa: E402
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize  # noqa: E402
+
+import dataset  # noqa: E402
+import online_update  # noqa: E402
+import train  # noqa: E402
+from candle_store import CandleStore  # noqa: E402
+from market_env import make_env_fns  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+from synthetic import random_walk_klines  # noqa: E402
+
+HOUR = 3_600_000
+
+
+def _parent(tmp_path, monkeypatch):
+    """A registered tiny run on 400 bars; the store holds 100 bars more."""
+    store = CandleStore(str(tmp_path / "store"))
+    for seed, symbol in enumerate(("BTCUSDT", "ETHUSDT")):
+        k = random_walk_klines(500, seed=seed, interval_ms=HOUR, start_ms=1_700_006_400_000)
+        store.write("bitunix", symbol, "1h", {f: v[:400] for f, v in k.items()})
+    ds = str(tmp_path / "ds")
+    dataset.build(store, "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", ds)
+    for seed, symbol in enumerate(("BTCUSDT", "ETHUSDT")):
+        store.write("bitunix", symbol, "1h", random_walk_klines(500, seed=seed, interval_ms=HOUR,
+                                                                start_ms=1_700_006_400_000))
+
+    monkeypatch.setattr(train, "TRAINED_MODEL_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(online_update, "ModelRegistry", functools.partial(ModelRegistry, str(tmp_path / "registry")))
+    data = dataset.load(ds)
+    env = VecNormalize(DummyVecEnv(make_env_fns(data, episode_bars=50)), norm_obs=True, norm_reward=True)
+    agent = PPO("MlpPolicy", env, n_steps=32, batch_size=32, n_epochs=1, seed=0)
+    agent.learn(64)
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    digest = registry.register_dataset(ds)
+    artifacts = train.save_agent(agent, env, {"kind": "perp", "exchange": "bitunix", "tf": "1h",
+                                              "symbols": ["BTCUSDT", "ETHUSDT"], "dataset": ds,
+                                              "dataset_hash": digest})
+    run_id = registry.record_run("parent", digest, {"algo": "PPO"}, artifacts, {"": {"sharpe": 0.0}}, tf="1h",
+                                 symbols=["BTCUSDT", "ETHUSDT"])
+    registry.close()
+    return store, ds, run_id
+
+
+def _scores(monkeypatch, values):
+    """evaluate_agent returning the given portfolio Sharpe ratios in turn (the first is the baseline)."""
+    values = iter(values)
+    monkeypatch.setattr(train, "evaluate_agent", lambda *a, **k: {"": {"sharpe": next(values)}})
+
+
+def _argv(tmp_path):
+    return ["--tf", "1h", "--store", str(tmp_path / "store"), "--work-dir", str(tmp_path / "work"),
+            "--no-download", "--no-export", "--timesteps", "64", "--eval-freq", "32",
+            "--validation-bars", "40", "--window-bars", "200", "--half-life", "50"]
+
+
+def test_update_that_does_not_beat_the_baseline_changes_nothing(tmp_path, monkeypatch):
+    store, ds, parent = _parent(tmp_path, monkeypatch)
+    _scores(monkeypatch, [1.0, 0.5, 0.9, 0.9])
+    assert online_update.main(_argv(tmp_path)) == 0
+    assert dataset.load(ds)["manifest"]["bars"] > 300
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    assert registry.latest(tf="1h")["id"] == parent
+
+
+def test_better_update_is_registered_as_a_child_run(tmp_path, monkeypatch):
+    store, ds, parent = _parent(tmp_path, monkeypatch)
+    _scores(monkeypatch, [1.0, 0.5, 1.5, 1.5])
+    assert online_update.main(_argv(tmp_path)) == 0
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    child = registry.latest(tf="1h")
+    assert child["id"] != parent
+    assert child["config"]["parent_run"] == parent
+    assert child["config"]["mode"] == "update"
+    assert child["metrics"][""]["sharpe"] == pytest.approx(1.5)
+    assert child["dataset_hash"] != registry.run(parent)["dataset_hash"]
+    assert np.all(np.diff(dataset.load(ds)["time"]) == HOUR)
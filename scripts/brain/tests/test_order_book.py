@@ -0,0 +1,175 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import numpy as np
+import pytest
+
+import order_book as ob
+
+
+def _loop_replay(tape, bucket_ms, distances_bps, levels):
+    """Per-message dict book: the reference the vectorized replay must match at every bucket end."""
+    ts, tick_size = tape["ts"], tape["tick_size"]
+    t0 = ts[0] // bucket_ms * bucket_ms
+    n = int((ts[-1] - t0) // bucket_ms) + 1
+    books = {ob.BID: {}, ob.ASK: {}}
+    rows, i = [], 0
+    for k in range(n):
+        end_ms = t0 + (k + 1) * bucket_ms
+        while i < len(ts) and ts[i] < end_ms:
+            if tape["kind"][i] == ob.SNAPSHOT:
+                books = {ob.BID: {}, ob.ASK: {}}
+            for j in range(tape["offsets"][i], tape["offsets"][i + 1]):
+                side, t, q = int(tape["side"][j]), int(tape["tick"][j]), float(tape["qty"][j])
+                if q > 0:
+                    books[side][t] = q
+                else:
+                    books[side].pop(t, None)
+            i += 1
+        bids = sorted(books[ob.BID].items(), reverse=True)
+        asks = sorted(books[ob.ASK].items())
+        bid, ask = bids[0][0] * tick_size, asks[0][0] * tick_size
+        mid = (bid + ask) / 2
+        top_b = sum(q for _, q in bids[:levels])
+        top_a = sum(q for _, q in asks[:levels])
+        rows.append({
+            "best_bid": bid, "best_ask": ask, "spread_bps": (ask - bid) / mid * 1e4,
+            "imbalance": (top_b - top_a) / (top_b + top_a),
+            "bid_depth": [sum(t * tick_size * q for t, q in bids if t >= mid * (1 - d / 1e4) / tick_size)
+                          for d in distances_bps],
+            "ask_depth": [sum(t * tick_size * q for t, q in asks if t <= mid * (1 + d / 1e4) / tick_size)
+                          for d in distances_bps],
+            "bid_qty": sum(q for _, q in bids), "ask_qty": sum(q for _, q in asks),
+        })
+    return rows
+
+
+def _msg(ts, bids, asks, kind=None, seq=None, prev=None, symbol="BTCUSDT"):
+    m = {"ch": "depth_book5", "symbol": symbol, "ts": ts, "data": {"b": bids, "a": asks}}
+    if kind:
+        m["type"] = kind
+    if seq is not None:
+        m["data"]["seq"] = seq
+    if prev is not None:
+        m["data"]["prevSeq"] = prev
+    return m
+
+
+def test_replay_matches_a_per_message_book():
+    tape = ob.synthetic_tape(20_000, seed=3, snapshot_every=300, snapshot_levels=40, interval_ms=7)
+    distances = (5, 20)
+    book = ob.replay(tape, 250, distances, levels=3, heatmap=(int(tape["tick"].min()), 10**6))
+    expected = _loop_replay(tape, 250, distances, 3)
+    assert len(book["time"]) == len(expected)
+    for key in ("best_bid", "best_ask", "spread_bps", "imbalance"):
+        np.testing.assert_allclose(book[key], [r[key] for r in expected], rtol=1e-9)
+    for key in ("bid_depth", "ask_depth"):
+        np.testing.assert_allclose(book[key], [r[key] for r in expected], rtol=1e-9)
+    # One bin wide enough for the whole book: the heatmap holds each side's total quantity.
+    np.testing.assert_allclose(book["heat_bid"][:, 0], [r["bid_qty"] for r in expected], rtol=1e-9)
+    np.testing.assert_allclose(book["heat_ask"][:, 0], [r["ask_qty"] for r in expected], rtol=1e-9)
+    assert book["valid"].all()
+
+
+def test_merge_levels_last_update_wins_and_zero_deletes():
+    ticks, qty = np.array([10, 20, 30]), np.array([1.0, 2.0, 3.0])
+    t, q = ob.merge_levels(ticks, qty, np.array([20, 25, 25, 30]), np.array([5.0, 1.0, 4.0, 0.0]))
+    assert t.tolist() == [10, 20, 25]
+    assert q.tolist() == [1.0, 5.0, 4.0]
+
+
+def test_bitunix_book5_frames_are_snapshots(tmp_path):
+    frames = [
+        {"t": 1.0, "url": "wss://fapi.bitunix.com/public/", "data": json.dumps(
+            _msg(1000, [["100.5", "2"], ["100.4", "1"]], [["100.6", "3"]]))},
+        {"t": 2.0, "url": "wss://fapi.bitunix.com/public/", "data": json.dumps({"op": "ping"})},
+        {"t": 3.0, "url": "wss://fapi.bitunix.com/public/", "data": json.dumps(
+            _msg(1500, [["100.5", "1"]], [["100.7", "1"]], symbol="ETHUSDT"))},
+        {"t": 4.0, "url": "wss://fapi.bitunix.com/public/", "data": json.dumps(
+            _msg(3100, [["100.3", "1"]], [["100.55", "1"]]))},
+    ]
+    path = tmp_path / "frames.jsonl"
+    path.write_text("\n".join(json.dumps(f) for f in frames) + "\n")
+    tape = ob.build_tape(ob.read_messages(str(path), "btcusdt"))
+    assert tape["tick_size"] == pytest.approx(0.01)
+    assert tape["kind"].tolist() == [ob.SNAPSHOT, ob.SNAPSHOT]
+
+    book = ob.replay(tape, 1000)
+    assert book["best_bid"].tolist() == pytest.approx([100.5, 100.5, 100.3])
+    assert book["best_ask"].tolist() == pytest.approx([100.6, 100.6, 100.55])
+    assert book["imbalance"][0] == pytest.approx(0.0)
+    assert book["messages"].tolist() == [1, 0, 1]
+
+    out = tmp_path / "tape.npz"
+    ob.save_tape(tape, str(out))
+    again = ob.load_tape(str(out))
+    assert again["tick_size"] == tape["tick_size"]
+    np.testing.assert_array_equal(again["tick"], tape["tick"])
+
+
+def test_sequence_gaps_invalidate_until_the_next_snapshot():
+    msgs = [
+        _msg(0, [["10", "1"]], [["11", "1"]], "snapshot", seq=5),
+        _msg(100, [["10", "2"]], [], "update", seq=6, prev=5),
+        _msg(200, [], [["11", "3"]], "update", seq=9, prev=8),      # 7..8 missing
+        _msg(300, [["9", "1"]], [], "update", seq=10, prev=9),
+        _msg(1400, [["10", "1"]], [["11", "1"]], "snapshot", seq=20),
+        _msg(1500, [], [["12", "1"]], "update", seq=20, prev=19),   # replayed
+        _msg(1600, [], [["12", "1"]], "update", seq=21),            # no prev: seq + 1
+    ]
+    tape = ob.build_tape(ob.parse_message(m) for m in msgs)
+    report = ob.check_sequence(tape, gap_ms=1000)
+    assert [(g["index"], g["kind"], g["expected"], g["got"]) for g in report["gaps"]] == [
+        (2, "gap", 6, 8), (5, "out_of_order", 20, 19)]
+    assert report["valid"].tolist() == [True, True, False, False, True, False, False]
+    assert report["silences"] == [{"index": 4, "ts": 1400, "ms": 1100}]
+
+    book = ob.replay(tape, 1000, valid=report["valid"])
+    assert book["valid"].tolist() == [False, False]
+    assert book["bid_levels"].tolist() == [2, 1]
+
+
+def test_tape_is_ordered_by_timestamp_and_unstamped_messages_are_skipped():
+    no_ts = _msg(0, [["12", "1"]], [], "update", seq=4, prev=3)
+    del no_ts["ts"]
+    assert ob.parse_message(no_ts) is None
+    msgs = [
+        _msg(0, [["10", "1"]], [["11", "1"]], "snapshot", seq=1),
+        _msg(300, [], [["11", "3"], ["12", "1"]], "update", seq=3, prev=2),
+        _msg(100, [["10", "2"]], [], "update", seq=2, prev=1),
+        _msg(300, [["9", "4"]], [], "update", seq=4, prev=3),
+    ]
+    tape = ob.build_tape(ob.parse_message(m) for m in msgs)
+    assert tape["ts"].tolist() == [0, 100, 300, 300]
+    assert tape["seq"].tolist() == [1, 2, 3, 4]
+    assert tape["offsets"].tolist() == [0, 2, 3, 5, 6]
+    assert tape["qty"].tolist() == [1, 1, 2, 3, 1, 4]
+    assert ob.check_sequence(tape)["gaps"] == []
+
+    book = ob.replay(tape, 1000)
+    assert book["best_bid"].tolist() == pytest.approx([10.0])
+    assert book["ask_levels"].tolist() == [2]
+    shuffled = dict(tape, ts=tape["ts"][::-1].copy())
+    with pytest.raises(ValueError, match="not in order"):
+        ob.replay(shuffled, 1000)
+
+
+def test_parse_duration():
+    assert ob.parse_duration("250ms") == 250
+    assert ob.parse_duration("1s") == 1000
+    assert ob.parse_duration("5m") == 300_000
+    assert ob.parse_duration("1500") == 1500
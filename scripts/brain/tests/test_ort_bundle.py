@@ -0,0 +1,64 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import pytest
+
+onnx = pytest.importorskip("onnx")
+from onnx import TensorProto, helper  # noqa: E402
+
+import ort_bundle  # noqa: E402
+
+
+def _model():
+    then_graph = helper.make_graph(
+        [helper.make_node("Relu", ["x"], ["y_then"])], "then", [],
+        [helper.make_tensor_value_info("y_then", TensorProto.FLOAT, [1])])
+    else_graph = helper.make_graph(
+        [helper.make_node("Neg", ["x"], ["y_else"])], "else", [],
+        [helper.make_tensor_value_info("y_else", TensorProto.FLOAT, [1])])
+    nodes = [
+        helper.make_node("Add", ["x", "x"], ["s"]),
+        helper.make_node("Greater", ["s", "x"], ["c"]),
+        helper.make_node("If", ["c"], ["y"], then_branch=then_graph, else_branch=else_graph),
+    ]
+    graph = helper.make_graph(
+        nodes, "g", [helper.make_tensor_value_info("x", TensorProto.FLOAT, [1])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [1])])
+    return helper.make_model(graph, opset_imports=[helper.make_opsetid("", 11)])
+
+
+def test_operators_include_subgraphs():
+    ops = ort_bundle.used_operators(_model())
+    assert ops == {("ai.onnx", 11): ["Add", "Greater", "If", "Neg", "Relu"]}
+
+
+def test_config_format_matches_onnxruntime():
+    config = ort_bundle.format_operator_config({("ai.onnx", 11): ["Add", "Relu"]}, ["m.onnx"])
+    assert config.splitlines() == ["# Generated from model/s:", "# - m.onnx", "ai.onnx;11;Add,Relu"]
+
+
+def test_bundle_writes_config_script_and_report(tmp_path):
+    path = tmp_path / "m.onnx"
+    onnx.save(_model(), str(path))
+    runtime = tmp_path / "ort-wasm-simd.wasm"
+    runtime.write_bytes(b"\0" * 4096)
+    report = ort_bundle.bundle(str(path), runtime_full=str(runtime))
+
+    assert (tmp_path / "m.required_operators.config").exists()
+    assert (tmp_path / "build_ort_web.sh").read_text().count("--include_ops_by_config") == 1
+    assert report["before"]["runtime"]["raw"] == 4096
+    assert report["before"]["total"]["raw"] == path.stat().st_size + 4096
+    assert report["after"]["runtime"] is None
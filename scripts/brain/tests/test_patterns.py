@@ -0,0 +1,238 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+import divergence
+import patterns
+import reference_indicators as ri
+from candle_store import CandleStore
+from synthetic import random_walk_klines
+
+TEMPLATES = patterns.load_templates()
+
+
+# --- Line-by-line transcription of PatternDetector (src/services/patternDetection.ts) ---
+
+def _ts_normalize(candles):
+    lo, hi = float("inf"), float("-inf")
+    for c in candles:
+        lo = min(lo, c["low"])
+        hi = max(hi, c["high"])
+    span = hi - lo
+    inv = 0 if span == 0 else 1 / span
+    buf = []
+    for c in candles:
+        if inv == 0:
+            buf += [0.5, 0.5, 0.5, 0.5]
+        else:
+            buf += [(c["open"] - lo) * inv, (c["high"] - lo) * inv, (c["low"] - lo) * inv, (c["close"] - lo) * inv]
+    return buf
+
+
+def _ts_hammer(c):
+    body = abs(c["open"] - c["close"])
+    upper = c["high"] - max(c["open"], c["close"])
+    lower = min(c["open"], c["close"]) - c["low"]
+    total = c["high"] - c["low"]
+    if total == 0:
+        return False
+    return lower >= body * 2 and upper <= total * 0.1
+
+
+def _ts_inverted_hammer(c):
+    body = abs(c["open"] - c["close"])
+    upper = c["high"] - max(c["open"], c["close"])
+    lower = min(c["open"], c["close"]) - c["low"]
+    total = c["high"] - c["low"]
+    if total == 0:
+        return False
+    return upper >= body * 2 and lower <= total * 0.1
+
+
+def _ts_bullish_engulfing(prev, curr):
+    if prev["close"] >= prev["open"]:
+        return False
+    if curr["close"] <= curr["open"]:
+        return False
+    return curr["open"] <= prev["close"] and curr["close"] >= prev["open"]
+
+
+def _ts_bearish_engulfing(prev, curr):
+    if prev["close"] <= prev["open"]:
+        return False
+    if curr["close"] >= curr["open"]:
+        return False
+    return curr["open"] >= prev["close"] and curr["close"] <= prev["open"]
+
+
+def _ts_morning_star(c1, c2, c3):
+    if c1["close"] >= c1["open"]:
+        return False
+    body1 = abs(c1["open"] - c1["close"])
+    if body1 < (c1["high"] - c1["low"]) * 0.5:
+        return False
+    if abs(c2["open"] - c2["close"]) >= body1 * 0.5:
+        return False
+    if c3["close"] <= c3["open"]:
+        return False
+    return c3["close"] > (c1["open"] + c1["close"]) / 2
+
+
+def _ts_evening_star(c1, c2, c3):
+    if c1["close"] <= c1["open"]:
+        return False
+    body1 = abs(c1["open"] - c1["close"])
+    if body1 < (c1["high"] - c1["low"]) * 0.5:
+        return False
+    if abs(c2["open"] - c2["close"]) >= body1 * 0.5:
+        return False
+    if c3["close"] >= c3["open"]:
+        return False
+    return c3["close"] < (c1["open"] + c1["close"]) / 2
+
+
+def _ts_specific(pattern_id, candles, s):
+    if pattern_id in ("hammer", "hanging_man"):
+        return _ts_hammer(candles[s])
+    if pattern_id in ("inverted_hammer", "shooting_star"):
+        return _ts_inverted_hammer(candles[s])
+    if pattern_id == "bullish_engulfing":
+        return _ts_bullish_engulfing(candles[s], candles[s + 1])
+    if pattern_id == "bearish_engulfing":
+        return _ts_bearish_engulfing(candles[s], candles[s + 1])
+    if pattern_id == "morning_star":
+        return _ts_morning_star(candles[s], candles[s + 1], candles[s + 2])
+    if pattern_id == "evening_star":
+        return _ts_evening_star(candles[s], candles[s + 1], candles[s + 2])
+    return None
+
+
+def _ts_detect(candles, templates, normalized):
+    detected = []
+    by_length = {}
+    for t in templates:
+        by_length.setdefault(len(t["candles"]), []).append(t)
+    for length, group in by_length.items():
+        if len(candles) < length:
+            continue
+        start = len(candles) - length
+        up = down = None
+        if len(candles) >= length + 5:
+            up = candles[len(candles) - length - 1]["close"] > candles[len(candles) - length - 5]["close"]
+            down = candles[len(candles) - length - 1]["close"] < candles[len(candles) - length - 5]["close"]
+        buf = _ts_normalize(candles[start:])
+        for t in group:
+            trend = t["candles"][0].get("trend")
+            if trend and up is not None:
+                if trend == "downtrend" and not down:
+                    continue
+                if trend in ("uptrend", "uptrend_peak") and not up:
+                    continue
+            specific = _ts_specific(t["id"], candles, start)
+            if specific is not None:
+                if specific:
+                    detected.append(t["id"])
+                continue
+            total = 0.0
+            tolerance = 0.05 * length
+            matched = True
+            for a, b in zip(normalized[t["id"]], buf):
+                d = a - b
+                total += d * d
+                if total >= tolerance:
+                    matched = False
+                    break
+            if matched:
+                detected.append(t["id"])
+    return detected
+
+
+def _fixture(n=400):
+    k = random_walk_klines(n, seed=7, volatility=0.01)
+    # A flat stretch exercises the zero-range branches.
+    for f in ("open", "high", "low", "close"):
+        k[f][200:210] = k["close"][199]
+    return k
+
+
+def test_candlestick_events_match_the_ts_detector_bar_by_bar():
+    k = _fixture()
+    candles = [{f: float(k[f][i]) for f in ("open", "high", "low", "close")} for i in range(len(k["time"]))]
+    normalized = {t["id"]: patterns._normalized_template(t["candles"]).tolist() for t in TEMPLATES}
+    ends, _, codes = patterns.candlestick_events(k, TEMPLATES)
+    hits = 0
+    for t in range(len(candles)):
+        expected = sorted(_ts_detect(candles[:t + 1], TEMPLATES, normalized))
+        got = sorted(TEMPLATES[c]["id"] for c in codes[ends == t])
+        assert got == expected, t
+        hits += len(expected)
+    assert hits > 200
+
+
+def test_blocks_do_not_change_the_labels():
+    k = random_walk_klines(3000, seed=3, volatility=0.01)
+    full = patterns.candlestick_events(k, TEMPLATES)
+    blocked = patterns.candlestick_events(k, TEMPLATES, chunk=257)
+    key = lambda e: sorted(zip(e[0].tolist(), e[2].tolist()))  # noqa: E731
+    assert key(full) == key(blocked)
+
+
+def test_divergences_are_what_the_scanner_reports_at_every_bar():
+    k = random_walk_klines(600, seed=11, volatility=0.01)
+    indicator = ri.rsi(k["close"], 14)
+    found = {(start, end, kind, side)
+             for (kind, side), (p1, p2) in patterns.divergence_events(k["high"], k["low"], indicator).items()
+             for start, end in zip(p1.tolist(), p2.tolist())}
+    assert found
+    for t in range(60, 600, 7):
+        live = {(r["startIdx"], r["endIdx"], r["type"], r["side"])
+                for r in divergence.scan(k["high"][:t], k["low"][:t], indicator[:t], "RSI")}
+        window = {f for f in found if t - divergence.RECENT_BARS <= f[1] <= t - 1 - divergence.PIVOT_RANGE}
+        assert live == window, t
+
+
+def test_label_writes_sparse_events_and_hit_rates(tmp_path, capsys):
+    store = CandleStore(str(tmp_path))
+    k = random_walk_klines(2000, seed=5, interval_ms=3_600_000, volatility=0.01)
+    store.write("bitunix", "BTCUSDT", "1h", k)
+    assert patterns.main(["label", "--store", str(tmp_path), "--symbols", "BTCUSDT", "--tf", "1h"]) == 0
+
+    events, names = store.load_events("bitunix", "BTCUSDT", "1h")
+    assert names == patterns.pattern_names(TEMPLATES)
+    assert len(events["time"]) > 0 and np.all(np.diff(events["time"]) >= 0)
+    assert np.all(events["start"] <= events["time"])
+    assert np.isin(events["time"], k["time"]).all()
+
+    dense = patterns.to_dense(k["time"], events, len(names))
+    assert dense.shape == (2000, len(names))
+    assert dense.sum() == len(set(zip(events["time"].tolist(), events["pattern"].tolist())))
+
+    assert patterns.main(["stats", "--store", str(tmp_path), "--tf", "1h", "--min-events", "5"]) == 0
+    out = capsys.readouterr().out
+    assert "bullish_engulfing" in out and "rsi_regular_bullish" in out
+
+
+def test_hit_rates_count_moves_in_the_pattern_direction():
+    k = {"time": np.arange(6, dtype=np.int64), "close": np.array([10.0, 11, 12, 11, 10, 9])}
+    names = [{"id": "up", "direction": 1}, {"id": "down", "direction": -1}, {"id": "flat", "direction": 0}]
+    events = {"time": np.array([0, 1, 2, 5]), "pattern": np.array([0, 0, 1, 2])}
+    returns = patterns.forward_returns(k, events, (1,))
+    assert np.isnan(returns[3, 0])
+    rows = {r["pattern"]: r for r in patterns.hit_rates(events["pattern"], returns, names, (1,))}
+    assert rows["up"]["hit_1"] == 1.0 and rows["up"]["events"] == 2
+    assert rows["down"]["hit_1"] == 1.0
+    assert rows["flat"]["hit_1"] is None and rows["flat"]["ret_1"] is None
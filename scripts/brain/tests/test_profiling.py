@@ -0,0 +1,66 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+import profiling
+
+
+def test_stage_records_time_memory_and_rows(tmp_path):
+    profiler = profiling.Profiler("unit", out_dir=str(tmp_path))
+    with profiler.stage("alloc") as stage:
+        block = np.ones(64 * 2**20 // 8)  # 64 MB, touched
+        time.sleep(0.05)
+        stage.rows = len(block)
+        del block
+    with profiler.stage("sleep"):
+        time.sleep(0.05)
+
+    alloc, sleep = [s.to_dict() for s in profiler.stages]
+    assert alloc["rows"] == 8 * 2**20 and alloc["rows_per_s"] > 0
+    assert alloc["rss_peak_mb"] - alloc["rss_start_mb"] > 48
+    assert sleep["wall_s"] >= 0.05 and sleep["cpu_s"] < sleep["wall_s"]
+
+    path = profiler.write()
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert [s["name"] for s in report["stages"]] == ["alloc", "sleep"]
+    assert "alloc" in profiling.format_table(report)
+
+
+def test_failed_stage_is_recorded_and_reraised(tmp_path):
+    profiler = profiling.Profiler("unit", out_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        with profiler.stage("broken"):
+            raise ValueError("boom")
+    assert profiler.stages[0].to_dict()["error"] == "ValueError: boom"
+
+
+def test_cprofile_mode_writes_stats_and_top_functions(tmp_path):
+    def busy():
+        return sum(i * i for i in range(200_000))
+
+    profiler = profiling.Profiler("unit", mode="cprofile", out_dir=str(tmp_path))
+    with profiler.stage("busy") as stage:
+        busy()
+    assert stage.artifacts["cprofile"].endswith("busy.prof")
+    assert any("busy" in row["function"] for row in stage.extra["top_functions"])
+    with pytest.raises(ValueError):
+        profiling.Profiler("unit", mode="perf")
@@ -0,0 +1,98 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+import reference_indicators as ri
+from synthetic import random_walk_klines
+
+
+def _loop_smoothed(data, period, alpha):
+    """Line-by-line transcription of JSIndicators.ema / smma."""
+    out = np.full(len(data), np.nan)
+    if len(data) < period:
+        return out
+    value = data[:period].mean()
+    out[period - 1] = value
+    for i in range(period, len(data)):
+        value = (data[i] - value) * alpha + value
+        out[i] = value
+    return out
+
+
+def _loop_rsi(data, period):
+    out = np.full(len(data), np.nan)
+    gain = loss = 0.0
+    for i in range(1, period + 1):
+        d = data[i] - data[i - 1]
+        gain += d if d >= 0 else 0.0
+        loss += -d if d < 0 else 0.0
+    gain /= period
+    loss /= period
+    out[period] = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+    for i in range(period + 1, len(data)):
+        d = data[i] - data[i - 1]
+        gain = (gain * (period - 1) + (d if d >= 0 else 0.0)) / period
+        loss = (loss * (period - 1) + (-d if d < 0 else 0.0)) / period
+        out[i] = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+    return out
+
+
+@pytest.fixture(scope="module")
+def klines():
+    return random_walk_klines(3000, seed=7)
+
+
+@pytest.mark.parametrize("decay", [0.05, 0.5, 0.9, 0.999, 1.0])
+def test_decay_scan_matches_sequential_recurrence(decay):
+    x = np.random.default_rng(1).normal(size=2500)
+    expected = np.empty_like(x)
+    prev = 3.0
+    for i, v in enumerate(x):
+        prev = decay * prev + v
+        expected[i] = prev
+    np.testing.assert_allclose(ri.decay_scan(x, decay, 3.0), expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("period", [2, 9, 20, 200])
+def test_ema_and_smma_match_js_loop(klines, period):
+    close = klines["close"]
+    np.testing.assert_allclose(ri.ema(close, period), _loop_smoothed(close, period, 2 / (period + 1)), rtol=1e-10)
+    np.testing.assert_allclose(ri.smma(close, period), _loop_smoothed(close, period, 1 / period), rtol=1e-10)
+
+
+def test_rsi_matches_js_loop(klines):
+    np.testing.assert_allclose(ri.rsi(klines["close"], 14), _loop_rsi(klines["close"], 14), rtol=1e-9)
+
+
+def test_windowed_indicators_align_with_input(klines):
+    close = klines["close"]
+    sma = ri.sma(close, 20)
+    assert np.isnan(sma[:19]).all()
+    assert sma[19] == pytest.approx(close[:20].mean())
+    middle, upper, lower = ri.bb(close, 20, 2.0)
+    assert upper[-1] - middle[-1] == pytest.approx(2.0 * close[-20:].std())
+    k = ri.stoch(klines["high"], klines["low"], close, 14)
+    assert np.nanmin(k) >= 0.0 and np.nanmax(k) <= 100.0
+
+
+def test_supertrend_flips_with_the_trend():
+    close = np.concatenate([np.linspace(100, 200, 200), np.linspace(200, 100, 200)])
+    value, trend = ri.supertrend(close + 1, close - 1, close, 10, 3.0)
+    assert trend[150] == 1
+    assert trend[-1] == -1
+    assert value[-1] > close[-1]
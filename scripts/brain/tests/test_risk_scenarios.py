@@ -0,0 +1,184 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import risk_scenarios as rs
+from synthetic import random_walk_klines
+
+
+def _values(**overrides):
+    values = {"accountSize": Decimal(1000), "riskPercentage": Decimal(1), "entryPrice": Decimal(100),
+              "stopLossPrice": Decimal(90), "leverage": Decimal(10), "fees": Decimal("0.1"),
+              "totalPercentSold": Decimal(0)}
+    values.update({k: rs.to_decimal(v) for k, v in overrides.items()})
+    return values
+
+
+# --- Fixtures of src/lib/calculator.test.ts and src/lib/calculators/core.test.ts ---
+
+def test_base_metrics_long_and_short():
+    long = rs.base_metrics(_values(), rs.LONG)
+    assert (long["positionSize"], long["requiredMargin"], long["riskAmount"]) == (1, 10, 10)
+    short = rs.base_metrics(_values(stopLossPrice=110, leverage=5, fees="0.06"), rs.SHORT)
+    assert (short["positionSize"], short["requiredMargin"]) == (1, 20)
+    assert rs.base_metrics(_values(stopLossPrice=100), rs.LONG) is None
+
+
+def test_individual_tp_and_totals():
+    base = {"positionSize": Decimal(1), "requiredMargin": Decimal(10), "netLoss": Decimal(10),
+            "breakEvenPrice": Decimal(100), "liquidationPrice": Decimal(0), "entryFee": Decimal("0.1"),
+            "riskAmount": Decimal(10)}
+    tp = rs.individual_tp(Decimal(120), Decimal(50), base, _values(), 0)
+    assert tp["netProfit"] == Decimal("9.89")
+    assert tp["riskRewardRatio"] == Decimal("1.978")
+
+    totals = rs.total_metrics([{"price": Decimal(110), "percent": Decimal(100)}], dict(base, entryFee=Decimal(0)),
+                              _values(fees=0, totalPercentSold=100), rs.LONG)
+    assert totals["totalNetProfit"] == 10
+
+
+def test_break_even_price():
+    entry, fee = Decimal(100), Decimal("0.05")
+    long = rs.break_even_price(entry, fee, rs.LONG)
+    assert long > entry and abs(float(long) - 100.1) < 0.005
+    assert rs.break_even_price(entry, fee, rs.SHORT) < entry
+    assert rs.break_even_price(Decimal(42000), Decimal(0), rs.LONG) == Decimal(42000)
+    # decimal.js rounds every division to 20 significant digits, half up.
+    assert str(long) == "100.10005002501250625"
+
+    values = _values(accountSize=10000, entryPrice=30000, stopLossPrice=29700, fees=rs.DEFAULT_FEES)
+    base = rs.base_metrics(values, rs.LONG)
+    assert base["breakEvenPrice"] == rs.break_even_price(values["entryPrice"], values["fees"], rs.LONG)
+
+
+def test_money_metrics_follow_a_rounded_position_size():
+    values = _values(accountSize=10000, entryPrice=30000, stopLossPrice=29700, fees=rs.DEFAULT_FEES)
+    base = rs.base_metrics(values, rs.LONG)
+    same = rs.derive_money_metrics(base["positionSize"], values, base["riskAmount"])
+    assert all(same[f] == base[f] for f in ("requiredMargin", "netLoss", "entryFee"))
+
+    result = rs.calculate({"accountSize": 10000, "riskPercentage": 1, "entryPrice": 30000, "stopLossPrice": 29700,
+                           "fees": rs.DEFAULT_FEES, "basePrecision": 2})
+    assert result["base"]["positionSize"] == Decimal("0.33")
+    assert result["base"]["requiredMargin"] < base["requiredMargin"]
+    assert result["base"]["requiredMargin"] == rs.derive_money_metrics(
+        Decimal("0.33"), values, base["riskAmount"])["requiredMargin"]
+
+
+# --- calculatorService flow ---
+
+def test_calculate_atr_stop_locks_and_validation():
+    state = {"accountSize": "1000", "riskPercentage": "1", "entryPrice": "100", "useAtrSl": True,
+             "atrValue": "5", "atrMultiplier": "1.2", "leverage": "10", "fees": "0.1",
+             "targets": [{"price": "112", "percent": "50"}, {"price": "118", "percent": "50"}]}
+    result = rs.calculate(state)
+    assert result["status"] == rs.VALID
+    assert result["values"]["stopLossPrice"] == 94
+    assert result["values"]["totalPercentSold"] == 100
+    assert len(result["tps"]) == 2
+
+    short = rs.calculate(dict(state, tradeType=rs.SHORT, targets=[]))
+    assert short["values"]["stopLossPrice"] == 106
+
+    locked = rs.calculate(dict(state, isPositionSizeLocked=True, lockedPositionSize="2"))
+    assert locked["base"]["positionSize"] == 2
+    assert locked["values"]["riskPercentage"] == Decimal("1.2")
+
+    risk_locked = rs.calculate(dict(state, isRiskAmountLocked=True, riskAmount="25"))
+    assert risk_locked["values"]["riskPercentage"] == Decimal("2.5")
+    assert risk_locked["base"]["riskAmount"] == 25
+
+    assert rs.calculate(dict(state, atrValue="0"))["status"] == rs.INCOMPLETE
+    assert rs.calculate(dict(state, useAtrSl=False, stopLossPrice="101"))["message"] == "slBelowEntry"
+    assert rs.calculate(dict(state, targets=[{"price": "99", "percent": "50"}]))["message"] == "tpAboveEntry"
+    assert rs.calculate(dict(state, targets=[{"price": "112", "percent": "60"},
+                                             {"price": "118", "percent": "50"}]))["message"] == "totalPercentExceeded"
+
+
+# --- Float grids ---
+
+def test_grid_cells_match_the_exact_calculator():
+    risk, leverage, mults = [0.5, 1.7], [1, 3, 25], [0.8, 2.5]
+    split_rows, targets = rs.splits(3, 10), [1.0, 2.0, 3.5]
+    for trade_type in (rs.LONG, rs.SHORT):
+        grid = rs.scenario_grid(30_123.5, 151.25, risk, leverage, mults, split_rows, targets,
+                                trade_type=trade_type, account=2500.0, fees=0.06)
+        sign = 1 if trade_type == rs.LONG else -1
+        rng = np.random.default_rng(0)
+        for _ in range(25):
+            r, lv, m, s = (int(rng.integers(n)) for n in grid["valid"].shape)
+            dist = 151.25 * mults[m]
+            state = {"accountSize": 2500.0, "riskPercentage": risk[r], "entryPrice": 30_123.5,
+                     "stopLossPrice": 30_123.5 - sign * dist, "leverage": leverage[lv], "fees": 0.06,
+                     "tradeType": trade_type,
+                     "targets": [{"price": 30_123.5 + sign * t * dist, "percent": p}
+                                 for t, p in zip(targets, split_rows[s])]}
+            exact = rs.calculate(state)
+            assert exact["status"] == rs.VALID
+            pairs = {"position_size": exact["base"]["positionSize"], "required_margin": exact["base"]["requiredMargin"],
+                     "net_loss": exact["base"]["netLoss"], "liquidation_price": exact["base"]["liquidationPrice"],
+                     "total_net_profit": exact["totals"]["totalNetProfit"], "total_rr": exact["totals"]["totalRR"]}
+            for name, value in pairs.items():
+                assert grid[name][r, lv, m, s] == pytest.approx(float(value), rel=1e-9, abs=1e-9), name
+
+
+def test_driftless_walk_without_fees_has_zero_ev_and_concave_growth():
+    grid = rs.scenario_grid(100.0, 2.0, [0.5, 2.0], [1], [1.0, 3.0], rs.splits(4, 25), [1, 2, 3, 5], fees=0.0)
+    assert np.allclose(grid["ev"], 0.0, atol=1e-9)
+    assert (grid["growth"] < 0).all()
+    # Twice the risk costs more than twice the growth.
+    assert (grid["growth"][1] < 2 * grid["growth"][0]).all()
+    assert (grid["drawdown"][1] > grid["drawdown"][0]).all()
+
+
+def test_scenarios_liquidated_before_the_stop_or_above_the_account_are_invalid():
+    # Stop 10% away: liquidation (entry × (1 − 1/leverage)) comes first from 10x.
+    grid = rs.scenario_grid(100.0, 10.0, [1.0], [2, 9, 10, 20], [1.0], [[100.0]], [2.0])
+    assert grid["valid"][0, :, 0, 0].tolist() == [True, True, False, False]
+    assert np.isnan(grid["ev"][0, 2:, 0, 0]).all()
+    # 50% risk on a 1% stop needs 50x the account as notional.
+    grid = rs.scenario_grid(100.0, 1.0, [50.0], [10, 100], [1.0], [[100.0]], [2.0])
+    assert grid["valid"][0, :, 0, 0].tolist() == [False, False]
+
+
+def test_splits_cover_every_positive_split_of_100():
+    rows = rs.splits(3, 10)
+    assert len(rows) == 36 and np.allclose(rows.sum(axis=1), 100) and (rows > 0).all()
+    assert len(rs.splits(rs.MAX_TARGETS, 10)) == 126
+    assert len(rs.splits(11, 10)) == 0
+
+
+def test_history_hit_rates_follow_the_trend():
+    k = random_walk_klines(400, seed=1, volatility=0.001)
+    trend = np.exp(np.arange(400) * 0.01)
+    rising = {f: (v * trend if f != "time" else v) for f, v in k.items()}
+    up = rs.history_hit_rates(rising, [1.0], [1.0, 2.0], horizon=50)
+    down = rs.history_hit_rates(rising, [1.0], [1.0, 2.0], trade_type=rs.SHORT, horizon=50)
+    assert (up > 0.9).all() and (down < 0.1).all()
+    assert up[0, 0] >= up[0, 1]
+
+
+def test_grid_cli_writes_surfaces(tmp_path, capsys):
+    out = tmp_path / "surface.npz"
+    assert rs.main(["grid", "--entry", "100", "--atr", "2", "--risk", "1,2", "--leverage", "1,5",
+                    "--atr-mult", "1,2", "--targets", "1,2", "--split-step", "50", "--out", str(out)]) == 0
+    saved = np.load(out)
+    assert saved["ev"].shape == (2, 2, 2, 1)
+    assert "🏆" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+import scanner
+from candle_store import CandleStore
+from synthetic import random_walk_klines
+
+
+def test_summary_flags_extremes_flips_and_scores():
+    rsi = np.full(40, 50.0)
+    rsi[-1] = 80.0
+    trend = np.ones(40)
+    trend[-3:] = -1
+    price = np.linspace(100, 110, 40)
+    row = scanner.summarize(rsi, trend, price, price)
+    assert row["rsi_state"] == "overbought"
+    assert row["trend"] == "bear"
+    assert row["bars_since_flip"] == 2
+    assert row["score"] == pytest.approx(0.6 + 0.8)
+
+
+def test_scan_series_with_numpy_engine(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write("bitunix", "BTCUSDT", "1h", random_walk_klines(800, seed=3))
+    row = scanner.scan_series((str(tmp_path), "bitunix", "BTCUSDT", "1h", 600, 120, "numpy"))
+    assert "error" not in row
+    assert row["bars"] == 600
+    assert 0.0 <= row["rsi"] <= 100.0
+
+
+def test_rank_puts_errors_aside_and_sorts_by_component():
+    rows = [
+        {"symbol": "A", "score": 1.0, "_rank": {"rsi": 0.1, "flip": 0.9, "divergence": 0.0}},
+        {"symbol": "B", "score": 0.5, "_rank": {"rsi": 0.5, "flip": 0.0, "divergence": 0.0}},
+        {"symbol": "C", "error": "only 3 bars"},
+    ]
+    assert [r["symbol"] for r in scanner.rank(rows)] == ["A", "B"]
+    assert [r["symbol"] for r in scanner.rank(rows, "rsi")] == ["B", "A"]
+
+
+def test_native_engine_agrees_on_the_latest_rsi(tmp_path):
+    native = pytest.importorskip("native_technicals")
+    try:
+        native.find_library()
+    except native.NativeLibraryMissing:
+        pytest.skip("native technicals library not built")
+    store = CandleStore(str(tmp_path))
+    store.write("bitunix", "BTCUSDT", "1h", random_walk_klines(800, seed=3))
+    task = (str(tmp_path), "bitunix", "BTCUSDT", "1h", 600, 120)
+    native_row = scanner.scan_series(task + ("native",))
+    numpy_row = scanner.scan_series(task + ("numpy",))
+    assert native_row["rsi"] == pytest.approx(numpy_row["rsi"], abs=0.5)
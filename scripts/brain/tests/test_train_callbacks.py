@@ -0,0 +1,70 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+
+import pytest
+
+pytest.importorskip("gymnasium")
+pytest.importorskip("stable_baselines3")
+
+from stable_baselines3 import PPO  # noqa: E402
+from stable_baselines3.common.callbacks import CallbackList  # noqa: E402
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize  # noqa: E402
+
+import dataset  # noqa: E402
+import train_callbacks as tc  # noqa: E402
+from market_env import make_env_fns  # noqa: E402
+from test_dataset import _store  # noqa: E402
+
+
+def _agent(tmp_path):
+    dataset.build(_store(tmp_path), "bitunix", ["BTCUSDT", "ETHUSDT"], "1h", str(tmp_path / "ds"))
+    data = dataset.load(str(tmp_path / "ds"))
+    venv = DummyVecEnv(make_env_fns(data, episode_bars=50))
+    env = VecNormalize(venv, norm_obs=True, norm_reward=True)
+    return PPO("MlpPolicy", env, n_steps=32, batch_size=32, n_epochs=1, seed=0), venv
+
+
+def test_validation_stops_after_patience_and_keeps_the_best(tmp_path):
+    agent, _ = _agent(tmp_path)
+    scores = iter([1.0, 2.0, 1.5, 1.9, 0.0, 5.0])
+    validation = tc.ValidationCallback(lambda model: {"": {"sharpe": next(scores)}}, str(tmp_path / "ck"),
+                                       eval_freq=64, patience=2, verbose=0)
+    agent.learn(total_timesteps=64 * 10, callback=validation)
+
+    assert [h["sharpe"] for h in validation.history] == [1.0, 2.0, 1.5, 1.9]
+    assert validation.best == 2.0 and validation.bad_evals == 2
+    assert agent.num_timesteps < 64 * 10
+    assert tc.restore_best(agent, str(tmp_path / "ck"))
+
+
+def test_checkpoint_resumes_steps_normalization_and_validation_state(tmp_path):
+    agent, venv = _agent(tmp_path)
+    ck = str(tmp_path / "ck")
+    validation = tc.ValidationCallback(lambda model: {"": {"sharpe": 1.0}}, ck, eval_freq=64, patience=0, verbose=0)
+    checkpoints = tc.CheckpointCallback(ck, save_freq=64, validation=validation, keep=2)
+    agent.learn(total_timesteps=256, callback=CallbackList([validation, checkpoints]))
+
+    latest = tc.latest_checkpoint(ck)
+    assert latest is not None and latest.endswith(f"step_{agent.num_timesteps:012d}")
+    assert len([d for d in os.listdir(ck) if d.startswith("step_")]) == 2
+
+    resumed, env, state = tc.load_checkpoint(latest, venv)
+    assert resumed.num_timesteps == agent.num_timesteps
+    assert isinstance(env, VecNormalize)
+    assert env.obs_rms.count == pytest.approx(agent.get_vec_normalize_env().obs_rms.count)
+    assert state["validation"]["best"] == 1.0
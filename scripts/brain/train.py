@@ -14,23 +14,24 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
-import pandas as pd
+import argparse
+import json
+import shutil
+import sys
 import numpy as np
-import yfinance as yf
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
-from finrl.meta.preprocessor.yahoodownloader import YahooDownloader
-from finrl.meta.preprocessor.preprocessors import FeatureEngineer, data_split
-from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
-from finrl import config_tickers
-from finrl.config import INDICATORS
-
-# Optional: Try to import CCXT (for Binance) if available, handled gracefully if not
-try:
-    import ccxt
-    HAS_CCXT = True
-except ImportError:
-    HAS_CCXT = False
+from stable_baselines3.common.callbacks import CallbackList
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+import kline_repair
+from candle_store import timeframe_ms
+from profiling import MODES as PROFILE_MODES, Profiler
+from synthetic import KLINE_FIELDS
+from train_callbacks import (CheckpointCallback, ThroughputCallback, ValidationCallback, latest_checkpoint,
+                             load_checkpoint, restore_best)
+
+# FinRL, pandas/yfinance and CCXT (for Binance) are imported by the YAHOO/BINANCE
+# path only, so STORE training and `cachy-brain train --help` start without them.
 
 # --- Configuration ---
 TRAINED_MODEL_DIR = "trained_models"
@@ -38,11 +39,52 @@ os.makedirs(TRAINED_MODEL_DIR, exist_ok=True)
 MODEL_NAME = "ppo_cachy_agent"
 TIMESTEPS = 10000
 
-# SETTINGS: Choose Data Source
-# Options: "YAHOO" (Default, works always) or "BINANCE" (High quality crypto data, requires ccxt)
+# Checkpoints (policy, optimizer and normalization state) for --resume
+CHECKPOINT_DIR = os.path.join(TRAINED_MODEL_DIR, "checkpoints")
+CHECKPOINT_FREQ = 2000
+
+# Written next to the model; export.py bakes both into the ONNX graph.
+VECNORMALIZE_SUFFIX = "_vecnormalize.pkl"  # running mean/var of the observations
+LAYOUT_SUFFIX = ".layout.json"  # which raw inputs make up an observation (see observation.py)
+CLIP_OBS = 10.0
+
+# SETTINGS: Choose Data Source (default for --data-source)
+# Options: "YAHOO" (Default, works always), "BINANCE" (High quality crypto data, requires ccxt)
+# or "STORE" (Bitunix/Bitget perpetuals incl. funding, built by dataset.py from the candle store)
 DATA_SOURCE = "BINANCE"
+DATA_SOURCES = ("YAHOO", "BINANCE", "STORE")
+
+# Only used with --data-source STORE (default for --dataset)
+DATASET_DIR = os.environ.get("CACHY_DATASET", "datasets/bitunix_1h")
+EPISODE_BARS = 1000
+SEED = 0
+ENT_COEF = 0.01
+# PPO rollout/update shape (SB3's defaults). `autotune.py` measures which
+# combination with env count, torch threads and torch.compile trains fastest
+# on this machine and writes it to the `train:` section of the config.
+N_STEPS = 2048
+BATCH_SIZE = 64
+N_EPOCHS = 10
+# The last share of the dataset's bars is held out; every EVAL_FREQ steps
+# the agent is backtested on it and training stops after PATIENCE
+# evaluations without a better validation Sharpe.
+VALIDATION_SHARE = 0.2
+EVAL_FREQ = 2000
+PATIENCE = 5
+
+# STORE runs are recorded in the registry (model_registry.py) under a key of
+# dataset hash, the config below and this code; an unchanged rerun restores
+# the stored model instead of training again.
+FORCE_RETRAIN = os.environ.get("CACHY_FORCE_RETRAIN") == "1"
+TRAINING_SOURCES = ("train.py", "market_env.py")
+# Config fields that only decide how long a run trains. Checkpoints are kept
+# under the run key without them, so `--resume --timesteps <more>` or another
+# patience continues the same model.
+RUN_LENGTH_FIELDS = ("timesteps", "eval_freq", "patience")
 
 def download_data_yahoo(start_date, end_date, ticker_list):
+    from finrl.meta.preprocessor.yahoodownloader import YahooDownloader
+
     print(f"📥 Downloading from Yahoo Finance ({ticker_list})...")
     return YahooDownloader(
         start_date=start_date,
@@ -55,9 +97,13 @@ def download_data_binance(start_date, end_date, symbol="BTC/USDT", timeframe="1d
     Direct download using CCXT (Public API) for high quality crypto data.
     FinRL has wrappers, but direct CCXT is often more reliable for custom pipelines.
     """
-    if not HAS_CCXT:
+    # Optional: CCXT is handled gracefully if not installed
+    try:
+        import ccxt
+    except ImportError:
         print("⚠️ CCXT library not found. Falling back to Yahoo Finance.")
         return None
+    import pandas as pd
 
     print(f"📥 Downloading from Binance ({symbol} - {timeframe})...")
     exchange = ccxt.binance()
@@ -66,21 +112,24 @@ def download_data_binance(start_date, end_date, symbol="BTC/USDT", timeframe="1d
     since = exchange.parse8601(f"{start_date}T00:00:00Z")
     end_ts = exchange.parse8601(f"{end_date}T00:00:00Z")
 
-    all_ohlcv = []
+    pages = []
 
     try:
         while since < end_ts:
             ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=1000)
             if not ohlcv:
                 break
-            all_ohlcv.extend(ohlcv)
+            pages.append(kline_repair.from_rows(ohlcv))
             since = ohlcv[-1][0] + 1  # Next timestamp
             # Rate limit safety
             # time.sleep(exchange.rateLimit / 1000)
 
+        # Overlapping pages collapse to one bar per timestamp; missing bars become flat candles.
+        k = kline_repair.repair(pages, timeframe_ms(timeframe))
+
         # Convert to DataFrame matching FinRL format
         # FinRL expects: date, open, high, low, close, volume, tic, day
-        df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df = pd.DataFrame({"timestamp" if f == "time" else f: k[f] for f in KLINE_FIELDS})
         df['date'] = pd.to_datetime(df['timestamp'], unit='ms').dt.strftime('%Y-%m-%d')
         df['tic'] = symbol.replace("/", "-") # Normalize ticker name
 
@@ -97,9 +146,266 @@ def download_data_binance(start_date, end_date, symbol="BTC/USDT", timeframe="1d
         print(f"❌ Binance Download Error: {e}")
         return None
 
-def main():
+def save_agent(agent, env_train, layout):
+    save_path = os.path.join(TRAINED_MODEL_DIR, MODEL_NAME)
+    agent.save(save_path)
+    env_train.save(save_path + VECNORMALIZE_SUFFIX)
+    with open(save_path + LAYOUT_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(layout, f, indent=2)
+    print(f"💾 Model saved to: {save_path}.zip (+ normalization stats and input layout)")
+    return {os.path.basename(path): path
+            for path in (save_path + ".zip", save_path + VECNORMALIZE_SUFFIX, save_path + LAYOUT_SUFFIX)}
+
+def training_config(args):
+    """Everything besides data and code that decides what a STORE run produces."""
+    from market_env import DEFAULT_FEE
+    return {
+        "algo": "PPO",
+        "policy": "MlpPolicy",
+        "timesteps": args.timesteps,
+        "episode_bars": EPISODE_BARS,
+        "ent_coef": ENT_COEF,
+        **ppo_kwargs(args),
+        "n_envs": args.n_envs,
+        "clip_obs": CLIP_OBS,
+        "fee": DEFAULT_FEE,
+        "seed": SEED,
+        "validation_share": VALIDATION_SHARE,
+        "eval_freq": args.eval_freq,
+        "patience": args.patience,
+    }
+
+def checkpoint_key(dataset_hash, config, code):
+    """`run_key` without RUN_LENGTH_FIELDS: what the checkpoint directory of a STORE run is named after."""
+    from model_registry import run_key
+    return run_key(dataset_hash, {k: v for k, v in config.items() if k not in RUN_LENGTH_FIELDS}, code)
+
+def ppo_kwargs(args):
+    """Rollout and minibatch shape of PPO from the command line."""
+    return {"n_steps": args.n_steps, "batch_size": args.batch_size, "n_epochs": args.n_epochs}
+
+def configure_torch(threads=None):
+    """Intra-op thread count for torch (None keeps torch's default, one per core)."""
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+def compile_policy(agent):
+    """
+    torch.compile the policy's MLPs. Only `forward` is replaced, so the
+    parameters and state dict (and with them save/load and export) stay as
+    they are.
+    """
+    import torch
+
+    for module in (agent.policy.mlp_extractor, agent.policy.action_net, agent.policy.value_net):
+        module.forward = torch.compile(module.forward)
+
+def env_fns_for(data, n_envs=None, **kwargs):
+    """`make_env_fns` cycled over the symbols to `n_envs` environments (default: one per symbol)."""
+    from market_env import make_env_fns
+
+    fns = make_env_fns(data, **kwargs)
+    return fns if not n_envs else [fns[i % len(fns)] for i in range(n_envs)]
+
+def build_agent(venv, checkpoint_dir, resume, validation=None, ppo=None):
+    """PPO on VecNormalize(venv): fresh, or from the latest checkpoint in `checkpoint_dir` with --resume."""
+    ppo = ppo or {}
+    checkpoint = latest_checkpoint(checkpoint_dir) if resume else None
+    if checkpoint is None:
+        if resume:
+            print(f"⚠️ --resume: no checkpoint in {checkpoint_dir}, starting from scratch. Checkpoints belong "
+                  "to one dataset, code version and model/env config; changing any of them starts a new run.")
+        env = VecNormalize(venv, norm_obs=True, norm_reward=True, clip_obs=CLIP_OBS)
+        env.seed(SEED)
+        return PPO("MlpPolicy", env, verbose=1, ent_coef=ENT_COEF, seed=SEED, **ppo), env
+    agent, env, state = load_checkpoint(checkpoint, venv, **ppo)
+    if validation is not None:
+        validation.load_state(state.get("validation", {}))
+    print(f"⏯️ Resuming from {checkpoint} at step {agent.num_timesteps}")
+    return agent, env
+
+def learn(agent, total_timesteps, callbacks, checkpoints):
+    """
+    Train up to `total_timesteps` overall (a resumed agent continues its
+    count). Ctrl+C writes a checkpoint and returns False.
+    """
+    remaining = total_timesteps - agent.num_timesteps
+    if remaining <= 0:
+        return True
+    try:
+        agent.learn(total_timesteps=remaining, callback=CallbackList(callbacks), reset_num_timesteps=False)
+    except KeyboardInterrupt:
+        checkpoints.save()
+        print("⏸️ Interrupted: checkpoint written, continue with `python train.py --resume`.")
+        return False
+    return True
+
+def evaluate_agent(agent, vec_normalize, data, start=0, end=None):
+    """
+    Deterministic pass over bars [start, end) of every dataset symbol.
+    Returns market_env.performance per symbol, plus "" for the equal-weight
+    portfolio of all symbols.
+    """
+    from market_env import PerpetualTradingEnv, performance
+
+    symbols = data["manifest"]["symbols"]
+    envs = [PerpetualTradingEnv(data, s, start=start, end=end) for s in range(len(symbols))]
+    obs = np.stack([env.reset()[0] for env in envs])
+    rewards = []
+    terminated = False
+    while not terminated:
+        actions, _ = agent.predict(vec_normalize.normalize_obs(obs), deterministic=True)
+        steps = [env.step(action) for env, action in zip(envs, actions)]
+        obs = np.stack([step[0] for step in steps])
+        rewards.append([step[1] for step in steps])
+        terminated = steps[0][2]
+    rewards = np.asarray(rewards)
+    bar_ms = data["manifest"]["bar_ms"]
+    metrics = {symbol: performance(rewards[:, i], bar_ms) for i, symbol in enumerate(symbols)}
+    metrics[""] = performance(rewards.mean(axis=1), bar_ms)
+    return metrics
+
+def train_on_dataset(dataset_dir, args, profiler):
+    """
+    PPO on the perpetual-futures environment, one env per dataset symbol.
+    The envs read the dataset's memory-mapped arrays directly; no DataFrame
+    is built at any point.
+    """
+    import dataset
+    from market_env import WINDOW_BARS
+    from model_registry import ModelRegistry, code_hash, git_sha, run_key
+
+    if not os.path.exists(os.path.join(dataset_dir, "manifest.json")):
+        print(f"❌ No dataset at {dataset_dir}. Build one with dataset.py first.")
+        return 1
+
+    with profiler.stage("load_dataset") as stage:
+        budget = None if args.memory_budget is None else int(args.memory_budget * 2**20)
+        data = dataset.load(dataset_dir, budget_bytes=budget)
+        manifest = data["manifest"]
+        stage.rows = manifest["bars"] * len(manifest["symbols"])
+        footprint = dataset.footprint(data, WINDOW_BARS)
+        stage.extra.update({"dataset_resident_mb": footprint["resident"] / 2**20,
+                            "dataset_mapped_mb": footprint["mapped"] / 2**20})
+    print(f"✅ Dataset: {manifest['exchange']} {manifest['tf']}, {len(manifest['symbols'])} symbols, "
+          f"{manifest['bars']} bars, features: {', '.join(manifest['features'])}")
+    print(dataset.format_footprint(footprint))
+
+    with profiler.stage("register_dataset"):
+        registry = ModelRegistry()
+        dataset_hash = registry.register_dataset(dataset_dir)
+    config = training_config(args)
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = code_hash([os.path.join(here, name) for name in TRAINING_SOURCES])
+    key = run_key(dataset_hash, config, code)
+    previous = registry.find_run(key)
+    if previous is not None and not FORCE_RETRAIN:
+        registry.restore(previous["id"], TRAINED_MODEL_DIR)
+        sharpe = previous["metrics"].get("", {}).get("sharpe")
+        print(f"⏭️ Unchanged dataset {dataset_hash[:12]}, config and code: restored run #{previous['id']} "
+              f"(Sharpe {sharpe:.3f}) to {TRAINED_MODEL_DIR}/. Set CACHY_FORCE_RETRAIN=1 to train anyway.")
+        registry.close()
+        return 0
+
+    split = int(manifest["bars"] * (1 - VALIDATION_SHARE))
+    print(f"✂️ Training on bars [0, {split}), validating on [{split}, {manifest['bars']})")
+    checkpoint_dir = os.path.join(CHECKPOINT_DIR, checkpoint_key(dataset_hash, config, code)[:16])
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    validation = ValidationCallback(
+        lambda model: evaluate_agent(model, model.get_vec_normalize_env(), data, start=split),
+        checkpoint_dir, args.eval_freq, args.patience)
+    checkpoints = CheckpointCallback(checkpoint_dir, args.checkpoint_freq, validation)
+    with profiler.stage("env_setup"):
+        venv = DummyVecEnv(env_fns_for(data, args.n_envs, episode_bars=EPISODE_BARS, end=split))
+        agent, env_train = build_agent(venv, checkpoint_dir, args.resume, validation, ppo_kwargs(args))
+        if args.compile:
+            compile_policy(agent)
+
+    print("🧠 Training PPO Agent...")
+    with profiler.stage("learn") as stage:
+        finished = learn(agent, args.timesteps, [validation, checkpoints, ThroughputCallback(stage)], checkpoints)
+        stage.extra["validations"] = len(validation.history)
+    if not finished:
+        registry.close()
+        return 1
+    print("✅ Training complete!")
+    if restore_best(agent, checkpoint_dir):
+        print(f"⭐ Using the best validation checkpoint (step {validation.best_step}, Sharpe {validation.best:.3f})")
+
+    with profiler.stage("save"):
+        artifacts = save_agent(agent, env_train, {
+            "kind": "perp",
+            "exchange": manifest["exchange"],
+            "tf": manifest["tf"],
+            "symbols": manifest["symbols"],
+            "dataset": os.path.abspath(dataset_dir),
+            "dataset_hash": dataset_hash,
+        })
+
+    print("📈 Evaluating on the validation bars...")
+    with profiler.stage("evaluate") as stage:
+        metrics = evaluate_agent(agent, env_train, data, start=split)
+        metrics[""]["timesteps"] = agent.num_timesteps
+        stage.rows = (manifest["bars"] - split) * len(manifest["symbols"])
+    with profiler.stage("register_run"):
+        run_id = registry.record_run(key, dataset_hash, config, artifacts, metrics, tf=manifest["tf"],
+                                     symbols=manifest["symbols"], git_sha=git_sha())
+        registry.close()
+    # The run is in the registry now; its checkpoints are no longer needed.
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    print(f"🗂️ Registered as run #{run_id}: Sharpe {metrics['']['sharpe']:.3f}, "
+          f"return {metrics['']['total_return'] * 100:.1f}%, max drawdown {metrics['']['max_drawdown'] * 100:.1f}%")
+    return 0
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Train the Cachy Brain PPO agent.")
+    p.add_argument("--data-source", choices=DATA_SOURCES, default=DATA_SOURCE,
+                   help="YAHOO / BINANCE (FinRL stock env) or STORE (dataset.py output with market_env).")
+    p.add_argument("--dataset", default=DATASET_DIR, help="Dataset directory for --data-source STORE.")
+    p.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                   help="STORE: read the dataset into RAM if it fits this many MB, else train from the "
+                        "memory maps (default: always memory-mapped).")
+    p.add_argument("--resume", action="store_true", help="Continue from the latest checkpoint of this run.")
+    p.add_argument("--timesteps", type=int, default=TIMESTEPS, help="Total environment steps.")
+    p.add_argument("--checkpoint-freq", type=int, default=CHECKPOINT_FREQ, help="Steps between checkpoints.")
+    p.add_argument("--eval-freq", type=int, default=EVAL_FREQ,
+                   help="Steps between validation backtests (STORE only).")
+    p.add_argument("--patience", type=int, default=PATIENCE,
+                   help="Validations without improvement before stopping (0 disables early stopping).")
+    p.add_argument("--profile", choices=PROFILE_MODES, default="basic",
+                   help="Per-stage profiling: timings only, or with cProfile / py-spy output (see profiling.py).")
+    p.add_argument("--n-envs", type=int, default=None,
+                   help="STORE: environments, cycled over the symbols (default: one per symbol).")
+    p.add_argument("--n-steps", type=int, default=N_STEPS, help="Rollout length per environment.")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Minibatch size of the PPO updates.")
+    p.add_argument("--n-epochs", type=int, default=N_EPOCHS, help="Passes over each rollout.")
+    p.add_argument("--torch-threads", type=int, default=None, help="torch intra-op threads (default: one per core).")
+    p.add_argument("--compile", action="store_true", help="torch.compile the policy networks.")
+    return p
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_torch(args.torch_threads)
+    profiler = Profiler("train", args.profile)
+    try:
+        return run_pipeline(args, profiler)
+    finally:
+        if profiler.stages:
+            profiler.finish()
+
+def run_pipeline(args, profiler):
     print("🚀 Starting Cachy Brain Training Pipeline...")
-    print(f"📊 Configured Data Source: {DATA_SOURCE}")
+    print(f"📊 Configured Data Source: {args.data_source}")
+
+    if args.data_source == "STORE":
+        return train_on_dataset(args.dataset, args, profiler)
+
+    from finrl.config import INDICATORS
+    from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
+    from finrl.meta.preprocessor.preprocessors import FeatureEngineer
 
     # 1. Download Data
     # Defaults
@@ -108,19 +414,21 @@ def main():
 
     df = None
 
-    if DATA_SOURCE == "BINANCE":
-        # Try Binance First
-        df = download_data_binance(start_date, end_date, symbol="BTC/USDT", timeframe="1d")
+    with profiler.stage("download") as stage:
+        if args.data_source == "BINANCE":
+            # Try Binance First
+            df = download_data_binance(start_date, end_date, symbol="BTC/USDT", timeframe="1d")
 
-    if df is None:
-        if DATA_SOURCE == "BINANCE":
-            print("⚠️ Fallback to Yahoo Finance...")
-        # Yahoo Fallback (or default)
-        df = download_data_yahoo(start_date, end_date, ["BTC-USD"])
+        if df is None:
+            if args.data_source == "BINANCE":
+                print("⚠️ Fallback to Yahoo Finance...")
+            # Yahoo Fallback (or default)
+            df = download_data_yahoo(start_date, end_date, ["BTC-USD"])
+        stage.rows = 0 if df is None else len(df)
 
     if df is None or df.empty:
         print("❌ Critical Error: No data downloaded. Exiting.")
-        return
+        return 1
 
     print(f"✅ Data ready. Shape: {df.shape}")
 
@@ -135,11 +443,13 @@ def main():
     )
 
     try:
-        processed = fe.preprocess_data(df)
-        processed = processed.sort_values(['date','tic']).reset_index(drop=True)
+        with profiler.stage("preprocess", rows=len(df)) as stage:
+            processed = fe.preprocess_data(df)
+            processed = processed.sort_values(['date','tic']).reset_index(drop=True)
+            stage.extra["rows_out"] = len(processed)
     except Exception as e:
         print(f"❌ Preprocessing failed: {e}")
-        return
+        return 1
 
     # 3. Define Environment
     print("🌍 Setting up Trading Environment...")
@@ -163,20 +473,34 @@ def main():
         "reward_scaling": 1e-4
     }
 
-    e_train_gym = StockTradingEnv(df=processed, **env_kwargs)
-    env_train, _ = e_train_gym.get_sb_env()
+    checkpoint_dir = os.path.join(CHECKPOINT_DIR, "finrl")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    checkpoints = CheckpointCallback(checkpoint_dir, args.checkpoint_freq)
+    with profiler.stage("env_setup", rows=len(processed)):
+        e_train_gym = StockTradingEnv(df=processed, **env_kwargs)
+        venv, _ = e_train_gym.get_sb_env()
+        agent, env_train = build_agent(venv, checkpoint_dir, args.resume, ppo=ppo_kwargs(args))
+        if args.compile:
+            compile_policy(agent)
 
     # 4. Train Agent (PPO)
     print("🧠 Training PPO Agent...")
-    agent = PPO("MlpPolicy", env_train, verbose=1, ent_coef=0.01)
-
-    agent.learn(total_timesteps=TIMESTEPS)
+    with profiler.stage("learn") as stage:
+        finished = learn(agent, args.timesteps, [checkpoints, ThroughputCallback(stage)], checkpoints)
+    if not finished:
+        return 1
     print("✅ Training complete!")
 
     # 5. Save Model
-    save_path = os.path.join(TRAINED_MODEL_DIR, MODEL_NAME)
-    agent.save(save_path)
-    print(f"💾 Model saved to: {save_path}.zip")
+    with profiler.stage("save"):
+        save_agent(agent, env_train, {
+            "kind": "finrl",
+            "stock_dim": stock_dimension,
+            "indicators": list(INDICATORS),
+            "tickers": sorted(processed.tic.unique().tolist()),
+        })
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
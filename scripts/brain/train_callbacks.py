@@ -0,0 +1,251 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Callbacks that make `train.py`'s `agent.learn` resumable and self-stopping.
+
+* `CheckpointCallback` writes the model (policy and optimizer state, SB3's
+  zip), the VecNormalize statistics and the validation state every
+  `save_freq` steps into `<dir>/step_<n>/`, and points `<dir>/latest.json`
+  at the newest one. `load_checkpoint` restores all three for `--resume`.
+* `ValidationCallback` runs a backtest on held-out bars every `eval_freq`
+  steps, keeps a copy of the best model in `<dir>/best/`, and stops training
+  after `patience` evaluations without improvement.
+* `ThroughputCallback` splits learning time into rollout collection and
+  gradient updates and reports env steps/s and updates/s for `profiling.py`.
+"""
+
+import json
+import math
+import os
+import shutil
+import time
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecNormalize
+
+LATEST = "latest.json"
+BEST_DIR = "best"
+MODEL_FILE = "model.zip"
+VECNORMALIZE_FILE = "vecnormalize.pkl"
+STATE_FILE = "state.json"
+
+
+def save_snapshot(model, directory, state=None):
+    """Model, normalization stats and `state` into `directory` (replaced atomically)."""
+    tmp = directory + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    model.save(os.path.join(tmp, MODEL_FILE))
+    vec_normalize = model.get_vec_normalize_env()
+    if vec_normalize is not None:
+        vec_normalize.save(os.path.join(tmp, VECNORMALIZE_FILE))
+    with open(os.path.join(tmp, STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"num_timesteps": model.num_timesteps, **(state or {})}, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def latest_checkpoint(checkpoint_dir):
+    """Directory of the newest checkpoint, or None."""
+    path = os.path.join(checkpoint_dir, LATEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        directory = os.path.join(checkpoint_dir, json.load(f)["checkpoint"])
+    return directory if os.path.exists(os.path.join(directory, MODEL_FILE)) else None
+
+
+def load_checkpoint(directory, venv, **ppo_kwargs):
+    """(agent, VecNormalize env, state) from a snapshot; `venv` is the unnormalized vector env."""
+    vec_path = os.path.join(directory, VECNORMALIZE_FILE)
+    env = VecNormalize.load(vec_path, venv) if os.path.exists(vec_path) else venv
+    agent = PPO.load(os.path.join(directory, MODEL_FILE), env=env, **ppo_kwargs)
+    with open(os.path.join(directory, STATE_FILE), encoding="utf-8") as f:
+        state = json.load(f)
+    return agent, env, state
+
+
+def restore_best(agent, checkpoint_dir):
+    """Load the best validation snapshot's weights and statistics into `agent`; False if there is none."""
+    best = os.path.join(checkpoint_dir, BEST_DIR)
+    if not os.path.exists(os.path.join(best, MODEL_FILE)):
+        return False
+    agent.set_parameters(os.path.join(best, MODEL_FILE), exact_match=True)
+    vec_normalize = agent.get_vec_normalize_env()
+    vec_path = os.path.join(best, VECNORMALIZE_FILE)
+    if vec_normalize is not None and os.path.exists(vec_path):
+        saved = VecNormalize.load(vec_path, vec_normalize.venv)
+        vec_normalize.obs_rms = saved.obs_rms
+        vec_normalize.ret_rms = saved.ret_rms
+    return True
+
+
+class ValidationCallback(BaseCallback):
+    """
+    `evaluate(model)` returns market_env.performance-style metrics keyed by
+    symbol ("" = portfolio); `metric` of the portfolio is the score.
+    """
+
+    def __init__(self, evaluate, checkpoint_dir, eval_freq, patience, metric="sharpe", min_delta=0.0, verbose=1):
+        super().__init__(verbose)
+        self.evaluate = evaluate
+        self.checkpoint_dir = checkpoint_dir
+        self.eval_freq = eval_freq
+        self.patience = patience
+        self.metric = metric
+        self.min_delta = min_delta
+        self.best = None
+        self.best_step = None
+        self.bad_evals = 0
+        self.history = []
+        self.last_eval = 0
+
+    def state(self):
+        return {"best": self.best, "best_step": self.best_step, "bad_evals": self.bad_evals,
+                "history": self.history, "last_eval": self.last_eval}
+
+    def load_state(self, state):
+        self.best = state.get("best")
+        self.best_step = state.get("best_step")
+        self.bad_evals = state.get("bad_evals", 0)
+        self.history = state.get("history", [])
+        self.last_eval = state.get("last_eval", 0)
+
+    def _on_step(self):
+        # num_timesteps grows by n_envs per step, so compare against the last evaluation.
+        if self.num_timesteps - self.last_eval < self.eval_freq:
+            return True
+        self.last_eval = self.num_timesteps
+        metrics = self.evaluate(self.model)
+        score = float(metrics[""][self.metric])
+        self.history.append({"step": self.num_timesteps, **metrics[""]})
+        for name, value in metrics[""].items():
+            self.logger.record(f"eval/{name}", value)
+
+        if self.best is None or score > self.best + self.min_delta:
+            self.best, self.best_step, self.bad_evals = score, self.num_timesteps, 0
+            save_snapshot(self.model, os.path.join(self.checkpoint_dir, BEST_DIR), {"validation": self.state()})
+            marker = " ⭐ new best"
+        else:
+            self.bad_evals += 1
+            marker = f" (no improvement {self.bad_evals}/{self.patience})"
+        if self.verbose:
+            print(f"📊 Step {self.num_timesteps}: validation {self.metric} {score:.3f}{marker}")
+        if self.patience and self.bad_evals >= self.patience:
+            print(f"🛑 Early stop: best {self.metric} {self.best:.3f} at step {self.best_step}")
+            return False
+        return True
+
+
+class CheckpointCallback(BaseCallback):
+    """Periodic snapshots for `--resume`; keeps the newest `keep` of them."""
+
+    def __init__(self, checkpoint_dir, save_freq, validation=None, keep=2, verbose=0):
+        super().__init__(verbose)
+        self.checkpoint_dir = checkpoint_dir
+        self.save_freq = save_freq
+        self.validation = validation
+        self.keep = keep
+        self.last_save = 0
+
+    def _on_training_start(self):
+        self.last_save = self.num_timesteps
+
+    def _on_step(self):
+        if self.num_timesteps - self.last_save >= self.save_freq:
+            self.save()
+        return True
+
+    def save(self):
+        """Write a checkpoint now (also called on Ctrl+C)."""
+        self.last_save = self.num_timesteps
+        name = f"step_{self.num_timesteps:012d}"
+        state = {"validation": self.validation.state()} if self.validation is not None else {}
+        save_snapshot(self.model, os.path.join(self.checkpoint_dir, name), state)
+        tmp = os.path.join(self.checkpoint_dir, LATEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"checkpoint": name, "num_timesteps": self.num_timesteps}, f)
+        os.replace(tmp, os.path.join(self.checkpoint_dir, LATEST))
+        old = sorted(d for d in os.listdir(self.checkpoint_dir) if d.startswith("step_") and not d.endswith(".tmp"))
+        for stale in old[:-self.keep]:
+            shutil.rmtree(os.path.join(self.checkpoint_dir, stale), ignore_errors=True)
+        if self.verbose:
+            print(f"💾 Checkpoint at step {self.num_timesteps}")
+
+
+class ThroughputCallback(BaseCallback):
+    """
+    Env steps/s while collecting rollouts and gradient updates/s while
+    training. At the end of learning the numbers go into `stage.extra` (a
+    `profiling.Stage`) if one is given, and are kept in `self.result`.
+    """
+
+    def __init__(self, stage=None, verbose=0):
+        super().__init__(verbose)
+        self.stage = stage
+        self.result = None
+        self.rollout_s = 0.0
+        self.train_s = 0.0
+        self.env_steps = 0
+        self._rollout_started = None
+        self._rollout_ended = None
+        self._steps_at_rollout = 0
+        self._updates_at_start = 0
+
+    def _on_training_start(self):
+        self._updates_at_start = self.model._n_updates
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._rollout_ended is not None:
+            self.train_s += now - self._rollout_ended
+        self._rollout_started, self._rollout_ended = now, None
+        self._steps_at_rollout = self.model.num_timesteps
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        self.rollout_s += now - self._rollout_started
+        self.env_steps += self.model.num_timesteps - self._steps_at_rollout
+        self._rollout_started, self._rollout_ended = None, now
+
+    def _on_step(self):
+        return True
+
+    def _on_training_end(self):
+        now = time.perf_counter()
+        if self._rollout_started is not None:
+            # Stopped by another callback in the middle of a rollout.
+            self.rollout_s += now - self._rollout_started
+            self.env_steps += self.model.num_timesteps - self._steps_at_rollout
+        elif self._rollout_ended is not None:
+            self.train_s += now - self._rollout_ended
+        # PPO counts epochs in _n_updates; each epoch is one pass of minibatches over the rollout buffer.
+        batch_size = getattr(self.model, "batch_size", None)
+        rollout = self.model.n_steps * self.model.n_envs
+        minibatches = math.ceil(rollout / batch_size) if batch_size else 1
+        grad_updates = (self.model._n_updates - self._updates_at_start) * minibatches
+        self.result = {
+            "env_steps": self.env_steps,
+            "env_steps_per_s": self.env_steps / self.rollout_s if self.rollout_s else None,
+            "grad_updates": grad_updates,
+            "grad_updates_per_s": grad_updates / self.train_s if self.train_s else None,
+            "rollout_s": self.rollout_s,
+            "train_s": self.train_s,
+        }
+        if self.stage is not None:
+            self.stage.extra.update(self.result)
+            self.stage.rows = self.env_steps
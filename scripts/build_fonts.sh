@@ -0,0 +1,41 @@
+#!/bin/bash
+
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Writes static/_opt/ (WOFF2 font subsets and the service worker's precache
+# list) with scripts/perf/static_assets.py before `vite build` reads it, so
+# the build never depends on an earlier manual run. Subsetting needs fontTools
+# and brotli (scripts/perf/requirements.txt); without them the manifest lists
+# the original fonts only. Without python3, static/_opt/ is removed, and the
+# build loads the original fonts and precaches all of static/.
+
+# Do not exit immediately on error, handle them gracefully
+set +e
+
+OUT_DIR="static/_opt"
+
+if ! command -v python3 > /dev/null 2>&1; then
+    echo "⚠ python3 not found. Skipping font subsets; building with the original fonts."
+    rm -rf "$OUT_DIR"
+    exit 0
+fi
+
+if ! python3 scripts/perf/static_assets.py; then
+    echo "⚠ static_assets.py failed. Building with the original fonts."
+    rm -rf "$OUT_DIR"
+    exit 0
+fi
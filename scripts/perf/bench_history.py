@@ -0,0 +1,470 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+History of the app's benchmark results, with change-point detection.
+Run by hand; nothing calls it automatically.
+
+The benches under tests/benchmarks/ and src/benchmarks/ print their numbers
+and forget them, and `npm run test:perf` stays out of CI because a single
+run on a noisy machine proves nothing. This keeps every result in a local
+SQLite store (`history/bench.sqlite`) with the git SHA and the machine
+fingerprint it was measured on, and looks for lasting shifts in the series:
+
+    python bench_history.py record --repeat 3                    # run the benches, store the results
+    python bench_history.py ingest bench.json                    # or store `vitest bench --outputJson` output
+    python bench_history.py ingest bench.log --log tests/benchmarks/safeJson.bench.ts
+    python bench_history.py report --bench safeJson,slidingWindow,market_updates
+    python bench_history.py history "tests/benchmarks/market_updates.bench.ts > batch"
+
+Two kinds of bench exist: vitest `bench()` suites, read from vitest's JSON
+report, and standalone scripts (safeJson, slidingWindow, …) that print
+`name: 12.34ms for 500 ops (40519 ops/s) -> 0.025 ms/op` lines, read from
+their output. `record` runs both.
+
+A benchmark's series is its mean time per run, in run order, on one
+machine. Change points come from binary segmentation with Taylor's
+bootstrap test: the CUSUM range of the log times is compared with that of
+BOOTSTRAPS random reorderings, and a split is taken when fewer than
+1 − CONFIDENCE of them reach it. A change is kept only if the bootstrap
+confidence interval of after/before − 1 excludes zero and it is at least
+MIN_EFFECT; otherwise the difference is noise. Repeated runs at one commit
+(`--repeat`) are what give the test enough samples.
+"""
+
+import argparse
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import platform
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(PERF_DIR))
+DEFAULT_DB = os.environ.get("CACHY_BENCH_HISTORY", os.path.join(PERF_DIR, "history", "bench.sqlite"))
+SCRIPT_BENCHES = ("tests/benchmarks/*.bench.ts", "src/benchmarks/*.bench.ts")
+BOOTSTRAPS = 2000
+CONFIDENCE = 0.95
+MIN_EFFECT = 0.05
+MIN_SEGMENT = 3
+
+# The line the standalone benches' runBench() prints.
+LOG_LINE = re.compile(r"^(?P<name>.+?): (?P<total>[\d.]+)ms for (?P<n>\d+) ops \((?P<hz>[\d.]+) ops/s\)"
+                      r" -> (?P<per_op>[\d.]+) ms/op\s*$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL, git_sha TEXT, dirty INTEGER,
+    machine_fingerprint TEXT, machine TEXT, source TEXT, note TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER, bench TEXT, mean_ms REAL, sd_ms REAL, median_ms REAL, p99_ms REAL, hz REAL,
+    rme REAL, samples INTEGER, PRIMARY KEY (run_id, bench)
+);
+CREATE INDEX IF NOT EXISTS results_by_bench ON results (bench, run_id);
+CREATE INDEX IF NOT EXISTS runs_by_machine ON runs (machine_fingerprint, id);
+"""
+RESULT_FIELDS = ("bench", "mean_ms", "sd_ms", "median_ms", "p99_ms", "hz", "rme", "samples")
+
+
+def machine_fingerprint():
+    """Stable identity of the box (the same digest as scripts/brain/indicator_bench.py)."""
+    cpu = platform.processor() or ""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    parts = {
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpu": cpu,
+        "cpu_count": os.cpu_count(),
+    }
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:12]
+    return digest, parts
+
+
+def git_state():
+    """(short SHA, uncommitted changes?) of the repo, or (None, False) outside git."""
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True,
+                                      stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=REPO_ROOT,
+                               stderr=subprocess.DEVNULL).returncode != 0
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def _relpath(path):
+    if path and os.path.isabs(path):
+        path = os.path.relpath(path, REPO_ROOT)
+    return path.replace(os.sep, "/")
+
+
+def parse_vitest(report):
+    """Result rows from a `vitest bench --outputJson` report (times in ms, as tinybench measures them)."""
+    rows = []
+    for f in report.get("files", []):
+        path = _relpath(f.get("filepath", ""))
+        for group in f.get("groups", []):
+            name = group.get("fullName") or path
+            if path and not name.startswith(path):
+                name = f"{path} > {name}"
+            for b in group.get("benchmarks", []):
+                mean = b.get("mean") or (1000 / b["hz"] if b.get("hz") else None)
+                if mean is None:
+                    continue
+                rows.append({
+                    "bench": f"{name} > {b['name']}",
+                    "mean_ms": mean,
+                    "sd_ms": b.get("sd"),
+                    "median_ms": b.get("median", b.get("p50")),
+                    "p99_ms": b.get("p99"),
+                    "hz": b.get("hz"),
+                    "rme": b.get("rme"),
+                    "samples": b.get("sampleCount") or len(b.get("samples") or []) or None,
+                })
+    return rows
+
+
+def parse_log(text, path):
+    """Result rows from the output of a standalone bench script (`runBench` lines)."""
+    rows = []
+    for line in text.splitlines():
+        m = LOG_LINE.match(line.strip())
+        if m:
+            n = int(m["n"])
+            rows.append({"bench": f"{_relpath(path)} > {m['name']}", "mean_ms": float(m["total"]) / n,
+                         "sd_ms": None, "median_ms": None, "p99_ms": None, "hz": float(m["hz"]),
+                         "rme": None, "samples": n})
+    return rows
+
+
+class BenchHistory:
+    def __init__(self, path=DEFAULT_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_run(self, rows, source, git_sha=None, dirty=False, fingerprint=None, machine=None, note=None,
+                created=None):
+        """Store one run's results; returns the run id. SHA and machine default to the current ones."""
+        if fingerprint is None:
+            fingerprint, machine = machine_fingerprint()
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO runs (created, git_sha, dirty, machine_fingerprint, machine, source, note) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (created if created is not None else time.time(), git_sha, int(dirty), fingerprint,
+                 json.dumps(machine or {}), source, note))
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO results VALUES (?, {', '.join('?' * len(RESULT_FIELDS))})",
+                [(cur.lastrowid, *(r[k] for k in RESULT_FIELDS)) for r in rows])
+        return cur.lastrowid
+
+    def benches(self, fingerprint=None, patterns=None):
+        """Benchmark names with results (on one machine), optionally filtered by substrings or globs."""
+        sql = "SELECT DISTINCT bench FROM results JOIN runs ON runs.id = results.run_id"
+        args = ()
+        if fingerprint:
+            sql += " WHERE machine_fingerprint = ?"
+            args = (fingerprint,)
+        names = [r["bench"] for r in self.db.execute(sql + " ORDER BY bench", args)]
+        if patterns:
+            names = [n for n in names if any(fnmatch.fnmatch(n, p) if any(c in p for c in "*?[") else p in n
+                                             for p in patterns)]
+        return names
+
+    def series(self, bench, fingerprint=None):
+        """Rows (run id, created, git_sha, dirty, mean_ms, sd_ms) of one benchmark in run order."""
+        sql = ("SELECT runs.id AS run_id, created, git_sha, dirty, mean_ms, sd_ms FROM results "
+               "JOIN runs ON runs.id = results.run_id WHERE bench = ?")
+        args = [bench]
+        if fingerprint:
+            sql += " AND machine_fingerprint = ?"
+            args.append(fingerprint)
+        return [dict(r) for r in self.db.execute(sql + " ORDER BY runs.id", args)]
+
+
+def _cusum_range(x):
+    """max − min of the CUSUM of deviations from the mean (with S_0 = 0), per row."""
+    s = np.cumsum(x - x.mean(axis=-1, keepdims=True), axis=-1)
+    s = np.concatenate([np.zeros(s.shape[:-1] + (1,)), s], axis=-1)
+    return s.max(axis=-1) - s.min(axis=-1), s
+
+
+def split_confidence(x, n_boot=BOOTSTRAPS, rng=None, min_size=MIN_SEGMENT):
+    """(best split index, confidence that there is a change) for one segment, Taylor's bootstrap."""
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if n < 2 * min_size:
+        return None, 0.0
+    rng = rng if rng is not None else np.random.default_rng(0)
+    observed, s = _cusum_range(x)
+    # S_k covers x[:k]; a change at k starts the new segment at x[k].
+    k = min_size + int(np.argmax(np.abs(s[min_size:n - min_size + 1])))
+    shuffled = rng.permuted(np.broadcast_to(x, (n_boot, n)), axis=1)
+    boot, _ = _cusum_range(shuffled)
+    return k, float(np.mean(boot < observed))
+
+
+def effect_ci(before, after, n_boot=BOOTSTRAPS, rng=None, level=CONFIDENCE):
+    """(mean(after)/mean(before) − 1, low, high), the interval from resampling each side."""
+    before, after = np.asarray(before, dtype=np.float64), np.asarray(after, dtype=np.float64)
+    rng = rng if rng is not None else np.random.default_rng(0)
+    b = rng.choice(before, size=(n_boot, len(before))).mean(axis=1)
+    a = rng.choice(after, size=(n_boot, len(after))).mean(axis=1)
+    ratios = a / b - 1
+    tail = (1 - level) / 2 * 100
+    return float(after.mean() / before.mean() - 1), float(np.percentile(ratios, tail)), float(np.percentile(ratios, 100 - tail))
+
+
+def change_points(values, n_boot=BOOTSTRAPS, confidence=CONFIDENCE, min_effect=MIN_EFFECT,
+                  min_size=MIN_SEGMENT, seed=0):
+    """
+    Kept changes in a series of times, by binary segmentation:
+    [{"index", "change", "ci": [low, high], "confidence"}] in index order,
+    where `index` is the first run after the change.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    logs = np.log(np.maximum(values, 1e-12))
+    rng = np.random.default_rng(seed)
+    found = []
+    segments = [(0, len(values))]
+    while segments:
+        lo, hi = segments.pop()
+        k, conf = split_confidence(logs[lo:hi], n_boot, rng, min_size)
+        if k is None or conf < confidence:
+            continue
+        split = lo + k
+        change, low, high = effect_ci(values[lo:split], values[split:hi], n_boot, rng, confidence)
+        if abs(change) < min_effect or low <= 0 <= high:
+            continue
+        found.append({"index": split, "change": float(change), "ci": [low, high], "confidence": conf})
+        segments += [(lo, split), (split, hi)]
+    found.sort(key=lambda c: c["index"])
+    # Effects against the neighbouring segments, not the segment the split was found in.
+    bounds = [0] + [c["index"] for c in found] + [len(values)]
+    for i, c in enumerate(found):
+        before, after = values[bounds[i]:bounds[i + 1]], values[bounds[i + 1]:bounds[i + 2]]
+        c["change"], c["ci"][0], c["ci"][1] = effect_ci(before, after, n_boot, rng, confidence)
+    return found
+
+
+def trend(rows, **kwargs):
+    """Trend of one benchmark's series (rows from BenchHistory.series)."""
+    values = np.array([r["mean_ms"] for r in rows], dtype=np.float64)
+    changes = change_points(values, **kwargs)
+    for c in changes:
+        c["git_sha"] = rows[c["index"]]["git_sha"]
+        c["run_id"] = rows[c["index"]]["run_id"]
+    start = changes[-1]["index"] if changes else 0
+    current = values[start:]
+    status = "stable"
+    if changes:
+        status = "regression" if changes[-1]["change"] > 0 else "improvement"
+    return {
+        "runs": len(values),
+        "latest_ms": float(values[-1]) if len(values) else None,
+        "current_ms": float(current.mean()) if len(current) else None,
+        "current_cv": float(current.std() / current.mean()) if len(current) > 1 and current.mean() else None,
+        "since_run": rows[start]["run_id"] if rows else None,
+        "changes": changes,
+        "status": status,
+    }
+
+
+def report(history, patterns=None, fingerprint=None, **kwargs):
+    return {bench: trend(history.series(bench, fingerprint), **kwargs)
+            for bench in history.benches(fingerprint, patterns)}
+
+
+def _fmt_ms(ms):
+    if ms is None:
+        return "-"
+    return f"{ms * 1000:.1f} µs" if ms < 1 else f"{ms:.2f} ms" if ms < 1000 else f"{ms / 1000:.2f} s"
+
+
+STATUS_MARKS = {"regression": "🔴", "improvement": "🟢", "stable": "⚪"}
+
+
+def format_report(trends):
+    lines = [f"{'':2} {'runs':>4} {'current':>10} {'cv':>6} {'last change':>12} {'95% CI':>17} {'at':>9}  benchmark"]
+    for bench, t in trends.items():
+        cv = f"{100 * t['current_cv']:.1f}%" if t["current_cv"] is not None else "-"
+        if t["changes"]:
+            c = t["changes"][-1]
+            change = f"{100 * c['change']:+.1f}%"
+            ci = f"[{100 * c['ci'][0]:+.1f}, {100 * c['ci'][1]:+.1f}]"
+            at = c["git_sha"] or f"run {c['run_id']}"
+        else:
+            change, ci, at = "-", "-", "-"
+        lines.append(f"{STATUS_MARKS[t['status']]} {t['runs']:>4} {_fmt_ms(t['current_ms']):>10} {cv:>6} "
+                     f"{change:>12} {ci:>17} {at:>9}  {bench}")
+    return "\n".join(lines)
+
+
+def format_history(bench, rows, t):
+    starts = {c["index"]: c for c in t["changes"]}
+    lines = [bench]
+    for i, r in enumerate(rows):
+        if i in starts:
+            c = starts[i]
+            lines.append(f"   ── change {100 * c['change']:+.1f}% "
+                         f"[{100 * c['ci'][0]:+.1f}, {100 * c['ci'][1]:+.1f}] ──")
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["created"]))
+        sha = (r["git_sha"] or "-") + ("*" if r["dirty"] else "")
+        lines.append(f"   run {r['run_id']:>5}  {when}  {sha:<10} {_fmt_ms(r['mean_ms']):>10}")
+    return "\n".join(lines)
+
+
+def script_benches():
+    """The standalone bench scripts (they print runBench lines instead of using vitest's bench())."""
+    found = []
+    for pattern in SCRIPT_BENCHES:
+        for path in sorted(glob.glob(os.path.join(REPO_ROOT, pattern))):
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            if "ms/op" in text and "bench(" not in text:
+                found.append(_relpath(path))
+    return found
+
+
+def run_vitest(filters=()):
+    """Result rows of one `vitest bench --run` (None if it failed)."""
+    fd, out = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        done = subprocess.run(["npx", "vitest", "bench", "--run", "--outputJson", out, *filters], cwd=REPO_ROOT)
+        if done.returncode != 0 or not os.path.getsize(out):
+            return None
+        with open(out, encoding="utf-8") as f:
+            return parse_vitest(json.load(f))
+    finally:
+        os.remove(out)
+
+
+def run_script(path):
+    """Result rows of one standalone bench script, run with tsx."""
+    done = subprocess.run(["npx", "tsx", path], cwd=REPO_ROOT, capture_output=True, text=True)
+    if done.returncode != 0:
+        print(f"⚠️ {path} failed: {done.stderr.strip().splitlines()[-1:] or done.returncode}")
+        return []
+    return parse_log(done.stdout, path)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Keep benchmark results over time and find real changes in them.")
+    p.add_argument("--db", default=DEFAULT_DB)
+    sub = p.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("record", help="Run the benches and store each repetition as a run.")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--only", choices=("vitest", "scripts"), help="Run one kind of bench only.")
+    r.add_argument("--filter", default="", help="Comma-separated substrings of bench files to run.")
+    r.add_argument("--note")
+    i = sub.add_parser("ingest", help="Store an existing result file as one run.")
+    i.add_argument("file")
+    i.add_argument("--log", metavar="BENCH_FILE", help="`file` is the output of this standalone bench script.")
+    i.add_argument("--sha", help="Git SHA the results belong to (default: HEAD).")
+    i.add_argument("--note")
+    for name, help_text in (("report", "Trend and last change per benchmark."),
+                            ("history", "Every stored result of matching benchmarks.")):
+        q = sub.add_parser(name, help=help_text)
+        if name == "history":
+            q.add_argument("bench_filter", nargs="+", help="Substrings or globs of benchmark names.")
+        else:
+            q.add_argument("--bench", default="", help="Comma-separated substrings or globs of benchmark names.")
+        q.add_argument("--all-machines", action="store_true", help="Mix results from other machines (not advised).")
+        q.add_argument("--confidence", type=float, default=CONFIDENCE)
+        q.add_argument("--min-effect", type=float, default=MIN_EFFECT, help="Smallest relative change kept.")
+        q.add_argument("--json", dest="json_out", help="Also write the trends here.")
+    return p
+
+
+def _record(history, args):
+    sha, dirty = git_state()
+    filters = [f for f in args.filter.split(",") if f]
+    scripts = [s for s in script_benches() if not filters or any(f in s for f in filters)]
+    for k in range(args.repeat):
+        if args.only != "scripts":
+            rows = run_vitest(filters)
+            if rows is None:
+                print("❌ vitest bench failed.")
+                return 1
+            history.add_run(rows, "vitest", sha, dirty, note=args.note)
+            print(f"💾 Repetition {k + 1}/{args.repeat}: {len(rows)} vitest results")
+        if args.only != "vitest" and scripts:
+            rows = [row for path in scripts for row in run_script(path)]
+            history.add_run(rows, "scripts", sha, dirty, note=args.note)
+            print(f"💾 Repetition {k + 1}/{args.repeat}: {len(rows)} script results from {len(scripts)} files")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    history = BenchHistory(args.db)
+    try:
+        if args.command == "record":
+            return _record(history, args)
+        if args.command == "ingest":
+            with open(args.file, encoding="utf-8") as f:
+                rows = parse_log(f.read(), args.log) if args.log else parse_vitest(json.load(f))
+            if not rows:
+                print(f"❌ No benchmark results in {args.file}")
+                return 1
+            sha, dirty = (args.sha, False) if args.sha else git_state()
+            run_id = history.add_run(rows, "log" if args.log else "vitest", sha, dirty, note=args.note)
+            print(f"💾 Run {run_id}: {len(rows)} results ({sha or 'no git'})")
+            return 0
+
+        fingerprint = None if args.all_machines else machine_fingerprint()[0]
+        patterns = args.bench_filter if args.command == "history" else [b for b in args.bench.split(",") if b]
+        trends = report(history, patterns, fingerprint, confidence=args.confidence, min_effect=args.min_effect)
+        if not trends:
+            print("❌ No stored results match (on this machine; see --all-machines).")
+            return 1
+        if args.command == "history":
+            for bench, t in trends.items():
+                print(format_history(bench, history.series(bench, fingerprint), t))
+        else:
+            print(format_report(trends))
+        if args.json_out:
+            with open(args.json_out, "w", encoding="utf-8") as f:
+                json.dump(trends, f, indent=2)
+        return 0
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
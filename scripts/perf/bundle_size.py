@@ -0,0 +1,484 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+What the production build ships, per route, module and npm package.
+Run by hand; nothing calls it automatically.
+
+    BUNDLE_SOURCEMAP=1 npm run build                 # hidden source maps next to the chunks
+    python bundle_size.py                            # report, diff against the last report, check budgets
+    python bundle_size.py --top 40 --json bundle/report.json
+
+Reads SvelteKit's output (`.svelte-kit/output`): every client file with its
+raw, gzip and brotli size, and the source map of each JS/CSS chunk, which
+splits the chunk's bytes by source module (`src/lib/…`,
+`node_modules/decimal.js/…`). Modules roll up into npm packages, with `(app)`
+for the repo's own code. Without maps a chunk counts as one module under
+`(no source map)`, so build with `BUNDLE_SOURCEMAP=1`. vite.config.ts then
+writes `hidden` maps, which are not referenced from the shipped files.
+
+A route's initial load is the client entry plus its layout and page nodes:
+their JS imports, stylesheets and fonts, read from the server manifest.
+Everything else (workers, lazily imported chunks, the WASM engine, static
+files) is listed as loaded later.
+
+Compressed sizes are exact per file. Per module they are estimated: each
+module's bytes are compressed on their own, then scaled so the modules of a
+file add up to the file's compressed size. Brotli needs the `brotli`
+package; without it that column stays empty.
+
+Each report is saved as `bundle/last.json`, and the next run diffs against
+it by route, package, module and chunk. Chunk file names carry content
+hashes, so chunks are matched by name without the hash, or by their largest
+module if the name is only a hash. `--budgets` (default
+bundle_budgets.yaml) sets KB limits per route, package and chunk, plus a
+total. The exit code is 1 when one is exceeded.
+"""
+
+import argparse
+import fnmatch
+import gzip
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+import source_maps
+from bench_history import REPO_ROOT, git_state
+
+try:
+    import brotli
+except ImportError:  # optional: the brotli column stays empty without it
+    brotli = None
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUILD = os.path.join(REPO_ROOT, ".svelte-kit", "output")
+DEFAULT_BUDGETS = os.path.join(PERF_DIR, "bundle_budgets.yaml")
+DEFAULT_LAST = os.path.join(PERF_DIR, "bundle", "last.json")
+METRICS = ("raw", "gzip", "brotli")
+TOP = 20
+KINDS = {".js": "js", ".mjs": "js", ".css": "css", ".wasm": "wasm", ".woff2": "font", ".woff": "font",
+         ".ttf": "font", ".json": "data"}
+APP = "(app)"
+UNMAPPED = "(unmapped)"
+NO_MAP = "(no source map)"
+ASSET = "(asset)"
+# `name.Ab3_x9Zq.js` / `name-Ab3_x9Zq.js`: Vite's content hash before the extension.
+HASH = re.compile(r"[.-][A-Za-z0-9_-]{8}(?=\.\w+$)")
+
+
+def compressed(data, kind="js"):
+    """{raw, gzip, brotli} byte counts (brotli None without the package; raw only for images and the like)."""
+    if kind == "other":
+        return {"raw": len(data), "gzip": None, "brotli": None}
+    return {
+        "raw": len(data),
+        "gzip": len(gzip.compress(data, 9, mtime=0)),
+        "brotli": len(brotli.compress(data, quality=11)) if brotli is not None else None,
+    }
+
+
+def module_name(source):
+    """`src/lib/x.ts` or `node_modules/decimal.js/decimal.mjs` from a source map entry."""
+    path = source.replace("\\", "/").split("?", 1)[0]
+    if "node_modules/" in path:
+        return "node_modules/" + path.rsplit("node_modules/", 1)[1]
+    if "/src/" in path:
+        return "src/" + path.split("/src/", 1)[1]
+    while path.startswith(("../", "./")):
+        path = path[3:] if path.startswith("../") else path[2:]
+    return path or UNMAPPED
+
+
+def package_of(module):
+    """npm package of a module, APP for the repo's own code, or the pseudo module itself."""
+    if module.startswith("node_modules/"):
+        parts = module.split("/")
+        return "/".join(parts[1:3]) if parts[1].startswith("@") else parts[1]
+    if module.startswith("("):
+        return module.split(")", 1)[0] + ")"
+    return APP
+
+
+def split_by_source(code, sm):
+    """{source: bytes} of a generated file; bytes outside mapped segments go to UNMAPPED."""
+    seg = sm.segments
+    lines = code.split(b"\n")
+    starts = np.searchsorted(seg[:, 0], np.arange(len(lines) + 1)) if len(seg) else np.zeros(len(lines) + 1, int)
+    pieces = {}
+
+    def put(source, chunk):
+        if chunk:
+            pieces.setdefault(source, []).append(chunk)
+
+    for i, line in enumerate(lines):
+        a, b = starts[i], starts[i + 1]
+        if a == b:
+            put(UNMAPPED, line)
+        else:
+            cols = seg[a:b, 1]
+            if line.isascii():
+                offsets = np.minimum(cols, len(line))
+            else:
+                # Map columns count UTF-16 units; turn them into byte offsets.
+                text = line.decode("utf-8", errors="replace")
+                widths = np.array([0] + [len(c.encode("utf-8")) for c in text], dtype=np.int64)
+                offsets = np.cumsum(widths)[np.minimum(cols, len(text))]
+            offsets = np.maximum.accumulate(offsets)
+            sources = seg[a:b, 2]
+            # One piece per run of segments from the same source.
+            run = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+            bounds = np.r_[offsets[run], len(line)]
+            put(UNMAPPED, line[:bounds[0]])
+            for j, k in enumerate(run):
+                source = sm.sources[sources[k]] if sources[k] >= 0 else UNMAPPED
+                put(source, line[bounds[j]:bounds[j + 1]])
+        if i < len(lines) - 1:
+            put(UNMAPPED, b"\n")
+    return {source: b"".join(chunks) for source, chunks in pieces.items()}
+
+
+def _local_map(path, text):
+    """Source map of a built file: referenced, inline, or a hidden `<file>.map` next to it."""
+    def read(p):
+        with open(p, encoding="utf-8") as f:
+            return f.read()
+
+    raw = source_maps.for_script(path, text, fetch=read)
+    if raw is None and os.path.exists(path + ".map"):
+        raw = read(path + ".map")
+    return source_maps.SourceMap.from_json(raw) if raw else None
+
+
+def analyze_file(path, rel):
+    """Sizes of one client file and of the modules in it."""
+    with open(path, "rb") as f:
+        data = f.read()
+    kind = KINDS.get(os.path.splitext(path)[1], "other")
+    sizes = compressed(data, kind)
+    sm = None
+    if kind in ("js", "css"):
+        try:
+            sm = _local_map(path, data.decode("utf-8", errors="replace"))
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ {rel}: unreadable source map ({e})")
+    if sm is None:
+        name = HASH.sub("", rel)
+        owner = f"{NO_MAP} {name}" if kind in ("js", "css") else f"{ASSET} {name}"
+        return {"kind": kind, **sizes, "modules": {owner: dict(sizes)}}
+
+    by_module = {}
+    for source, chunk in split_by_source(data, sm).items():
+        name = module_name(source)
+        by_module[name] = by_module.get(name, b"") + chunk
+    modules = {name: compressed(chunk) for name, chunk in by_module.items()}
+    for metric in ("gzip", "brotli"):
+        if sizes[metric] is None:
+            continue
+        standalone = sum(m[metric] for m in modules.values())
+        for m in modules.values():
+            m[metric] = m[metric] * sizes[metric] / standalone if standalone else 0
+    return {"kind": kind, **sizes, "modules": modules}
+
+
+def chunk_label(rel, modules):
+    """A build-independent name for a file: hash removed, or its largest module for hash-only names."""
+    directory, base = os.path.split(rel)
+    stem, ext = os.path.splitext(base)
+    if re.fullmatch(r"[A-Za-z0-9_-]{8}", stem) and not stem.islower():
+        top = max(modules.items(), key=lambda kv: kv[1]["raw"])[0] if modules else stem
+        return f"{directory}/~{top}"
+    return os.path.join(directory, HASH.sub("", base)).replace(os.sep, "/")
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _list_after(text, key):
+    """The JSON string array after `key =` / `key:` in generated JS, or []."""
+    m = re.search(re.escape(key) + r"\s*[=:]\s*(\[[^\]]*\])", text)
+    return json.loads(m.group(1)) if m else []
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",") if v.strip().isdigit()]
+
+
+def sveltekit_routes(build_dir):
+    """(client entry files, {route id: initial files}) from SvelteKit's server output, or None."""
+    server = os.path.join(build_dir, "server")
+    manifest_path = next((p for p in (os.path.join(server, "manifest-full.js"), os.path.join(server, "manifest.js"))
+                          if os.path.exists(p)), None)
+    if manifest_path is None:
+        return None
+    manifest = _read(manifest_path)
+    client = re.search(r"client:\s*\{(.*?)\}\s*,\s*nodes:", manifest, re.S)
+    entry = []
+    if client:
+        body = client.group(1)
+        entry = re.findall(r'(?:start|app):\s*"([^"]+)"', body) + _list_after(body, "imports") \
+            + _list_after(body, "stylesheets") + _list_after(body, "fonts")
+
+    def node_files(i):
+        path = os.path.join(server, "nodes", f"{i}.js")
+        if not os.path.exists(path):
+            return []
+        text = _read(path)
+        return _list_after(text, "imports") + _list_after(text, "stylesheets") + _list_after(text, "fonts")
+
+    routes = {}
+    ids = list(re.finditer(r'\bid:\s*"([^"]+)"', manifest))
+    for n, m in enumerate(ids):
+        block = manifest[m.end():ids[n + 1].start() if n + 1 < len(ids) else len(manifest)]
+        page = re.search(r"page:\s*\{\s*layouts:\s*\[([^\]]*)\],\s*errors:\s*\[([^\]]*)\],\s*leaf:\s*(\d+)", block)
+        if not page:
+            continue  # an endpoint
+        nodes = _ints(page.group(1)) + [int(page.group(3))]
+        files = list(dict.fromkeys(entry + [f for i in nodes for f in node_files(i)]))
+        routes[m.group(1)] = files
+    return list(dict.fromkeys(entry)), routes
+
+
+def _add(total, sizes):
+    for metric in METRICS:
+        if sizes.get(metric) is not None:
+            total[metric] = (total.get(metric) or 0) + sizes[metric]
+        else:
+            total.setdefault(metric, None)
+    return total
+
+
+def _rollup(files, names):
+    """(total sizes, {package: sizes}) over the files `names`."""
+    total, packages = {}, {}
+    for name in names:
+        f = files.get(name)
+        if f is None:
+            continue
+        _add(total, f)
+        for module, sizes in f["modules"].items():
+            _add(packages.setdefault(package_of(module), {}), sizes)
+    return total, packages
+
+
+def report(build_dir=DEFAULT_BUILD):
+    """Report dict of a build: files, routes, packages, modules and totals."""
+    client = os.path.join(build_dir, "client")
+    if not os.path.isdir(client):
+        raise FileNotFoundError(f"No client output in {build_dir} (run `npm run build`)")
+    files = {}
+    for root, dirs, names in os.walk(client):
+        dirs[:] = [d for d in dirs if d != ".vite"]
+        for name in sorted(names):
+            if name.endswith(".map"):
+                continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, client).replace(os.sep, "/")
+            files[rel] = analyze_file(path, rel)
+    for rel, f in files.items():
+        f["label"] = chunk_label(rel, f["modules"])
+
+    found = sveltekit_routes(build_dir)
+    entry, route_files = found if found else ([], {})
+    routes = {}
+    for route, names in sorted(route_files.items()):
+        total, packages = _rollup(files, names)
+        routes[route] = {**total, "files": names, "packages": packages}
+    initial = {name for names in route_files.values() for name in names}
+
+    modules, packages = {}, {}
+    for f in files.values():
+        for module, sizes in f["modules"].items():
+            _add(modules.setdefault(module, {}), sizes)
+            _add(packages.setdefault(package_of(module), {}), sizes)
+    by_kind = {}
+    for f in files.values():
+        _add(by_kind.setdefault(f["kind"], {}), f)
+    shipped = [n for n, f in files.items() if f["kind"] in ("js", "css", "wasm", "font")]
+    later = [n for n in shipped if n not in initial]
+    sha, dirty = git_state()
+    return {
+        "build": build_dir,
+        "created": time.time(),
+        "git_sha": sha,
+        "dirty": dirty,
+        "brotli": brotli is not None,
+        "total": _rollup(files, shipped)[0],
+        "kinds": by_kind,
+        "entry": _rollup(files, entry)[0] if entry else None,
+        "routes": routes,
+        "later": {**_rollup(files, later)[0], "files": later},
+        "packages": packages,
+        "modules": modules,
+        "files": files,
+    }
+
+
+def _delta_rows(old, new, metric, top):
+    rows = []
+    for name in set(old) | set(new):
+        a = (old.get(name) or {}).get(metric) or 0
+        b = (new.get(name) or {}).get(metric) or 0
+        if a != b:
+            rows.append({"name": name, "old": a, "new": b, "delta": b - a})
+    rows.sort(key=lambda r: -abs(r["delta"]))
+    return rows[:top]
+
+
+def diff(old, new, metric="gzip", top=TOP):
+    """Largest changes between two reports by route, package, module and chunk."""
+    if not new.get("brotli") or not old.get("brotli"):
+        metric = "gzip" if metric == "brotli" else metric
+    chunks = lambda r: {f["label"]: f for f in r["files"].values()}  # noqa: E731
+    return {
+        "metric": metric,
+        "old_sha": old.get("git_sha"),
+        "total": [(old["total"].get(metric) or 0), (new["total"].get(metric) or 0)],
+        "routes": _delta_rows(old["routes"], new["routes"], metric, top),
+        "packages": _delta_rows(old["packages"], new["packages"], metric, top),
+        "modules": _delta_rows(old["modules"], new["modules"], metric, top),
+        "chunks": _delta_rows(chunks(old), chunks(new), metric, top),
+    }
+
+
+def load_budgets(path):
+    import yaml
+
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _budget_for(name, limits):
+    """Limit of the exact key, else of the first glob that matches (in file order), else None."""
+    if name in limits:
+        return limits[name]
+    for pattern, limit in limits.items():
+        if any(c in pattern for c in "*?[") and fnmatch.fnmatchcase(name, pattern):
+            return limit
+    return None
+
+
+def check_budgets(r, budgets):
+    """Exceeded budgets: [{"scope", "name", "metric", "size", "budget"}], sizes in bytes."""
+    metric = budgets.get("metric", "gzip")
+    if metric == "brotli" and not r["brotli"]:
+        print("⚠️ Budgets are in brotli bytes but the brotli package is missing; checking gzip instead.")
+        metric = "gzip"
+    over = []
+
+    def check(scope, name, sizes, limit_kb):
+        if limit_kb is None:
+            return
+        size = sizes.get(metric) or 0
+        if size > limit_kb * 1024:
+            over.append({"scope": scope, "name": name, "metric": metric, "size": size, "budget": limit_kb * 1024})
+
+    for route, sizes in r["routes"].items():
+        check("route", route, sizes, _budget_for(route, budgets.get("routes") or {}))
+    for package, sizes in r["packages"].items():
+        check("package", package, sizes, _budget_for(package, budgets.get("packages") or {}))
+    for f in r["files"].values():
+        if f["kind"] in ("js", "css", "wasm"):
+            check("chunk", f["label"], f, _budget_for(f["label"], budgets.get("chunks") or {}))
+    check("total", "shipped files", r["total"], budgets.get("total"))
+    return over
+
+
+def _kb(n):
+    return "-" if n is None else f"{n / 1024:,.1f}"
+
+
+def _sizes(s):
+    return f"{_kb(s.get('raw')):>10} {_kb(s.get('gzip')):>9} {_kb(s.get('brotli')):>9}"
+
+
+def format_report(r, top=TOP, changes=None, over=None):
+    head = f"{'raw KB':>10} {'gzip KB':>9} {'br KB':>9}"
+    lines = [f"📦 Build {r['build']} ({r['git_sha'] or 'no git'}{'*' if r['dirty'] else ''})",
+             f"   {head}", f"   {_sizes(r['total'])}  shipped JS/CSS/WASM/fonts"]
+    for kind, sizes in sorted(r["kinds"].items(), key=lambda kv: -kv[1]["raw"]):
+        lines.append(f"   {_sizes(sizes)}    {kind}")
+    if r["routes"]:
+        lines += ["", "🧭 Initial load per route", f"   {head}  route"]
+        if r["entry"]:
+            lines.append(f"   {_sizes(r['entry'])}  (client entry, every route)")
+        for route, sizes in sorted(r["routes"].items(), key=lambda kv: -kv[1]["raw"]):
+            biggest = sorted(sizes["packages"].items(), key=lambda kv: -kv[1]["raw"])[:3]
+            lines.append(f"   {_sizes(sizes)}  {route}   ({', '.join(p for p, _ in biggest)})")
+        lines.append(f"   {_sizes(r['later'])}  loaded later ({len(r['later']['files'])} file(s): workers, lazy chunks, WASM)")
+    for title, table in (("📚 Packages", r["packages"]), ("🧩 Modules", r["modules"])):
+        lines += ["", title, f"   {head}"]
+        for name, sizes in sorted(table.items(), key=lambda kv: -kv[1]["raw"])[:top]:
+            lines.append(f"   {_sizes(sizes)}  {name}")
+    if changes:
+        lines += ["", f"🔀 Since {changes['old_sha'] or 'the last report'} ({changes['metric']} KB): total "
+                      f"{_kb(changes['total'][0])} → {_kb(changes['total'][1])}"]
+        for section in ("routes", "packages", "modules", "chunks"):
+            if changes[section]:
+                lines.append(f"   {section}")
+                for row in changes[section]:
+                    lines.append(f"   {row['delta'] / 1024:>+10.1f}  {row['name']}  ({_kb(row['old'])} → {_kb(row['new'])})")
+    if over is not None:
+        lines.append("")
+        if over:
+            lines.append(f"❌ {len(over)} budget(s) exceeded")
+            for o in over:
+                lines.append(f"   {o['scope']:<8} {o['name']}: {_kb(o['size'])} KB {o['metric']} > {_kb(o['budget'])} KB")
+        else:
+            lines.append("✅ All budgets met")
+    return "\n".join(lines)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Attribute the production build's bytes to routes, modules and packages.")
+    p.add_argument("--build", default=DEFAULT_BUILD, help="SvelteKit output directory.")
+    p.add_argument("--budgets", default=DEFAULT_BUDGETS, help="YAML budgets ('' to skip).")
+    p.add_argument("--baseline", default=DEFAULT_LAST, help="Report to diff against (default: the last one).")
+    p.add_argument("--no-save", dest="save", action="store_false", help="Do not make this report the new baseline.")
+    p.add_argument("--metric", choices=METRICS, default="gzip", help="Size the diff ranks by.")
+    p.add_argument("--top", type=int, default=TOP)
+    p.add_argument("--json", dest="json_out", help="Also write the full report here.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        r = report(args.build)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    if not r["routes"]:
+        print("⚠️ No SvelteKit server manifest found; routes are not listed.")
+    changes = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            changes = diff(json.load(f), r, args.metric, args.top)
+    over = check_budgets(r, load_budgets(args.budgets)) if args.budgets and os.path.exists(args.budgets) else None
+    print(format_report(r, args.top, changes, over))
+    for path in ([args.json_out] if args.json_out else []) + ([args.baseline] if args.save and args.baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(r, f)
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,606 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+CPU profiles of the main thread and every worker, merged across runs.
+Run by hand; nothing calls it automatically.
+
+`capture` drives the app with a Playwright scenario (see scenario.py) and
+records a V8 `.cpuprofile` of the main thread and of each dedicated worker
+(TechnicalsWorker, the aggregator, pool workers) for the whole session,
+`--runs` times. With `--replay` the app's WebSockets are served from a
+recorded market session, so every run sees the same data; `--record`
+writes such a recording from a live session.
+
+    python cpu_profiles.py capture --record market.jsonl --steps 60 --runs 1 --out cpu/live
+    python cpu_profiles.py capture --replay market.jsonl --steps 60 --runs 5 --out cpu/base
+    python cpu_profiles.py analyze cpu/base --top 30 --folded cpu/base/stacks.folded
+
+`analyze` merges the runs of a capture directory:
+
+* per thread (main, or the worker's name; instances of one worker are
+  summed), self and total time of every function, as the mean per run,
+  plus the spread of the self time across runs. Frames are resolved
+  through the scripts' source maps, saved at capture, so functions show
+  as `calcRSI src/utils/indicators.ts:212` rather than a position in the
+  transformed module;
+* collapsed stacks (`thread;outer;…;inner <µs>`, summed over runs) for
+  flamegraph.pl, speedscope or inferno;
+* per worker, postMessage calls per second and payload bytes in both
+  directions, counted on the main thread around `Worker`.
+
+Payload bytes are an estimate: typed arrays and ArrayBuffers count their
+byteLength, everything else the length of its JSON.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+import source_maps
+
+TOP = 25
+SAMPLING_INTERVAL_US = 200
+STOP_TIMEOUT_S = 30
+MAIN = "main"
+PROFILE_SUFFIX = ".cpuprofile"
+MESSAGES_FILE = "messages.json"
+SOURCE_MAPS_FILE = "sourcemaps.json"
+# V8's pseudo frames; (idle) is not busy time.
+IDLE = "(idle)"
+ROOT = "(root)"
+
+# Injected before the app's scripts: counts postMessage traffic per worker,
+# keyed like the worker profiles (its `name` option, else the script file).
+MESSAGE_COUNTER_JS = """
+(() => {
+  const stats = {};
+  const size = (data) => {
+    if (data == null) return 0;
+    if (data instanceof ArrayBuffer || ArrayBuffer.isView(data)) return data.byteLength;
+    if (typeof data === "string") return data.length;
+    let binary = 0;
+    try {
+      const json = JSON.stringify(data, (k, v) => {
+        if (v instanceof ArrayBuffer || ArrayBuffer.isView(v)) { binary += v.byteLength; return 0; }
+        return v;
+      });
+      return binary + (json ? json.length : 0);
+    } catch {
+      return binary;
+    }
+  };
+  const entry = (key) => (stats[key] ??= { instances: 0, to: 0, toBytes: 0, from: 0, fromBytes: 0 });
+  const NativeWorker = window.Worker;
+  window.Worker = class extends NativeWorker {
+    constructor(url, options) {
+      super(url, options);
+      const key = (options && options.name) || new URL(String(url), location.href).pathname.split("/").pop();
+      this.__perfKey = key;
+      entry(key).instances++;
+      this.addEventListener("message", (e) => { const s = entry(key); s.from++; s.fromBytes += size(e.data); });
+    }
+    postMessage(message, transfer) {
+      const s = entry(this.__perfKey);
+      s.to++;
+      s.toBytes += size(message);
+      return super.postMessage(message, transfer);
+    }
+  };
+  window.__perfWorkerMessages = {
+    stats,
+    reset() { for (const s of Object.values(stats)) Object.assign(s, { to: 0, toBytes: 0, from: 0, fromBytes: 0 }); },
+  };
+})();
+"""
+
+
+def worker_label(title, url):
+    """A worker's thread name: its `name` option (the target title), else the script file name."""
+    if title and title != url and "://" not in title:
+        return title
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1] or "worker"
+
+
+def thread_of(path):
+    """Thread name of `<thread>@<instance>.cpuprofile` (or `<thread>.cpuprofile`)."""
+    return os.path.basename(path)[:-len(PROFILE_SUFFIX)].split("@", 1)[0]
+
+
+def sample_durations(profile):
+    """(sample node ids, µs each sample stands for): the time until the next sample."""
+    samples = np.asarray(profile.get("samples", []), dtype=np.int64)
+    if len(samples) == 0:
+        return samples, np.zeros(0)
+    stamps = profile["startTime"] + np.cumsum(np.asarray(profile["timeDeltas"], dtype=np.float64))
+    ends = np.append(stamps[1:], max(profile.get("endTime", stamps[-1]), stamps[-1]))
+    return samples, np.maximum(ends - stamps, 0)
+
+
+class Symbolizer:
+    """(function, location) of V8 call frames, through the scripts' source maps where there are any."""
+
+    def __init__(self, maps=None):
+        self.raw = dict(maps or {})
+        self.maps = {}
+
+    def _map(self, url):
+        if url not in self.maps:
+            raw = self.raw.get(url)
+            try:
+                self.maps[url] = source_maps.SourceMap.from_json(raw) if raw else None
+            except (ValueError, KeyError):
+                self.maps[url] = None
+        return self.maps[url]
+
+    def frame(self, call_frame):
+        name = call_frame.get("functionName") or ""
+        url = call_frame.get("url") or ""
+        if not url:
+            return name or "(anonymous)", ""
+        line, column = call_frame.get("lineNumber", -1), call_frame.get("columnNumber", -1)
+        sm = self._map(url) if line >= 0 else None
+        original = sm.lookup(line, max(column, 0)) if sm is not None else None
+        if original is not None:
+            source, line, _, mapped_name = original
+            return name or mapped_name or "(anonymous)", f"{_short_path(source)}:{line + 1}"
+        return name or "(anonymous)", f"{_short_path(url)}:{line + 1}"
+
+
+def _short_path(url):
+    """`src/utils/indicators.ts` from a dev-server URL or a map source like `../../src/utils/…`."""
+    path = re.sub(r"^[a-z]+://[^/]+", "", url.split("?", 1)[0])
+    for marker in ("/src/", "/node_modules/"):
+        if marker in path:
+            return marker.strip("/") + "/" + path.split(marker, 1)[1]
+    return path.lstrip("./") or url
+
+
+class ThreadProfile:
+    """Self and total µs per frame and collapsed stacks of one thread, added up over runs."""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = {}
+        self.self_us = {}
+        self.total_us = {}
+        self.stacks = {}
+        self.run_self = []
+        self.sampled_us = []
+        self.idle_us = []
+
+    def _frame_id(self, frame):
+        if frame not in self.frames:
+            self.frames[frame] = len(self.frames)
+        return self.frames[frame]
+
+    def start_run(self):
+        self.run_self.append({})
+        self.sampled_us.append(0.0)
+        self.idle_us.append(0.0)
+
+    def add(self, profile, symbolizer):
+        """Add one .cpuprofile to the current run."""
+        nodes = profile["nodes"]
+        index = {n["id"]: i for i, n in enumerate(nodes)}
+        parent = np.full(len(nodes), -1, dtype=np.int64)
+        for i, n in enumerate(nodes):
+            for child in n.get("children", ()):
+                parent[index[child]] = i
+        frame = np.array([self._frame_id(symbolizer.frame(n["callFrame"])) for n in nodes], dtype=np.int64)
+
+        samples, durations = sample_durations(profile)
+        node_self = np.zeros(len(nodes))
+        if len(samples):
+            np.add.at(node_self, np.array([index[s] for s in samples], dtype=np.int64), durations)
+        run = self.run_self[-1]
+        labels = {i: f for f, i in self.frames.items()}
+        self.sampled_us[-1] += float(node_self.sum())
+
+        # Depth-first from the roots: a frame's total time counts each sample once,
+        # however often the frame recurses on that stack.
+        children = [[] for _ in nodes]
+        for i, p in enumerate(parent):
+            if p >= 0:
+                children[p].append(i)
+        subtree = node_self.copy()
+        order = []
+        stack = [i for i in range(len(nodes)) if parent[i] < 0]
+        while stack:
+            i = stack.pop()
+            order.append(i)
+            stack.extend(children[i])
+        for i in reversed(order):
+            if parent[i] >= 0:
+                subtree[parent[i]] += subtree[i]
+
+        on_stack = {}
+        path = []
+        for i in order:
+            while path and path[-1][0] != parent[i]:
+                _, f, _ = path.pop()
+                on_stack[f] -= 1
+            f = int(frame[i])
+            name, location = labels[f]
+            if name == IDLE:
+                self.idle_us[-1] += node_self[i]
+            if not on_stack.get(f):
+                self.total_us[f] = self.total_us.get(f, 0.0) + subtree[i]
+            on_stack[f] = on_stack.get(f, 0) + 1
+            label = name if not location else f"{name} {location}"
+            path.append((i, f, label))
+            if node_self[i] > 0:
+                self.self_us[f] = self.self_us.get(f, 0.0) + node_self[i]
+                run[f] = run.get(f, 0.0) + node_self[i]
+                if name not in (ROOT, IDLE):
+                    key = ";".join([self.name] + [p[2] for p in path if labels[p[1]][0] != ROOT])
+                    self.stacks[key] = self.stacks.get(key, 0.0) + node_self[i]
+
+    def summary(self, runs, top=TOP):
+        """Mean per run (ms) of the busiest frames by self time."""
+        busy_ms = (sum(self.sampled_us) - sum(self.idle_us)) / runs / 1000
+        rows = []
+        for (name, location), f in self.frames.items():
+            if name in (ROOT, IDLE) or f not in self.self_us and f not in self.total_us:
+                continue
+            per_run = np.array([r.get(f, 0.0) for r in self.run_self] + [0.0] * (runs - len(self.run_self)))
+            self_ms = self.self_us.get(f, 0.0) / runs / 1000
+            rows.append({
+                "function": name,
+                "location": location,
+                "self_ms": self_ms,
+                "self_sd_ms": float(per_run.std(ddof=1)) / 1000 if runs > 1 else 0.0,
+                "total_ms": self.total_us.get(f, 0.0) / runs / 1000,
+                "self_pct": 100 * self_ms / busy_ms if busy_ms else 0.0,
+            })
+        rows.sort(key=lambda r: (-r["self_ms"], -r["total_ms"]))
+        return {"thread": self.name, "runs": runs, "busy_ms": busy_ms,
+                "idle_ms": sum(self.idle_us) / runs / 1000, "functions": rows[:top]}
+
+
+def run_dirs(capture_dir):
+    """The run_* directories of a capture, or the directory itself if it holds profiles."""
+    runs = sorted(d for d in glob.glob(os.path.join(capture_dir, "run_*")) if os.path.isdir(d))
+    return runs or [capture_dir]
+
+
+def load_source_maps(capture_dir):
+    path = os.path.join(capture_dir, SOURCE_MAPS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge_runs(runs, symbolizer):
+    """{thread: ThreadProfile} over run directories; instances of one worker are summed within a run."""
+    threads = {}
+    for run in runs:
+        for t in threads.values():
+            t.start_run()
+        for path in sorted(glob.glob(os.path.join(run, "*" + PROFILE_SUFFIX))):
+            name = thread_of(path)
+            if name not in threads:
+                threads[name] = ThreadProfile(name)
+                # A thread first seen in a later run was idle in the earlier ones.
+                for _ in range(runs.index(run) + 1):
+                    threads[name].start_run()
+            with open(path, encoding="utf-8") as f:
+                threads[name].add(json.load(f), symbolizer)
+    return threads
+
+
+def message_rates(runs):
+    """Per worker: instances and mean postMessage calls/s and bytes/s, to and from the worker."""
+    totals = {}
+    seconds = 0.0
+    for run in runs:
+        path = os.path.join(run, MESSAGES_FILE)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        seconds += data["duration_s"]
+        for worker, s in data["workers"].items():
+            t = totals.setdefault(worker, {"instances": 0, "to": 0, "toBytes": 0, "from": 0, "fromBytes": 0})
+            t["instances"] = max(t["instances"], s["instances"])
+            for k in ("to", "toBytes", "from", "fromBytes"):
+                t[k] += s[k]
+    out = {}
+    for worker, t in sorted(totals.items()):
+        out[worker] = {
+            "instances": t["instances"],
+            "to_per_s": t["to"] / seconds if seconds else 0.0,
+            "to_bytes_per_s": t["toBytes"] / seconds if seconds else 0.0,
+            "to_bytes_per_msg": t["toBytes"] / t["to"] if t["to"] else 0.0,
+            "from_per_s": t["from"] / seconds if seconds else 0.0,
+            "from_bytes_per_s": t["fromBytes"] / seconds if seconds else 0.0,
+            "from_bytes_per_msg": t["fromBytes"] / t["from"] if t["from"] else 0.0,
+        }
+    return out
+
+
+def analyze(capture_dir, top=TOP):
+    """Report dict of a capture directory, plus its collapsed stacks (µs, summed over runs)."""
+    runs = run_dirs(capture_dir)
+    threads = merge_runs(runs, Symbolizer(load_source_maps(capture_dir)))
+    if not threads:
+        raise ValueError(f"No {PROFILE_SUFFIX} files under {capture_dir}")
+    # Main thread first, then workers by busy time.
+    summaries = sorted((t.summary(len(runs), top) for t in threads.values()),
+                       key=lambda s: (s["thread"] != MAIN, -s["busy_ms"]))
+    stacks = {}
+    for t in threads.values():
+        stacks.update(t.stacks)
+    return {"runs": len(runs), "threads": summaries, "messages": message_rates(runs)}, stacks
+
+
+def write_collapsed(stacks, path):
+    """flamegraph.pl input: one `frame;frame;… count` line per stack, counts in µs."""
+    with open(path, "w", encoding="utf-8") as f:
+        for key in sorted(stacks):
+            value = int(round(stacks[key]))
+            if value > 0:
+                f.write(f"{key} {value}\n")
+    return path
+
+
+def _fmt_bytes(n):
+    return f"{n / 2**20:.1f} MB" if n >= 2**20 else f"{n / 1024:.1f} KB" if n >= 1024 else f"{n:.0f} B"
+
+
+def format_report(r):
+    lines = [f"🔥 CPU profile, mean of {r['runs']} run(s)"]
+    for t in r["threads"]:
+        lines.append("")
+        lines.append(f"{t['thread']}: {t['busy_ms']:.0f} ms busy, {t['idle_ms']:.0f} ms idle per run")
+        header = f"  {'self ms':>9} {'± sd':>7} {'self %':>7} {'total ms':>9}  function"
+        lines += [header, "  " + "-" * (len(header) - 2)]
+        for row in t["functions"]:
+            where = f"  {row['location']}" if row["location"] else ""
+            lines.append(f"  {row['self_ms']:>9.1f} {row['self_sd_ms']:>7.1f} {row['self_pct']:>6.1f}% "
+                         f"{row['total_ms']:>9.1f}  {row['function']}{where}")
+    if r["messages"]:
+        lines.append("")
+        lines.append("📨 postMessage per worker (main thread ↔ worker)")
+        header = f"  {'worker':<24} {'n':>3} {'to/s':>8} {'to bytes/s':>12} {'avg':>9} {'from/s':>8} {'from bytes/s':>12} {'avg':>9}"
+        lines += [header, "  " + "-" * (len(header) - 2)]
+        for worker, m in r["messages"].items():
+            lines.append(f"  {worker:<24} {m['instances']:>3} {m['to_per_s']:>8.1f} {_fmt_bytes(m['to_bytes_per_s']):>12} "
+                         f"{_fmt_bytes(m['to_bytes_per_msg']):>9} {m['from_per_s']:>8.1f} "
+                         f"{_fmt_bytes(m['from_bytes_per_s']):>12} {_fmt_bytes(m['from_bytes_per_msg']):>9}")
+    return "\n".join(lines)
+
+
+class _WorkerProfiler:
+    """
+    Profiles the page's dedicated workers through `Target.setAutoAttach` on
+    the page's CDP session. Playwright's CDPSession has no way to address a
+    child session directly, so commands go through Target.sendMessageToTarget
+    (the non-flattened protocol) and their replies come back as events.
+    Workers are held at their first line until the profiler is set up, so a
+    worker started during the session is profiled from its start.
+    """
+
+    def __init__(self, cdp, interval_us):
+        self.cdp = cdp
+        self.interval_us = interval_us
+        self.workers = {}
+        self.replies = {}
+        self.running = False
+        self._next_id = 0
+        cdp.on("Target.attachedToTarget", self._attached)
+        cdp.on("Target.detachedFromTarget", self._detached)
+        cdp.on("Target.receivedMessageFromTarget", self._message)
+        cdp.send("Target.setAutoAttach", {"autoAttach": True, "waitForDebuggerOnStart": True, "flatten": False})
+
+    def _send(self, session_id, method, params=None):
+        self._next_id += 1
+        self.cdp.send("Target.sendMessageToTarget", {
+            "sessionId": session_id,
+            "message": json.dumps({"id": self._next_id, "method": method, "params": params or {}}),
+        })
+        return self._next_id
+
+    def _attached(self, event):
+        info, session_id = event["targetInfo"], event["sessionId"]
+        if info["type"] != "worker":
+            self.cdp.send("Target.detachFromTarget", {"sessionId": session_id})
+            return
+        label = re.sub(r"[^\w.-]", "_", worker_label(info.get("title"), info.get("url", "")))
+        same = sum(1 for w in self.workers.values() if w["label"] == label)
+        self.workers[session_id] = {"label": label, "instance": same, "alive": True, "stop_id": None}
+        self._send(session_id, "Profiler.enable")
+        self._send(session_id, "Profiler.setSamplingInterval", {"interval": self.interval_us})
+        if self.running:
+            self._send(session_id, "Profiler.start")
+        self._send(session_id, "Runtime.runIfWaitingForDebugger")
+
+    def _detached(self, event):
+        worker = self.workers.get(event["sessionId"])
+        if worker is not None:
+            worker["alive"] = False
+
+    def _message(self, event):
+        message = json.loads(event["message"])
+        if "id" in message:
+            self.replies[message["id"]] = message
+
+    def start(self):
+        self.running = True
+        for session_id, worker in self.workers.items():
+            if worker["alive"]:
+                self._send(session_id, "Profiler.start")
+
+    def stop(self, page, timeout_s=STOP_TIMEOUT_S):
+        """{file stem: profile} of the live workers (a worker that exited before the end is lost)."""
+        self.running = False
+        for session_id, worker in self.workers.items():
+            if worker["alive"]:
+                worker["stop_id"] = self._send(session_id, "Profiler.stop")
+        pending = {w["stop_id"] for w in self.workers.values() if w["stop_id"] is not None}
+        deadline = time.monotonic() + timeout_s
+        while pending - set(self.replies) and time.monotonic() < deadline:
+            page.wait_for_timeout(50)
+        profiles = {}
+        for worker in self.workers.values():
+            reply = self.replies.get(worker["stop_id"])
+            if reply and "result" in reply:
+                profiles[f"{worker['label']}@{worker['instance']}"] = reply["result"]["profile"]
+        return profiles
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def save_source_maps(profile_paths, out_dir, known=None):
+    """Fetch the source maps of every script in the profiles into `<out_dir>/sourcemaps.json`."""
+    maps = dict(known or {})
+    urls = set()
+    for path in profile_paths:
+        with open(path, encoding="utf-8") as f:
+            urls.update(n["callFrame"].get("url") for n in json.load(f)["nodes"])
+    for url in sorted(u for u in urls if u and u.startswith("http") and u not in maps):
+        maps[url] = source_maps.for_script(url)
+    _write_json(os.path.join(out_dir, SOURCE_MAPS_FILE), {u: m for u, m in maps.items() if m})
+    return maps
+
+
+def capture_run(url, session, steps, run_dir, interval_us, replay_path=None, record_path=None, speed=1.0,
+                headless=True):
+    """One profiled session; writes the run's .cpuprofile files and messages.json, returns their paths."""
+    import scenario
+
+    os.makedirs(run_dir, exist_ok=True)
+    state = {}
+
+    def prepare(page):
+        page.add_init_script(MESSAGE_COUNTER_JS)
+        state["cdp"] = page.context.new_cdp_session(page)
+        state["workers"] = _WorkerProfiler(state["cdp"], interval_us)
+        if replay_path:
+            state["replay"] = scenario.MarketReplay(replay_path, speed)
+            state["replay"].install(page)
+        if record_path:
+            state["recording"] = scenario.record_websockets(page, record_path)
+
+    with scenario.browser_page(url, headless, prepare=prepare) as page:
+        cdp, workers = state["cdp"], state["workers"]
+        try:
+            session.setup(page)
+            cdp.send("Profiler.enable")
+            cdp.send("Profiler.setSamplingInterval", {"interval": interval_us})
+            page.evaluate("window.__perfWorkerMessages && window.__perfWorkerMessages.reset()")
+            started = time.monotonic()
+            cdp.send("Profiler.start")
+            workers.start()
+            for i in range(steps):
+                session.step(page, i)
+            main_profile = cdp.send("Profiler.stop")["profile"]
+            worker_profiles = workers.stop(page)
+            duration_s = time.monotonic() - started
+            messages = page.evaluate("window.__perfWorkerMessages ? window.__perfWorkerMessages.stats : {}")
+        finally:
+            if "recording" in state:
+                state["recording"].close()
+    paths = [os.path.join(run_dir, MAIN + PROFILE_SUFFIX)]
+    _write_json(paths[0], main_profile)
+    for stem, profile in sorted(worker_profiles.items()):
+        paths.append(os.path.join(run_dir, stem + PROFILE_SUFFIX))
+        _write_json(paths[-1], profile)
+    _write_json(os.path.join(run_dir, MESSAGES_FILE), {"duration_s": duration_s, "workers": messages})
+    if "replay" in state and not state["replay"].done:
+        print(f"   replay: {state['replay'].sent}/{len(state['replay'].frames)} frames sent "
+              f"(the session ended before the recording)")
+    return paths
+
+
+def capture(url, scenario_path, steps, runs, out_dir, interval_us=SAMPLING_INTERVAL_US, replay_path=None,
+            record_path=None, speed=1.0, headless=True):
+    """`runs` profiled sessions into `<out_dir>/run_<k>/`, then the source maps of the profiled scripts."""
+    import scenario
+
+    session = scenario.load(scenario_path)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for k in range(runs):
+        run_paths = capture_run(url, session, steps, os.path.join(out_dir, f"run_{k + 1:02d}"), interval_us,
+                                replay_path, record_path if k == 0 else None, speed, headless)
+        paths += run_paths
+        print(f"🔥 Run {k + 1}/{runs}: {len(run_paths)} thread(s) profiled ({session.name} scenario, {steps} steps)")
+    save_source_maps(paths, out_dir, load_source_maps(out_dir))
+    return out_dir
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Profile the main thread and workers over a session and merge the runs.")
+    sub = p.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("capture", help="Drive the app and record CPU profiles per thread (then analyze them).")
+    c.add_argument("--url", default=None, help="App URL (default: the dev server, with source maps).")
+    c.add_argument("--scenario", help="Python file with setup(page) / step(page, i); default idles.")
+    c.add_argument("--steps", type=int, default=30)
+    c.add_argument("--runs", type=int, default=3)
+    c.add_argument("--interval-us", type=int, default=SAMPLING_INTERVAL_US, help="Sampling interval.")
+    c.add_argument("--replay", help="Serve the app's WebSockets from this recording (JSONL).")
+    c.add_argument("--speed", type=float, default=1.0, help="Replay speed factor.")
+    c.add_argument("--record", help="Record the WebSocket frames of the first run here.")
+    c.add_argument("--out", default="cpu")
+    c.add_argument("--headed", action="store_true")
+    a = sub.add_parser("analyze", help="Merge the runs of a capture directory.")
+    a.add_argument("capture_dir")
+    for q in (c, a):
+        q.add_argument("--top", type=int, default=TOP)
+        q.add_argument("--folded", help="Write collapsed stacks for flamegraph.pl here.")
+        q.add_argument("--json", dest="json_out", help="Also write the report here.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "capture":
+        import scenario
+
+        if args.replay and args.record:
+            print("❌ --replay and --record exclude each other.")
+            return 1
+        capture_dir = capture(args.url or scenario.DEFAULT_URL, args.scenario, args.steps, args.runs, args.out,
+                              args.interval_us, args.replay, args.record, args.speed, headless=not args.headed)
+    else:
+        capture_dir = args.capture_dir
+    try:
+        result, stacks = analyze(capture_dir, args.top)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ {capture_dir}: {e}")
+        return 1
+    print(format_report(result))
+    if args.folded:
+        write_collapsed(stacks, args.folded)
+        print(f"🧯 Collapsed stacks written to {args.folded}")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,571 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Heap-snapshot leak finder. Run by hand; nothing calls it automatically.
+
+`capture` drives the app with a Playwright scenario (see scenario.py) and
+writes a `.heapsnapshot` of the main thread after a forced GC every
+`--every` steps. `analyze` reads a series of snapshots and ranks what grew
+between the first and the last:
+
+    python heap_snapshots.py capture --scenario my_session.py --steps 120 --every 20 --out heap/run1
+    python heap_snapshots.py analyze heap/run1/*.heapsnapshot --top 25 --json heap/run1/report.json
+
+Snapshots are parsed as a stream: the node and edge arrays go straight into
+NumPy arrays chunk by chunk and the JSON document is never held as a whole,
+so files of several hundred MB are fine. Per snapshot the analysis computes
+
+* shortest retainer paths from the GC roots (breadth-first, weak edges
+  ignored) and the dominator tree, hence every object's retained size;
+* per constructor: instances, shallow size and retained size (summed over
+  instances not dominated by an instance of the same constructor);
+* per constructor and retainer path (the last PATH_DEPTH hops, e.g.
+  `BitunixWebSocketService.handlers → Map → (closure)`): the same numbers.
+
+Growth is the difference between the last and the first snapshot;
+"monotonic" rows never shrank in between. Rows matching WATCH (WebSocket
+handlers, kline buffers, window components) are listed separately.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+CHUNK_CHARS = 1 << 20
+PATH_DEPTH = 2
+TOP = 20
+
+# Pseudo constructor names for node types without a class, as DevTools shows them.
+TYPE_LABELS = {
+    "hidden": "(system)",
+    "array": "(array)",
+    "string": "(string)",
+    "code": "(compiled code)",
+    "closure": "(closure)",
+    "regexp": "(regexp)",
+    "number": "(number)",
+    "concatenated string": "(concatenated string)",
+    "sliced string": "(sliced string)",
+    "symbol": "(symbol)",
+    "bigint": "(bigint)",
+    "object shape": "(object shape)",
+}
+NAMED_EDGES = ("context", "property", "internal", "shortcut")
+
+WATCH = {
+    "websocket": re.compile(r"WebSocket|MessageEvent|onmessage|(Bitunix|Bitget)\w*Ws", re.I),
+    "kline_buffers": re.compile(r"CircularBuffer|BufferPool|KlineBuffer", re.I),
+    "windows": re.compile(r"\w+Window\b|WindowBase|WindowManager|WindowRegistry"),
+}
+
+
+class _Stream:
+    """Just enough of an incremental JSON reader for the heap snapshot layout."""
+
+    _DECODER = json.JSONDecoder()
+    _BRACKETS = re.compile(r"[\[\]{}]")
+
+    def __init__(self, f, chunk=CHUNK_CHARS):
+        self.f = f
+        self.chunk = chunk
+        self.buf = ""
+        self.pos = 0
+
+    def _more(self):
+        data = self.f.read(self.chunk)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"heap snapshot: expected '{char}' at '{self.buf[self.pos:self.pos + 20]}'")
+        self.pos += 1
+
+    def value(self):
+        """A whole JSON value (the header object, a key, one string)."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._DECODER.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return value
+            except json.JSONDecodeError:
+                if not self._more():
+                    raise
+
+    def ints(self, size=None):
+        """A flat array of non-negative integers, parsed chunk-wise into a uint32 array."""
+        self.expect("[")
+        out = np.empty(size, dtype=np.uint32) if size is not None else None
+        parts, filled = [], 0
+        while True:
+            end = self.buf.find("]", self.pos)
+            cut = end if end >= 0 else self.buf.rfind(",", self.pos)
+            if cut > self.pos:
+                values = np.fromstring(self.buf[self.pos:cut], dtype=np.int64, sep=",")
+                if out is not None:
+                    out[filled:filled + len(values)] = values
+                else:
+                    parts.append(values.astype(np.uint32))
+                filled += len(values)
+            if end >= 0:
+                self.pos = end + 1
+                break
+            self.pos = max(cut + 1, self.pos)
+            if not self._more():
+                raise ValueError("heap snapshot: truncated array")
+        if out is None:
+            return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+        if filled != size:
+            raise ValueError(f"heap snapshot: expected {size} values, read {filled}")
+        return out
+
+    def strings(self):
+        self.expect("[")
+        out = []
+        while True:
+            char = self.peek()
+            if char == "]":
+                self.pos += 1
+                return out
+            if char == ",":
+                self.pos += 1
+                continue
+            out.append(self.value())
+
+    def skip(self):
+        """Skip a value without strings inside (the trace and sample arrays)."""
+        if self.peek() not in "[{":
+            self.value()
+            return
+        depth = 0
+        while True:
+            for m in self._BRACKETS.finditer(self.buf, self.pos):
+                depth += 1 if m.group() in "[{" else -1
+                if depth == 0:
+                    self.pos = m.end()
+                    return
+            self.pos = len(self.buf)
+            if not self._more():
+                raise ValueError("heap snapshot: truncated value")
+
+
+def read_raw(path, chunk=CHUNK_CHARS):
+    """{"snapshot": header, "nodes": uint32[], "edges": uint32[], "strings": [...]} of a .heapsnapshot."""
+    raw = {}
+    with open(path, encoding="utf-8") as f:
+        s = _Stream(f, chunk)
+        s.expect("{")
+        while True:
+            char = s.peek()
+            if char == "}" or char == "":
+                break
+            if char == ",":
+                s.pos += 1
+                continue
+            key = s.value()
+            s.expect(":")
+            if key == "snapshot":
+                raw["snapshot"] = s.value()
+            elif key in ("nodes", "edges"):
+                header = raw.get("snapshot", {})
+                meta = header.get("meta", {})
+                count = header.get(f"{key[:-1]}_count")
+                width = len(meta.get(f"{key[:-1]}_fields", []))
+                raw[key] = s.ints(count * width if count is not None and width else None)
+            elif key == "strings":
+                raw["strings"] = s.strings()
+            else:
+                s.skip()
+    return raw
+
+
+class HeapSnapshot:
+    """Column arrays of one snapshot plus its graph analysis."""
+
+    def __init__(self, raw):
+        meta = raw["snapshot"]["meta"]
+        node_fields, edge_fields = meta["node_fields"], meta["edge_fields"]
+        self.strings = raw["strings"]
+        self.node_types = meta["node_types"][0]
+        self.edge_types = meta["edge_types"][0]
+        nodes = raw["nodes"].reshape(-1, len(node_fields))
+        edges = raw["edges"].reshape(-1, len(edge_fields))
+        self.n = len(nodes)
+        self.type = nodes[:, node_fields.index("type")].astype(np.int64)
+        self.name = nodes[:, node_fields.index("name")].astype(np.int64)
+        self.self_size = nodes[:, node_fields.index("self_size")].astype(np.int64)
+        edge_count = nodes[:, node_fields.index("edge_count")].astype(np.int64)
+        self.first_edge = np.concatenate([[0], np.cumsum(edge_count)])
+        self.edge_type = edges[:, edge_fields.index("type")].astype(np.int64)
+        self.edge_name = edges[:, edge_fields.index("name_or_index")].astype(np.int64)
+        self.to_node = edges[:, edge_fields.index("to_node")].astype(np.int64) // len(node_fields)
+        self.edge_from = np.repeat(np.arange(self.n), edge_count)
+
+        weak = self.edge_types.index("weak") if "weak" in self.edge_types else -1
+        self.strong = self.edge_type != weak
+        self.cls = self._classes()
+        self.parent, self.parent_edge = self._retainer_tree()
+        self.idom, self.retained = self._dominators()
+
+    def _classes(self):
+        """Constructor id per node: the name for objects, a pseudo name (id past the strings) otherwise."""
+        cls = self.name.copy()
+        for t, type_name in enumerate(self.node_types):
+            if type_name in TYPE_LABELS:
+                cls[self.type == t] = len(self.strings) + t
+        return cls
+
+    def class_label(self, c):
+        if c < 0:
+            return "(root)"
+        if c >= len(self.strings):
+            return TYPE_LABELS.get(self.node_types[c - len(self.strings)], "(unknown)")
+        return self.strings[c] or "(anonymous)"
+
+    def edge_label(self, e):
+        return "[]" if e < 0 else self.strings[e]
+
+    def _retainer_tree(self):
+        """Breadth-first shortest retainer of every node from the root (node 0); -1 if unreachable."""
+        parent = np.full(self.n, -1, dtype=np.int64)
+        parent_edge = np.full(self.n, -1, dtype=np.int64)
+        seen = np.zeros(self.n, dtype=bool)
+        seen[0] = True
+        frontier = np.array([0])
+        while len(frontier):
+            starts, counts = self.first_edge[frontier], self.first_edge[frontier + 1] - self.first_edge[frontier]
+            total = int(counts.sum())
+            if total == 0:
+                break
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            edge = np.repeat(starts, counts) + offsets
+            edge = edge[self.strong[edge]]
+            target = self.to_node[edge]
+            fresh = ~seen[target]
+            edge, target = edge[fresh], target[fresh]
+            target, first = np.unique(target, return_index=True)
+            seen[target] = True
+            parent[target] = self.edge_from[edge[first]]
+            parent_edge[target] = edge[first]
+            frontier = target
+        return parent, parent_edge
+
+    def _dominators(self):
+        """Immediate dominators (Cooper, Harvey & Kennedy) and retained sizes over strong edges."""
+        strong = np.flatnonzero(self.strong)
+        order = np.argsort(self.to_node[strong], kind="stable")
+        pred_from = self.edge_from[strong][order].tolist()
+        pred_start = np.searchsorted(self.to_node[strong][order], np.arange(self.n + 1)).tolist()
+        first_edge = self.first_edge.tolist()
+        # Weak edges point at the (always visited) root, so the walk below skips them for free.
+        to_node = np.where(self.strong, self.to_node, 0).tolist()
+
+        # Iterative depth-first postorder from the root.
+        post = [-1] * self.n
+        postorder = []
+        visited = [False] * self.n
+        visited[0] = True
+        next_edge = first_edge[:-1]
+        stack = [0]
+        while stack:
+            node = stack[-1]
+            e, end = next_edge[node], first_edge[node + 1]
+            while e < end and visited[to_node[e]]:
+                e += 1
+            if e < end:
+                next_edge[node] = e + 1
+                child = to_node[e]
+                visited[child] = True
+                stack.append(child)
+            else:
+                stack.pop()
+                post[node] = len(postorder)
+                postorder.append(node)
+
+        idom = [-1] * self.n
+        idom[0] = 0
+        nodes = postorder[::-1][1:]
+        changed = True
+        while changed:
+            changed = False
+            for node in nodes:
+                new = -1
+                for p in pred_from[pred_start[node]:pred_start[node + 1]]:
+                    if idom[p] == -1:
+                        continue
+                    if new == -1:
+                        new = p
+                        continue
+                    a, b = p, new
+                    while a != b:
+                        while post[a] < post[b]:
+                            a = idom[a]
+                        while post[b] < post[a]:
+                            b = idom[b]
+                    new = a
+                if new != idom[node]:
+                    idom[node] = new
+                    changed = True
+            # After the first pass only nodes with several retainers can still change.
+            nodes = [node for node in nodes if pred_start[node + 1] - pred_start[node] > 1]
+
+        retained = self.self_size.copy()
+        idom_arr = np.asarray(idom, dtype=np.int64)
+        for node in postorder[:-1]:
+            retained[idom[node]] += retained[node]
+        return idom_arr, retained
+
+    def summary(self, depth=PATH_DEPTH):
+        """{"constructors": {name: [count, self, retained]}, "paths": {label: [...]}, totals}."""
+        live = np.flatnonzero(self.parent >= 0)
+        # Retained sizes add up only over instances not dominated by their own constructor.
+        is_top = self.cls[self.idom[live]] != self.cls[live]
+
+        named_types = [self.edge_types.index(t) for t in NAMED_EDGES if t in self.edge_types]
+        columns, node = [self.cls[live]], live
+        for _ in range(depth):
+            edge = self.parent_edge[node]
+            has = edge >= 0
+            edge = np.where(has, edge, 0)
+            columns.append(np.where(has & np.isin(self.edge_type[edge], named_types), self.edge_name[edge], -1))
+            node = np.where(has, self.parent[node], 0)
+            columns.append(np.where(~has, -2, np.where(node == 0, -1, self.cls[node])))
+
+        sections = {}
+        for section, width, label in (("constructors", 1, lambda key: self.class_label(key[0])),
+                                      ("paths", len(columns), self._path_label)):
+            keys, counts, shallow = _group(columns[:width], self.self_size[live])
+            table = {tuple(key): [count, size, 0] for key, count, size in zip(keys.tolist(), counts, shallow)}
+            top_keys, _, retained = _group([c[is_top] for c in columns[:width]], self.retained[live][is_top])
+            for key, size in zip(top_keys.tolist(), retained):
+                table[tuple(key)][2] = size
+            sections[section] = {label(key): row for key, row in table.items()}
+        return {
+            "nodes": self.n,
+            "edges": len(self.to_node),
+            "total_size": int(self.self_size.sum()),
+            "reachable_size": int(self.self_size[live].sum()),
+            **sections,
+        }
+
+    def _path_label(self, key):
+        """'A.x → B.y → C' from (C, edge y, B, edge x, A), outermost retainer first."""
+        parts = []
+        for edge, owner in zip(key[1::2], key[2::2]):
+            if owner == -2:
+                break
+            parts.append(f"{self.class_label(owner)}.{self.edge_label(edge)}")
+        return " → ".join(parts[::-1] + [self.class_label(key[0])])
+
+
+def _group(columns, values):
+    """(unique key rows, count per key, sum of `values` per key) over parallel int columns."""
+    if len(columns[0]) == 0:
+        return np.empty((0, len(columns)), dtype=np.int64), [], []
+    # Fold the columns into one dense code, one column at a time, so np.unique stays one-dimensional.
+    _, code = np.unique(columns[0], return_inverse=True)
+    for column in columns[1:]:
+        _, column_code = np.unique(column, return_inverse=True)
+        _, code = np.unique(code * (int(column_code.max()) + 1) + column_code, return_inverse=True)
+    code = code.reshape(-1)
+    counts = np.bincount(code)
+    first = np.zeros(len(counts), dtype=np.int64)
+    first[code[::-1]] = np.arange(len(code))[::-1]
+    keys = np.column_stack(columns)[first]
+    sums = np.bincount(code, weights=values, minlength=len(counts)).astype(np.int64)
+    return keys, counts.tolist(), sums.tolist()
+
+
+def analyze_file(path, chunk=CHUNK_CHARS):
+    started = time.perf_counter()
+    summary = HeapSnapshot(read_raw(path, chunk)).summary()
+    summary["file"] = path
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def watched(label):
+    """Names of the WATCH groups a constructor or path label belongs to."""
+    return [name for name, pattern in WATCH.items() if pattern.search(label)]
+
+
+def diff(summaries, section, top=TOP):
+    """Rows of `section` ("constructors" or "paths") ranked by retained growth, first → last snapshot."""
+    keys = set()
+    for s in summaries:
+        keys.update(s[section])
+    rows = []
+    for key in keys:
+        series = np.array([s[section].get(key, [0, 0, 0]) for s in summaries], dtype=np.int64)
+        retained = series[:, 2]
+        rows.append({
+            "name": key,
+            "count": series[:, 0].tolist(),
+            "self_size": series[:, 1].tolist(),
+            "retained_size": retained.tolist(),
+            "count_growth": int(series[-1, 0] - series[0, 0]),
+            "self_growth": int(series[-1, 1] - series[0, 1]),
+            "retained_growth": int(retained[-1] - retained[0]),
+            "monotonic": bool(len(series) > 1 and (np.diff(retained) >= 0).all() and retained[-1] > retained[0]),
+            "watch": watched(key),
+        })
+    rows.sort(key=lambda r: (-r["retained_growth"], -r["count_growth"], r["name"]))
+    ranked = [r for r in rows if r["retained_growth"] > 0 or r["count_growth"] > 0]
+    return {
+        "top": ranked[:top],
+        "watched": [r for r in ranked if r["watch"]],
+    }
+
+
+def report(summaries, top=TOP):
+    return {
+        "snapshots": [{k: s[k] for k in ("file", "nodes", "edges", "total_size", "reachable_size", "seconds")}
+                      for s in summaries],
+        "constructors": diff(summaries, "constructors", top),
+        "paths": diff(summaries, "paths", top),
+    }
+
+
+def _kb(n):
+    return f"{n / 1024:+,.0f}" if n else "0"
+
+
+def format_report(r):
+    lines = []
+    for s in r["snapshots"]:
+        lines.append(f"📸 {os.path.basename(s['file'])}: {s['nodes']:,} nodes, "
+                     f"{s['reachable_size'] / 2**20:,.1f} MB reachable ({s['seconds']:.1f}s)")
+    for section in ("constructors", "paths"):
+        rows = r[section]["top"]
+        lines.append("")
+        lines.append(f"{'retained KB':>12} {'self KB':>10} {'count':>8}  mono  {section[:-1]}")
+        for row in rows:
+            mark = "↗" if row["monotonic"] else " "
+            flag = f"  ⚠️ {', '.join(row['watch'])}" if row["watch"] else ""
+            lines.append(f"{_kb(row['retained_growth']):>12} {_kb(row['self_growth']):>10} "
+                         f"{row['count_growth']:>+8}   {mark}   {row['name']}{flag}")
+    flagged = [row for row in r["paths"]["watched"] if row["monotonic"]]
+    lines.append("")
+    if flagged:
+        lines.append(f"🚨 {len(flagged)} watched retainer paths grew in every snapshot:")
+        for row in flagged[:TOP]:
+            lines.append(f"   {_kb(row['retained_growth'])} KB, {row['count_growth']:+} objects  {row['name']}")
+    else:
+        lines.append("✅ No WebSocket, kline buffer or window path grew monotonically.")
+    return "\n".join(lines)
+
+
+def take_snapshot(cdp, path):
+    """Force a GC, then stream a heap snapshot of the page to `path` chunk by chunk."""
+    cdp.send("HeapProfiler.collectGarbage")
+    with open(path, "w", encoding="utf-8") as f:
+        def write(event):
+            f.write(event["chunk"])
+
+        cdp.on("HeapProfiler.addHeapSnapshotChunk", write)
+        try:
+            cdp.send("HeapProfiler.takeHeapSnapshot", {"reportProgress": False})
+        finally:
+            cdp.remove_listener("HeapProfiler.addHeapSnapshotChunk", write)
+    return path
+
+
+def capture(url, scenario_path, steps, every, out_dir, headless=True):
+    """Run the scenario and write snapshot_<step>.heapsnapshot before the first step and every `every` steps."""
+    import scenario
+
+    session = scenario.load(scenario_path)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    with scenario.browser_page(url, headless) as page:
+        session.setup(page)
+        cdp = page.context.new_cdp_session(page)
+        cdp.send("HeapProfiler.enable")
+        paths.append(take_snapshot(cdp, os.path.join(out_dir, "snapshot_0000.heapsnapshot")))
+        print(f"📸 Baseline written ({session.name} scenario, {steps} steps)")
+        for i in range(steps):
+            session.step(page, i)
+            if (i + 1) % every == 0:
+                paths.append(take_snapshot(cdp, os.path.join(out_dir, f"snapshot_{i + 1:04d}.heapsnapshot")))
+                print(f"📸 Step {i + 1}/{steps}")
+    return paths
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Capture heap snapshots over a session and rank what grew.")
+    sub = p.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("capture", help="Drive the app and write a snapshot series (then analyze it).")
+    c.add_argument("--url", default=None, help="App URL (default: the dev server, class names unminified).")
+    c.add_argument("--scenario", help="Python file with setup(page) / step(page, i); default idles.")
+    c.add_argument("--steps", type=int, default=60)
+    c.add_argument("--every", type=int, default=15, help="Steps between snapshots.")
+    c.add_argument("--out", default="heap")
+    c.add_argument("--headed", action="store_true")
+    a = sub.add_parser("analyze", help="Rank growth across snapshots (in capture order).")
+    a.add_argument("snapshots", nargs="+")
+    for q in (c, a):
+        q.add_argument("--top", type=int, default=TOP)
+        q.add_argument("--json", dest="json_out", help="Also write the report here.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "capture":
+        import scenario
+
+        paths = capture(args.url or scenario.DEFAULT_URL, args.scenario, args.steps, args.every, args.out,
+                        headless=not args.headed)
+    else:
+        paths = args.snapshots
+    if len(paths) < 2:
+        print("❌ Need at least two snapshots to compare.")
+        return 1
+    summaries = []
+    for path in paths:
+        try:
+            summaries.append(analyze_file(path))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {path}: {e}")
+            return 1
+    result = report(summaries, args.top)
+    print(format_report(result))
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
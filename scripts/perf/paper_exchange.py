@@ -0,0 +1,1649 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Paper exchange for order-flow load and latency tests.
+
+A local stand-in for the private Bitunix futures API, so the order paths can
+be hammered offline at hundreds of orders per second.
+
+* REST: the `/api/v1/futures/` endpoints the server routes call. These are
+  place, modify, cancel and cancel-all orders, order detail, pending and
+  history orders and trades, flash close and close-all, pending positions,
+  pending TP/SL plans (cancel and modify too) and the account. Responses use
+  the `{code, msg, data}` envelope and the shapes of docs/bitunix-api/.
+  Requests are checked against the `generateBitunixSignature` scheme when
+  the stand-in is given a key.
+* WebSocket: `/private/` answers login, ping and subscribe the way
+  `bitunixWs` expects. It pushes `order`, `position`, `wallet` and `tp_sl`
+  events. `/public/` streams the market's `trade` prints.
+* Positions and money follow src/services/paperExchange.ts:
+  * hedge-mode positions per symbol and side, entries averaged by weight;
+  * slippage against the trader and a taker fee on every fill;
+  * a CLOSE order carries the *position's* side, so BUY closes a long.
+* Resting orders go into a price-time-priority book per symbol. The market
+  is a stream of trade prints, either a synthetic random walk or a JSONL
+  recording from `scenario.record_websockets`. Each print fills the resting
+  orders it crosses, best price first and oldest first at one price, up to
+  the print's size. Orders rest partly filled when the tape is thin.
+  TP/SL plans fire as market closes once the price crosses their trigger.
+* Latency, rejects, timeouts and forced partial fills are injected per
+  request. Throughput counters and service-time percentiles are served at
+  GET /paper/stats.
+
+    python paper_exchange.py serve --symbols BTCUSDT,ETHUSDT --latency-ms 40 --jitter-ms 20
+    python paper_exchange.py serve --replay market.jsonl --reject-rate 0.02 --partial-rate 0.1
+    python paper_exchange.py load --rate 300 --seconds 20 --connections 32
+    python paper_exchange.py load --url http://127.0.0.1:8790 --rate 500 --json load.json
+    python paper_exchange.py load --app http://127.0.0.1:5173 --rate 200
+
+`load` runs the order flows of `orderPlacementService` and the flash-close
+button at a fixed order rate. The stand-in is started in-process unless
+--url is given. It reports throughput and p50/p99 latency per flow step, and
+how late the private pushes arrive.
+
+By default the flows go to the stand-in directly, a baseline without the
+app. With --app they go through the app's /api routes (token, validation,
+signing and forwarding included), which needs the app started outside
+production with
+
+    BITUNIX_API_URL=http://127.0.0.1:8790 CLIENT_RATE_LIMIT_PER_MINUTE=100000 \
+    CLIENT_RATE_LIMIT_PER_IP_PER_MINUTE=100000
+
+The browser side can be pointed at the stand-in's WebSocket with
+VITE_BITUNIX_WS_PUBLIC_URL and VITE_BITUNIX_WS_PRIVATE_URL at build time.
+"""
+
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import struct
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+# HTTP and WebSocket framing are brain_server's (standard library and NumPy only).
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "brain"))
+from brain_server import (WS_CLOSE, WS_PING, WS_PONG, WS_TEXT, RequestError, http_response,  # noqa: E402
+                          read_http_message, ws_accept_key, ws_frame, ws_read)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8790
+API = "/api/v1/futures"
+MARGIN_COIN = "USDT"
+BPS = Decimal(10_000)
+DEFAULT_BALANCE = "100000"
+DEFAULT_SLIPPAGE_BPS = "5"
+DEFAULT_TAKER_FEE_BPS = "6"
+DEFAULT_PARTIAL_RATIO = "0.5"
+# Longer than the app's 10 s fetch timeout, so a held request reads as a timeout.
+TIMEOUT_HOLD_S = 15.0
+HISTORY_LIMIT = 10_000
+METRIC_WINDOW = 10_000
+# The app's fetch timeout; `load` gives up on a request after as long.
+REQUEST_TIMEOUT_S = 10.0
+# A WebSocket client this far behind is dropped instead of buffered forever.
+WS_MAX_BUFFER = 4 * 1024 * 1024
+PRIVATE_CHANNELS = ("order", "position", "wallet", "tp_sl")
+
+TICK_MS = 100
+TICK_VOLATILITY = 0.0005
+# Mean notional of one synthetic print; sets how fast resting size is consumed.
+TICK_NOTIONAL = 50_000.0
+START_PRICES = {"BTCUSDT": 60_000.0, "ETHUSDT": 3_000.0, "SOLUSDT": 150.0, "XRPUSDT": 0.6}
+DEFAULT_START_PRICE = 100.0
+
+# Bitunix business errors (docs/bitunix-api/09_error_codes.md); all go out with HTTP 200.
+PARAMETER_ERROR = (10002, "Parameter Error")
+SIGN_ERROR = (10007, "Sign signature error")
+NO_MARKET = (20001, "Market not exists")
+INSUFFICIENT_BALANCE = (20003, "Insufficient balance")
+NO_ORDER = (20007, "Order not found, please try it later")
+NO_POSITION = (30004, "Position not exist")
+ORDER_STATUS = (30011, "Abnormal order status")
+
+OPEN_STATUSES = ("NEW", "PART_FILLED")
+
+
+class ExchangeError(Exception):
+    """A business error, answered as `{code, msg}` with HTTP 200 like the exchange does."""
+
+    def __init__(self, error, detail=None):
+        code, msg = error
+        super().__init__(f"{msg}: {detail}" if detail else msg)
+        self.code = code
+        self.msg = msg
+
+
+def to_decimal(value, field):
+    """A positive Decimal from a request field, or a Parameter Error naming it."""
+    try:
+        d = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ExchangeError(PARAMETER_ERROR, field) from None
+    if not d.is_finite() or d <= 0:
+        raise ExchangeError(PARAMETER_ERROR, field)
+    return d
+
+
+def fmt(d):
+    """Decimal as the exchange writes it: plain notation, no trailing zeros."""
+    if d is None:
+        return None
+    s = format(d, "f")
+    return s.rstrip("0").rstrip(".") if "." in s else s
+
+
+def _flag(value):
+    return value is True or str(value).lower() == "true"
+
+
+def bitunix_sign(api_key, api_secret, nonce, timestamp, params, body):
+    """`generateBitunixSignature` of src/utils/server/bitunix.ts."""
+    query = "".join(k + str(params[k]) for k in sorted(params))
+    digest = hashlib.sha256((nonce + timestamp + api_key + query + body).encode()).hexdigest()
+    return hashlib.sha256((digest + api_secret).encode()).hexdigest()
+
+
+def ws_login_sign(api_key, api_secret, nonce, timestamp):
+    """Signature of the private WebSocket login (docs/bitunix-api/08_websocket.md)."""
+    first = hashlib.sha256(f"{nonce}{timestamp}{api_key}".encode()).hexdigest()
+    return hashlib.sha256((first + api_secret).encode()).hexdigest()
+
+
+class Config:
+    """What the stand-in injects. Rates are probabilities per request."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, reject_rate=0.0, timeout_rate=0.0, partial_rate=0.0,
+                 partial_ratio=DEFAULT_PARTIAL_RATIO, slippage_bps=DEFAULT_SLIPPAGE_BPS,
+                 taker_fee_bps=DEFAULT_TAKER_FEE_BPS, balance=DEFAULT_BALANCE, seed=None):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.reject_rate = float(reject_rate)
+        self.timeout_rate = float(timeout_rate)
+        self.partial_rate = float(partial_rate)
+        self.partial_ratio = Decimal(str(partial_ratio))
+        self.slippage_bps = Decimal(str(slippage_bps))
+        self.taker_fee_bps = Decimal(str(taker_fee_bps))
+        self.balance = Decimal(str(balance))
+        self.seed = seed
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p99": None, "max": None}
+    p50, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 99])
+    return {"p50": float(p50), "p99": float(p99), "max": float(max(values))}
+
+
+class Counters:
+    """Throughput counters plus a rolling window of service times per endpoint."""
+
+    def __init__(self, window=METRIC_WINDOW):
+        self.started = time.monotonic()
+        self.requests = collections.Counter()
+        self.errors = collections.Counter()
+        self.events = collections.Counter()
+        self.pushes = collections.Counter()
+        self.service_ms = collections.defaultdict(lambda: collections.deque(maxlen=window))
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "uptime_s": elapsed,
+            "requests": dict(self.requests),
+            "requests_per_s": sum(self.requests.values()) / elapsed,
+            "orders_per_s": self.events["orders"] / elapsed,
+            "fills_per_s": self.events["fills"] / elapsed,
+            "errors": {str(code): n for code, n in self.errors.items()},
+            "events": dict(self.events),
+            "pushes": dict(self.pushes),
+            "service_ms": {path: _percentiles(v) for path, v in sorted(self.service_ms.items())},
+        }
+
+
+class Order:
+    __slots__ = ("order_id", "client_id", "symbol", "side", "type", "effect", "price", "qty", "filled", "cost",
+                 "fee", "realized", "reduce_only", "trade_side", "position_id", "leverage", "status", "ctime",
+                 "mtime", "seq", "attached")
+
+    def __init__(self, order_id, symbol, side, order_type, qty, price=None, client_id=None, effect="GTC",
+                 reduce_only=False, trade_side="OPEN", position_id=None, leverage=1, attached=None, now=0):
+        self.order_id = order_id
+        self.client_id = client_id or order_id
+        self.symbol = symbol
+        self.side = side
+        self.type = order_type
+        self.effect = effect
+        self.price = price
+        self.qty = qty
+        self.filled = Decimal(0)
+        self.cost = Decimal(0)
+        self.fee = Decimal(0)
+        self.realized = Decimal(0)
+        self.reduce_only = reduce_only
+        self.trade_side = trade_side
+        self.position_id = position_id
+        self.leverage = leverage
+        self.status = "NEW"
+        self.ctime = self.mtime = now
+        self.seq = 0
+        self.attached = attached or {}
+
+    @property
+    def closes(self):
+        return self.trade_side == "CLOSE" or self.reduce_only
+
+    @property
+    def position_side(self):
+        # Bitunix's close shape carries the position's side (buildCloseOrderFields
+        # in tradeService), so BUY names the long whether it opens or closes.
+        return "LONG" if self.side == "BUY" else "SHORT"
+
+    @property
+    def exec_side(self):
+        """The side that actually trades: closing a long sells."""
+        if not self.closes:
+            return self.side
+        return "SELL" if self.side == "BUY" else "BUY"
+
+    @property
+    def remaining(self):
+        return self.qty - self.filled
+
+    @property
+    def is_open(self):
+        return self.status in OPEN_STATUSES
+
+    def wire(self):
+        """Get Order Detail / Get Pending Orders shape."""
+        avg = self.cost / self.filled if self.filled else Decimal(0)
+        return {"orderId": self.order_id, "clientId": self.client_id, "symbol": self.symbol,
+                "qty": fmt(self.qty), "tradeQty": fmt(self.filled), "price": fmt(self.price),
+                "avgPrice": fmt(avg), "positionMode": "HEDGE", "marginMode": "CROSS", "leverage": self.leverage,
+                "side": self.side, "type": self.type, "orderType": self.type, "effect": self.effect,
+                "tradeSide": self.trade_side, "reduceOnly": self.reduce_only, "status": self.status,
+                "fee": fmt(self.fee), "realizedPNL": fmt(self.realized), "source": "api", **self.attached,
+                "ctime": self.ctime, "mtime": self.mtime}
+
+    def push(self, event):
+        """Order channel shape."""
+        avg = self.cost / self.filled if self.filled else Decimal(0)
+        return {"event": event, "orderId": self.order_id, "clientId": self.client_id, "symbol": self.symbol,
+                "positionType": "CROSS", "positionMode": "HEDGE", "side": self.side, "effect": self.effect,
+                "type": self.type, "qty": fmt(self.qty), "price": fmt(self.price), "ctime": str(self.ctime),
+                "mtime": str(self.mtime), "leverage": str(self.leverage), "orderStatus": self.status,
+                "fee": fmt(self.fee), "averagePrice": fmt(avg), "dealAmount": fmt(self.filled),
+                "reduceOnly": self.reduce_only, **self.attached}
+
+
+class Position:
+    __slots__ = ("position_id", "symbol", "side", "qty", "entry", "leverage", "fee", "realized", "ctime", "mtime")
+
+    def __init__(self, position_id, symbol, side, leverage, now):
+        self.position_id = position_id
+        self.symbol = symbol
+        self.side = side
+        self.qty = Decimal(0)
+        self.entry = Decimal(0)
+        self.leverage = leverage
+        self.fee = Decimal(0)
+        self.realized = Decimal(0)
+        self.ctime = self.mtime = now
+
+    def margin(self):
+        return self.entry * self.qty / self.leverage
+
+    def unrealized(self, price):
+        if price is None:
+            return Decimal(0)
+        move = price - self.entry if self.side == "LONG" else self.entry - price
+        return move * self.qty
+
+    def wire(self, price):
+        """Get Pending Positions shape."""
+        margin = self.margin()
+        return {"positionId": self.position_id, "symbol": self.symbol, "qty": fmt(self.qty),
+                "entryValue": fmt(self.entry * self.qty), "side": self.side, "marginMode": "CROSS",
+                "positionMode": "HEDGE", "leverage": self.leverage, "fee": fmt(self.fee), "funding": "0",
+                "realizedPNL": fmt(self.realized), "margin": fmt(margin), "unrealizedPNL": fmt(self.unrealized(price)),
+                "liqPrice": "0", "marginRate": "0", "avgOpenPrice": fmt(self.entry), "ctime": self.ctime,
+                "mtime": self.mtime}
+
+    def push(self, event, price):
+        """Position channel shape."""
+        return {"event": event, "positionId": self.position_id, "marginMode": "CROSS", "positionMode": "HEDGE",
+                "side": self.side, "leverage": str(self.leverage), "margin": fmt(self.margin()),
+                "ctime": str(self.ctime), "qty": fmt(self.qty), "symbol": self.symbol,
+                "realizedPNL": fmt(self.realized), "unrealizedPNL": fmt(self.unrealized(price)), "funding": "0",
+                "fee": fmt(self.fee)}
+
+
+class Plan:
+    """A position TP/SL plan (Get Pending TP/SL Order)."""
+
+    __slots__ = ("plan_id", "position_id", "symbol", "side", "qty", "fields", "ctime")
+
+    def __init__(self, plan_id, position, qty, fields, now):
+        self.plan_id = plan_id
+        self.position_id = position.position_id
+        self.symbol = position.symbol
+        # Close shape: the position's side, so BUY for a long.
+        self.side = "BUY" if position.side == "LONG" else "SELL"
+        self.qty = qty
+        self.fields = fields
+        self.ctime = now
+
+    def level(self, leg):
+        value = self.fields.get(f"{leg}Price")
+        return Decimal(value) if value else None
+
+    def wire(self):
+        base = self.symbol[:-len(MARGIN_COIN)] if self.symbol.endswith(MARGIN_COIN) else self.symbol
+        out = {"id": self.plan_id, "positionId": self.position_id, "symbol": self.symbol, "base": base,
+               "quote": MARGIN_COIN, "ctime": self.ctime, **self.fields}
+        for leg in ("tp", "sl"):
+            if self.fields.get(f"{leg}Price"):
+                out[f"{leg}Qty"] = fmt(self.qty)
+        return out
+
+
+class OrderBook:
+    """Resting orders of one symbol in price-time priority (heaps with lazy deletion)."""
+
+    def __init__(self):
+        self.bids = []
+        self.asks = []
+
+    def add(self, order, seq):
+        order.seq = seq
+        if order.exec_side == "BUY":
+            heapq.heappush(self.bids, (-order.price, seq, order))
+        else:
+            heapq.heappush(self.asks, (order.price, seq, order))
+
+    def crossed(self, price):
+        """Resting orders a print at `price` reaches, in priority order; the book keeps them."""
+        for heap, crosses in ((self.bids, lambda top: -top >= price), (self.asks, lambda top: top <= price)):
+            # Only the crossing prefix is taken off the heap, so a print costs
+            # O(k log n) for k crossed orders however deep the book is.
+            popped = []
+            while heap and crosses(heap[0][0]):
+                entry = heapq.heappop(heap)
+                _, seq, order = entry
+                if order.is_open and order.seq == seq:
+                    popped.append(entry)
+            yield from (entry[2] for entry in popped)
+            for entry in popped:
+                if entry[2].is_open:
+                    heapq.heappush(heap, entry)
+
+    def __len__(self):
+        return sum(1 for heap in (self.bids, self.asks) for _, seq, o in heap if o.is_open and o.seq == seq)
+
+
+class PaperExchange:
+    """
+    The exchange's state and rules without any transport. `handle` takes one
+    REST call and returns its `data` or raises ExchangeError; `on_trade` feeds
+    one market print. Every state change is reported to `listeners` as
+    `(channel, data)` in the private WebSocket's shapes.
+    """
+
+    def __init__(self, config=None, clock=None):
+        self.config = config or Config()
+        self.rng = random.Random(self.config.seed)
+        self.clock = clock or (lambda: int(time.time() * 1000))
+        self.balance = self.config.balance
+        self.prices = {}
+        self.books = collections.defaultdict(OrderBook)
+        self.orders = {}
+        self.client_ids = {}
+        self.positions = {}
+        self.plans = {}
+        self.closed_orders = collections.deque()
+        self.closed_positions = collections.deque(maxlen=HISTORY_LIMIT)
+        self.closed_plans = collections.deque(maxlen=HISTORY_LIMIT)
+        self.trades = collections.deque(maxlen=HISTORY_LIMIT)
+        self.listeners = []
+        self.counters = Counters()
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self.routes = {
+            ("POST", "/trade/place_order"): self.place_order,
+            ("POST", "/trade/modify_order"): self.modify_order,
+            ("POST", "/trade/cancel_orders"): self.cancel_orders,
+            ("POST", "/trade/cancel_all_orders"): self.cancel_all_orders,
+            ("POST", "/trade/flash_close_position"): self.flash_close_position,
+            ("POST", "/trade/close_all_position"): self.close_all_position,
+            ("GET", "/trade/get_order_detail"): self.get_order_detail,
+            ("GET", "/trade/get_pending_orders"): self.get_pending_orders,
+            ("GET", "/trade/get_history_orders"): self.get_history_orders,
+            ("GET", "/trade/get_history_trades"): self.get_history_trades,
+            ("GET", "/position/get_pending_positions"): self.get_pending_positions,
+            ("GET", "/position/get_history_positions"): self.get_history_positions,
+            ("GET", "/tpsl/get_pending_orders"): self.get_pending_tpsl,
+            ("GET", "/tpsl/get_history_orders"): self.get_history_tpsl,
+            ("POST", "/tpsl/cancel_order"): self.cancel_tpsl,
+            ("POST", "/tpsl/modify_order"): self.modify_tpsl,
+            ("GET", "/account"): self.account,
+        }
+
+    # -- transport-independent entry points ----------------------------------
+
+    def handle(self, method, path, params):
+        """`data` of one REST call (`params` is the query for GET, the JSON body for POST)."""
+        route = self.routes.get((method, path[len(API):] if path.startswith(API) else None))
+        if route is None:
+            raise RequestError(f"no route for {method} {path}", status=404)
+        return route(params)
+
+    def respond(self, method, path, params):
+        """(HTTP status, envelope) of one REST call, errors included."""
+        self.counters.requests[path] += 1
+        try:
+            return 200, {"code": 0, "msg": "Success", "data": self.handle(method, path, params)}
+        except ExchangeError as e:
+            self.counters.errors[e.code] += 1
+            return 200, {"code": e.code, "msg": str(e), "data": None}
+
+    def latency_s(self):
+        """One sampled delay: the fixed latency plus exponential jitter."""
+        c = self.config
+        jitter = self.rng.expovariate(1 / c.jitter_ms) if c.jitter_ms > 0 else 0.0
+        return (c.latency_ms + jitter) / 1000
+
+    def times_out(self):
+        return self.config.timeout_rate > 0 and self.rng.random() < self.config.timeout_rate
+
+    def on_trade(self, symbol, price, qty=None):
+        """
+        One market print: `qty` at `price` (unlimited size for price-only
+        frames). Fills crossed resting orders in priority order at their own
+        limit, then fires crossed TP/SL plans.
+        """
+        price = Decimal(str(price))
+        self.prices[symbol] = price
+        self._emit("trade", [{"t": self.clock(), "p": fmt(price), "v": fmt(Decimal(str(qty or 0))), "s": "buy"}],
+                   symbol=symbol)
+        book = self.books.get(symbol)
+        if book is not None:
+            size = None if qty is None else Decimal(str(qty))
+            # The print's size is available once to each side of the book.
+            left = {"BUY": size, "SELL": size}
+            for order in book.crossed(price):
+                side_left = left[order.exec_side]
+                if side_left is not None and side_left <= 0:
+                    continue
+                take = order.remaining if side_left is None else min(order.remaining, side_left)
+                self._fill(order, take, order.price)
+                if side_left is not None:
+                    left[order.exec_side] = side_left - take
+        self._trigger_plans(symbol, price)
+
+    # -- orders ---------------------------------------------------------------
+
+    def place_order(self, body):
+        symbol = self._symbol(body)
+        side = str(body.get("side", "")).upper()
+        if side not in ("BUY", "SELL"):
+            raise ExchangeError(PARAMETER_ERROR, "side")
+        order_type = str(body.get("orderType") or "MARKET").upper()
+        if order_type not in ("LIMIT", "MARKET"):
+            raise ExchangeError(PARAMETER_ERROR, "orderType")
+        qty = to_decimal(body.get("qty"), "qty")
+        price = to_decimal(body.get("price"), "price") if order_type == "LIMIT" else None
+        effect = str(body.get("effect") or "GTC").upper()
+        trade_side = str(body.get("tradeSide") or "OPEN").upper()
+        leverage = int(to_decimal(body.get("leverage") or 1, "leverage"))
+        attached = self._attached(body)
+        last = self._last(symbol)
+        if self._rejects():
+            raise ExchangeError(INSUFFICIENT_BALANCE)
+
+        now = self.clock()
+        order = Order(self._id(), symbol, side, order_type, qty, price, body.get("clientId"), effect,
+                      _flag(body.get("reduceOnly")), trade_side, body.get("positionId"), leverage, attached, now)
+        if order.closes and self._position_for(order) is None:
+            raise ExchangeError(NO_POSITION)
+        if not order.closes and self._free_margin() < last * qty / leverage:
+            raise ExchangeError(INSUFFICIENT_BALANCE)
+
+        self.orders[order.order_id] = order
+        self.client_ids[order.client_id] = order.order_id
+        self.counters.events["orders"] += 1
+        self._emit("order", order.push("CREATE"))
+        self._execute(order, last)
+        return {"orderId": order.order_id, "clientId": order.client_id}
+
+    def _execute(self, order, last):
+        """Match an incoming (or re-priced) order against the last price; rest or cancel the remainder."""
+        marketable = order.type == "MARKET" or (
+            order.price >= last if order.exec_side == "BUY" else order.price <= last)
+        if marketable and order.effect == "POST_ONLY":
+            return self._cancel(order)
+        if not marketable:
+            if order.effect in ("IOC", "FOK"):
+                return self._cancel(order)
+            return self._rest(order)
+
+        take = order.remaining
+        if self.config.partial_rate > 0 and self.rng.random() < self.config.partial_rate:
+            take = take * self.config.partial_ratio
+            if order.effect == "FOK":
+                return self._cancel(order)
+        price = self._slipped(last, order.exec_side)
+        if order.type == "LIMIT":
+            # Slippage never takes a limit order through its own price.
+            price = min(price, order.price) if order.exec_side == "BUY" else max(price, order.price)
+        self._fill(order, take, price)
+        if order.is_open:
+            if order.type == "MARKET" or order.effect in ("IOC", "FOK"):
+                self._cancel(order)
+            else:
+                self._rest(order)
+
+    def modify_order(self, body):
+        order = self._order(body)
+        if not order.is_open:
+            raise ExchangeError(ORDER_STATUS)
+        if self._rejects():
+            raise ExchangeError(INSUFFICIENT_BALANCE)
+        qty = to_decimal(body.get("qty"), "qty")
+        if qty <= order.filled:
+            raise ExchangeError(PARAMETER_ERROR, "qty")
+        price = to_decimal(body.get("price"), "price") if order.type == "LIMIT" else order.price
+        # A new price or more size goes to the back of the queue; less size keeps its place.
+        requeue = price != order.price or qty > order.qty
+        order.qty, order.price = qty, price
+        order.attached.update(self._attached(body))
+        order.mtime = self.clock()
+        self._emit("order", order.push("UPDATE"))
+        if requeue:
+            self._execute(order, self._last(order.symbol))
+        return {"orderId": order.order_id, "clientId": order.client_id}
+
+    def cancel_orders(self, body):
+        self._symbol(body)
+        items = body.get("orderList")
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ExchangeError(PARAMETER_ERROR, "orderList")
+        success, failure = [], []
+        for item in items:
+            try:
+                order = self._order(item)
+                if not order.is_open:
+                    raise ExchangeError(ORDER_STATUS)
+            except ExchangeError as e:
+                failure.append({"orderId": item.get("orderId"), "clientId": item.get("clientId"),
+                                "errorMsg": e.msg, "errorCode": e.code})
+                continue
+            self._cancel(order)
+            success.append({"orderId": order.order_id, "clientId": order.client_id})
+        return {"successList": success, "failureList": failure}
+
+    def cancel_all_orders(self, body):
+        symbol = body.get("symbol")
+        success = []
+        for order in [o for o in self.orders.values() if o.is_open and symbol in (None, o.symbol)]:
+            self._cancel(order)
+            success.append({"orderId": order.order_id, "clientId": order.client_id})
+        return {"successList": success, "failureList": []}
+
+    def get_order_detail(self, params):
+        return self._order(params).wire()
+
+    def get_pending_orders(self, params):
+        return self._order_page([o for o in self.orders.values() if o.is_open], params)
+
+    def get_history_orders(self, params):
+        return self._order_page([self.orders[i] for i in self.closed_orders if i in self.orders], params)
+
+    def get_history_trades(self, params):
+        symbol = params.get("symbol")
+        rows = [t for t in reversed(self.trades) if symbol in (None, t["symbol"])]
+        return {"tradeList": self._page(rows, params), "total": len(rows)}
+
+    # -- positions -------------------------------------------------------------
+
+    def flash_close_position(self, body):
+        position = self.positions.get(str(body.get("positionId", "")))
+        if position is None:
+            raise ExchangeError(NO_POSITION)
+        self._market_close(position, position.qty)
+        return {"positionId": position.position_id}
+
+    def close_all_position(self, body):
+        symbol = body.get("symbol")
+        for position in [p for p in self.positions.values() if symbol in (None, p.symbol)]:
+            self._market_close(position, position.qty)
+        return ""
+
+    def get_pending_positions(self, params):
+        symbol, position_id = params.get("symbol"), params.get("positionId")
+        return [p.wire(self.prices.get(p.symbol)) for p in self.positions.values()
+                if symbol in (None, p.symbol) and position_id in (None, p.position_id)]
+
+    def get_history_positions(self, params):
+        symbol = params.get("symbol")
+        rows = [p for p in reversed(self.closed_positions) if symbol in (None, p["symbol"])]
+        return {"positionList": self._page(rows, params), "total": len(rows)}
+
+    def account(self, params):
+        margin = sum((p.margin() for p in self.positions.values()), Decimal(0))
+        unrealized = sum((p.unrealized(self.prices.get(p.symbol)) for p in self.positions.values()), Decimal(0))
+        available = self.balance - margin
+        return [{"marginCoin": MARGIN_COIN, "available": fmt(available), "frozen": "0", "margin": fmt(margin),
+                 "transfer": fmt(available), "positionMode": "HEDGE", "crossUnrealizedPNL": fmt(unrealized),
+                 "isolationUnrealizedPNL": "0", "bonus": "0"}]
+
+    # -- TP/SL plans -----------------------------------------------------------
+
+    def get_pending_tpsl(self, params):
+        symbol, position_id = params.get("symbol"), params.get("positionId")
+        rows = [p.wire() for p in self.plans.values()
+                if symbol in (None, p.symbol) and position_id in (None, p.position_id)]
+        return self._page(rows, params)
+
+    def get_history_tpsl(self, params):
+        symbol = params.get("symbol")
+        rows = [p for p in reversed(self.closed_plans) if symbol in (None, p["symbol"])]
+        return {"orderList": self._page(rows, params), "total": len(rows)}
+
+    def cancel_tpsl(self, body):
+        plan = self.plans.get(str(body.get("orderId", "")))
+        if plan is None:
+            raise ExchangeError(NO_ORDER)
+        self._close_plan(plan, "CANCELED")
+        return {"orderId": plan.plan_id}
+
+    def modify_tpsl(self, body):
+        plan = self.plans.get(str(body.get("orderId", "")))
+        if plan is None:
+            raise ExchangeError(NO_ORDER)
+        plan.fields.update(self._attached(body))
+        self._emit("tp_sl", self._plan_push(plan, "UPDATE", "NEW"))
+        return {"orderId": plan.plan_id}
+
+    # -- internals -------------------------------------------------------------
+
+    def _id(self):
+        return str(next(self._ids))
+
+    def _emit(self, channel, data, symbol=None):
+        if symbol is None:
+            self.counters.pushes[channel] += 1
+        for listener in self.listeners:
+            listener(channel, data, symbol)
+
+    def _rejects(self):
+        return self.config.reject_rate > 0 and self.rng.random() < self.config.reject_rate
+
+    def _symbol(self, body):
+        symbol = str(body.get("symbol") or "").upper()
+        if not symbol:
+            raise ExchangeError(PARAMETER_ERROR, "symbol")
+        return symbol
+
+    def _last(self, symbol):
+        price = self.prices.get(symbol)
+        if price is None:
+            raise ExchangeError(NO_MARKET, symbol)
+        return price
+
+    def _attached(self, body):
+        fields = {}
+        for leg in ("tp", "sl"):
+            if body.get(f"{leg}Price") in (None, ""):
+                continue
+            fields[f"{leg}Price"] = fmt(to_decimal(body[f"{leg}Price"], f"{leg}Price"))
+            fields[f"{leg}StopType"] = body.get(f"{leg}StopType") or "LAST_PRICE"
+            fields[f"{leg}OrderType"] = body.get(f"{leg}OrderType") or "MARKET"
+            if body.get(f"{leg}OrderPrice") not in (None, ""):
+                fields[f"{leg}OrderPrice"] = fmt(to_decimal(body[f"{leg}OrderPrice"], f"{leg}OrderPrice"))
+        return fields
+
+    def _order(self, params):
+        order_id = params.get("orderId") or self.client_ids.get(params.get("clientId"))
+        order = self.orders.get(str(order_id)) if order_id else None
+        if order is None:
+            raise ExchangeError(NO_ORDER)
+        return order
+
+    def _page(self, rows, params):
+        skip = int(params.get("skip") or 0)
+        limit = min(int(params.get("limit") or 10), 100)
+        return rows[skip:skip + limit]
+
+    def _order_page(self, orders, params):
+        symbol, status = params.get("symbol"), params.get("status")
+        orders = [o for o in orders if symbol in (None, o.symbol) and status in (None, o.status)
+                  and params.get("orderId") in (None, o.order_id) and params.get("clientId") in (None, o.client_id)]
+        orders.sort(key=lambda o: (o.ctime, int(o.order_id)), reverse=True)
+        return {"orderList": [o.wire() for o in self._page(orders, params)], "total": len(orders)}
+
+    def _position_for(self, order):
+        if order.position_id:
+            position = self.positions.get(str(order.position_id))
+            return position if position is not None and position.symbol == order.symbol else None
+        return next((p for p in self.positions.values()
+                     if p.symbol == order.symbol and p.side == order.position_side), None)
+
+    def _free_margin(self):
+        return self.balance - sum((p.margin() for p in self.positions.values()), Decimal(0))
+
+    def _slipped(self, reference, exec_side):
+        """Slippage always works against the trader, on both sides of the book."""
+        slip = reference * self.config.slippage_bps / BPS
+        return reference + slip if exec_side == "BUY" else reference - slip
+
+    def _rest(self, order):
+        self.books[order.symbol].add(order, next(self._seq))
+
+    def _cancel(self, order):
+        order.status = "PART_FILLED_CANCELED" if order.filled else "CANCELED"
+        order.mtime = self.clock()
+        self.counters.events["cancels"] += 1
+        self._retire(order)
+        self._emit("order", order.push("CLOSE"))
+
+    def _retire(self, order):
+        # Closed orders stay queryable until HISTORY_LIMIT newer ones have closed.
+        self.closed_orders.append(order.order_id)
+        if len(self.closed_orders) > HISTORY_LIMIT:
+            old = self.orders.pop(self.closed_orders.popleft(), None)
+            if old is not None:
+                self.client_ids.pop(old.client_id, None)
+
+    def _fill(self, order, qty, price):
+        """Execute `qty` of `order` at `price`: position, balance, fee, events."""
+        if order.closes:
+            position = self._position_for(order)
+            if position is None:
+                # The position went away under a resting close; the order is moot.
+                return self._cancel(order)
+            qty = min(qty, position.qty)
+        if qty <= 0:
+            return None
+        fee = price * qty * self.config.taker_fee_bps / BPS
+        if order.closes:
+            pnl = self._apply_close(position, qty, price, fee)
+            order.realized += pnl
+        else:
+            position = self._apply_open(order, qty, price, fee)
+        order.filled += qty
+        order.cost += price * qty
+        order.fee += fee
+        order.mtime = self.clock()
+        # A close capped at the position size is done even below its qty.
+        done = order.filled >= order.qty or (order.closes and position.qty <= 0)
+        order.status = "FILLED" if done else "PART_FILLED"
+        self.counters.events["fills"] += 1
+        self.trades.append({"tradeId": self._id(), "orderId": order.order_id, "clientId": order.client_id,
+                            "symbol": order.symbol, "qty": fmt(qty), "price": fmt(price), "side": order.side,
+                            "orderType": order.type, "effect": order.effect, "reduceOnly": order.reduce_only,
+                            "positionMode": "HEDGE", "marginMode": "CROSS", "leverage": order.leverage,
+                            "fee": fmt(fee), "realizedPNL": fmt(order.realized), "ctime": order.mtime,
+                            "roleType": "MAKER" if order.seq else "TAKER"})
+        if done:
+            self._retire(order)
+        self._emit("order", order.push("CLOSE" if done else "UPDATE"))
+        if not order.closes and order.attached:
+            self._attach_plan(order, position, qty)
+        self._emit("wallet", self._wallet())
+        return None
+
+    def _apply_open(self, order, qty, price, fee):
+        position = self._position_for(order)
+        event = "UPDATE"
+        if position is None:
+            position = Position(self._id(), order.symbol, order.position_side, order.leverage, self.clock())
+            self.positions[position.position_id] = position
+            event = "OPEN"
+        # Weighted average entry, the way the exchange reports it after an add.
+        total = position.qty + qty
+        position.entry = (position.entry * position.qty + price * qty) / total
+        position.qty = total
+        position.fee += fee
+        position.mtime = self.clock()
+        self.balance -= fee
+        self._emit("position", position.push(event, self.prices.get(position.symbol)))
+        return position
+
+    def _apply_close(self, position, qty, price, fee):
+        gross = (price - position.entry) * qty if position.side == "LONG" else (position.entry - price) * qty
+        net = gross - fee
+        position.qty -= qty
+        position.realized += gross
+        position.fee += fee
+        position.mtime = self.clock()
+        self.balance += net
+        last = self.prices.get(position.symbol)
+        if position.qty <= 0:
+            del self.positions[position.position_id]
+            self.closed_positions.append(position.wire(last))
+            for plan in [p for p in self.plans.values() if p.position_id == position.position_id]:
+                self._close_plan(plan, "CANCELED")
+            self._emit("position", position.push("CLOSE", last))
+        else:
+            self._emit("position", position.push("UPDATE", last))
+        return net
+
+    def _market_close(self, position, qty):
+        """A MARKET close of `qty` on `position`, as flash close and triggered plans send it."""
+        side = "BUY" if position.side == "LONG" else "SELL"
+        order = Order(self._id(), position.symbol, side, "MARKET", qty, trade_side="CLOSE",
+                      position_id=position.position_id, leverage=position.leverage, now=self.clock())
+        self.orders[order.order_id] = order
+        self.client_ids[order.client_id] = order.order_id
+        self.counters.events["orders"] += 1
+        self._emit("order", order.push("CREATE"))
+        self._fill(order, qty, self._slipped(self._last(position.symbol), order.exec_side))
+        return order
+
+    def _attach_plan(self, order, position, qty):
+        plan = Plan(self._id(), position, qty, dict(order.attached), self.clock())
+        self.plans[plan.plan_id] = plan
+        self._emit("tp_sl", self._plan_push(plan, "CREATE", "NEW"))
+
+    def _plan_push(self, plan, event, status):
+        return {"event": event, "orderId": plan.plan_id, "status": status, "side": plan.side, "type": "MARKET",
+                "positionMode": "HEDGE", "leverage": "1", **plan.wire(), "ctime": str(plan.ctime)}
+
+    def _close_plan(self, plan, status):
+        del self.plans[plan.plan_id]
+        self.closed_plans.append({**plan.wire(), "status": status})
+        self._emit("tp_sl", self._plan_push(plan, "CLOSE", status))
+
+    def _trigger_plans(self, symbol, price):
+        for plan in [p for p in self.plans.values() if p.symbol == symbol]:
+            position = self.positions.get(plan.position_id)
+            if position is None or plan.plan_id not in self.plans:
+                continue
+            long = position.side == "LONG"
+            tp, sl = plan.level("tp"), plan.level("sl")
+            hit_tp = tp is not None and (price >= tp if long else price <= tp)
+            hit_sl = sl is not None and (price <= sl if long else price >= sl)
+            if not (hit_tp or hit_sl):
+                continue
+            self._close_plan(plan, "FILLED")
+            self.counters.events["triggers"] += 1
+            self._market_close(position, min(plan.qty, position.qty))
+
+    def _wallet(self):
+        acc = self.account({})[0]
+        return {"coin": MARGIN_COIN, "available": acc["available"], "frozen": "0", "isolationFrozen": "0",
+                "crossFrozen": "0", "margin": acc["margin"], "isolationMargin": "0", "crossMargin": acc["margin"],
+                "expMoney": "0"}
+
+
+# --- Market data -------------------------------------------------------------
+
+def synthetic_ticks(symbols, seed=0, tick_ms=TICK_MS, volatility=TICK_VOLATILITY):
+    """Endless (t_ms, symbol, price, qty) random-walk prints, one per symbol every `tick_ms`."""
+    rng = np.random.default_rng(seed)
+    prices = np.array([START_PRICES.get(s, DEFAULT_START_PRICE) for s in symbols])
+    for step in itertools.count():
+        prices = prices * np.exp(rng.normal(0.0, volatility, len(symbols)))
+        sizes = rng.exponential(TICK_NOTIONAL / prices)
+        for symbol, price, size in zip(symbols, prices, sizes):
+            yield step * tick_ms, symbol, float(f"{price:.8g}"), float(f"{size:.6g}")
+
+
+def recorded_ticks(path):
+    """
+    (t_ms, symbol, price, qty) prints from a `scenario.record_websockets`
+    file: every `trade` item, plus the last price of `ticker` and `price`
+    frames with `qty` None (price-only, unlimited size).
+    """
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            frame = json.loads(line)
+            try:
+                message = json.loads(frame.get("data") or "")
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(message, dict) or not message.get("symbol"):
+                continue
+            channel, data, symbol = message.get("ch"), message.get("data"), message["symbol"]
+            if channel == "trade" and isinstance(data, list):
+                out += [(frame["t"], symbol, float(item["p"]), float(item["v"])) for item in data]
+            elif channel in ("ticker", "price") and isinstance(data, dict):
+                last = data.get("la") or data.get("lastPrice") or data.get("lp") or data.get("mp")
+                if last is not None:
+                    out.append((frame["t"], symbol, float(last), None))
+    out.sort(key=lambda tick: tick[0])
+    return out
+
+
+async def run_feed(exchange, ticks, speed=1.0, loop=False):
+    """
+    Play prints into the exchange at their pace (`speed` × real time), from
+    the first one on at once. A looped recording restarts one tick after its end.
+    """
+    if loop:
+        ticks = list(ticks)
+        if not ticks:
+            return
+    started = time.monotonic()
+    first, offset = None, 0.0
+    while True:
+        for t_ms, symbol, price, qty in ticks:
+            if first is None:
+                first = t_ms
+            wait = started + (offset + t_ms - first) / 1000 / speed - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            exchange.on_trade(symbol, price, qty)
+        if not loop:
+            return
+        offset += ticks[-1][0] - first + TICK_MS
+
+
+class WsSession:
+    """One WebSocket client and what it subscribed to."""
+
+    def __init__(self, writer, private):
+        self.writer = writer
+        self.private = private
+        self.authenticated = False
+        self.channels = set()
+        self.symbols = set()
+
+    def send(self, message):
+        if self.writer.transport.get_write_buffer_size() > WS_MAX_BUFFER:
+            self.writer.close()
+            return False
+        self.writer.write(ws_frame(WS_TEXT, json.dumps(message, separators=(",", ":")).encode()))
+        return True
+
+
+class PaperExchangeServer:
+    """HTTP/1.1 keep-alive and WebSocket front of a PaperExchange, with the configured faults."""
+
+    def __init__(self, exchange, api_key=None, api_secret=None):
+        self.exchange = exchange
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.sessions = set()
+        self.server = None
+        exchange.listeners.append(self._broadcast)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            for session in list(self.sessions):
+                session.writer.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    message = await read_http_message(reader)
+                except RequestError as e:
+                    writer.write(http_response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if message is None:
+                    break
+                start, headers, body = message
+                method, target = (start.split(" ") + ["", ""])[:2]
+                url = urlsplit(target)
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers, url.path.startswith("/private"))
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                started = time.perf_counter()
+                delay = self.exchange.latency_s()
+                if delay:
+                    await asyncio.sleep(delay)
+                if url.path != "/paper/stats" and self.exchange.times_out():
+                    self.exchange.counters.events["timeouts"] += 1
+                    await asyncio.sleep(TIMEOUT_HOLD_S)
+                    break
+                status, payload = self._route(method, url, headers, body)
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                self.exchange.counters.service_ms[url.path].append((time.perf_counter() - started) * 1000)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, RequestError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown with the connection still open; nothing to report.
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method, url, headers, body):
+        if url.path == "/paper/stats":
+            prices = {s: fmt(p) for s, p in sorted(self.exchange.prices.items())}
+            return 200, {**self.exchange.counters.snapshot(), "prices": prices}
+        query = dict(parse_qsl(url.query, keep_blank_values=True))
+        text = body.decode("utf-8")
+        try:
+            if self.api_key is not None:
+                self._verify(headers, query, text)
+            params = query if method == "GET" else json.loads(text or "{}")
+            if not isinstance(params, dict):
+                raise ExchangeError(PARAMETER_ERROR, "body")
+            return self.exchange.respond(method, url.path, params)
+        except ValueError as e:
+            if isinstance(e, RequestError):
+                return e.status, {"error": str(e)}
+            return 200, {"code": PARAMETER_ERROR[0], "msg": f"{PARAMETER_ERROR[1]}: {e}", "data": None}
+        except ExchangeError as e:
+            self.exchange.counters.errors[e.code] += 1
+            return 200, {"code": e.code, "msg": str(e), "data": None}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    def _verify(self, headers, query, body):
+        expected = bitunix_sign(self.api_key, self.api_secret, headers.get("nonce", ""),
+                                headers.get("timestamp", ""), query, body)
+        if headers.get("api-key") != self.api_key or headers.get("sign") != expected:
+            raise ExchangeError(SIGN_ERROR)
+
+    async def _websocket(self, reader, writer, headers, private):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            writer.write(http_response(400, {"error": "missing Sec-WebSocket-Key"}, keep_alive=False))
+            return
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept_key(key)}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        session = WsSession(writer, private)
+        self.sessions.add(session)
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == WS_CLOSE:
+                    writer.write(ws_frame(WS_CLOSE, payload[:2]))
+                    break
+                if opcode == WS_PING:
+                    writer.write(ws_frame(WS_PONG, payload))
+                    continue
+                if opcode != WS_TEXT:
+                    continue
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    continue
+                if isinstance(message, dict):
+                    self._ws_message(session, message)
+                await writer.drain()
+        finally:
+            self.sessions.discard(session)
+
+    def _ws_message(self, session, message):
+        op = message.get("op")
+        args = [a for a in message.get("args") or [] if isinstance(a, dict)]
+        if op == "ping":
+            session.send({"op": "ping", "ping": message.get("ping"), "pong": int(time.time())})
+        elif op == "login" and session.private:
+            login = args[0] if args else {}
+            ok = self.api_key is None or (
+                login.get("apiKey") == self.api_key
+                and login.get("sign") == ws_login_sign(self.api_key, self.api_secret, login.get("nonce", ""),
+                                                       login.get("timestamp", "")))
+            session.authenticated = ok
+            session.send({"op": "login", "event": "login", "code": 0 if ok else SIGN_ERROR[0],
+                          "msg": "success" if ok else SIGN_ERROR[1]})
+        elif op in ("subscribe", "unsubscribe"):
+            update = set.add if op == "subscribe" else set.discard
+            for arg in args:
+                if session.private:
+                    update(session.channels, arg.get("ch"))
+                elif arg.get("ch") == "trade" and arg.get("symbol"):
+                    update(session.symbols, arg["symbol"])
+            session.send({"op": op, "args": args, "code": 0, "msg": "success"})
+
+    def _broadcast(self, channel, data, symbol):
+        ts = int(time.time() * 1000)
+        for session in list(self.sessions):
+            if symbol is None:
+                if not (session.private and session.authenticated and channel in session.channels):
+                    continue
+                message = {"ch": channel, "ts": ts, "data": data}
+            else:
+                if session.private or symbol not in session.symbols:
+                    continue
+                message = {"ch": channel, "symbol": symbol, "ts": ts, "data": data}
+            if not session.send(message):
+                self.sessions.discard(session)
+
+
+# --- Clients and the load generator -------------------------------------------
+
+# Each order-flow step as (method, endpoint, params) on the stand-in...
+EXCHANGE_STEPS = {
+    "place_order": lambda p: ("POST", "/trade/place_order", p),
+    "pending_positions": lambda p: ("GET", "/position/get_pending_positions", {"symbol": p["symbol"]}),
+    "pending_tpsl": lambda p: ("GET", "/tpsl/get_pending_orders", p),
+    "flash_close": lambda p: ("POST", "/trade/flash_close_position", {"positionId": p["positionId"]}),
+    "modify_order": lambda p: ("POST", "/trade/modify_order", {k: p[k] for k in ("orderId", "qty", "price")}),
+    "cancel_order": lambda p: ("POST", "/trade/cancel_orders",
+                               {"symbol": p["symbol"], "orderList": [{"orderId": p["orderId"]}]}),
+}
+# ...and as (route, body) on the app, with the payloads tradeService sends.
+APP_STEPS = {
+    "place_order": lambda p: ("/api/orders", {"exchange": "bitunix", "type": "place-order", **p}),
+    "pending_positions": lambda p: ("/api/sync/positions-pending", {}),
+    "pending_tpsl": lambda p: ("/api/tpsl", {"exchange": "bitunix", "action": "pending",
+                                             "params": {"symbol": p["symbol"]}}),
+    "flash_close": lambda p: ("/api/orders", {"exchange": "bitunix", "type": "flash-close-position", **p}),
+    "modify_order": lambda p: ("/api/orders", {"exchange": "bitunix", "type": "modify-order", **p}),
+    "cancel_order": lambda p: ("/api/orders", {"exchange": "bitunix", "type": "cancel-order", **p}),
+}
+
+
+class ExchangeClient:
+    """One keep-alive connection sending signed requests, like the server routes do."""
+
+    def __init__(self, reader, writer, host, port, api_key, api_secret):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self.port = port
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+    @classmethod
+    async def open(cls, host, port, api_key="paper", api_secret="paper"):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host, port, api_key, api_secret)
+
+    async def reconnect(self):
+        """A fresh connection after a dropped or timed-out one (its response may still be in flight)."""
+        self.writer.close()
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, params=None):
+        """Decoded response body (the `{code, msg, data}` envelope for exchange calls)."""
+        params = {k: v if isinstance(v, (list, dict)) else str(v) for k, v in (params or {}).items() if v is not None}
+        query = params if method == "GET" else {}
+        body = "" if method == "GET" else json.dumps(params, separators=(",", ":"))
+        nonce, timestamp = os.urandom(16).hex(), str(int(time.time() * 1000))
+        sign = bitunix_sign(self.api_key, self.api_secret, nonce, timestamp, query, body)
+        target = path + ("?" + urlencode(sorted(query.items())) if query else "")
+        data = body.encode()
+        self.writer.write((
+            f"{method} {target} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"api-key: {self.api_key}\r\nnonce: {nonce}\r\ntimestamp: {timestamp}\r\nsign: {sign}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        ).encode() + data)
+        await self.writer.drain()
+        message = await read_http_message(self.reader)
+        if message is None:
+            raise ConnectionError("connection closed")
+        return json.loads(message[2])
+
+    async def step(self, name, params):
+        """(ok, code, data) of one order-flow step sent straight to the stand-in."""
+        method, endpoint, params = EXCHANGE_STEPS[name](params)
+        envelope = await self.request(method, API + endpoint, params)
+        code = envelope.get("code")
+        return code == 0, code, envelope.get("data")
+
+    async def close(self):
+        self.writer.close()
+
+
+class AppClient:
+    """
+    One keep-alive connection to the app's own /api routes, authenticated like
+    `appFetch`: a client token plus the exchange key and secret as headers.
+    The app signs and forwards each call to BITUNIX_API_URL.
+    """
+
+    def __init__(self, reader, writer, host, port, token, api_key, api_secret):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self.port = port
+        self.headers = (f"x-app-access-token: {token}\r\nX-Api-Key: {api_key}\r\n"
+                        f"X-Api-Secret: {api_secret}\r\n")
+
+    @classmethod
+    async def open(cls, host, port, token, api_key="paper", api_secret="paper"):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host, port, token, api_key, api_secret)
+
+    @staticmethod
+    async def issue_token(host, port):
+        """A client token from POST /api/auth/token."""
+        client = await AppClient.open(host, port, "")
+        try:
+            status, body = await client.request("/api/auth/token", {})
+        finally:
+            await client.close()
+        if status != 200 or not isinstance(body, dict) or not body.get("token"):
+            raise ConnectionError(f"no client token from the app (HTTP {status}: {body})")
+        return body["token"]
+
+    async def reconnect(self):
+        self.writer.close()
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, path, payload):
+        """(status, decoded JSON body) of a POST to the app."""
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        self.writer.write((
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"{self.headers}"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        ).encode() + data)
+        await self.writer.drain()
+        message = await read_http_message(self.reader)
+        if message is None:
+            raise ConnectionError("connection closed")
+        start, _, body = message
+        return int(start.split(" ")[1]), json.loads(body or b"null")
+
+    async def step(self, name, params):
+        """
+        (ok, code, data) of one order-flow step through the app. A failure's
+        code is the exchange code the route passes on, else the HTTP status.
+        """
+        path, payload = APP_STEPS[name](params)
+        status, body = await self.request(path, payload)
+        if status != 200:
+            code = body.get("code") if isinstance(body, dict) else None
+            return False, code or f"http {status}", None
+        # /api/orders and /api/tpsl answer with the exchange's `data`, /api/sync/* wrap it.
+        return True, 0, body["data"] if isinstance(body, dict) and "data" in body else body
+
+    async def close(self):
+        self.writer.close()
+
+
+class WsClient:
+    """A WebSocket client for the stand-in's `/private/` or `/public/` stream."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port, path="/private/"):
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        message = await read_http_message(reader)
+        if message is None or message[0].split(" ")[1:2] != ["101"]:
+            raise ConnectionError(f"WebSocket upgrade refused: {message and message[0]}")
+        return cls(reader, writer)
+
+    async def send(self, message):
+        self.writer.write(ws_frame(WS_TEXT, json.dumps(message).encode(), mask=True))
+        await self.writer.drain()
+
+    async def recv(self):
+        while True:
+            opcode, payload = await ws_read(self.reader)
+            if opcode == WS_CLOSE:
+                raise ConnectionError("WebSocket closed")
+            if opcode == WS_TEXT:
+                return json.loads(payload)
+
+    async def login(self, api_key="paper", api_secret="paper", channels=PRIVATE_CHANNELS):
+        """Log in and subscribe like `bitunixWs.subscribePrivate`; returns the login reply."""
+        nonce, timestamp = os.urandom(16).hex(), int(time.time())
+        await self.send({"op": "login", "args": [{"apiKey": api_key, "timestamp": timestamp, "nonce": nonce,
+                                                  "sign": ws_login_sign(api_key, api_secret, nonce, timestamp)}]})
+        reply = await self.recv()
+        await self.send({"op": "subscribe", "args": [{"ch": ch} for ch in channels]})
+        await self.recv()
+        return reply
+
+    async def close(self):
+        try:
+            self.writer.write(ws_frame(WS_CLOSE, struct.pack("!H", 1000), mask=True))
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        self.writer.close()
+
+
+class LoadStats:
+    """Client-side latency per order-flow step and result codes."""
+
+    def __init__(self):
+        self.latency_ms = collections.defaultdict(list)
+        self.codes = collections.Counter()
+        self.orders = 0
+        self.late = 0
+
+    async def call(self, client, step, params):
+        """(ok, data); a timeout or dropped connection counts as code "timeout"."""
+        if step == "place_order":
+            self.orders += 1
+        started = time.perf_counter()
+        try:
+            ok, code, data = await asyncio.wait_for(client.step(step, params), REQUEST_TIMEOUT_S)
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            self.codes[(step, "timeout")] += 1
+            await client.reconnect()
+            return False, None
+        self.latency_ms[step].append((time.perf_counter() - started) * 1000)
+        self.codes[(step, str(code))] += 1
+        return ok, data
+
+
+async def entry_flow(client, stats, symbol, price, qty, rng):
+    """
+    `orderPlacementService.placeEntryGroup` then the flash-close button: a
+    market entry with TP/SL attached, the position read back, its protection
+    confirmed from the TP/SL plans (one retry, like `confirmProtection`), then
+    the position flash-closed.
+    """
+    side = "BUY" if rng.random() < 0.5 else "SELL"
+    sign = 1 if side == "BUY" else -1
+    ok, _ = await stats.call(client, "place_order", {
+        "symbol": symbol, "side": side, "tradeSide": "OPEN", "orderType": "MARKET", "qty": qty,
+        "clientId": os.urandom(8).hex(), "tpPrice": f"{price * (1 + sign * 0.01):.8g}",
+        "slPrice": f"{price * (1 - sign * 0.005):.8g}", "tpStopType": "LAST_PRICE", "slStopType": "LAST_PRICE"})
+    if not ok:
+        return
+    _, positions = await stats.call(client, "pending_positions", {"symbol": symbol})
+    wanted = "LONG" if side == "BUY" else "SHORT"
+    position = next((p for p in positions or [] if p.get("symbol") == symbol and p.get("side") == wanted), None)
+    if position is None:
+        return
+    position_id = position["positionId"]
+    for _ in range(2):
+        _, plans = await stats.call(client, "pending_tpsl", {"symbol": symbol, "positionId": position_id})
+        if any(plan.get("positionId") == position_id for plan in plans or []):
+            break
+    await stats.call(client, "flash_close", {"symbol": symbol, "positionId": position_id})
+
+
+async def limit_flow(client, stats, symbol, price, qty, rng):
+    """A resting limit order moved once towards the market (`modifyOrder`), then cancelled."""
+    side = "BUY" if rng.random() < 0.5 else "SELL"
+    sign = -1 if side == "BUY" else 1
+    ok, placed = await stats.call(client, "place_order", {
+        "symbol": symbol, "side": side, "tradeSide": "OPEN", "orderType": "LIMIT", "effect": "GTC", "qty": qty,
+        "price": f"{price * (1 + sign * 0.004):.8g}", "clientId": os.urandom(8).hex()})
+    if not ok:
+        return
+    order_id = placed["orderId"]
+    await stats.call(client, "modify_order", {
+        "orderId": order_id, "symbol": symbol, "qty": qty, "price": f"{price * (1 + sign * 0.002):.8g}"})
+    await stats.call(client, "cancel_order", {"symbol": symbol, "orderId": order_id})
+
+
+async def _push_listener(ws, pushes, lag_ms):
+    try:
+        while True:
+            message = await ws.recv()
+            channel = message.get("ch")
+            if channel in PRIVATE_CHANNELS:
+                pushes[channel] += 1
+                lag_ms.append(time.time() * 1000 - message["ts"])
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+        pass
+
+
+async def run_load(host, port, symbols, rate=200, seconds=10.0, connections=16, limit_share=0.4, qty="0.01",
+                   seed=0, api_key="paper", api_secret="paper", app=None):
+    """
+    Start `rate` order flows per second for `seconds` over `connections`
+    keep-alive connections, `limit_share` of them resting-limit flows and the
+    rest entry + flash-close flows. Every flow places exactly one order.
+
+    The flows go to the stand-in at `host`:`port` directly, or with `app`
+    ((host, port) of a running app whose BITUNIX_API_URL is the stand-in)
+    through the app's /api routes. Pushes and counters come from the
+    stand-in either way.
+    """
+    rng = random.Random(seed)
+    stats = LoadStats()
+    exchange = await ExchangeClient.open(host, port, api_key, api_secret)
+    if app is None:
+        clients = [exchange] + [await ExchangeClient.open(host, port, api_key, api_secret)
+                                for _ in range(connections - 1)]
+    else:
+        token = await AppClient.issue_token(*app)
+        clients = [await AppClient.open(*app, token, api_key, api_secret) for _ in range(connections)]
+    ws = await WsClient.open(host, port)
+    await ws.login(api_key, api_secret)
+    pushes, lag_ms = collections.Counter(), []
+    listener = asyncio.ensure_future(_push_listener(ws, pushes, lag_ms))
+    # Flows price their TP/SL and limits off the market at the start.
+    known = (await exchange.request("GET", "/paper/stats")).get("prices", {})
+    prices = {s: float(known.get(s) or START_PRICES.get(s, DEFAULT_START_PRICE)) for s in symbols}
+    total = max(int(rate * seconds), 1)
+    slots = iter(range(total))
+    started = time.monotonic()
+
+    async def worker(client):
+        for i in slots:
+            due = started + i / rate
+            wait = due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            elif wait < -0.05:
+                stats.late += 1
+            symbol = symbols[i % len(symbols)]
+            flow = limit_flow if rng.random() < limit_share else entry_flow
+            await flow(client, stats, symbol, prices[symbol], qty, rng)
+
+    await asyncio.gather(*(worker(c) for c in clients))
+    elapsed = time.monotonic() - started
+    await asyncio.sleep(0.05)  # the last pushes are still on their way
+    server = await exchange.request("GET", "/paper/stats")
+    listener.cancel()
+    await ws.close()
+    for client in {exchange, *clients}:
+        await client.close()
+    return {
+        "via": "paper exchange" if app is None else f"app http://{app[0]}:{app[1]}",
+        "target_rate": rate,
+        "seconds": elapsed,
+        "orders": stats.orders,
+        "orders_per_s": stats.orders / elapsed,
+        "late_starts": stats.late,
+        "steps": {step: {"requests": len(v), **_percentiles(v)} for step, v in sorted(stats.latency_ms.items())},
+        "codes": {f"{step} {code}": n for (step, code), n in sorted(stats.codes.items())},
+        "pushes": dict(pushes),
+        "push_lag_ms": _percentiles(lag_ms),
+        "server": server,
+    }
+
+
+def format_result(r):
+    lines = [f"⚡ {r['orders']} orders in {r['seconds']:.1f} s → {r['orders_per_s']:.0f} orders/s via {r['via']} "
+             f"(target {r['target_rate']:g}, {r['late_starts']} flows started late)",
+             f"   {'step':<36} {'requests':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+    for step, e in r["steps"].items():
+        lines.append(f"   {step:<36} {e['requests']:>8} {e['p50']:>8.2f} {e['p99']:>8.2f} {e['max']:>8.2f}")
+    errors = {k: n for k, n in r["codes"].items() if not k.endswith(" 0")}
+    if errors:
+        lines.append("⚠️ Errors: " + ", ".join(f"{k} ×{n}" for k, n in errors.items()))
+    lag = r["push_lag_ms"]
+    lines.append("📡 Pushes: " + ", ".join(f"{ch} {n}" for ch, n in sorted(r["pushes"].items()))
+                 + (f"  (lag p50 {lag['p50']:.1f} ms, p99 {lag['p99']:.1f} ms)" if lag["p50"] is not None else ""))
+    events = r["server"].get("events", {})
+    lines.append(f"🏦 Exchange: {events.get('fills', 0)} fills, {events.get('cancels', 0)} cancels, "
+                 f"{events.get('triggers', 0)} TP/SL triggers, {events.get('timeouts', 0)} held timeouts, "
+                 f"{r['server']['requests_per_s']:.0f} requests/s")
+    return "\n".join(lines)
+
+
+# --- CLI -----------------------------------------------------------------------
+
+def _add_exchange_args(p):
+    p.add_argument("--symbols", default="BTCUSDT", help="Comma-separated symbols the market feed covers.")
+    p.add_argument("--replay", help="JSONL recording (scenario.record_websockets) to use instead of a random walk.")
+    p.add_argument("--speed", type=float, default=1.0, help="Replay speed-up.")
+    p.add_argument("--tick-ms", type=int, default=TICK_MS, help="Synthetic print interval per symbol.")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay added to every request.")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="Mean of an exponential delay on top.")
+    p.add_argument("--reject-rate", type=float, default=0.0,
+                   help="Share of place/modify requests rejected (20003 Insufficient balance).")
+    p.add_argument("--timeout-rate", type=float, default=0.0,
+                   help=f"Share of requests held {TIMEOUT_HOLD_S:g} s and dropped unanswered.")
+    p.add_argument("--partial-rate", type=float, default=0.0, help="Share of taker fills cut to --partial-ratio.")
+    p.add_argument("--partial-ratio", default=DEFAULT_PARTIAL_RATIO)
+    p.add_argument("--slippage-bps", default=DEFAULT_SLIPPAGE_BPS)
+    p.add_argument("--taker-fee-bps", default=DEFAULT_TAKER_FEE_BPS)
+    p.add_argument("--balance", default=DEFAULT_BALANCE, help=f"Starting {MARGIN_COIN} balance.")
+    p.add_argument("--seed", type=int, default=0)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Local Bitunix stand-in for order-flow load and latency tests.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("serve", help="Run the paper exchange.")
+    _add_exchange_args(s)
+    s.add_argument("--host", default=DEFAULT_HOST)
+    s.add_argument("--port", type=int, default=DEFAULT_PORT)
+    s.add_argument("--api-key", help="Check request signatures against this key (any signature passes without it).")
+    s.add_argument("--api-secret", default="")
+
+    ld = sub.add_parser("load", help="Drive order flows at a fixed rate and report latency.")
+    _add_exchange_args(ld)
+    ld.add_argument("--url", help="A running paper exchange (default: start one in-process).")
+    ld.add_argument("--port", type=int,
+                    help=f"Port of the in-process exchange (default: {DEFAULT_PORT} with --app, else any free one).")
+    ld.add_argument("--app", help="Send the flows through a running app's /api routes instead, e.g. "
+                                  "http://127.0.0.1:5173. Start it with BITUNIX_API_URL pointing at the exchange "
+                                  "and the CLIENT_RATE_LIMIT_* ceilings raised.")
+    ld.add_argument("--api-key", default="paper", help="Key and secret the requests are signed with.")
+    ld.add_argument("--api-secret", default="paper")
+    ld.add_argument("--rate", type=float, default=200.0, help="Orders placed per second.")
+    ld.add_argument("--seconds", type=float, default=10.0)
+    ld.add_argument("--connections", type=int, default=16)
+    ld.add_argument("--limit-share", type=float, default=0.4, help="Share of flows that rest a limit order.")
+    ld.add_argument("--qty", default="0.01")
+    ld.add_argument("--json", help="Also write the result here.")
+    return p
+
+
+def exchange_from_args(args):
+    config = Config(args.latency_ms, args.jitter_ms, args.reject_rate, args.timeout_rate, args.partial_rate,
+                    args.partial_ratio, args.slippage_bps, args.taker_fee_bps, args.balance, args.seed)
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    if args.replay:
+        ticks = recorded_ticks(args.replay)
+        symbols = sorted({t[1] for t in ticks}) or symbols
+        feed = (ticks, True)
+    else:
+        feed = (synthetic_ticks(symbols, args.seed, args.tick_ms), False)
+    return PaperExchange(config), symbols, feed
+
+
+async def _start(args, host, port, api_key=None, api_secret=None):
+    exchange, symbols, (ticks, loop) = exchange_from_args(args)
+    server = PaperExchangeServer(exchange, api_key, api_secret)
+    port = await server.start(host, port)
+    feed = asyncio.ensure_future(run_feed(exchange, ticks, args.speed, loop))
+    # The first print of every symbol has to be in before the first order.
+    while not all(s in exchange.prices for s in symbols) and not feed.done():
+        await asyncio.sleep(0.001)
+    return server, feed, symbols, port
+
+
+async def serve(args):
+    server, feed, symbols, port = await _start(args, args.host, args.port, args.api_key, args.api_secret)
+    print(f"🏦 Paper exchange for {', '.join(symbols)} on http://{args.host}:{port}{API} "
+          f"(ws://{args.host}:{port}/private/, stats at /paper/stats)")
+    try:
+        await server.server.serve_forever()
+    finally:
+        feed.cancel()
+        await server.close()
+
+
+async def load(args):
+    app = None
+    if args.app:
+        url = urlsplit(args.app)
+        app = (url.hostname, url.port or 80)
+    if args.url:
+        url = urlsplit(args.url)
+        symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+        return await run_load(url.hostname, url.port or 80, symbols, args.rate, args.seconds, args.connections,
+                              args.limit_share, args.qty, args.seed, args.api_key, args.api_secret, app)
+    # The app reaches an in-process exchange at the BITUNIX_API_URL it was started with.
+    port = args.port if args.port is not None else DEFAULT_PORT if app else 0
+    server, feed, symbols, port = await _start(args, DEFAULT_HOST, port, args.api_key, args.api_secret)
+    try:
+        return await run_load(DEFAULT_HOST, port, symbols, args.rate, args.seconds, args.connections,
+                              args.limit_share, args.qty, args.seed, args.api_key, args.api_secret, app)
+    finally:
+        feed.cancel()
+        await server.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        result = asyncio.run(load(args))
+    except (ConnectionError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(format_result(result))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Playwright sessions for the perf tools.
+
+A scenario is a Python file with
+
+    def setup(page): ...        # optional, once after the app has loaded
+    def step(page, i): ...      # one iteration of the session
+
+that drives the app the way a user does (switch symbols, open and close
+windows, leave the chart streaming). Without a file the session idles:
+each step waits STEP_MS while the app keeps streaming market data. Waits
+in a scenario should go through `idle(page, ms)` so a replay keeps feeding
+the app.
+
+Live market data makes two runs incomparable. `record_websockets` writes
+every frame the app receives to a JSONL file; `MarketReplay` answers the
+app's WebSockets from such a file instead of the exchange, at the recorded
+pace, so repeated runs see the same market session.
+
+Point the tools at the dev server (`npm run dev`): the production build
+minifies class names, which the heap and CPU reports group by.
+"""
+
+import base64
+import contextlib
+import importlib.util
+import json
+import os
+import re
+import time
+
+DEFAULT_URL = "http://localhost:5173"
+STEP_MS = 1000
+PUMP_MS = 20
+WS_URL = re.compile(r"^wss?://")
+
+_replays = []
+
+
+def accept_disclaimer(page):
+    """Click away the first-run disclaimer if it is showing."""
+    button = page.get_by_role("button", name="I understand and accept")
+    if button.count() and button.first.is_visible():
+        button.first.click()
+
+
+class IdleScenario:
+    name = "idle"
+
+    @staticmethod
+    def setup(page):
+        accept_disclaimer(page)
+
+    @staticmethod
+    def step(page, i):
+        idle(page, STEP_MS)
+
+
+def idle(page, ms):
+    """Wait `ms` while feeding due replay frames to the app (a plain wait without a replay)."""
+    if not _replays:
+        page.wait_for_timeout(ms)
+        return
+    end = time.monotonic() + ms / 1000
+    while True:
+        for replay in _replays:
+            replay.pump()
+        left = end - time.monotonic()
+        if left <= 0:
+            return
+        page.wait_for_timeout(min(PUMP_MS, left * 1000))
+
+
+def _frame(t_ms, url, payload):
+    if isinstance(payload, (bytes, bytearray)):
+        return {"t": t_ms, "url": url, "b64": base64.b64encode(payload).decode("ascii")}
+    return {"t": t_ms, "url": url, "data": payload}
+
+
+def record_websockets(page, path):
+    """Append every WebSocket frame the page receives to `path` (JSONL); returns the open file."""
+    f = open(path, "w", encoding="utf-8")
+    started = time.monotonic()
+
+    def on_websocket(ws):
+        def on_frame(payload):
+            t_ms = round((time.monotonic() - started) * 1000, 1)
+            f.write(json.dumps(_frame(t_ms, ws.url, payload)) + "\n")
+
+        ws.on("framereceived", on_frame)
+
+    page.on("websocket", on_websocket)
+    return f
+
+
+class MarketReplay:
+    """
+    Serve recorded frames to the app's WebSockets at their recorded pace
+    (scaled by `speed`). Frames go to sockets whose URL matches the recorded
+    one; what the app sends (subscriptions, pings) is swallowed. `install`
+    must run before the page navigates.
+    """
+
+    def __init__(self, path, speed=1.0):
+        with open(path, encoding="utf-8") as f:
+            self.frames = [json.loads(line) for line in f if line.strip()]
+        self.frames.sort(key=lambda fr: fr["t"])
+        self.speed = speed
+        self.sockets = []
+        self.sent = 0
+        self.started = None
+
+    def install(self, page):
+        page.route_web_socket(WS_URL, self._connect)
+        _replays.append(self)
+
+    def uninstall(self):
+        if self in _replays:
+            _replays.remove(self)
+
+    def _connect(self, ws):
+        ws.on_message(lambda message: None)
+        self.sockets.append(ws)
+        if self.started is None:
+            self.started = time.monotonic()
+
+    @property
+    def done(self):
+        return self.sent >= len(self.frames)
+
+    def pump(self):
+        """Send the frames that are due; returns how many were sent."""
+        if self.started is None:
+            return 0
+        now_ms = (time.monotonic() - self.started) * 1000 * self.speed
+        sent = 0
+        while self.sent < len(self.frames) and self.frames[self.sent]["t"] <= now_ms:
+            frame = self.frames[self.sent]
+            payload = base64.b64decode(frame["b64"]) if "b64" in frame else frame["data"]
+            for ws in self.sockets:
+                if ws.url == frame["url"]:
+                    ws.send(payload)
+            self.sent += 1
+            sent += 1
+        return sent
+
+
+def load(path=None):
+    """The scenario module at `path`, or IdleScenario."""
+    if not path:
+        return IdleScenario
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not callable(getattr(module, "step", None)):
+        raise ValueError(f"Scenario {path} has no step(page, i)")
+    if not hasattr(module, "setup"):
+        module.setup = accept_disclaimer
+    module.name = getattr(module, "name", spec.name)
+    return module
+
+
+@contextlib.contextmanager
+def browser_page(url=DEFAULT_URL, headless=True, prepare=None):
+    """
+    A Chromium page on `url` (Playwright is imported here, the analyzers do
+    not need it). `prepare(page)` runs before navigation, for init scripts,
+    CDP sessions and WebSocket routes.
+    """
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless, args=["--js-flags=--expose-gc"])
+        try:
+            page = browser.new_page()
+            if prepare is not None:
+                prepare(page)
+            page.goto(url, wait_until="load")
+            yield page
+        finally:
+            del _replays[:]
+            browser.close()
@@ -0,0 +1,132 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Source maps (version 3), decoded into NumPy columns.
+
+    sm = SourceMap.from_json(text)
+    sm.lookup(line, column)      # → (source, line, column, name) or None, all 0-based
+
+`for_script(url, text, fetch)` finds a script's map: an inline
+`data:application/json;base64,…` URL (what the Vite dev server emits) or a
+`.map` URL resolved against the script. `fetch(url)` returns text; the
+capture steps pass one that reads from the running server, so the analyzers
+never need network access.
+"""
+
+import base64
+import json
+import re
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+_B64 = {c: i for i, c in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")}
+_MAP_URL = re.compile(r"[#@]\s*sourceMappingURL=(\S+)\s*$")
+COLUMNS = ("gen_line", "gen_col", "source", "line", "col", "name")
+
+
+def decode_vlq(segment):
+    """The signed integers of one Base64 VLQ segment."""
+    values, shift, value = [], 0, 0
+    for char in segment:
+        digit = _B64[char]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+            continue
+        values.append(-(value >> 1) if value & 1 else value >> 1)
+        shift = value = 0
+    return values
+
+
+def decode_mappings(mappings):
+    """Int64 array (n, 6) of absolute COLUMNS; source/line/col/name are -1 for unmapped segments."""
+    rows = []
+    source = line = col = name = 0
+    for gen_line, text in enumerate(mappings.split(";")):
+        gen_col = 0
+        for segment in text.split(","):
+            if not segment:
+                continue
+            v = decode_vlq(segment)
+            gen_col += v[0]
+            if len(v) < 4:
+                rows.append((gen_line, gen_col, -1, -1, -1, -1))
+                continue
+            source += v[1]
+            line += v[2]
+            col += v[3]
+            if len(v) > 4:
+                name += v[4]
+            rows.append((gen_line, gen_col, source, line, col, name if len(v) > 4 else -1))
+    return np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS))
+
+
+class SourceMap:
+    def __init__(self, data):
+        if "sections" in data:
+            raise ValueError("Indexed source maps (sections) are not supported")
+        root = data.get("sourceRoot") or ""
+        self.sources = [root + s if root and not s.startswith(("/", "http")) else s for s in data.get("sources", [])]
+        self.names = list(data.get("names", []))
+        self.segments = decode_mappings(data.get("mappings", ""))
+        # Sorted (line, column) keys for the binary search in lookup.
+        self._keys = (self.segments[:, 0] << 32) | self.segments[:, 1]
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text))
+
+    def lookup(self, line, column):
+        """Original (source, line, column, name) of a generated 0-based position, or None."""
+        i = int(np.searchsorted(self._keys, (line << 32) | column, side="right")) - 1
+        if i < 0 or self.segments[i, 0] != line or self.segments[i, 2] < 0:
+            return None
+        _, _, source, orig_line, orig_col, name = (int(v) for v in self.segments[i])
+        return self.sources[source], orig_line, orig_col, self.names[name] if name >= 0 else None
+
+
+def map_url(script_text):
+    """The sourceMappingURL comment of a script, or None."""
+    tail = script_text[-4096:].rstrip()
+    last = tail.rsplit("\n", 1)[-1]
+    match = _MAP_URL.search(last)
+    return match.group(1) if match else None
+
+
+def read_url(url, timeout=10):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read().decode("utf-8", errors="replace")
+
+
+def for_script(url, text=None, fetch=read_url):
+    """Raw source map JSON of the script at `url` (its `text` if already loaded), or None."""
+    try:
+        text = fetch(url) if text is None else text
+    except (OSError, ValueError):
+        return None
+    ref = map_url(text)
+    if not ref:
+        return None
+    if ref.startswith("data:"):
+        header, _, payload = ref.partition(",")
+        return base64.b64decode(payload).decode("utf-8") if header.endswith(";base64") \
+            else urllib.parse.unquote(payload)
+    try:
+        return fetch(urllib.parse.urljoin(url, ref))
+    except (OSError, ValueError):
+        return None
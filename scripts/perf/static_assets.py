@@ -0,0 +1,308 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+WOFF2 subsets of the fonts in `static/` and the service worker's precache
+list, rebuilt only where the source changed. `npm run build` runs it first
+(scripts/build_fonts.sh), so the build never reads a stale static/_opt/.
+
+    pip install fonttools brotli
+    python static_assets.py                 # static/ → static/_opt/ + static/_opt/manifest.json
+    python static_assets.py --force
+
+* TTF/OTF fonts are subset to the characters of the locale files
+  (src/locales/locales/*.json) plus ASCII and EXTRA_GLYPHS, as WOFF2.
+  Variable axes and OpenType features are kept. The build picks them up:
+  vite.config.ts adds an @font-face rule for each subset after its font's,
+  limited to the subset's code points (`unicode-range`). Text within them
+  loads only the subset; any other character (user input, symbol names,
+  news) pulls in the full TTF, which stays the family's catch-all face.
+  hooks.server.ts moves the app.html font preload onto the subset.
+* `manifest.json` maps every source path to its variants and lists
+  `precache`: the URLs the service worker installs up front (PRECACHE,
+  matched against source paths, with a font's subset in place of the
+  font). Other files are cached on first use, instead of the whole 12 MB
+  of static/ at install.
+
+Outputs are named `<name>.<hash8>.subset.woff2` after the source content,
+so they can be served as immutable. Images are left alone: the UI shows
+none of static/'s PNG/JPEG files, and the icons, social cards and PWA
+screenshots must stay PNG/JPEG for the platforms that fetch them.
+Precompressed `.br`/`.gz` copies of static/ and the build come from
+adapter-node (`precompress` in svelte.config.js), which also serves them.
+
+The cache (`assets/cache.json`) records per source file its size, mtime,
+content hash and the settings that produced its outputs. Unchanged files
+are skipped without being read. Outputs no longer referenced are deleted.
+Without fontTools or brotli, fonts are listed with their original only and
+subset once both are installed.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+try:
+    import brotli
+except ImportError:  # optional: fontTools needs it for WOFF2
+    brotli = None
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # optional: fonts keep their original only
+    font_subset = None
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+# Not bench_history.REPO_ROOT: `npm run build` runs this, and that module needs numpy.
+REPO_ROOT = os.path.dirname(os.path.dirname(PERF_DIR))
+STATIC_DIR = os.path.join(REPO_ROOT, "static")
+OUT_NAME = "_opt"
+MANIFEST = "manifest.json"
+DEFAULT_CACHE = os.path.join(PERF_DIR, "assets", "cache.json")
+LOCALES_DIR = os.path.join(REPO_ROOT, "src", "locales", "locales")
+# Bump when the outputs for an unchanged input change (new subsetter settings, naming).
+PIPELINE_VERSION = 3
+
+FONT_EXT = (".ttf", ".otf")
+WOFF2 = "font/woff2"
+EXTRA_GLYPHS = "–—…€$£¥₿%‰→←↑↓↗↘•·×÷±≈≠≤≥°©®™‹›«»„“”‚‘’"
+# What the app requests on first load today: icons, the PWA manifest, the WASM engine, the default font.
+PRECACHE = ("favicon*", "icon-192*.png", "manifest.json", "wasm/technicals_wasm.js", "wasm/technicals_wasm_bg.wasm",
+            "fonts/Inter/*.ttf")
+SKIP = ("README.txt", "OFL.txt", ".DS_Store")
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hashed_name(rel, digest, tag="", ext=None):
+    """`dir/stem.<hash8>[.tag].ext` for a source path and its content hash."""
+    directory, base = os.path.split(rel)
+    stem, source_ext = os.path.splitext(base)
+    name = f"{stem}.{digest[:8]}" + (f".{tag}" if tag else "") + (ext or source_ext)
+    return os.path.join(directory, name).replace(os.sep, "/")
+
+
+def is_font(rel):
+    return os.path.splitext(rel)[1].lower() in FONT_EXT
+
+
+def tool_missing():
+    """Name of the missing package the subsetter needs, or None."""
+    if font_subset is None:
+        return "fontTools"
+    if brotli is None:
+        return "brotli"
+    return None
+
+
+def locale_glyphs(locales_dir=LOCALES_DIR, extra=EXTRA_GLYPHS):
+    """Every character the UI can show: locale strings, printable ASCII and `extra`, sorted."""
+    chars = set(chr(c) for c in range(0x20, 0x7F)) | set(extra)
+
+    def walk(value):
+        if isinstance(value, str):
+            chars.update(value)
+        elif isinstance(value, dict):
+            for v in value.values():
+                walk(v)
+        elif isinstance(value, list):
+            for v in value:
+                walk(v)
+
+    if os.path.isdir(locales_dir):
+        for name in sorted(os.listdir(locales_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(locales_dir, name), encoding="utf-8") as f:
+                    walk(json.load(f))
+    return "".join(sorted(c for c in chars if c.isprintable() or c == " "))
+
+
+def settings_for(glyphs):
+    """What, besides the content, decides a font's outputs (part of the cache key)."""
+    settings = {"version": PIPELINE_VERSION, "glyphs": sha256(glyphs.encode("utf-8"))[:16]}
+    return sha256(json.dumps(settings, sort_keys=True).encode())[:16]
+
+
+def unicode_range(codepoints):
+    """CSS `unicode-range` value for a set of code points, consecutive ones merged: "U+20-7E, U+A9"."""
+    spans = []
+    for cp in sorted(set(codepoints)):
+        if spans and cp == spans[-1][1] + 1:
+            spans[-1][1] = cp
+        else:
+            spans.append([cp, cp])
+    return ", ".join(f"U+{lo:X}" if lo == hi else f"U+{lo:X}-{hi:X}" for lo, hi in spans)
+
+
+def subset_font(data, rel, digest, out_dir, glyphs):
+    """
+    A WOFF2 subset to `glyphs`, with layout features and variation axes kept;
+    its manifest variant. `unicode_range` lists the code points the subset
+    maps, so the page uses it for those only and the full font for the rest.
+    """
+    options = font_subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    font = font_subset.load_font(io.BytesIO(data), options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(text=glyphs)
+    subsetter.subset(font)
+    covered = unicode_range(font.getBestCmap() or {})
+    buf = io.BytesIO()
+    font_subset.save_font(font, buf, options)
+    font.close()
+    name = hashed_name(rel, digest, "subset", ".woff2")
+    path = os.path.join(out_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+    return {"url": f"/{OUT_NAME}/{name}", "type": WOFF2, "bytes": len(buf.getvalue()), "unicode_range": covered,
+            "files": [name]}
+
+
+def source_files(static_dir):
+    """Paths of static/ relative to it, without the output directory and licence notes."""
+    found = []
+    for root, dirs, names in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != OUT_NAME]
+        dirs.sort()
+        for name in sorted(names):
+            if name not in SKIP:
+                found.append(os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, "/"))
+    return found
+
+
+def _load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_json(path, data, indent=None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp, path)
+
+
+def build(static_dir=STATIC_DIR, cache_path=DEFAULT_CACHE, glyphs=None, precache=PRECACHE, force=False):
+    """Bring `<static_dir>/_opt` up to date; returns (manifest, {"processed", "cached", "skipped"} paths)."""
+    out_dir = os.path.join(static_dir, OUT_NAME)
+    glyphs = locale_glyphs() if glyphs is None else glyphs
+    settings = settings_for(glyphs)
+    cache = {} if force else _load_cache(cache_path)
+    stats = {"processed": [], "cached": [], "skipped": []}
+    assets, new_cache = {}, {}
+    for rel in source_files(static_dir):
+        path = os.path.join(static_dir, rel)
+        st = os.stat(path)
+        entry = cache.get(rel)
+        # Size and mtime unchanged: trust the cached hash instead of reading the file.
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            digest, data = entry["sha256"], None
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = sha256(data)
+        variants, used_settings = [], None
+        outputs_exist = entry and all(os.path.exists(os.path.join(out_dir, name))
+                                      for v in entry["variants"] for name in v["files"])
+        if not is_font(rel):
+            pass
+        elif entry and entry["sha256"] == digest and entry["settings"] == settings and outputs_exist:
+            variants, used_settings = entry["variants"], settings
+            stats["cached"].append(rel)
+        elif tool_missing():
+            # Not cached, so it is subset once the tools are there.
+            stats["skipped"].append(rel)
+        else:
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            variants, used_settings = [subset_font(data, rel, digest, out_dir, glyphs)], settings
+            stats["processed"].append(rel)
+        new_cache[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest,
+                          "settings": used_settings, "variants": variants}
+        assets["/" + rel] = {"hash": digest[:16], "bytes": st.st_size,
+                             "variants": [{k: v for k, v in variant.items() if k != "files"} for variant in variants]}
+
+    keep = {name for e in new_cache.values() for v in e["variants"] for name in v["files"]}
+    for root, _, names in os.walk(out_dir):
+        for name in names:
+            rel_out = os.path.relpath(os.path.join(root, name), out_dir).replace(os.sep, "/")
+            if rel_out != MANIFEST and rel_out not in keep:
+                os.remove(os.path.join(root, name))
+
+    manifest = {
+        "version": PIPELINE_VERSION,
+        # What the page loads: a font's subset rather than the font.
+        "precache": [next((v["url"] for v in asset["variants"] if v["type"] == WOFF2), url)
+                     for url, asset in assets.items() if any(fnmatch.fnmatchcase(url[1:], p) for p in precache)],
+        "assets": assets,
+    }
+    _save_json(os.path.join(out_dir, MANIFEST), manifest)
+    _save_json(cache_path, new_cache)
+    return manifest, stats
+
+
+def summary(manifest):
+    """(bytes of the original fonts, bytes of their subsets) over fonts that have one."""
+    original = subset = 0
+    for asset in manifest["assets"].values():
+        if asset["variants"]:
+            original += asset["bytes"]
+            subset += min(v["bytes"] for v in asset["variants"])
+    return original, subset
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="WOFF2 font subsets of static/ and a precache manifest.")
+    p.add_argument("--static", default=STATIC_DIR)
+    p.add_argument("--cache", default=DEFAULT_CACHE)
+    p.add_argument("--force", action="store_true", help="Ignore the cache and rebuild everything.")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    missing = tool_missing()
+    if missing:
+        print(f"⚠️ {missing} is not installed: fonts keep their originals only.")
+    started = time.perf_counter()
+    manifest, stats = build(args.static, args.cache, force=args.force)
+    original, subset = summary(manifest)
+    print(f"🔤 {len(stats['processed'])} processed, {len(stats['cached'])} unchanged, "
+          f"{len(stats['skipped'])} skipped in {time.perf_counter() - started:.1f} s")
+    for rel in stats["processed"]:
+        print(f"   + {rel}")
+    if original:
+        print(f"📉 {original / 2**20:.1f} MB of fonts → {subset / 2**20:.1f} MB as WOFF2 subsets")
+    print(f"📋 {len(manifest['precache'])} precached URLs in {os.path.join(args.static, OUT_NAME, MANIFEST)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
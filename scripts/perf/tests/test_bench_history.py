@@ -0,0 +1,86 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+
+import bench_history as bh
+
+VITEST = {"files": [{"filepath": bh.REPO_ROOT + "/tests/benchmarks/market_updates.bench.ts", "groups": [
+    {"fullName": "tests/benchmarks/market_updates.bench.ts > Market updates", "benchmarks": [
+        {"name": "batch", "hz": 2000.0, "mean": 0.5, "sd": 0.05, "median": 0.49, "p99": 0.8, "rme": 1.2,
+         "sampleCount": 1000},
+        {"name": "single", "hz": 400.0, "sampleCount": 200},
+    ]},
+]}]}
+
+LOG = """=== SafeJson Benchmark ===
+Running Small Payload (Common Case)...
+Legacy Small: 12.50ms for 500 ops (40000 ops/s) -> 0.025 ms/op
+Optimized Small: 5.00ms for 500 ops (100000 ops/s) -> 0.010 ms/op
+"""
+
+
+def test_parse_vitest_and_log():
+    rows = bh.parse_vitest(VITEST)
+    assert [r["bench"] for r in rows] == ["tests/benchmarks/market_updates.bench.ts > Market updates > batch",
+                                         "tests/benchmarks/market_updates.bench.ts > Market updates > single"]
+    assert rows[0]["mean_ms"] == 0.5 and rows[0]["samples"] == 1000
+    # Without a mean the time comes from the rate.
+    assert rows[1]["mean_ms"] == pytest.approx(2.5)
+
+    rows = bh.parse_log(LOG, "tests/benchmarks/safeJson.bench.ts")
+    assert [r["bench"] for r in rows] == ["tests/benchmarks/safeJson.bench.ts > Legacy Small",
+                                         "tests/benchmarks/safeJson.bench.ts > Optimized Small"]
+    assert rows[1]["mean_ms"] == pytest.approx(0.01)
+
+
+def test_change_points_separate_shifts_from_noise():
+    rng = np.random.default_rng(1)
+    assert bh.change_points(rng.normal(1.0, 0.05, 30)) == []
+    series = np.r_[rng.normal(1.0, 0.03, 8), rng.normal(1.3, 0.03, 8), rng.normal(0.9, 0.03, 8)]
+    changes = bh.change_points(series)
+    assert [c["index"] for c in changes] == [8, 16]
+    assert changes[0]["change"] == pytest.approx(0.3, abs=0.04)
+    assert changes[0]["ci"][0] > 0.2
+    assert changes[1]["change"] == pytest.approx(0.9 / 1.3 - 1, abs=0.04)
+    # A real but small shift is dropped below the effect threshold.
+    small = np.r_[np.full(10, 1.0), np.full(10, 1.02)] + rng.normal(0, 0.001, 20)
+    assert bh.change_points(small) == []
+    assert len(bh.change_points(small, min_effect=0.01)) == 1
+
+
+def test_store_and_trend(tmp_path):
+    history = bh.BenchHistory(str(tmp_path / "bench.sqlite"))
+    rng = np.random.default_rng(2)
+    means = np.r_[rng.normal(0.5, 0.01, 6), rng.normal(0.65, 0.01, 6)]
+    for i, mean in enumerate(means):
+        rows = [{**bh.parse_vitest(VITEST)[0], "mean_ms": float(mean)},
+                {**bh.parse_vitest(VITEST)[1], "mean_ms": 2.5}]
+        history.add_run(rows, "vitest", git_sha=f"sha{i // 3}", fingerprint="box-a", created=1000.0 + i)
+    # Results from another machine stay out of the series.
+    history.add_run([{**bh.parse_vitest(VITEST)[0], "mean_ms": 9.0}], "vitest", fingerprint="box-b")
+
+    assert len(history.series(bh.parse_vitest(VITEST)[0]["bench"], "box-a")) == 12
+    trends = bh.report(history, ["batch"], "box-a")
+    t = trends["tests/benchmarks/market_updates.bench.ts > Market updates > batch"]
+    assert t["status"] == "regression"
+    assert t["changes"][0]["git_sha"] == "sha2"
+    assert t["current_ms"] == pytest.approx(0.65, abs=0.01)
+    assert bh.report(history, ["single"], "box-a")[
+        "tests/benchmarks/market_updates.bench.ts > Market updates > single"]["status"] == "stable"
+    assert "🔴" in bh.format_report(trends)
+    history.close()
@@ -0,0 +1,159 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+
+import pytest
+
+import bundle_size as bs
+import source_maps
+from test_source_maps import encode_mappings
+
+CHUNK = "_app/immutable/chunks/CgU2n0Bu.js"
+NODE = "_app/immutable/nodes/2.Ab3_x9Zq.js"
+START = "_app/immutable/entry/start.Zx81_pQa.js"
+LIB = "../../../../src/lib/calc.ts"
+DECIMAL = "../../../../node_modules/decimal.js/decimal.mjs"
+
+MANIFEST = """export const manifest = (() => {
+return {
+	appDir: "_app",
+	_: {
+		client: {start:"%s",app:"_app/immutable/entry/app.Kd9s_aQ1.js",imports:["%s"],stylesheets:[],fonts:[],uses_env_dynamic_public:false},
+		nodes: [
+			__memo(() => import('./nodes/0.js')),
+			__memo(() => import('./nodes/1.js')),
+			__memo(() => import('./nodes/2.js'))
+		],
+		routes: [
+			{
+				id: "/",
+				pattern: /^\\/$/,
+				params: [],
+				page: { layouts: [0,], errors: [1,], leaf: 2 },
+				endpoint: null
+			},
+			{
+				id: "/api/klines",
+				pattern: /^\\/api\\/klines\\/?$/,
+				params: [],
+				page: null,
+				endpoint: __memo(() => import('./entries/endpoints/api/klines/_server.ts.js'))
+			}
+		],
+	}
+}
+})();
+""" % (START, START)
+
+
+def write(root, rel, text):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def make_build(root, decimal_code="P" * 300):
+    client, server = os.path.join(root, "client"), os.path.join(root, "server")
+    lib_code = "function calc(a){return a*2}"
+    code = lib_code + decimal_code + "\nexport{calc};"
+    write(client, CHUNK, code)
+    sm = {"version": 3, "sources": [LIB, DECIMAL], "names": [],
+          "mappings": encode_mappings([(0, 0, 0, 0, 0, -1), (0, len(lib_code), 1, 0, 0, -1), (1, 0, 0, 5, 0, -1)])}
+    # A hidden map: no sourceMappingURL comment in the chunk.
+    write(client, CHUNK + ".map", json.dumps(sm))
+    write(client, NODE, 'import"./../chunks/CgU2n0Bu.js";' + "x" * 50)
+    write(client, START, "start();" * 20)
+    write(client, "_app/immutable/entry/app.Kd9s_aQ1.js", "app()")
+    write(client, "_app/immutable/workers/technicals.worker-D8kX1a2B.js", "onmessage=()=>{};" * 10)
+    write(client, "robots.txt", "User-agent: *")
+    write(server, "manifest.js", MANIFEST)
+    write(server, "nodes/0.js", 'export const imports = ["%s"];\nexport const stylesheets = [];' % START)
+    write(server, "nodes/2.js", 'export const index = 2;\nexport const imports = ["%s","%s"];\n'
+                                'export const stylesheets = [];\nexport const fonts = [];' % (NODE, CHUNK))
+    return str(root)
+
+
+def test_split_by_source_covers_every_byte():
+    code = "abcdefghij\nklmno".encode()
+    sm = source_maps.SourceMap({"version": 3, "sources": ["a.ts", "b.ts"], "names": [],
+                                "mappings": encode_mappings([(0, 2, 0, 0, 0, -1), (0, 6, 1, 0, 0, -1),
+                                                             (1, 0, 1, 3, 0, -1)])})
+    parts = bs.split_by_source(code, sm)
+    assert parts == {bs.UNMAPPED: b"ab\n", "a.ts": b"cdef", "b.ts": b"ghijklmno"}
+    # Columns count characters, not bytes.
+    code = "é€xyz".encode()
+    sm = source_maps.SourceMap({"version": 3, "sources": ["a.ts", "b.ts"], "names": [],
+                                "mappings": encode_mappings([(0, 0, 0, 0, 0, -1), (0, 2, 1, 0, 0, -1)])})
+    assert bs.split_by_source(code, sm) == {"a.ts": "é€".encode(), "b.ts": b"xyz"}
+
+
+def test_module_and_package_names():
+    assert bs.module_name(LIB) == "src/lib/calc.ts"
+    assert bs.module_name("../node_modules/.pnpm/a@1/node_modules/@scope/pkg/index.js?v=1") \
+        == "node_modules/@scope/pkg/index.js"
+    assert bs.package_of("node_modules/@scope/pkg/index.js") == "@scope/pkg"
+    assert bs.package_of("node_modules/decimal.js/decimal.mjs") == "decimal.js"
+    assert bs.package_of("src/lib/calc.ts") == bs.APP
+    assert bs.chunk_label(NODE, {}) == "_app/immutable/nodes/2.js"
+    assert bs.chunk_label("_app/immutable/workers/technicals.worker-D8kX1a2B.js", {}) \
+        == "_app/immutable/workers/technicals.worker.js"
+    assert bs.chunk_label(CHUNK, {"src/lib/calc.ts": {"raw": 5}, "node_modules/x/y.js": {"raw": 9}}) \
+        == "_app/immutable/chunks/~node_modules/x/y.js"
+
+
+def test_report_routes_packages_and_budgets(tmp_path):
+    r = bs.report(make_build(tmp_path))
+    chunk = r["files"][CHUNK]
+    assert chunk["modules"]["node_modules/decimal.js/decimal.mjs"]["raw"] == 300
+    assert sum(m["raw"] for m in chunk["modules"].values()) == chunk["raw"]
+    assert sum(m["gzip"] for m in chunk["modules"].values()) == pytest.approx(chunk["gzip"])
+
+    assert list(r["routes"]) == ["/"]
+    route = r["routes"]["/"]
+    assert set(route["files"]) == {START, "_app/immutable/entry/app.Kd9s_aQ1.js", NODE, CHUNK}
+    assert route["packages"]["decimal.js"]["raw"] == 300
+    assert "_app/immutable/workers/technicals.worker-D8kX1a2B.js" in r["later"]["files"]
+    assert "robots.txt" not in r["later"]["files"]
+    assert r["packages"]["decimal.js"]["raw"] == 300
+
+    over = bs.check_budgets(r, {"metric": "raw", "routes": {"*": 0.1}, "packages": {"decimal.js": 1, "*": 100}})
+    assert {(o["scope"], o["name"]) for o in over} == {("route", "/")}
+    over = bs.check_budgets(r, {"metric": "raw", "packages": {"decimal.js": 0.2}, "total": 100})
+    assert [(o["scope"], o["name"]) for o in over] == [("package", "decimal.js")]
+    assert "decimal.js" in bs.format_report(r, over=over)
+
+
+def test_diff_against_previous_build(tmp_path):
+    old = bs.report(make_build(tmp_path / "a"))
+    new = bs.report(make_build(tmp_path / "b", decimal_code="Q" * 2000))
+    changes = bs.diff(old, new, metric="raw")
+    assert changes["packages"][0]["name"] == "decimal.js"
+    assert changes["packages"][0]["delta"] == 1700
+    assert changes["routes"][0] == {"name": "/", "old": old["routes"]["/"]["raw"],
+                                    "new": old["routes"]["/"]["raw"] + 1700, "delta": 1700}
+    assert changes["chunks"][0]["delta"] == 1700
+
+
+def test_main_saves_the_baseline(tmp_path, capsys):
+    build = make_build(tmp_path / "build")
+    last = str(tmp_path / "last.json")
+    assert bs.main(["--build", build, "--baseline", last, "--budgets", ""]) == 0
+    assert os.path.exists(last)
+    assert bs.main(["--build", build, "--baseline", last, "--budgets", ""]) == 0
+    assert "Since" in capsys.readouterr().out
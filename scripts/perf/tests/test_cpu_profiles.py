@@ -0,0 +1,136 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+
+import pytest
+
+import cpu_profiles as cp
+from test_source_maps import encode_mappings
+
+APP = "http://localhost:5173/src/services/technicalsService.ts?t=1"
+
+
+def make_profile(nodes, samples):
+    """
+    A .cpuprofile. `nodes` is [(id, parent id, function, url, line)] with
+    the root first; `samples` is [(node id, µs until the next sample)].
+    """
+    out = []
+    for node_id, parent, name, url, line in nodes:
+        out.append({"id": node_id, "callFrame": {"functionName": name, "scriptId": "1", "url": url,
+                                                 "lineNumber": line, "columnNumber": 0},
+                    "hitCount": 0, "children": [n[0] for n in nodes if n[1] == node_id]})
+    deltas = [0] + [us for _, us in samples[:-1]]
+    return {"nodes": out, "startTime": 1_000, "endTime": 1_000 + sum(us for _, us in samples),
+            "samples": [s for s, _ in samples], "timeDeltas": deltas}
+
+
+# (root) → (idle) | update → calc → calc (recursive) | (garbage collector)
+NODES = [(1, None, "(root)", "", -1), (2, 1, "(idle)", "", -1), (3, 1, "update", APP, 10),
+         (4, 3, "calc", APP, 20), (5, 4, "calc", APP, 20), (6, 1, "(garbage collector)", "", -1)]
+
+
+def write_run(run_dir, profiles, messages=None):
+    os.makedirs(run_dir, exist_ok=True)
+    for stem, profile in profiles.items():
+        with open(os.path.join(run_dir, stem + cp.PROFILE_SUFFIX), "w", encoding="utf-8") as f:
+            json.dump(profile, f)
+    if messages is not None:
+        with open(os.path.join(run_dir, cp.MESSAGES_FILE), "w", encoding="utf-8") as f:
+            json.dump(messages, f)
+
+
+def test_sample_durations_use_the_gap_to_the_next_sample():
+    samples, durations = cp.sample_durations(make_profile(NODES, [(3, 100), (4, 50), (5, 25)]))
+    assert samples.tolist() == [3, 4, 5]
+    assert durations.tolist() == [100, 50, 25]
+
+
+def test_self_and_total_time_with_recursion():
+    t = cp.ThreadProfile("main")
+    t.start_run()
+    t.add(make_profile(NODES, [(3, 100), (4, 200), (5, 300), (2, 1000), (6, 50)]), cp.Symbolizer())
+    rows = {r["function"]: r for r in t.summary(runs=1)["functions"]}
+    assert rows["calc"]["self_ms"] == pytest.approx(0.5)
+    # The recursive frame counts each sample once.
+    assert rows["calc"]["total_ms"] == pytest.approx(0.5)
+    assert rows["update"]["self_ms"] == pytest.approx(0.1)
+    assert rows["update"]["total_ms"] == pytest.approx(0.6)
+    assert "(idle)" not in rows and "(root)" not in rows
+    summary = t.summary(runs=1)
+    assert summary["busy_ms"] == pytest.approx(0.65)
+    assert summary["idle_ms"] == pytest.approx(1.0)
+    assert rows["calc"]["self_pct"] == pytest.approx(100 * 0.5 / 0.65)
+    assert rows["calc"]["location"] == "src/services/technicalsService.ts:21"
+    assert t.stacks == {"main;update src/services/technicalsService.ts:11": 100,
+                        "main;update src/services/technicalsService.ts:11;calc src/services/technicalsService.ts:21": 200,
+                        "main;update src/services/technicalsService.ts:11;calc src/services/technicalsService.ts:21;"
+                        "calc src/services/technicalsService.ts:21": 300,
+                        "main;(garbage collector)": 50}
+
+
+def test_source_mapped_frames():
+    source_map = {"version": 3, "sources": ["../../src/utils/indicators.ts"], "names": ["calcRSI"],
+                  "mappings": encode_mappings([(19, 0, 0, 211, 0, 0)])}
+    symbolizer = cp.Symbolizer({APP: json.dumps(source_map)})
+    assert symbolizer.frame({"functionName": "", "url": APP, "lineNumber": 19, "columnNumber": 4}) \
+        == ("calcRSI", "src/utils/indicators.ts:212")
+    # Unmapped positions fall back to the generated location.
+    assert symbolizer.frame({"functionName": "update", "url": APP, "lineNumber": 9, "columnNumber": 0}) \
+        == ("update", "src/services/technicalsService.ts:10")
+
+
+def test_analyze_merges_runs_and_worker_instances(tmp_path):
+    main = make_profile(NODES, [(3, 1000), (2, 1000)])
+    worker = make_profile(NODES, [(4, 3000)])
+    messages = {"duration_s": 2.0, "workers": {"TechnicalsWorker": {"instances": 1, "to": 10, "toBytes": 5000,
+                                                                    "from": 20, "fromBytes": 800}}}
+    write_run(tmp_path / "run_01", {"main": main, "TechnicalsWorker@0": worker, "pool.worker.ts@0": worker,
+                                    "pool.worker.ts@1": worker}, messages)
+    # The pool worker did not run in the second run.
+    write_run(tmp_path / "run_02", {"main": make_profile(NODES, [(3, 3000)]), "TechnicalsWorker@0": worker},
+              messages)
+
+    result, stacks = cp.analyze(str(tmp_path), top=5)
+    assert result["runs"] == 2
+    threads = {t["thread"]: t for t in result["threads"]}
+    assert [t["thread"] for t in result["threads"]][0] == "main"
+    assert threads["main"]["functions"][0]["self_ms"] == pytest.approx(2.0)
+    assert threads["main"]["functions"][0]["self_sd_ms"] == pytest.approx(1.4142, rel=1e-3)
+    assert threads["pool.worker.ts"]["functions"][0]["self_ms"] == pytest.approx(3.0)
+    assert threads["TechnicalsWorker"]["busy_ms"] == pytest.approx(3.0)
+    assert stacks["TechnicalsWorker;update src/services/technicalsService.ts:11;"
+                  "calc src/services/technicalsService.ts:21"] == 6000
+
+    m = result["messages"]["TechnicalsWorker"]
+    assert m["to_per_s"] == pytest.approx(5.0)
+    assert m["to_bytes_per_msg"] == pytest.approx(500)
+    assert m["from_bytes_per_s"] == pytest.approx(400)
+
+    folded = cp.write_collapsed(stacks, str(tmp_path / "stacks.folded"))
+    lines = open(folded, encoding="utf-8").read().splitlines()
+    assert "main;update src/services/technicalsService.ts:11 4000" in lines
+    assert "TechnicalsWorker" in cp.format_report(result)
+
+
+def test_worker_labels():
+    assert cp.worker_label("TechnicalsWorker", "http://h/src/workers/technicals.worker.ts?worker_file") \
+        == "TechnicalsWorker"
+    assert cp.worker_label("http://h/src/workers/aggregator.worker.ts?type=module",
+                           "http://h/src/workers/aggregator.worker.ts?type=module") == "aggregator.worker.ts"
+    assert cp.thread_of("/x/run_01/TechnicalsWorker@2.cpuprofile") == "TechnicalsWorker"
@@ -0,0 +1,121 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+import heap_snapshots as hs
+
+NODE_TYPES = ["hidden", "array", "string", "object", "code", "closure", "regexp", "number", "native", "synthetic",
+              "concatenated string", "sliced string", "symbol", "bigint", "object shape"]
+EDGE_TYPES = ["context", "element", "property", "internal", "hidden", "shortcut", "weak"]
+NODE_FIELDS = ["type", "name", "id", "self_size", "edge_count", "trace_node_id", "detachedness"]
+
+
+def write_snapshot(path, nodes):
+    """
+    A V8-shaped .heapsnapshot. `nodes` is a list of (type, name, self_size,
+    [(edge type, edge name or element index, target node index)]); node 0 is the root.
+    """
+    strings = [""]
+
+    def sid(text):
+        if text not in strings:
+            strings.append(text)
+        return strings.index(text)
+
+    flat_nodes, flat_edges = [], []
+    for i, (node_type, name, size, edges) in enumerate(nodes):
+        flat_nodes += [NODE_TYPES.index(node_type), sid(name), 2 * i + 1, size, len(edges), 0, 0]
+        for edge_type, edge_name, target in edges:
+            name_or_index = edge_name if edge_type in ("element", "hidden") else sid(edge_name)
+            flat_edges += [EDGE_TYPES.index(edge_type), name_or_index, target * len(NODE_FIELDS)]
+    header = {"meta": {"node_fields": NODE_FIELDS, "node_types": [NODE_TYPES, "string", "number", "number", "number",
+                                                                    "number", "number"],
+                       "edge_fields": ["type", "name_or_index", "to_node"],
+                       "edge_types": [EDGE_TYPES, "string_or_number", "node"]},
+              "node_count": len(nodes), "edge_count": len(flat_edges) // 3}
+    rows = lambda values, width: ",\n".join(",".join(map(str, values[i:i + width]))  # noqa: E731
+                                            for i in range(0, len(values), width))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"snapshot":' + json.dumps(header) + ',\n"nodes":[' + rows(flat_nodes, 7) + '],\n"edges":['
+                + rows(flat_edges, 3) + '],\n"trace_function_infos":[],\n"trace_tree":[[1,[2,[]]]],\n"samples":[],\n'
+                + '"locations":[0,1,2],\n"strings":[' + ",\n".join(json.dumps(s) for s in strings) + "]}")
+
+
+def session_heap(handlers):
+    """Root → Window → BitunixWebSocketService → Map → `handlers` closures, plus shared and weak-only objects."""
+    nodes = [
+        ("synthetic", "", 0, [("shortcut", "window", 1)]),
+        ("object", "Window", 100, [("property", "bitunixWs", 2), ("property", "shared", 4), ("weak", "cache", 5)]),
+        ("object", "BitunixWebSocketService", 50, [("property", "handlers", 3), ("property", "shared", 4)]),
+        ("object", "Map", 20, [("element", i, 6 + i) for i in range(handlers)]),
+        ("object", "Shared", 7, []),
+        ("object", "WeakOnly", 1000, []),
+    ]
+    nodes += [("closure", "onmessage", 32, [("context", "context", 6 + handlers + i)]) for i in range(handlers)]
+    nodes += [("hidden", "system / Context", 16, []) for _ in range(handlers)]
+    return nodes
+
+
+def test_streaming_reader_survives_tiny_chunks(tmp_path):
+    path = str(tmp_path / "a.heapsnapshot")
+    write_snapshot(path, session_heap(3))
+    whole, streamed = hs.read_raw(path), hs.read_raw(path, chunk=7)
+    assert whole["nodes"].tolist() == streamed["nodes"].tolist()
+    assert whole["edges"].tolist() == streamed["edges"].tolist()
+    assert whole["strings"] == streamed["strings"] and "onmessage" in whole["strings"]
+
+
+def test_dominators_and_retained_sizes(tmp_path):
+    path = str(tmp_path / "a.heapsnapshot")
+    write_snapshot(path, session_heap(2))
+    snap = hs.HeapSnapshot(hs.read_raw(path, chunk=64))
+    # Shared is retained by both Window and the service, so Window dominates it.
+    assert snap.idom[4] == 1 and snap.idom[3] == 2 and snap.idom[6] == 3
+    assert snap.retained[2] == 50 + 20 + 2 * (32 + 16)
+    assert snap.retained[1] == 100 + snap.retained[2] + 7
+    assert snap.parent[5] == -1  # only weakly held
+
+    summary = snap.summary()
+    assert summary["constructors"]["(closure)"] == [2, 64, 96]
+    assert "WeakOnly" not in summary["constructors"]
+    assert summary["paths"]["BitunixWebSocketService.handlers → Map.[] → (closure)"] == [2, 64, 96]
+    assert summary["paths"]["(root).window → Window"][0] == 1
+
+
+def test_growth_is_ranked_and_watched_paths_are_flagged(tmp_path):
+    paths = []
+    for i, handlers in enumerate((1, 3, 6)):
+        paths.append(str(tmp_path / f"s{i}.heapsnapshot"))
+        write_snapshot(paths[-1], session_heap(handlers))
+    result = hs.report([hs.analyze_file(p) for p in paths])
+
+    top = result["constructors"]["top"][0]
+    assert top["name"] == "(closure)" and top["count"] == [1, 3, 6] and top["monotonic"]
+    flagged = {row["name"] for row in result["paths"]["watched"] if row["monotonic"]}
+    assert "BitunixWebSocketService.handlers → Map.[] → (closure)" in flagged
+    assert "🚨" in hs.format_report(result)
+
+
+@pytest.mark.parametrize("label, groups", [
+    ("Window.bitunixWs → BitunixWebSocketService", ["websocket"]),  # the global Window is no component
+    ("KlineBufferManager.buffers → CircularBuffer", ["kline_buffers"]),
+    ("ChartWindow", ["windows"]),
+    ("(array)", []),
+])
+def test_watch_groups(label, groups):
+    assert hs.watched(label) == groups
@@ -0,0 +1,272 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import json
+from decimal import Decimal
+
+import pytest
+
+import paper_exchange as px
+
+
+def _exchange(**config):
+    ex = px.PaperExchange(px.Config(slippage_bps="0", taker_fee_bps="0", seed=1, **config), clock=lambda: 1000)
+    events = []
+    ex.listeners.append(lambda channel, data, symbol: events.append((channel, data)) if symbol is None else None)
+    ex.on_trade("BTCUSDT", 100)
+    return ex, events
+
+
+def _limit(ex, side, price, qty="1", **extra):
+    return ex.place_order({"symbol": "BTCUSDT", "side": side, "orderType": "LIMIT", "price": price, "qty": qty,
+                           **extra})["orderId"]
+
+
+def test_prints_fill_resting_orders_in_price_time_priority():
+    ex, _ = _exchange()
+    first = _limit(ex, "BUY", "99")
+    better = _limit(ex, "BUY", "99.5")
+    second = _limit(ex, "BUY", "99")
+    ask = _limit(ex, "SELL", "101")
+
+    ex.on_trade("BTCUSDT", 99, 1.5)
+    assert ex.orders[better].status == "FILLED"
+    assert ex.orders[better].cost == Decimal("99.5")  # a resting order fills at its own limit
+    assert (ex.orders[first].status, ex.orders[first].filled) == ("PART_FILLED", Decimal("0.5"))
+    assert ex.orders[second].filled == 0
+
+    ex.on_trade("BTCUSDT", 98.5, 1)
+    assert ex.orders[first].status == "FILLED"
+    assert ex.orders[second].filled == Decimal("0.5")
+    assert ex.orders[ask].status == "NEW"
+    # A price-only print has no size limit.
+    ex.on_trade("BTCUSDT", 98)
+    assert ex.orders[second].status == "FILLED"
+    assert ex.positions[next(iter(ex.positions))].qty == 3
+
+
+def test_modify_keeps_or_loses_queue_place():
+    ex, _ = _exchange()
+    a = _limit(ex, "BUY", "99", qty="2")
+    b = _limit(ex, "BUY", "99")
+    ex.modify_order({"orderId": a, "qty": "1", "price": "99"})
+    ex.on_trade("BTCUSDT", 99, 1)
+    assert (ex.orders[a].status, ex.orders[b].filled) == ("FILLED", 0)
+
+    c = _limit(ex, "BUY", "98")
+    d = _limit(ex, "BUY", "98")
+    ex.modify_order({"orderId": c, "qty": "2", "price": "98"})
+    ex.on_trade("BTCUSDT", 98, 1)
+    # b (99) is best; at 98 d is now ahead of the enlarged c.
+    assert ex.orders[b].status == "FILLED" and ex.orders[d].filled == 0 and ex.orders[c].filled == 0
+    ex.on_trade("BTCUSDT", 98, 1)
+    assert ex.orders[d].status == "FILLED" and ex.orders[c].filled == 0
+
+    result = ex.cancel_orders({"symbol": "BTCUSDT", "orderList": [{"orderId": c}, {"orderId": d}, {"orderId": "x"}]})
+    assert [r["orderId"] for r in result["successList"]] == [c]
+    assert [r["errorCode"] for r in result["failureList"]] == [px.ORDER_STATUS[0], px.NO_ORDER[0]]
+    assert ex.get_pending_orders({})["total"] == 0
+
+
+def test_market_fills_follow_paper_exchange_money():
+    ex = px.PaperExchange(px.Config(slippage_bps="10", taker_fee_bps="6", balance="1000"), clock=lambda: 1000)
+    ex.on_trade("BTCUSDT", 100)
+    ex.place_order({"symbol": "BTCUSDT", "side": "BUY", "orderType": "MARKET", "qty": "1", "leverage": "10"})
+    ex.on_trade("BTCUSDT", 110)
+    ex.place_order({"symbol": "BTCUSDT", "side": "BUY", "orderType": "MARKET", "qty": "1"})
+    (position,) = ex.get_pending_positions({"symbol": "BTCUSDT"})
+    # Slippage against the buyer, entries averaged by weight.
+    assert position["avgOpenPrice"] == "105.105" and position["qty"] == "2" and position["side"] == "LONG"
+    assert Decimal(position["margin"]) == Decimal("21.021")
+
+    ex.on_trade("BTCUSDT", 120)
+    assert ex.flash_close_position({"positionId": position["positionId"]}) == {"positionId": position["positionId"]}
+    exit_price = Decimal("120") - Decimal("0.12")
+    fees = (Decimal("100.1") + Decimal("110.11") + 2 * exit_price) * 6 / px.BPS
+    assert ex.balance == Decimal(1000) + (exit_price - Decimal("105.105")) * 2 - fees
+    assert ex.get_pending_positions({}) == []
+    with pytest.raises(px.ExchangeError) as e:
+        ex.flash_close_position({"positionId": position["positionId"]})
+    assert e.value.code == px.NO_POSITION[0]
+
+
+def test_injected_partials_and_rejects():
+    ex, events = _exchange(partial_rate=1.0)
+    order_id = ex.place_order({"symbol": "BTCUSDT", "side": "SELL", "orderType": "MARKET", "qty": "2"})["orderId"]
+    detail = ex.get_order_detail({"orderId": order_id})
+    assert (detail["status"], detail["tradeQty"]) == ("PART_FILLED_CANCELED", "1")
+    assert [d["orderStatus"] for ch, d in events if ch == "order"] == ["NEW", "PART_FILLED", "PART_FILLED_CANCELED"]
+    # A marketable GTC limit rests its unfilled half.
+    limit = _limit(ex, "BUY", "101", qty="2")
+    assert ex.orders[limit].status == "PART_FILLED" and len(ex.books["BTCUSDT"]) == 1
+
+    ex.config.reject_rate = 1.0
+    status, envelope = ex.respond("POST", px.API + "/trade/place_order",
+                                  {"symbol": "BTCUSDT", "side": "BUY", "qty": "1"})
+    assert (status, envelope["code"], envelope["data"]) == (200, px.INSUFFICIENT_BALANCE[0], None)
+    assert ex.counters.errors[px.INSUFFICIENT_BALANCE[0]] == 1
+
+
+def test_time_in_force_and_close_semantics():
+    ex, _ = _exchange()
+    assert ex.orders[_limit(ex, "BUY", "101", effect="POST_ONLY")].status == "CANCELED"
+    assert ex.orders[_limit(ex, "BUY", "99", effect="IOC")].status == "CANCELED"
+    assert ex.orders[_limit(ex, "BUY", "101", effect="IOC")].status == "FILLED"
+    with pytest.raises(px.ExchangeError) as e:
+        ex.place_order({"symbol": "BTCUSDT", "side": "SELL", "tradeSide": "CLOSE", "qty": "1"})
+    assert e.value.code == px.NO_POSITION[0]
+    # A CLOSE carries the position's side: BUY closes the long, as a resting sell above the market.
+    close = _limit(ex, "BUY", "102", qty="5", tradeSide="CLOSE")
+    ex.on_trade("BTCUSDT", 101.5)
+    assert ex.orders[close].filled == 0
+    ex.on_trade("BTCUSDT", 102)
+    assert ex.orders[close].status == "FILLED" and ex.orders[close].filled == 1
+    assert ex.get_pending_positions({}) == []
+
+
+def test_attached_tp_sl_becomes_a_plan_that_fires():
+    ex, events = _exchange()
+    ex.place_order({"symbol": "BTCUSDT", "side": "SELL", "qty": "2", "tpPrice": "90", "slPrice": "105"})
+    (plan,) = ex.get_pending_tpsl({"symbol": "BTCUSDT"})
+    assert (plan["tpPrice"], plan["slPrice"], plan["tpQty"], plan["slStopType"]) == ("90", "105", "2", "LAST_PRICE")
+    ex.modify_tpsl({"orderId": plan["id"], "slPrice": "104"})
+    ex.on_trade("BTCUSDT", 103.9)
+    assert ex.get_pending_tpsl({}) != []
+    ex.on_trade("BTCUSDT", 104)
+    assert ex.get_pending_tpsl({}) == [] and ex.get_pending_positions({}) == []
+    assert ex.get_history_tpsl({})["orderList"][0]["status"] == "FILLED"
+    assert [d["event"] for ch, d in events if ch == "tp_sl"] == ["CREATE", "UPDATE", "CLOSE"]
+    assert [d["event"] for ch, d in events if ch == "position"] == ["OPEN", "CLOSE"]
+
+
+def test_recorded_ticks_read_trade_and_ticker_frames(tmp_path):
+    frames = [
+        {"t": 20, "url": "wss://fapi.bitunix.com/public/",
+         "data": json.dumps({"ch": "trade", "symbol": "ETHUSDT", "data": [{"p": "3000.5", "v": "0.2", "s": "buy"}]})},
+        {"t": 10, "url": "wss://fapi.bitunix.com/public/",
+         "data": json.dumps({"ch": "ticker", "symbol": "ETHUSDT", "data": {"la": "2999"}})},
+        {"t": 30, "url": "wss://fapi.bitunix.com/public/", "b64": "AAAA"},
+        {"t": 40, "url": "wss://fapi.bitunix.com/public/", "data": "{\"op\":\"ping\"}"},
+    ]
+    path = tmp_path / "market.jsonl"
+    path.write_text("\n".join(json.dumps(f) for f in frames) + "\n")
+    assert px.recorded_ticks(path) == [(10, "ETHUSDT", 2999.0, None), (20, "ETHUSDT", 3000.5, 0.2)]
+
+
+def test_server_round_trip_with_signatures_and_pushes():
+    async def scenario():
+        ex = px.PaperExchange(px.Config(latency_ms=20))
+        ex.on_trade("BTCUSDT", 100)
+        server = px.PaperExchangeServer(ex, api_key="k", api_secret="s")
+        port = await server.start(px.DEFAULT_HOST, 0)
+        client = await px.ExchangeClient.open(px.DEFAULT_HOST, port, "k", "s")
+        ws = await px.WsClient.open(px.DEFAULT_HOST, port)
+        try:
+            assert (await ws.login("k", "s"))["code"] == 0
+            placed = await client.request("POST", px.API + "/trade/place_order",
+                                          {"symbol": "BTCUSDT", "side": "BUY", "orderType": "MARKET", "qty": 1})
+            assert placed["code"] == 0
+            pushed = [await ws.recv() for _ in range(4)]
+            assert [m["ch"] for m in pushed] == ["order", "position", "order", "wallet"]
+            assert pushed[2]["data"]["orderStatus"] == "FILLED"
+
+            detail = await client.request("GET", px.API + "/trade/get_order_detail",
+                                          {"orderId": placed["data"]["orderId"]})
+            assert detail["data"]["tradeQty"] == "1"
+            forged = await px.ExchangeClient.open(px.DEFAULT_HOST, port, "k", "wrong")
+            assert (await forged.request("GET", px.API + "/account"))["code"] == px.SIGN_ERROR[0]
+            await forged.close()
+
+            stats = await client.request("GET", "/paper/stats")
+            assert stats["events"]["fills"] == 1 and stats["pushes"]["order"] == 2
+            assert stats["service_ms"][px.API + "/trade/place_order"]["p50"] >= 20
+        finally:
+            await ws.close()
+            await client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_load_cli_reports_throughput(tmp_path, capsys):
+    out = tmp_path / "load.json"
+    assert px.main(["load", "--rate", "100", "--seconds", "0.5", "--connections", "4", "--json", str(out)]) == 0
+    result = json.loads(out.read_text())
+    assert result["orders"] == 50
+    assert result["steps"]["place_order"]["requests"] == 50
+    assert result["pushes"]["order"] > 0
+    assert "orders/s" in capsys.readouterr().out
+
+
+async def _fake_app(exchange_port):
+    """
+    A stand-in for the app's /api routes: checks the client token and key
+    headers, forwards to the exchange and answers like the routes do.
+    """
+    steps = {"place-order": "place_order", "flash-close-position": "flash_close",
+             "modify-order": "modify_order", "cancel-order": "cancel_order"}
+
+    async def handle(reader, writer):
+        exchange = await px.ExchangeClient.open(px.DEFAULT_HOST, exchange_port)
+        try:
+            while (message := await px.read_http_message(reader)) is not None:
+                start, headers, body = message
+                path, payload = start.split(" ")[1], json.loads(body or b"{}")
+                if path == "/api/auth/token":
+                    status, answer = 200, {"token": "t"}
+                elif headers.get("x-app-access-token") != "t" or headers.get("x-api-key") != "paper":
+                    status, answer = 401, {"error": "Unauthorized"}
+                else:
+                    if path == "/api/orders":
+                        step, params = steps[payload.pop("type")], payload
+                    elif path == "/api/tpsl":
+                        step, params = "pending_tpsl", payload["params"]
+                    else:
+                        step, params = "pending_positions", {"symbol": "BTCUSDT"}
+                    ok, code, data = await exchange.step(step, {k: v for k, v in params.items() if k != "exchange"})
+                    status = 200 if ok else 500
+                    answer = ({"data": data} if path.startswith("/api/sync/") else data) if ok else \
+                        {"error": "failed", "code": code}
+                writer.write(px.http_response(status, answer))
+                await writer.drain()
+        finally:
+            await exchange.close()
+            writer.close()
+
+    return await asyncio.start_server(handle, px.DEFAULT_HOST, 0)
+
+
+def test_load_through_the_app_routes():
+    async def scenario():
+        ex = px.PaperExchange(px.Config())
+        ex.on_trade("BTCUSDT", 100)
+        server = px.PaperExchangeServer(ex)
+        port = await server.start(px.DEFAULT_HOST, 0)
+        app = await _fake_app(port)
+        try:
+            return await px.run_load(px.DEFAULT_HOST, port, ["BTCUSDT"], rate=60, seconds=0.5, connections=2,
+                                     app=(px.DEFAULT_HOST, app.sockets[0].getsockname()[1]))
+        finally:
+            app.close()
+            await server.close()
+
+    result = asyncio.run(scenario())
+    assert result["via"].startswith("app http://")
+    assert result["orders"] == 30
+    assert result["steps"]["place_order"]["requests"] == 30
+    assert all(code.endswith(" 0") for code in result["codes"])
+    assert result["server"]["events"]["fills"] > 0
@@ -0,0 +1,83 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import base64
+import json
+
+import source_maps as sm
+
+_B64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def encode_vlq(values):
+    out = ""
+    for v in values:
+        v = (-v << 1) | 1 if v < 0 else v << 1
+        while True:
+            digit, v = v & 31, v >> 5
+            out += _B64[digit | (32 if v else 0)]
+            if not v:
+                break
+    return out
+
+
+def encode_mappings(rows):
+    """Mappings string from absolute (gen_line, gen_col, source, line, col, name) rows, sorted."""
+    lines, prev = [], [0, 0, 0, 0]
+    for gen_line, gen_col, source, line, col, name in rows:
+        while len(lines) <= gen_line:
+            lines.append([])
+        prev_col = lines[gen_line][-1][0] if lines[gen_line] else 0
+        fields = [gen_col - prev_col, source - prev[0], line - prev[1], col - prev[2]]
+        if name >= 0:
+            fields.append(name - prev[3])
+            prev[3] = name
+        prev[:3] = [source, line, col]
+        lines[gen_line].append((gen_col, encode_vlq(fields)))
+    return ";".join(",".join(seg for _, seg in segs) for segs in lines)
+
+
+ROWS = [(0, 0, 0, 0, 0, -1), (0, 9, 0, 3, 2, 0), (2, 4, 1, 40, 0, 1), (2, 30, 1, 41, 8, -1)]
+MAP = {"version": 3, "sources": ["../src/a.ts", "../src/utils/b.ts"], "names": ["alpha", "beta"],
+       "mappings": encode_mappings(ROWS)}
+
+
+def test_vlq_round_trip():
+    values = [0, 1, -1, 15, -16, 16, 1000, -123456]
+    assert sm.decode_vlq(encode_vlq(values)) == values
+    assert sm.decode_vlq("AAgBC") == [0, 0, 16, 1]
+
+
+def test_decode_and_lookup():
+    m = sm.SourceMap(MAP)
+    assert m.segments.tolist() == [list(r) for r in ROWS]
+    assert m.lookup(0, 12) == ("../src/a.ts", 3, 2, "alpha")
+    assert m.lookup(2, 4) == ("../src/utils/b.ts", 40, 0, "beta")
+    assert m.lookup(2, 100) == ("../src/utils/b.ts", 41, 8, None)
+    # Before the first segment of a line, and on a line without segments.
+    assert m.lookup(2, 0) is None
+    assert m.lookup(1, 5) is None
+
+
+def test_for_script_inline_and_external():
+    text = json.dumps(MAP)
+    inline = "export const x = 1;\n//# sourceMappingURL=data:application/json;base64," \
+        + base64.b64encode(text.encode()).decode()
+    assert sm.for_script("http://h/src/a.ts", inline) == text
+
+    served = {"http://h/assets/app.js": "var a;\n//# sourceMappingURL=app.js.map", "http://h/assets/app.js.map": text}
+    assert sm.for_script("http://h/assets/app.js", fetch=served.__getitem__) == text
+    assert sm.for_script("http://h/assets/none.js", "var b;") is None
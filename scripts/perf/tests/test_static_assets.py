@@ -0,0 +1,148 @@
+# Copyright (C) 2026 MYDCT
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import json
+import os
+
+import pytest
+
+import static_assets as sa
+
+
+def write(root, rel, data):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def tiny_font(glyph_names="abc", family="Tiny"):
+    """A TTF with one square glyph per character of `glyph_names`."""
+    fb_mod = pytest.importorskip("fontTools.fontBuilder")
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+    def square():
+        pen = TTGlyphPen(None)
+        pen.moveTo((100, 0))
+        pen.lineTo((100, 500))
+        pen.lineTo((400, 500))
+        pen.lineTo((400, 0))
+        pen.closePath()
+        return pen.glyph()
+
+    names = [".notdef", *glyph_names]
+    fb = fb_mod.FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(names)
+    fb.setupCharacterMap({ord(c): c for c in glyph_names})
+    fb.setupGlyf({name: square() for name in names})
+    fb.setupHorizontalMetrics({name: (500, 100) for name in names})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": family, "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    buf = io.BytesIO()
+    fb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def static(tmp_path):
+    root = tmp_path / "static"
+    write(root, "manifest.json", b'{"name": "Cachy", "icons": []}')
+    write(root, "wasm/technicals_wasm_bg.wasm", bytes(range(256)))
+    write(root, "knowledge/guide.pdf", b"%PDF-1.4 ...")
+    write(root, "fonts/Inter/OFL.txt", b"licence")
+    return str(root)
+
+
+def test_hashed_names_and_fonts():
+    assert sa.hashed_name("fonts/Inter/Inter.ttf", "1a2b3c4d5e", "subset", ".woff2") \
+        == "fonts/Inter/Inter.1a2b3c4d.subset.woff2"
+    assert sa.hashed_name("favicon.svg", "ffee00112233") == "favicon.ffee0011.svg"
+    assert [sa.is_font(p) for p in ("f/Inter.TTF", "f/Plex.otf", "x.wasm", "a/b.png")] == [True, True, False, False]
+
+
+def test_unicode_range_merges_consecutive_code_points():
+    assert sa.unicode_range({0x20, 0x21, 0x22, 0xE9, 0x20AC, 0x20AD}) == "U+20-22, U+E9, U+20AC-20AD"
+    assert sa.unicode_range([]) == ""
+
+
+def test_locale_glyphs(tmp_path):
+    locales = tmp_path / "locales"
+    locales.mkdir()
+    (locales / "de.json").write_text(json.dumps({"a": {"b": "Größe ≥ 5", "c": ["Ü"]}}), encoding="utf-8")
+    glyphs = sa.locale_glyphs(str(locales), extra="€")
+    assert {"ö", "ß", "≥", "Ü", "€", "A", " "} <= set(glyphs)
+    assert glyphs == "".join(sorted(glyphs))
+
+
+def test_without_the_subsetter_fonts_keep_their_original(static, tmp_path, monkeypatch):
+    monkeypatch.setattr(sa, "font_subset", None)
+    write(static, "fonts/Inter/Inter.ttf", b"not parsed")
+    manifest, stats = sa.build(static, str(tmp_path / "cache.json"), glyphs="abc",
+                               precache=("manifest.json", "fonts/Inter/*.ttf"))
+    assert stats == {"processed": [], "cached": [], "skipped": ["fonts/Inter/Inter.ttf"]}
+    assert manifest["precache"] == ["/manifest.json", "/fonts/Inter/Inter.ttf"]
+    assert manifest["assets"]["/knowledge/guide.pdf"]["variants"] == []
+    assert "/fonts/Inter/OFL.txt" not in manifest["assets"]
+    assert os.listdir(os.path.join(static, sa.OUT_NAME)) == [sa.MANIFEST]
+
+
+def test_build_is_incremental(static, tmp_path):
+    pytest.importorskip("brotli")
+    cache = str(tmp_path / "cache.json")
+    font = tiny_font("abcdef")
+    write(static, "fonts/Inter/Inter.ttf", font)
+    manifest, stats = sa.build(static, cache, glyphs="abc", precache=("manifest.json", "fonts/Inter/*.ttf"))
+    assert stats["processed"] == ["fonts/Inter/Inter.ttf"]
+
+    subset = manifest["assets"]["/fonts/Inter/Inter.ttf"]["variants"][0]
+    assert subset["url"].startswith("/_opt/fonts/Inter/Inter.") and subset["url"].endswith(".subset.woff2")
+    assert subset["type"] == "font/woff2" and subset["bytes"] < len(font)
+    # Only what the subset maps; "d" to "f" stay with the full font.
+    assert subset["unicode_range"] == "U+61-63"
+    # The page loads the subset, so that is what gets precached.
+    assert manifest["precache"] == ["/manifest.json", subset["url"]]
+    out = os.path.join(static, sa.OUT_NAME)
+    from fontTools.ttLib import TTFont
+
+    with open(os.path.join(out, subset["url"][len("/_opt/"):]), "rb") as f:
+        assert set(TTFont(f).getBestCmap()) == {ord(c) for c in "abc"}
+    with open(os.path.join(out, sa.MANIFEST), encoding="utf-8") as f:
+        assert json.load(f)["precache"] == manifest["precache"]
+
+    # Nothing changed: nothing is redone.
+    _, stats = sa.build(static, cache, glyphs="abc", precache=())
+    assert stats["processed"] == [] and stats["cached"] == ["fonts/Inter/Inter.ttf"]
+
+    # New glyphs in the locales redo the subset.
+    _, stats = sa.build(static, cache, glyphs="abcd", precache=())
+    assert stats["processed"] == ["fonts/Inter/Inter.ttf"]
+
+    # A changed font gets a new hashed name and its old outputs go away.
+    write(static, "fonts/Inter/Inter.ttf", tiny_font("abcdefg"))
+    manifest, stats = sa.build(static, cache, glyphs="abcd", precache=())
+    assert stats["processed"] == ["fonts/Inter/Inter.ttf"]
+    new_url = manifest["assets"]["/fonts/Inter/Inter.ttf"]["variants"][0]["url"]
+    assert new_url != subset["url"]
+    assert not os.path.exists(os.path.join(out, subset["url"][len("/_opt/"):]))
+    assert os.path.exists(os.path.join(out, new_url[len("/_opt/"):]))
+
+    # Deleted outputs are rebuilt even though the source did not change.
+    os.remove(os.path.join(out, new_url[len("/_opt/"):]))
+    _, stats = sa.build(static, cache, glyphs="abcd", precache=())
+    assert stats["processed"] == ["fonts/Inter/Inter.ttf"]
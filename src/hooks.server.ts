@@ -20,6 +20,7 @@ import type { Handle } from "@sveltejs/kit";
 import { building } from "$app/environment";
 import { CONSTANTS } from "./lib/constants";
 import { logger } from "$lib/server/logger";
+import { wsUrlOrigin } from "./services/bitunixWs/wsUrl";
 
 // --- Global Console Interceptor for CachyLog ---
 // Redirects all server-side console logs to the centralized logger and SSE stream
@@ -116,6 +117,42 @@ const themeHandler: Handle = async ({ event, resolve }) => {
   return response;
 };
 
+// Font URL → its WOFF2 subset, from scripts/perf/static_assets.py via
+// vite.config.ts; empty when the build found none.
+const FONT_SUBSETS: Record<string, string> = JSON.parse(import.meta.env.VITE_FONT_SUBSETS || "{}");
+
+// app.css renders the UI's own text from the subsets and fetches a TTF only
+// for characters outside them (see vite.config.ts), so the font preloads in
+// app.html have to follow, or the preloaded TTF would load for nothing.
+const fontPreloadHandler: Handle = async ({ event, resolve }) => {
+  if (Object.keys(FONT_SUBSETS).length === 0) return resolve(event);
+  return resolve(event, {
+    transformPageChunk: ({ html }) => {
+      let out = html;
+      for (const [font, subset] of Object.entries(FONT_SUBSETS)) {
+        out = out.replace(
+          `href="${font}" as="font" type="font/ttf"`,
+          `href="${subset}" as="font" type="font/woff2"`,
+        );
+      }
+      return out;
+    },
+  });
+};
+
+// Stream origins the build-time VITE_BITUNIX_WS_*_URL overrides add (the
+// paper exchange, see .env.example); empty in a normal build. A malformed or
+// disallowed override fails startup with the variable's name.
+const EXTRA_CONNECT_SRC = [
+  ...new Set(
+    [
+      wsUrlOrigin("VITE_BITUNIX_WS_PUBLIC_URL", CONSTANTS.BITUNIX_WS_PUBLIC_URL),
+      wsUrlOrigin("VITE_BITUNIX_WS_PRIVATE_URL", CONSTANTS.BITUNIX_WS_PRIVATE_URL),
+    ]
+      .filter((origin) => origin !== "wss://fapi.bitunix.com"),
+  ),
+].map((origin) => ` ${origin}`).join("");
+
 export const headersHandler: Handle = async ({ event, resolve }) => {
   const response = await resolve(event);
   // COOP: same-origin-allow-popups keeps TradingView popup compatibility
@@ -130,8 +167,8 @@ export const headersHandler: Handle = async ({ event, resolve }) => {
   // Security Headers from Production Monitor
   response.headers.set("Strict-Transport-Security", "max-age=31536000; includeSubDomains; preload");
   // Note: Content-Security-Policy is managed by SvelteKit in svelte.config.js, but added here for the monitor
-  response.headers.set("Content-Security-Policy", "default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval' 'wasm-unsafe-eval' https://s.cachy.app blob:; style-src 'self' 'unsafe-inline'; img-src 'self' data: https: https://s.cachy.app; media-src 'self' blob: https:; font-src 'self' data:; object-src 'none'; base-uri 'self'; frame-src 'self' https://space.cachy.app https://s.cachy.app https: blob: data:; frame-ancestors 'self'; connect-src 'self' https://s.cachy.app https://bam.nr-data.net https://bam.eu01.nr-data.net wss://fapi.bitunix.com wss://stream.bitunix.com wss://ws.bitget.com https://api.imgbb.com https://discord.com https://generativelanguage.googleapis.com https://api.openai.com");
+  response.headers.set("Content-Security-Policy", `default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval' 'wasm-unsafe-eval' https://s.cachy.app blob:; style-src 'self' 'unsafe-inline'; img-src 'self' data: https: https://s.cachy.app; media-src 'self' blob: https:; font-src 'self' data:; object-src 'none'; base-uri 'self'; frame-src 'self' https://space.cachy.app https://s.cachy.app https: blob: data:; frame-ancestors 'self'; connect-src 'self' https://s.cachy.app https://bam.nr-data.net https://bam.eu01.nr-data.net wss://fapi.bitunix.com${EXTRA_CONNECT_SRC} wss://stream.bitunix.com wss://ws.bitget.com https://api.imgbb.com https://discord.com https://generativelanguage.googleapis.com https://api.openai.com`);
   return response;
 };
 
-export const handle = sequence(loggingHandler, headersHandler, themeHandler);
+export const handle = sequence(loggingHandler, headersHandler, themeHandler, fontPreloadHandler);
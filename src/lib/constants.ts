@@ -587,8 +587,10 @@ export const CONSTANTS = {
   DEFAULT_LEVERAGE: "10",
   DEFAULT_FEES: "0.0140",
   DEFAULT_ATR_MULTIPLIER: "1.2",
-  BITUNIX_WS_PUBLIC_URL: "wss://fapi.bitunix.com/public/",
-  BITUNIX_WS_PRIVATE_URL: "wss://fapi.bitunix.com/private/",
+  // Build-time overrides point both streams at the paper exchange
+  // (scripts/perf/paper_exchange.py) for offline order-flow tests.
+  BITUNIX_WS_PUBLIC_URL: import.meta.env.VITE_BITUNIX_WS_PUBLIC_URL || "wss://fapi.bitunix.com/public/",
+  BITUNIX_WS_PRIVATE_URL: import.meta.env.VITE_BITUNIX_WS_PRIVATE_URL || "wss://fapi.bitunix.com/private/",
 };
 
 export const themes = [
@@ -0,0 +1,79 @@
+// @vitest-environment node
+/*
+ * Copyright (C) 2026 MYDCT
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <https://www.gnu.org/licenses/>.
+ */
+
+import { describe, it, expect, vi, beforeEach, afterEach } from "vitest";
+import { BITUNIX_DEFAULT_API_URL, bitunixApiUrl, isAllowedApiUrl } from "./bitunixEndpoint";
+
+const mockEnv = vi.hoisted(() => ({
+  BITUNIX_API_URL: undefined as string | undefined
+}));
+
+vi.mock("$env/dynamic/private", () => ({
+  env: mockEnv
+}));
+
+describe("bitunixApiUrl", () => {
+  const originalNodeEnv = process.env.NODE_ENV;
+
+  beforeEach(() => {
+    mockEnv.BITUNIX_API_URL = undefined;
+    process.env.NODE_ENV = "development";
+  });
+
+  afterEach(() => {
+    process.env.NODE_ENV = originalNodeEnv;
+  });
+
+  it("defaults to the Bitunix API", () => {
+    expect(bitunixApiUrl()).toBe(BITUNIX_DEFAULT_API_URL);
+  });
+
+  it("uses a loopback paper exchange outside production", () => {
+    mockEnv.BITUNIX_API_URL = "http://127.0.0.1:8790/";
+    expect(bitunixApiUrl()).toBe("http://127.0.0.1:8790");
+  });
+
+  it("ignores the override in production", () => {
+    mockEnv.BITUNIX_API_URL = "http://127.0.0.1:8790";
+    process.env.NODE_ENV = "production";
+    expect(bitunixApiUrl()).toBe(BITUNIX_DEFAULT_API_URL);
+  });
+
+  it("throws instead of signing requests for a rejected URL", () => {
+    mockEnv.BITUNIX_API_URL = "http://paper.example.com";
+    expect(() => bitunixApiUrl()).toThrow(/BITUNIX_API_URL/);
+  });
+});
+
+describe("isAllowedApiUrl", () => {
+  it("accepts https and plain http to this machine only", () => {
+    expect(isAllowedApiUrl("https://fapi.bitunix.com")).toBe(true);
+    expect(isAllowedApiUrl("http://127.0.0.1:8790")).toBe(true);
+    expect(isAllowedApiUrl("http://localhost:8790")).toBe(true);
+    expect(isAllowedApiUrl("http://[::1]:8790")).toBe(true);
+  });
+
+  it("rejects plain http elsewhere, other schemes and malformed URLs", () => {
+    expect(isAllowedApiUrl("http://fapi.bitunix.com")).toBe(false);
+    expect(isAllowedApiUrl("http://127.0.0.1.evil.example:8790")).toBe(false);
+    expect(isAllowedApiUrl("ws://127.0.0.1:8790")).toBe(false);
+    expect(isAllowedApiUrl("file:///etc/passwd")).toBe(false);
+    expect(isAllowedApiUrl("127.0.0.1:8790")).toBe(false);
+    expect(isAllowedApiUrl("")).toBe(false);
+  });
+});
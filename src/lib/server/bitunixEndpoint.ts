@@ -0,0 +1,74 @@
+/*
+ * Copyright (C) 2026 MYDCT
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <https://www.gnu.org/licenses/>.
+ */
+
+import { env } from "$env/dynamic/private";
+import { logger } from "./logger";
+
+export const BITUNIX_DEFAULT_API_URL = "https://fapi.bitunix.com";
+
+const LOOPBACK_HOSTS = ["127.0.0.1", "localhost", "[::1]"];
+
+/**
+ * HTTPS only, except plain http:// to this machine, where the paper exchange
+ * runs without TLS. Mirrors `isAllowedWsUrl` in src/services/bitunixWs.ts:
+ * the signed routes send the user's API key and signatures to this origin.
+ */
+export function isAllowedApiUrl(url: string): boolean {
+  let parsed: URL;
+  try {
+    parsed = new URL(url);
+  } catch {
+    return false;
+  }
+  if (parsed.protocol === "https:") return true;
+  return parsed.protocol === "http:" && LOOPBACK_HOSTS.includes(parsed.hostname);
+}
+
+let warnedProduction = false;
+
+/**
+ * Origin of the Bitunix futures REST API that the signed routes (orders,
+ * TP/SL, positions, account, balance, sync, leverage/margin mode) call.
+ *
+ * `BITUNIX_API_URL` points them at another server speaking the same API,
+ * in practice the paper exchange in scripts/perf/paper_exchange.py, so the
+ * order paths can be load-tested offline. Public market-data routes stay on
+ * the real exchange, which the stand-in does not replace.
+ *
+ * The override is ignored when `NODE_ENV` is `production`. Outside it, a URL
+ * that `isAllowedApiUrl` rejects throws rather than falling back, so a typo
+ * cannot send a load test's orders to the real exchange either.
+ *
+ * Read per call: `$env/dynamic/private` is only populated at runtime.
+ */
+export function bitunixApiUrl(): string {
+  const override = env.BITUNIX_API_URL;
+  if (!override) return BITUNIX_DEFAULT_API_URL;
+  if (process.env.NODE_ENV === "production") {
+    if (!warnedProduction) {
+      warnedProduction = true;
+      logger.warn("BITUNIX_API_URL is ignored in production; using the Bitunix API.");
+    }
+    return BITUNIX_DEFAULT_API_URL;
+  }
+  if (!isAllowedApiUrl(override)) {
+    throw new Error(
+      "BITUNIX_API_URL must be an https:// URL, or http:// to 127.0.0.1/localhost",
+    );
+  }
+  return override.replace(/\/+$/, "");
+}
@@ -84,4 +84,63 @@ describe("issueToken / checkClientToken", () => {
     expect(overLimit).not.toBeNull();
     expect(overLimit?.status).toBe(429);
   });
+
+  it("takes the per-token ceiling from CLIENT_RATE_LIMIT_PER_MINUTE outside production", () => {
+    process.env.CLIENT_RATE_LIMIT_PER_MINUTE = "400";
+    try {
+      _resetForTests();
+      const token = issueToken();
+      for (let i = 0; i < 400; i++) {
+        expect(checkClientToken(requestWithToken(token), `10.1.${i % 250}.${i}`)).toBeNull();
+      }
+      expect(checkClientToken(requestWithToken(token), "10.1.0.99")?.status).toBe(429);
+    } finally {
+      delete process.env.CLIENT_RATE_LIMIT_PER_MINUTE;
+      _resetForTests();
+    }
+  });
+
+  it("keeps the per-IP ceiling independent of the per-token one", () => {
+    process.env.CLIENT_RATE_LIMIT_PER_MINUTE = "100000";
+    try {
+      _resetForTests();
+      const token = issueToken();
+      for (let i = 0; i < 600; i++) {
+        expect(checkClientToken(requestWithToken(token), "7.7.7.7")).toBeNull();
+      }
+      expect(checkClientToken(requestWithToken(token), "7.7.7.7")?.status).toBe(429);
+
+      process.env.CLIENT_RATE_LIMIT_PER_IP_PER_MINUTE = "1000";
+      _resetForTests();
+      const again = issueToken();
+      for (let i = 0; i < 1000; i++) {
+        expect(checkClientToken(requestWithToken(again), "7.7.7.7")).toBeNull();
+      }
+      expect(checkClientToken(requestWithToken(again), "7.7.7.7")?.status).toBe(429);
+    } finally {
+      delete process.env.CLIENT_RATE_LIMIT_PER_MINUTE;
+      delete process.env.CLIENT_RATE_LIMIT_PER_IP_PER_MINUTE;
+      _resetForTests();
+    }
+  });
+
+  it("ignores the configured ceilings in production", () => {
+    const originalNodeEnv = process.env.NODE_ENV;
+    process.env.NODE_ENV = "production";
+    process.env.CLIENT_RATE_LIMIT_PER_MINUTE = "100000";
+    process.env.CLIENT_RATE_LIMIT_PER_IP_PER_MINUTE = "100000";
+    try {
+      _resetForTests();
+      const token = issueToken();
+      for (let i = 0; i < 300; i++) {
+        expect(checkClientToken(requestWithToken(token), `10.2.${i % 250}.${i}`)).toBeNull();
+      }
+      expect(checkClientToken(requestWithToken(token), "10.2.0.99")?.status).toBe(429);
+    } finally {
+      process.env.NODE_ENV = originalNodeEnv;
+      delete process.env.CLIENT_RATE_LIMIT_PER_MINUTE;
+      delete process.env.CLIENT_RATE_LIMIT_PER_IP_PER_MINUTE;
+      _resetForTests();
+    }
+  });
 });
@@ -15,9 +15,10 @@
  * along with this program.  If not, see <https://www.gnu.org/licenses/>.
  */
 
+import { env } from "$env/dynamic/private";
 import { json } from "@sveltejs/kit";
 import crypto from "node:crypto";
-import { createRateLimiter } from "./rateLimit";
+import { createRateLimiter, type RateLimiter } from "./rateLimit";
 
 /**
  * Self-service, anonymous client tokens (BUG-0052), replacing the single
@@ -59,11 +60,42 @@ export function issueToken(): string {
 // market data, AI proxies). Abuse protection, not a cost gate — /api/sentiment
 // and the AI proxies are BYOK-only, so a token can never spend the operator's
 // money, only its own rate-limit budget.
-const perTokenLimiter = createRateLimiter({ windowMs: 60_000, max: 300 });
+const DEFAULT_PER_TOKEN_MAX = 300;
 
 // Per-IP, summed across all of that IP's tokens: catches a single actor
 // minting many tokens to route around the per-token ceiling above.
-const perIpLimiter = createRateLimiter({ windowMs: 60_000, max: 600 });
+const DEFAULT_PER_IP_MAX = 2 * DEFAULT_PER_TOKEN_MAX;
+
+/**
+ * A per-minute ceiling from the environment, for order-flow load tests
+ * against the paper exchange (scripts/perf/paper_exchange.py), which send
+ * hundreds of orders a second from one client. Ignored in production, so a
+ * stray value cannot switch off the abuse protection there. Read on first
+ * use, since `$env/dynamic/private` is only populated at runtime.
+ */
+function configuredMax(value: string | undefined, fallback: number): number {
+  if (process.env.NODE_ENV === "production") return fallback;
+  const configured = Number(value);
+  return Number.isFinite(configured) && configured > 0 ? configured : fallback;
+}
+
+let limiters: { perToken: RateLimiter; perIp: RateLimiter } | null = null;
+
+function getLimiters() {
+  if (!limiters) {
+    limiters = {
+      perToken: createRateLimiter({
+        windowMs: 60_000,
+        max: configuredMax(env.CLIENT_RATE_LIMIT_PER_MINUTE, DEFAULT_PER_TOKEN_MAX),
+      }),
+      perIp: createRateLimiter({
+        windowMs: 60_000,
+        max: configuredMax(env.CLIENT_RATE_LIMIT_PER_IP_PER_MINUTE, DEFAULT_PER_IP_MAX),
+      }),
+    };
+  }
+  return limiters;
+}
 
 function unauthorized(): Response {
   return json(
@@ -92,8 +124,9 @@ export function checkClientToken(request: Request, clientAddress: string): Respo
   const record = tokens.get(hash);
   if (!record) return unauthorized();
 
-  if (!perIpLimiter.consume(clientAddress)) return rateLimited();
-  if (!perTokenLimiter.consume(hash)) return rateLimited();
+  const { perToken, perIp } = getLimiters();
+  if (!perIp.consume(clientAddress)) return rateLimited();
+  if (!perToken.consume(hash)) return rateLimited();
 
   record.requestCount += 1;
   record.lastSeenAt = Date.now();
@@ -101,9 +134,8 @@ export function checkClientToken(request: Request, clientAddress: string): Respo
   return null;
 }
 
-/** Test-only escape hatch: drops all issued tokens and rate-limit state. */
+/** Test-only escape hatch: drops all issued tokens and rate-limit state, and rereads the ceilings. */
 export function _resetForTests(): void {
   tokens.clear();
-  perTokenLimiter.clear();
-  perIpLimiter.clear();
+  limiters = null;
 }
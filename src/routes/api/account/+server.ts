@@ -28,6 +28,7 @@ import {
 import { Decimal } from "decimal.js";
 import { formatApiNum } from "../../../utils/utils";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import { safeJsonParse } from "../../../utils/safeJson";
 import { AccountRequestSchema } from "../../../types/accountSchemas";
 import { logger } from "$lib/server/logger";
@@ -112,7 +113,7 @@ async function fetchBitunixAccount(
   apiKey: string,
   apiSecret: string,
 ): Promise<ExchangeAccountData> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/account";
 
   const params: Record<string, string> = {
@@ -19,6 +19,7 @@ import { json } from "@sveltejs/kit";
 import type { RequestHandler } from "./$types";
 import { createHash, randomBytes } from "crypto";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import { generateBitgetSignature } from "../../../utils/server/bitget";
 import { Decimal } from "decimal.js";
 import { formatApiNum } from "../../../utils/utils";
@@ -60,7 +61,7 @@ async function fetchBitunixBalance(
   apiKey: string,
   apiSecret: string,
 ): Promise<string> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/account";
 
   // Params for the request
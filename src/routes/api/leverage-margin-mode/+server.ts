@@ -20,6 +20,7 @@ import { z } from "zod";
 import { generateBitunixSignature, validateBitunixKeys } from "../../../utils/server/bitunix";
 import { extractApiCredentials } from "../../../utils/server/requestUtils";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import { safeJsonParse } from "../../../utils/safeJson";
 import { BaseRequestSchema } from "../../../types/orderSchemas";
 import { jsonSuccess, jsonError, handleApiError } from "../../../utils/apiResponse";
@@ -85,7 +86,7 @@ async function fetchLeverageMarginMode(
   symbol: string,
   marginCoin: string,
 ): Promise<LeverageMarginModeData> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/account/get_leverage_margin_mode";
 
   const params: Record<string, string> = { symbol, marginCoin };
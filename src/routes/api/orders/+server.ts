@@ -33,6 +33,7 @@ import { OrderRequestSchema } from "../../../types/orderSchemas";
 import { Decimal } from "decimal.js";
 import { safeJsonParse } from "../../../utils/safeJson";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import { logger } from "$lib/server/logger";
 
 // Raw fields read off Bitget's current/history order list responses. The
@@ -290,7 +291,7 @@ export const POST: RequestHandler = async ({ request, getClientAddress }) => {
 // --- Bitunix Helpers ---
 
 async function cancelBitunixOrder(apiKey: string, apiSecret: string, symbol: string, orderId: string) {
-    const baseUrl = "https://fapi.bitunix.com";
+    const baseUrl = bitunixApiUrl();
     const path = "/api/v1/futures/trade/cancel_orders";
 
     const payload = { symbol, orderList: [{ orderId }] };
@@ -329,7 +330,7 @@ async function cancelBitunixOrder(apiKey: string, apiSecret: string, symbol: str
 }
 
 async function cancelAllBitunixOrders(apiKey: string, apiSecret: string, symbol?: string) {
-    const baseUrl = "https://fapi.bitunix.com";
+    const baseUrl = bitunixApiUrl();
     const path = "/api/v1/futures/trade/cancel_all_orders";
 
     const payload: Record<string, string> = {};
@@ -368,7 +369,7 @@ async function cancelAllBitunixOrders(apiKey: string, apiSecret: string, symbol?
 }
 
 async function closeAllBitunixPositions(apiKey: string, apiSecret: string, symbol?: string) {
-    const baseUrl = "https://fapi.bitunix.com";
+    const baseUrl = bitunixApiUrl();
     const path = "/api/v1/futures/trade/close_all_position";
 
     const payload: Record<string, string> = {};
@@ -401,7 +402,7 @@ async function closeAllBitunixPositions(apiKey: string, apiSecret: string, symbo
 }
 
 async function flashCloseBitunixPosition(apiKey: string, apiSecret: string, positionId: string) {
-    const baseUrl = "https://fapi.bitunix.com";
+    const baseUrl = bitunixApiUrl();
     const path = "/api/v1/futures/trade/flash_close_position";
 
     const payload = { positionId };
@@ -437,7 +438,7 @@ async function fetchBitunixOrderDetail(
     orderId?: string,
     clientId?: string,
 ): Promise<NormalizedOrder> {
-    const baseUrl = "https://fapi.bitunix.com";
+    const baseUrl = bitunixApiUrl();
     const path = "/api/v1/futures/trade/get_order_detail";
 
     const params: Record<string, string> = {};
@@ -513,7 +514,7 @@ async function modifyBitunixOrder(
         slOrderPrice?: string;
     },
 ) {
-    const baseUrl = "https://fapi.bitunix.com";
+    const baseUrl = bitunixApiUrl();
     const path = "/api/v1/futures/trade/modify_order";
 
     const body: Record<string, unknown> = {
@@ -564,7 +565,7 @@ async function placeBitunixOrder(
   apiSecret: string,
   orderData: BitunixOrderPayload,
 ): Promise<BitunixOrder> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/trade/place_order";
 
   const safeQty = formatApiNum(orderData.qty);
@@ -666,7 +667,7 @@ async function placeBitunixOrder(
 }
 
 async function fetchBitunixPendingOrders(apiKey: string, apiSecret: string): Promise<NormalizedOrder[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/trade/get_pending_orders";
   const { nonce, timestamp, signature } = generateBitunixSignature(apiKey, apiSecret, {}, "");
 
@@ -759,7 +760,7 @@ async function fetchBitunixHistoryOrders(
   endTime?: number,
   symbol?: string
 ): Promise<NormalizedOrder[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/trade/get_history_orders";
   // Bitunix's own split: queryCanceled=false returns everything except
   // CANCELED (up to 90 days back); true returns ONLY CANCELED (up to 3 days
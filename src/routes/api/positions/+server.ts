@@ -19,6 +19,7 @@ import { extractApiCredentials } from "../../../utils/server/requestUtils";
 import type { RequestHandler } from "./$types";
 import { createHash, randomBytes } from "crypto";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import { generateBitgetSignature } from "../../../utils/server/bitget";
 import { formatApiNum } from "../../../utils/utils";
 import { BaseRequestSchema } from "../../../types/orderSchemas";
@@ -122,7 +123,7 @@ async function fetchBitunixPositions(
   apiKey: string,
   apiSecret: string,
 ): Promise<NormalizedPosition[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/position/get_pending_positions";
 
   // Params for the request
@@ -19,6 +19,7 @@ import { json } from "@sveltejs/kit";
 import type { RequestHandler } from "./$types";
 import { z } from "zod";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import {
   generateBitunixSignature,
   validateBitunixKeys,
@@ -89,7 +90,7 @@ async function fetchBitunixHistory(
   endTime?: number,
   limit: number = 50,
 ): Promise<Record<string, unknown>[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/trade/get_history_trades";
 
   // Params for the request
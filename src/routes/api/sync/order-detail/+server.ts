@@ -20,6 +20,7 @@ import type { RequestHandler } from "./$types";
 import { createHash, randomBytes } from "crypto";
 import { z } from "zod";
 import { checkClientToken } from "../../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../../lib/server/bitunixEndpoint";
 import { readExchangeJson } from "../../../../utils/server/exchangeResponse";
 
 const RequestSchema = z.object({
@@ -69,7 +70,7 @@ async function fetchBitunixOrderDetail(
   apiSecret: string,
   orderId: string,
 ): Promise<unknown> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/trade/get_order_detail";
 
   // Params for the request
@@ -19,6 +19,7 @@ import { json } from "@sveltejs/kit";
 import type { RequestHandler } from "./$types";
 import { generateBitunixSignature } from "../../../../utils/server/bitunix";
 import { checkClientToken } from "../../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../../lib/server/bitunixEndpoint";
 import type { BitunixOrder } from "../../../../types/bitunix";
 import { z } from "zod";
 import { sanitizeErrorMessage } from "../../../../types/apiSchemas";
@@ -209,7 +210,7 @@ async function fetchBitunixData(
   limit: number = 100,
   endTime?: number,
 ): Promise<BitunixOrder[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
 
   // Params for the request
   const params: Record<string, string> = {
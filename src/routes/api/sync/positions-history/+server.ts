@@ -20,6 +20,7 @@ import type { RequestHandler } from "./$types";
 import { generateBitunixSignature } from "../../../../utils/server/bitunix";
 import { z } from "zod";
 import { checkClientToken } from "../../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../../lib/server/bitunixEndpoint";
 import { sanitizeErrorMessage } from "../../../../types/apiSchemas";
 import { readExchangeJson } from "../../../../utils/server/exchangeResponse";
 
@@ -82,7 +83,7 @@ async function fetchBitunixHistoryPositions(
   apiSecret: string,
   limit: number = 50,
 ): Promise<unknown[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/position/get_history_positions";
 
   // Params for the request
@@ -20,6 +20,7 @@ import { json } from "@sveltejs/kit";
 import type { RequestHandler } from "./$types";
 import { createHash, randomBytes } from "crypto";
 import { checkClientToken } from "../../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../../lib/server/bitunixEndpoint";
 import { z } from "zod";
 import { readExchangeJson } from "../../../../utils/server/exchangeResponse";
 
@@ -78,7 +79,7 @@ async function fetchBitunixPendingPositions(
   apiKey: string,
   apiSecret: string,
 ): Promise<unknown[]> {
-  const baseUrl = "https://fapi.bitunix.com";
+  const baseUrl = bitunixApiUrl();
   const path = "/api/v1/futures/position/get_pending_positions";
 
   // Params for the request (empty for all pending positions)
@@ -23,12 +23,11 @@ import {
   validateBitunixKeys,
 } from "../../../utils/server/bitunix";
 import { checkClientToken } from "../../../lib/server/clientToken";
+import { bitunixApiUrl } from "../../../lib/server/bitunixEndpoint";
 import { TpSlRequestSchema, sanitizeErrorMessage } from "../../../types/apiSchemas";
 import { safeJsonParse } from "../../../utils/safeJson";
 import { readExchangeJson } from "../../../utils/server/exchangeResponse";
 
-const BASE_URL = "https://fapi.bitunix.com";
-
 export const POST: RequestHandler = async ({ request, getClientAddress }) => {
   const authError = checkClientToken(request, getClientAddress());
   if (authError) return authError;
@@ -168,8 +167,8 @@ async function fetchBitunixTpSl(
 
   // Only append ? if there are query params
   const url = queryString
-    ? `${BASE_URL}${path}?${queryString}`
-    : `${BASE_URL}${path}`;
+    ? `${bitunixApiUrl()}${path}?${queryString}`
+    : `${bitunixApiUrl()}${path}`;
 
   const response = await fetch(url, {
     method: "GET",
@@ -223,7 +222,7 @@ async function executeBitunixAction(
     cleanPayload,
   );
 
-  const url = `${BASE_URL}${path}`;
+  const url = `${bitunixApiUrl()}${path}`;
 
   const response = await fetch(url, {
     method: "POST",
@@ -103,4 +103,19 @@ describe("POST /api/tpsl uses the real Bitunix endpoints", () => {
     expect(url).toBe("https://fapi.bitunix.com/api/v1/futures/tpsl/modify_order");
     expect(options.method).toBe("POST");
   });
+
+  it("goes to BITUNIX_API_URL instead when it is set (the paper exchange)", async () => {
+    process.env.BITUNIX_API_URL = "http://127.0.0.1:8790/";
+    try {
+      await POST({
+        request: makeRequest({ exchange: "bitunix", action: "pending", params: {}, ...creds }),
+        getClientAddress,
+      } as unknown as Parameters<typeof POST>[0]);
+    } finally {
+      delete process.env.BITUNIX_API_URL;
+    }
+
+    const [url] = fetchMock.mock.calls[0];
+    expect(url).toBe("http://127.0.0.1:8790/api/v1/futures/tpsl/get_pending_orders");
+  });
 });
@@ -35,11 +35,31 @@ const ASSETS = [
   ...files, // everything in `static`
 ];
 
+// Written by scripts/perf/static_assets.py. When it exists, install only
+// precaches the build plus the static files it lists; everything else in
+// `static` (screenshots, PDFs, unused fonts) is cached on first use instead
+// of being downloaded up front.
+const STATIC_MANIFEST = "/_opt/manifest.json";
+
+async function precacheList(): Promise<string[]> {
+  if (!files.includes(STATIC_MANIFEST)) return ASSETS;
+  try {
+    const response = await fetch(STATIC_MANIFEST);
+    const manifest = response.ok ? await response.json() : null;
+    if (Array.isArray(manifest?.precache)) {
+      return [...build, ...manifest.precache.filter((url: string) => files.includes(url))];
+    }
+  } catch (err) {
+    console.warn("Static asset manifest unavailable, precaching all of static/:", err);
+  }
+  return ASSETS;
+}
+
 self.addEventListener("install", (event) => {
-  // Create a new cache and add all files to it
+  // Create a new cache and add the precached files to it
   async function addFilesToCache() {
     const cache = await caches.open(CACHE);
-    await cache.addAll(ASSETS);
+    await cache.addAll(await precacheList());
   }
 
   (event as ExtendableEvent).waitUntil(addFilesToCache());
@@ -17,6 +17,8 @@
 
 import { parseMessage } from "./bitunixWs/messageParser";
 import { dispatchMessage } from "./bitunixWs/channelDispatch";
+import { isAllowedWsUrl } from "./bitunixWs/wsUrl";
+export { isAllowedWsUrl } from "./bitunixWs/wsUrl";
 import { marketState } from "../stores/market.svelte";
 
 
@@ -351,7 +353,7 @@ class BitunixWebSocketService {
     if (this.isDestroyed || !settingsState.entitlement.capabilities.marketData) return;
 
     // HARDENING: Enforce WSS
-    if (!WS_PUBLIC_URL.startsWith("wss://")) {
+    if (!isAllowedWsUrl(WS_PUBLIC_URL)) {
         logger.error("network", "[BitunixWS] Insecure WebSocket URL detected (Public). Aborting connection.");
         return;
     }
@@ -489,7 +491,7 @@ class BitunixWebSocketService {
     if (this.isDestroyed) return;
 
     // HARDENING: Enforce WSS
-    if (!WS_PRIVATE_URL.startsWith("wss://")) {
+    if (!isAllowedWsUrl(WS_PRIVATE_URL)) {
         logger.error("network", "[BitunixWS] Insecure WebSocket URL detected (Private). Aborting connection.");
         return;
     }
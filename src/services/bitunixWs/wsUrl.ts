@@ -0,0 +1,47 @@
+/*
+ * Copyright (C) 2026 MYDCT
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the
+ * License, or (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <https://www.gnu.org/licenses/>.
+ */
+
+/**
+ * WSS only, except plain ws:// to this machine: the paper exchange
+ * (scripts/perf/paper_exchange.py) the URLs can be pointed at for offline
+ * order-flow tests has no TLS.
+ */
+export function isAllowedWsUrl(url: string): boolean {
+  if (url.startsWith("wss://")) return true;
+  if (!url.startsWith("ws://")) return false;
+  try {
+    return ["127.0.0.1", "localhost", "[::1]"].includes(new URL(url).hostname);
+  } catch {
+    return false;
+  }
+}
+
+/**
+ * Origin of the stream URL in the build-time variable `name`, for the CSP's
+ * connect-src. Throws an error naming the variable when `isAllowedWsUrl`
+ * rejects the URL or it does not parse.
+ */
+export function wsUrlOrigin(name: string, url: string): string {
+  if (isAllowedWsUrl(url)) {
+    try {
+      return new URL(url).origin;
+    } catch {
+      // Reported below.
+    }
+  }
+  throw new Error(`${name} must be a wss:// URL, or ws:// to 127.0.0.1/localhost (got "${url}")`);
+}
@@ -16,7 +16,8 @@
  */
 
 import { describe, it, expect } from 'vitest';
-import { isTradeData } from './bitunixWs';
+import { isAllowedWsUrl, isTradeData } from './bitunixWs';
+import { wsUrlOrigin } from './bitunixWs/wsUrl';
 
 describe('BitunixWs Type Guards Hardening', () => {
     it('should reject trade with null values for "p"', () => {
@@ -29,3 +30,20 @@ describe('BitunixWs Type Guards Hardening', () => {
         expect(isTradeData(unsafe)).toBe(false);
     });
 });
+
+describe('BitunixWs URL hardening', () => {
+    it('accepts wss:// anywhere and ws:// only to this machine', () => {
+        expect(isAllowedWsUrl('wss://fapi.bitunix.com/private/')).toBe(true);
+        expect(isAllowedWsUrl('ws://127.0.0.1:8790/private/')).toBe(true);
+        expect(isAllowedWsUrl('ws://localhost:8790/public/')).toBe(true);
+        expect(isAllowedWsUrl('ws://fapi.bitunix.com/private/')).toBe(false);
+        expect(isAllowedWsUrl('ws://127.0.0.1.evil.example/private/')).toBe(false);
+        expect(isAllowedWsUrl('https://fapi.bitunix.com/')).toBe(false);
+    });
+
+    it('names the variable when a stream URL is malformed or disallowed', () => {
+        expect(wsUrlOrigin('VITE_BITUNIX_WS_PRIVATE_URL', 'ws://127.0.0.1:8790/private/')).toBe('ws://127.0.0.1:8790');
+        expect(() => wsUrlOrigin('VITE_BITUNIX_WS_PUBLIC_URL', 'wss://')).toThrow(/VITE_BITUNIX_WS_PUBLIC_URL/);
+        expect(() => wsUrlOrigin('VITE_BITUNIX_WS_PUBLIC_URL', 'ws://paper.example/public/')).toThrow(/VITE_BITUNIX_WS_PUBLIC_URL/);
+    });
+});
@@ -17,6 +17,37 @@
 
 import adapter from "@sveltejs/adapter-node";
 import { vitePreprocess } from "@sveltejs/vite-plugin-svelte";
+import { loadEnv } from "vite";
+
+// The build-time VITE_BITUNIX_WS_*_URL overrides point the Bitunix streams at
+// the paper exchange (see .env.example); their origins must be allowed to
+// connect. Empty in a normal build. Same rule as isAllowedWsUrl in
+// src/services/bitunixWs/wsUrl.ts: wss://, or ws:// to this machine.
+const bitunixWsOverrides = loadEnv(process.env.NODE_ENV ?? "development", process.cwd(), "VITE_BITUNIX_WS_");
+
+/** @param {string} name @param {string} url */
+function wsOrigin(name, url) {
+  try {
+    const parsed = new URL(url);
+    if (
+      parsed.protocol === "wss:" ||
+      (parsed.protocol === "ws:" && ["127.0.0.1", "localhost", "[::1]"].includes(parsed.hostname))
+    ) {
+      return parsed.origin;
+    }
+  } catch {
+    // Reported below.
+  }
+  throw new Error(`${name} must be a wss:// URL, or ws:// to 127.0.0.1/localhost (got "${url}")`);
+}
+
+const extraConnectSrc = [
+  ...new Set(
+    Object.entries(bitunixWsOverrides)
+      .filter(([, url]) => url)
+      .map(([name, url]) => wsOrigin(name, url)),
+  ),
+];
 
 /** @type {import('@sveltejs/kit').Config} */
 const config = {
@@ -28,7 +59,9 @@ const config = {
     // adapter-auto only supports some environments, see https://svelte.dev/docs/kit/adapter-auto for a list.
     // If your environment is not supported, or you settled on a specific environment, switch out the adapter.
     // See https://svelte.dev/docs/kit/adapters for more information about adapters.
-    adapter: adapter(),
+    // Writes .br/.gz next to the build output and static/ files and serves
+    // them to clients that accept them.
+    adapter: adapter({ precompress: true }),
     csp: {
       mode: "auto",
       directives: {
@@ -76,6 +109,7 @@ const config = {
           "https://bam.nr-data.net",
           "https://bam.eu01.nr-data.net",
           "wss://fapi.bitunix.com",
+          ...extraConnectSrc,
           "wss://stream.bitunix.com",
           "wss://ws.bitget.com",
           "https://api.imgbb.com",
@@ -2122,3 +2122,5 @@ mod tests {
 pub mod alert_engine;
 pub mod alert_engine_tests;
 pub mod alert_exports;
+#[cfg(not(target_arch = "wasm32"))]
+pub mod native_exports;
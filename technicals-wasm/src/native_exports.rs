@@ -0,0 +1,292 @@
+/*
+ * Copyright (C) 2026 MYDCT
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <https://www.gnu.org/licenses/>.
+ */
+
+//! C ABI for native builds of this crate.
+//!
+//! The browser drives `TechnicalsCalculator` through wasm-bindgen. Offline
+//! tools (`scripts/brain/scanner.py`, `scripts/brain/alert_backtest.py`) load the same crate as a shared library
+//! built with a plain `cargo build --release` and call these functions through
+//! `ctypes`, so a scan computes exactly what the Technicals panel shows and a
+//! backtest fires exactly the alerts the app would.
+//!
+//! Only compiled for non-wasm targets; nothing here ships to the browser.
+
+use crate::alert_engine::{AlertDefinition, AlertEngine};
+use crate::TechnicalsCalculator;
+use rust_decimal::Decimal;
+use std::ffi::{CStr, CString};
+use std::os::raw::c_char;
+use std::panic::{catch_unwind, AssertUnwindSafe};
+use std::slice;
+use std::str::FromStr;
+
+/// `f64` to the decimal string the JS side would send for the same number.
+/// Rust's `Display` for `f64` is the shortest round-trip representation, as is
+/// JS `String(number)`, so both boundaries hand rust_decimal the same text.
+fn to_decimal_strings(values: &[f64]) -> Vec<String> {
+    values.iter().map(|v| format!("{}", v)).collect()
+}
+
+/// Replay a series bar by bar, the way a live chart sees it.
+///
+/// The calculator is seeded with the first `warmup` bars; every later bar is
+/// first evaluated with `update` (the reading the panel shows while that bar
+/// forms) and then committed with `shift`. The result is a JSON array with one
+/// `update` output per replayed bar, oldest first.
+///
+/// Returns null for invalid arguments or if the calculator panicked. A
+/// non-null result must be released with `technicals_free_string`.
+///
+/// # Safety
+/// Every price pointer must reference `len` readable `f64` values and
+/// `settings_json` must be a NUL-terminated UTF-8 string.
+#[no_mangle]
+pub unsafe extern "C" fn technicals_replay(
+    opens: *const f64,
+    highs: *const f64,
+    lows: *const f64,
+    closes: *const f64,
+    volumes: *const f64,
+    times: *const f64,
+    len: usize,
+    warmup: usize,
+    settings_json: *const c_char,
+) -> *mut c_char {
+    if opens.is_null()
+        || highs.is_null()
+        || lows.is_null()
+        || closes.is_null()
+        || volumes.is_null()
+        || times.is_null()
+        || settings_json.is_null()
+        || warmup == 0
+        || warmup > len
+    {
+        return std::ptr::null_mut();
+    }
+
+    let opens = slice::from_raw_parts(opens, len);
+    let highs = slice::from_raw_parts(highs, len);
+    let lows = slice::from_raw_parts(lows, len);
+    let closes = slice::from_raw_parts(closes, len);
+    let volumes = slice::from_raw_parts(volumes, len);
+    let times = slice::from_raw_parts(times, len);
+    let settings = match CStr::from_ptr(settings_json).to_str() {
+        Ok(s) => s.to_owned(),
+        Err(_) => return std::ptr::null_mut(),
+    };
+
+    let result = catch_unwind(AssertUnwindSafe(|| {
+        let mut calc = TechnicalsCalculator::new();
+        calc.initialize(
+            to_decimal_strings(&closes[..warmup]),
+            to_decimal_strings(&highs[..warmup]),
+            to_decimal_strings(&lows[..warmup]),
+            to_decimal_strings(&volumes[..warmup]),
+            &times[..warmup],
+            &settings,
+        );
+
+        let mut out = String::with_capacity((len - warmup) * 256 + 2);
+        out.push('[');
+        for i in warmup..len {
+            let bar = (
+                format!("{}", opens[i]),
+                format!("{}", highs[i]),
+                format!("{}", lows[i]),
+                format!("{}", closes[i]),
+                format!("{}", volumes[i]),
+                format!("{}", times[i]),
+            );
+            if i > warmup {
+                out.push(',');
+            }
+            out.push_str(&calc.update(
+                bar.0.clone(),
+                bar.1.clone(),
+                bar.2.clone(),
+                bar.3.clone(),
+                bar.4.clone(),
+                bar.5.clone(),
+            ));
+            calc.shift(bar.0, bar.1, bar.2, bar.3, bar.4, bar.5);
+        }
+        out.push(']');
+        out
+    }));
+
+    match result {
+        Ok(json) => CString::new(json)
+            .map(CString::into_raw)
+            .unwrap_or(std::ptr::null_mut()),
+        Err(_) => std::ptr::null_mut(),
+    }
+}
+
+/// Feed a price series for one symbol through `AlertEngine::evaluate`.
+///
+/// `alerts_json` is the same `AlertDefinition` array the app passes to
+/// `set_alerts`. Returns the JSON array of every `AlertEvent` in firing order,
+/// or null for invalid arguments or if the engine panicked. Release the
+/// result with `technicals_free_string`.
+///
+/// # Safety
+/// `prices` and `timestamps` must reference `len` readable values; `symbol`
+/// and `alerts_json` must be NUL-terminated UTF-8 strings.
+#[no_mangle]
+pub unsafe extern "C" fn alerts_replay(
+    alerts_json: *const c_char,
+    symbol: *const c_char,
+    prices: *const f64,
+    timestamps: *const i64,
+    len: usize,
+) -> *mut c_char {
+    if alerts_json.is_null() || symbol.is_null() || prices.is_null() || timestamps.is_null() {
+        return std::ptr::null_mut();
+    }
+    let (alerts_json, symbol) = match (
+        CStr::from_ptr(alerts_json).to_str(),
+        CStr::from_ptr(symbol).to_str(),
+    ) {
+        (Ok(a), Ok(s)) => (a, s),
+        _ => return std::ptr::null_mut(),
+    };
+    let alerts: Vec<AlertDefinition> = match serde_json::from_str(alerts_json) {
+        Ok(a) => a,
+        Err(_) => return std::ptr::null_mut(),
+    };
+    let prices = slice::from_raw_parts(prices, len);
+    let timestamps = slice::from_raw_parts(timestamps, len);
+
+    let result = catch_unwind(AssertUnwindSafe(|| {
+        let mut engine = AlertEngine::new();
+        engine.set_alerts(alerts);
+        let mut events = Vec::new();
+        for (price, ts) in prices.iter().zip(timestamps) {
+            // Same path as the app: the price reaches the engine as a decimal string.
+            let price = Decimal::from_str(&format!("{}", price)).ok()?;
+            events.extend(engine.evaluate(symbol, price, *ts));
+        }
+        serde_json::to_string(&events).ok()
+    }));
+
+    match result {
+        Ok(Some(json)) => CString::new(json)
+            .map(CString::into_raw)
+            .unwrap_or(std::ptr::null_mut()),
+        _ => std::ptr::null_mut(),
+    }
+}
+
+/// Release a string returned by this module.
+///
+/// # Safety
+/// `ptr` must come from a function in this module and be freed only once.
+#[no_mangle]
+pub unsafe extern "C" fn technicals_free_string(ptr: *mut c_char) {
+    if !ptr.is_null() {
+        drop(CString::from_raw(ptr));
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn replay_emits_one_reading_per_replayed_bar() {
+        let closes: Vec<f64> = (0..40).map(|i| 100.0 + (i as f64).sin()).collect();
+        let highs: Vec<f64> = closes.iter().map(|c| c + 1.0).collect();
+        let lows: Vec<f64> = closes.iter().map(|c| c - 1.0).collect();
+        let volumes = vec![10.0; 40];
+        let times: Vec<f64> = (0..40).map(|i| i as f64 * 60_000.0).collect();
+        let settings = CString::new(r#"{"rsi":[{"length":14}]}"#).unwrap();
+
+        unsafe {
+            let ptr = technicals_replay(
+                closes.as_ptr(),
+                highs.as_ptr(),
+                lows.as_ptr(),
+                closes.as_ptr(),
+                volumes.as_ptr(),
+                times.as_ptr(),
+                40,
+                30,
+                settings.as_ptr(),
+            );
+            assert!(!ptr.is_null());
+            let json = CStr::from_ptr(ptr).to_str().unwrap().to_owned();
+            technicals_free_string(ptr);
+
+            let readings: Vec<serde_json::Value> = serde_json::from_str(&json).unwrap();
+            assert_eq!(readings.len(), 10);
+            assert!(readings[9]["oscillators"]["RSI14"].is_string());
+        }
+    }
+
+    #[test]
+    fn replay_rejects_a_warmup_longer_than_the_series() {
+        let values = vec![1.0; 5];
+        let settings = CString::new("{}").unwrap();
+        let ptr = unsafe {
+            technicals_replay(
+                values.as_ptr(),
+                values.as_ptr(),
+                values.as_ptr(),
+                values.as_ptr(),
+                values.as_ptr(),
+                values.as_ptr(),
+                5,
+                6,
+                settings.as_ptr(),
+            )
+        };
+        assert!(ptr.is_null());
+    }
+
+    #[test]
+    fn alerts_replay_fires_each_alert_once() {
+        let alerts = CString::new(
+            r#"[{"id":"up","symbol":"BTCUSDT","condition":{"price_cross_up":"100"},"active":true},
+                {"id":"down","symbol":"BTCUSDT","condition":{"price_cross_down":"95"},"active":true}]"#,
+        )
+        .unwrap();
+        let symbol = CString::new("BTCUSDT").unwrap();
+        let prices = [99.0, 101.0, 94.0, 102.0, 90.0];
+        let timestamps = [1i64, 2, 3, 4, 5];
+
+        unsafe {
+            let ptr = alerts_replay(
+                alerts.as_ptr(),
+                symbol.as_ptr(),
+                prices.as_ptr(),
+                timestamps.as_ptr(),
+                prices.len(),
+            );
+            assert!(!ptr.is_null());
+            let json = CStr::from_ptr(ptr).to_str().unwrap().to_owned();
+            technicals_free_string(ptr);
+
+            let events: Vec<serde_json::Value> = serde_json::from_str(&json).unwrap();
+            assert_eq!(events.len(), 2);
+            assert_eq!(events[0]["alert_id"], "up");
+            assert_eq!(events[0]["timestamp"], 2);
+            assert_eq!(events[1]["alert_id"], "down");
+            assert_eq!(events[1]["timestamp"], 3);
+        }
+    }
+}
@@ -0,0 +1,281 @@
+/*
+ * Copyright (C) 2026 MYDCT
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the
+ * License, or (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <https://www.gnu.org/licenses/>.
+ */
+
+/**
+ * Node side of the cross-engine indicator benchmark
+ * (`scripts/brain/indicator_bench.py`).
+ *
+ * The Python suite writes a dataset as raw little-endian float64 columns,
+ * then runs this file through vitest so the JS path gets exactly the module
+ * resolution and TS transform the app's own tests use. Without
+ * `CACHY_BENCH_DATASET` the whole file is skipped — `npm test` never runs it.
+ *
+ * One engine per invocation, so the reported peak RSS belongs to that engine.
+ */
+
+import { describe, it } from 'vitest';
+import * as fs from 'fs';
+import * as path from 'path';
+import { Decimal } from 'decimal.js';
+import { JSIndicators, type Kline } from '../../src/utils/indicators';
+import { StatefulTechnicalsCalculator } from '../../src/utils/statefulTechnicalsCalculator';
+import type { IndicatorSettings } from '../../src/types/indicators';
+
+const DATASET_DIR = process.env.CACHY_BENCH_DATASET;
+const OUT_FILE = process.env.CACHY_BENCH_OUT;
+const ENGINE = process.env.CACHY_BENCH_ENGINE ?? 'wasm';
+const UPDATES = Number(process.env.CACHY_BENCH_UPDATES ?? '1000');
+
+// The same set `DEFAULT_INDICATOR_SET` in scripts/brain/reference_indicators.py
+// computes, in the settings shape the Rust `IndicatorSettings` deserializes.
+const WASM_SETTINGS = {
+    ema: [{ length: 20 }],
+    sma: [{ length: 20 }],
+    rsi: [{ length: 14 }],
+    macd: [{ fast: 12, slow: 26, signal: 9 }],
+    bb: [{ length: 20, std_dev: '2' }],
+    atr: [{ length: 14 }],
+    stoch: [{ k: 14, d: 3, smooth: 3 }],
+    supertrend: [{ length: 10, multiplier: '3' }],
+};
+
+const off = { enabled: false };
+const unsmoothed = { offset: 0, smoothingType: 'none' as const, smoothingLength: 0 };
+
+/**
+ * WASM_SETTINGS in the app's `IndicatorSettings` shape, for the JS engine.
+ * Everything outside the benchmark set is disabled: the calculator computes
+ * every indicator whose settings are missing, which made the JS side do
+ * several times the WASM side's work. Slots the Rust lists do not fill
+ * (`ema2`, `sma3`, ...) get length 0, which the calculator skips.
+ */
+function toIndicatorSettings(w: typeof WASM_SETTINGS): IndicatorSettings {
+    const [ema] = w.ema;
+    const [sma] = w.sma;
+    const [rsi] = w.rsi;
+    const [macd] = w.macd;
+    const [bb] = w.bb;
+    const [atr] = w.atr;
+    const [stoch] = w.stoch;
+    const [supertrend] = w.supertrend;
+    return {
+        historyLimit: JS_UPDATE_HISTORY,
+        precision: 4,
+        autoOptimize: false,
+        preferredEngine: 'ts',
+        performanceMode: 'balanced',
+        panelSections: {
+            summary: true, confluence: false, volatility: true, oscillators: true,
+            movingAverages: true, pivots: false, advanced: false, signals: false,
+        },
+        rsi: {
+            enabled: true, length: rsi.length, source: 'close', showSignal: false, signalType: 'sma',
+            signalLength: rsi.length, overbought: 70, oversold: 30, defaultTimeframe: '1d',
+        },
+        stochRsi: { ...off, length: 14, rsiLength: 14, kPeriod: 3, dPeriod: 3, source: 'close' },
+        macd: {
+            enabled: true, fastLength: macd.fast, slowLength: macd.slow, signalLength: macd.signal,
+            source: 'close', oscillatorMaType: 'ema', signalMaType: 'ema',
+        },
+        stochastic: { enabled: true, kPeriod: stoch.k, kSmoothing: stoch.smooth, dPeriod: stoch.d },
+        williamsR: { ...off, length: 14 },
+        cci: { ...off, length: 20, source: 'hlc3', threshold: 100, smoothingType: 'sma', smoothingLength: 5 },
+        adx: { ...off, adxSmoothing: 14, diLength: 14, threshold: 25 },
+        ao: { ...off, fastLength: 5, slowLength: 34 },
+        momentum: { ...off, length: 10, source: 'close' },
+        ema: {
+            enabled: true,
+            ema1: { length: ema.length, ...unsmoothed },
+            ema2: { length: 0, ...unsmoothed },
+            ema3: { length: 0, ...unsmoothed },
+            source: 'close',
+        },
+        sma: { enabled: true, sma1: { length: sma.length }, sma2: { length: 0 }, sma3: { length: 0 } },
+        wma: { ...off, length: 14 },
+        vwma: { ...off, length: 20 },
+        hma: { ...off, length: 9 },
+        ichimoku: { ...off, conversionPeriod: 9, basePeriod: 26, spanBPeriod: 52, displacement: 26 },
+        pivots: { ...off, type: 'classic', viewMode: 'integrated' },
+        atr: { enabled: true, length: atr.length },
+        // The calculator reads `bollingerBands`, the stateful update path `bb`.
+        bb: { enabled: true, length: bb.length, stdDev: Number(bb.std_dev) },
+        choppiness: { ...off, length: 14 },
+        superTrend: { enabled: true, factor: Number(supertrend.multiplier), period: supertrend.length },
+        atrTrailingStop: { ...off, period: 14, multiplier: 3.5 },
+        obv: { ...off, smoothingLength: 0 },
+        mfi: { ...off, length: 14 },
+        vwap: { ...off, length: 0, anchor: 'session' },
+        parabolicSar: { ...off, start: 0.02, increment: 0.02, max: 0.2 },
+        volumeMa: { ...off, length: 20, maType: 'sma' },
+        volumeProfile: { ...off, rows: 24 },
+        bollingerBands: { enabled: true, length: bb.length, stdDev: Number(bb.std_dev), source: 'close' },
+    };
+}
+
+// StatefulTechnicalsCalculator keeps 200 candles; seeding it with a few times
+// that is what the app does on a chart open, independent of dataset size.
+const JS_UPDATE_HISTORY = 1000;
+
+// A 10M-bar WASM run converts 40M numbers to strings before it starts.
+const DRIVER_TIMEOUT_MS = 60 * 60 * 1000;
+
+interface Columns {
+    n: number;
+    time: Float64Array;
+    open: Float64Array;
+    high: Float64Array;
+    low: Float64Array;
+    close: Float64Array;
+    volume: Float64Array;
+}
+
+function readColumn(dir: string, name: string): Float64Array {
+    const buf = fs.readFileSync(path.join(dir, `${name}.f64`));
+    return new Float64Array(buf.buffer, buf.byteOffset, buf.byteLength / 8);
+}
+
+function loadDataset(dir: string): Columns {
+    const meta = JSON.parse(fs.readFileSync(path.join(dir, 'meta.json'), 'utf-8'));
+    return {
+        n: meta.n,
+        time: readColumn(dir, 'time'),
+        open: readColumn(dir, 'open'),
+        high: readColumn(dir, 'high'),
+        low: readColumn(dir, 'low'),
+        close: readColumn(dir, 'close'),
+        volume: readColumn(dir, 'volume'),
+    };
+}
+
+function percentile(sorted: number[], p: number): number {
+    if (sorted.length === 0) return 0;
+    const idx = Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length));
+    return sorted[idx];
+}
+
+function latencySummary(samplesMs: number[]) {
+    const sorted = [...samplesMs].sort((a, b) => a - b);
+    const mean = sorted.reduce((s, v) => s + v, 0) / Math.max(1, sorted.length);
+    return {
+        count: sorted.length,
+        mean_us: mean * 1000,
+        p50_us: percentile(sorted, 50) * 1000,
+        p95_us: percentile(sorted, 95) * 1000,
+        p99_us: percentile(sorted, 99) * 1000,
+    };
+}
+
+function runJsBatch(c: Columns) {
+    JSIndicators.ema(c.close, 20);
+    JSIndicators.sma(c.close, 20);
+    JSIndicators.rsi(c.close, 14);
+    JSIndicators.macd(c.close, 12, 26, 9);
+    JSIndicators.bb(c.close, 20, 2);
+    JSIndicators.atr(c.high, c.low, c.close, 14);
+    JSIndicators.stoch(c.high, c.low, c.close, 14);
+    JSIndicators.superTrend(c.high, c.low, c.close, 10, 3);
+}
+
+function toKline(c: Columns, i: number): Kline {
+    return {
+        time: c.time[i],
+        open: new Decimal(c.open[i]),
+        high: new Decimal(c.high[i]),
+        low: new Decimal(c.low[i]),
+        close: new Decimal(c.close[i]),
+        volume: new Decimal(c.volume[i]),
+    };
+}
+
+function benchJs(c: Columns) {
+    const t0 = performance.now();
+    runJsBatch(c);
+    const batchMs = performance.now() - t0;
+
+    const historyLen = Math.min(JS_UPDATE_HISTORY, c.n);
+    const history: Kline[] = [];
+    for (let i = c.n - historyLen; i < c.n; i++) history.push(toKline(c, i));
+    const calc = new StatefulTechnicalsCalculator();
+    calc.initialize(history, toIndicatorSettings(WASM_SETTINGS));
+
+    const samples: number[] = [];
+    for (let u = 0; u < UPDATES; u++) {
+        const tick = toKline(c, c.n - 1 - (u % historyLen));
+        const s = performance.now();
+        calc.update(tick);
+        samples.push(performance.now() - s);
+    }
+    return { batchMs, samples };
+}
+
+async function benchWasm(c: Columns) {
+    const wasmDir = path.resolve(__dirname, '../../static/wasm');
+    const glue = await import(/* @vite-ignore */ path.join(wasmDir, 'technicals_wasm.js'));
+    glue.initSync({ module: fs.readFileSync(path.join(wasmDir, 'technicals_wasm_bg.wasm')) });
+
+    // Strings are part of the WASM boundary cost the app pays (BUG-0182), so
+    // the conversion is timed together with `initialize`.
+    const t0 = performance.now();
+    const closes: string[] = new Array(c.n);
+    const highs: string[] = new Array(c.n);
+    const lows: string[] = new Array(c.n);
+    const volumes: string[] = new Array(c.n);
+    for (let i = 0; i < c.n; i++) {
+        closes[i] = String(c.close[i]);
+        highs[i] = String(c.high[i]);
+        lows[i] = String(c.low[i]);
+        volumes[i] = String(c.volume[i]);
+    }
+    const calc = new glue.TechnicalsCalculator();
+    calc.initialize(closes, highs, lows, volumes, c.time, JSON.stringify(WASM_SETTINGS));
+    const batchMs = performance.now() - t0;
+
+    const samples: number[] = [];
+    for (let u = 0; u < UPDATES; u++) {
+        const i = c.n - 1 - (u % c.n);
+        const s = performance.now();
+        calc.update(
+            String(c.open[i]), String(c.high[i]), String(c.low[i]),
+            String(c.close[i]), String(c.volume[i]), String(c.time[i]),
+        );
+        samples.push(performance.now() - s);
+    }
+    calc.free();
+    return { batchMs, samples };
+}
+
+describe.skipIf(!DATASET_DIR || !OUT_FILE)('cross-engine indicator driver', () => {
+    it(`benchmarks the ${ENGINE} engine`, async () => {
+        const columns = loadDataset(DATASET_DIR!);
+        const rssBefore = process.memoryUsage().rss;
+
+        const { batchMs, samples } = ENGINE === 'js' ? benchJs(columns) : await benchWasm(columns);
+
+        // maxRSS is reported in kilobytes.
+        const peakRss = process.resourceUsage().maxRSS * 1024;
+        const result = {
+            engine: ENGINE,
+            bars: columns.n,
+            batch_seconds: batchMs / 1000,
+            bars_per_sec: columns.n / Math.max(batchMs / 1000, 1e-9),
+            update: latencySummary(samples),
+            memory: { peak_bytes: Math.max(0, peakRss - rssBefore), peak_rss_bytes: peakRss },
+            runtime: `node ${process.version}`,
+        };
+        fs.writeFileSync(OUT_FILE!, JSON.stringify(result));
+    }, DRIVER_TIMEOUT_MS);
+});
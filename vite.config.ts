@@ -7,8 +7,7 @@
  * (at your option) any later version.
  */
 
-import { existsSync } from "node:fs";
-import { readFileSync } from "node:fs";
+import { existsSync, readFileSync } from "node:fs";
 import { execSync } from "node:child_process";
 import { fileURLToPath } from "node:url";
 import { sveltekit } from "@sveltejs/kit/vite";
@@ -25,6 +24,32 @@ const { version: appVersion } = JSON.parse(
   readFileSync(new URL("./package.json", import.meta.url), "utf-8"),
 ) as { version: string };
 
+interface FontSubset {
+  url: string;
+  type: string;
+  unicode_range?: string;
+}
+
+// WOFF2 subsets written by scripts/perf/static_assets.py, keyed by the URL
+// of the font they cover. `npm run build` writes them first (build:fonts);
+// without them (no fontTools, or a dev server before any build) the app
+// loads the original TTFs.
+function fontSubsets(): Record<string, FontSubset> {
+  const manifestPath = "static/_opt/manifest.json";
+  if (!existsSync(manifestPath)) return {};
+  const { assets } = JSON.parse(readFileSync(manifestPath, "utf-8")) as {
+    assets: Record<string, { variants: FontSubset[] }>;
+  };
+  return Object.fromEntries(
+    Object.entries(assets).flatMap(([url, asset]) => {
+      const subset = asset.variants.find((v) => v.type === "font/woff2" && v.unicode_range);
+      return subset ? [[url, subset]] : [];
+    }),
+  );
+}
+
+const FONT_SUBSETS = fontSubsets();
+
 /** Test files that mount a Svelte component. See the `components` project below. */
 const COMPONENT_TESTS = "src/**/*.component.test.ts";
 
@@ -77,6 +102,29 @@ export default defineConfig({
           svelte(),
         ]
       : sveltekit(),
+    {
+      // Follows each font's @font-face rule with one for its subset, limited
+      // to the subset's code points. Browsers pick faces by unicode-range,
+      // later rules first: text within the subset loads only the WOFF2, and
+      // any other character (user input, symbol names, news) still renders in
+      // the family from the full TTF, fetched when first needed. Runs before
+      // Tailwind and Vite's CSS pipeline, on the source text of app.css.
+      name: "cachy-font-subsets",
+      enforce: "pre",
+      transform(code, id) {
+        if (!id.split("?")[0].endsWith(".css")) return null;
+        const out = code.replace(/@font-face\s*\{[^}]*\}/g, (rule) => {
+          const font = Object.keys(FONT_SUBSETS).find((url) => rule.includes(`url("${url}") format("truetype")`));
+          if (!font) return rule;
+          const subset = FONT_SUBSETS[font];
+          const subsetRule = rule
+            .replace(`url("${font}") format("truetype")`, `url("${subset.url}") format("woff2")`)
+            .replace(/\}$/, `  unicode-range: ${subset.unicode_range};\n}`);
+          return `${rule}\n\n${subsetRule}`;
+        });
+        return out === code ? null : { code: out, map: null };
+      },
+    },
     tailwindcss(),
   ],
   resolve: {
@@ -127,6 +175,10 @@ export default defineConfig({
   },
   define: {
     "import.meta.env.VITE_APP_VERSION": JSON.stringify(appVersion),
+    // For the font preload in hooks.server.ts.
+    "import.meta.env.VITE_FONT_SUBSETS": JSON.stringify(
+      JSON.stringify(Object.fromEntries(Object.entries(FONT_SUBSETS).map(([font, subset]) => [font, subset.url]))),
+    ),
   },
   optimizeDeps: {
     include: ["intl-messageformat"],
@@ -178,5 +230,10 @@ export default defineConfig({
       },
     },
     chunkSizeWarningLimit: 1000,
+    // `BUNDLE_SOURCEMAP=1 npm run build` writes source maps for
+    // scripts/perf/bundle_size.py, which splits each chunk's bytes by source
+    // module. "hidden" leaves the shipped files without a sourceMappingURL
+    // comment; normal builds write no maps at all.
+    sourcemap: process.env.BUNDLE_SOURCEMAP ? "hidden" : false,
   },
 });
\ No newline at end of file